@@ -1,6 +1,11 @@
 import logging
 import asyncio
+import os
+import random
+import weakref
 import httpx
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
 from datetime import datetime, time, timedelta, timezone
 from fake_useragent import UserAgent
 from backend.app.core.calendar import TradeCalendar
@@ -156,25 +161,114 @@ class MarketClock:
         )
         return str(context["default_display_date"])
 
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    重试策略：网络错误与 retry_statuses 中的状态码按指数退避重试，
+    第 n 次重试前等待 min(backoff_max, backoff_base * 2^n) 秒（带 50%~100% 抖动）。
+    """
+    attempts: int = 3
+    backoff_base: float = 0.3
+    backoff_max: float = 3.0
+    retry_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            attempts=max(1, int(os.getenv("HTTP_RETRY_ATTEMPTS", "3"))),
+            backoff_base=float(os.getenv("HTTP_RETRY_BACKOFF_BASE", "0.3")),
+            backoff_max=float(os.getenv("HTTP_RETRY_BACKOFF_MAX", "3.0")),
+        )
+
+    def delay(self, retry_index: int) -> float:
+        base = min(self.backoff_max, self.backoff_base * (2 ** retry_index))
+        return base * random.uniform(0.5, 1.0)
+
+
+class _LoopClientState:
+    """单个事件循环内共享的连接池：httpx.AsyncClient 绑定创建它的 loop，不能跨 loop 复用。"""
+
+    def __init__(self, limits: httpx.Limits):
+        self.client = httpx.AsyncClient(
+            headers={"Accept": "*/*", "Connection": "keep-alive"},
+            limits=limits,
+            follow_redirects=True,
+        )
+        self.host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def host_semaphore(self, host: str, per_host_limit: int) -> asyncio.Semaphore:
+        semaphore = self.host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(per_host_limit)
+            self.host_semaphores[host] = semaphore
+        return semaphore
+
+
 class HTTPClient:
     """
     封装带有随机 User-Agent 的 HTTP 客户端
+
+    每个事件循环持有一个长生命周期的 httpx.AsyncClient（keep-alive 连接池），
+    同一 host 的并发连接数受 per_host_limit 约束，失败请求按 retry_policy 退避重试。
     """
     _ua = UserAgent()
-    
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "32")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "16")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+    )
+    per_host_limit = int(os.getenv("HTTP_PER_HOST_CONNECTIONS", "4"))
+    retry_policy = RetryPolicy.from_env()
+    _states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopClientState]" = weakref.WeakKeyDictionary()
+
     @classmethod
-    async def get(cls, url: str, params: dict = None, timeout: float = 10.0):
-        headers = {
-            "User-Agent": cls._ua.random,
-            "Accept": "*/*",
-            "Connection": "keep-alive"
-        }
-        
-        async with httpx.AsyncClient(headers=headers, timeout=timeout, follow_redirects=True) as client:
+    def _state(cls) -> _LoopClientState:
+        loop = asyncio.get_running_loop()
+        state = cls._states.get(loop)
+        if state is None or state.client.is_closed:
+            state = _LoopClientState(cls.limits)
+            cls._states[loop] = state
+        return state
+
+    @classmethod
+    async def get(
+        cls,
+        url: str,
+        params: dict = None,
+        timeout: float = 10.0,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        policy = retry_policy or cls.retry_policy
+        state = cls._state()
+        semaphore = state.host_semaphore(httpx.URL(url).host, cls.per_host_limit)
+        headers = {"User-Agent": cls._ua.random}
+
+        for attempt in range(policy.attempts):
+            is_last = attempt + 1 >= policy.attempts
             try:
-                response = await client.get(url, params=params)
+                async with semaphore:
+                    response = await state.client.get(url, params=params, headers=headers, timeout=timeout)
+                if response.status_code in policy.retry_statuses and not is_last:
+                    logger.warning(f"HTTP {response.status_code} [{url}], retry {attempt + 1}/{policy.attempts - 1}")
+                    await asyncio.sleep(policy.delay(attempt))
+                    continue
                 response.raise_for_status()
                 return response
+            except httpx.TransportError as e:
+                if is_last:
+                    logger.error(f"HTTP Request Failed [{url}]: {e}")
+                    return None
+                logger.warning(f"HTTP transport error [{url}]: {e}, retry {attempt + 1}/{policy.attempts - 1}")
+                await asyncio.sleep(policy.delay(attempt))
             except Exception as e:
                 logger.error(f"HTTP Request Failed [{url}]: {e}")
                 return None
+        return None
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """关闭当前事件循环上的连接池（在 loop 结束前调用）。"""
+        loop = asyncio.get_running_loop()
+        state = cls._states.pop(loop, None)
+        if state is not None:
+            await state.client.aclose()
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    按 key 合并并发调用（single-flight）：同一 key 已有在途计算时，后来者不再重复计算，
+    而是等待同一个结果；计算结束即出队，下一次调用重新计算（不做结果缓存）。
+
+    - `run` 把同步函数放进本实例自带的有界线程池执行，事件循环不被阻塞；
+    - `run_async` 合并协程（例如带网络请求的补抓）；
+    - 等待方被取消（客户端断开）不会取消共享计算，其它等待方照常拿到结果；
+    - `fresh_after`（time.monotonic 时间戳）要求结果必须来自该时刻之后启动的计算，
+      例如补抓写库后再刷新，不能搭上补抓之前就已启动的那次；
+    - 不传 `clone` 时所有等待方拿到同一个结果对象；结果会被调用方改写的（如接口响应），
+      传 `clone`，每个等待方（含发起方）各拿一份拷贝，互相看不到对方的改动。
+
+    在途表只在事件循环线程上读写；不同事件循环各自独立合并。
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix=thread_name_prefix)
+        self._inflight: Dict[Tuple[int, Hashable], Tuple[float, "asyncio.Future"]] = {}
+        self._stats_lock = threading.Lock()
+        self.stats = {"started": 0, "joined": 0, "failed": 0}
+
+    def _count(self, field: str) -> None:
+        with self._stats_lock:
+            self.stats[field] += 1
+
+    async def run_async(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable],
+        *,
+        fresh_after: Optional[float] = None,
+        clone: Optional[Callable[[Any], Any]] = None,
+    ):
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        existing = self._inflight.get(slot)
+        if existing is not None and (fresh_after is None or existing[0] >= fresh_after):
+            self._count("joined")
+            result = await asyncio.shield(existing[1])
+            return clone(result) if clone is not None else result
+
+        started_at = time.monotonic()
+        task = asyncio.ensure_future(factory())
+        self._inflight[slot] = (started_at, task)
+        self._count("started")
+
+        def _release(done: "asyncio.Future") -> None:
+            current = self._inflight.get(slot)
+            if current is not None and current[1] is done:
+                del self._inflight[slot]
+            if not done.cancelled() and done.exception() is not None:
+                self._count("failed")
+
+        task.add_done_callback(_release)
+        result = await asyncio.shield(task)
+        return clone(result) if clone is not None else result
+
+    async def run(
+        self,
+        key: Hashable,
+        fn: Callable,
+        *args,
+        fresh_after: Optional[float] = None,
+        clone: Optional[Callable[[Any], Any]] = None,
+        **kwargs,
+    ):
+        loop = asyncio.get_running_loop()
+        call = partial(fn, *args, **kwargs)
+        return await self.run_async(
+            key,
+            lambda: loop.run_in_executor(self._executor, call),
+            fresh_after=fresh_after,
+            clone=clone,
+        )
+
+    def inflight_count(self) -> int:
+        return len(self._inflight)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self.stats, inflight=len(self._inflight))
+
+
+REALTIME_WORKERS = int(os.getenv("REALTIME_WORKERS", "4"))
+
+# 盘中实时接口（dashboard / intraday_fusion / 补抓 / preview 刷新）共用的合并层与有界线程池
+realtime_flight = SingleFlight(REALTIME_WORKERS, "realtime")
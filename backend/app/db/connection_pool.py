@@ -0,0 +1,230 @@
+"""
+长连接 SQLite 连接池。
+
+- 读：每个线程、每个库文件一条长连接（query_only + mmap + 大 page cache），
+  FastAPI 线程池里的线程常驻，连接随之复用，不再每次请求 connect/close。
+- 写：每个库文件一条共享写连接，用 RLock 串行化，首次打开时切到 WAL。
+- schema：`ensure_schema_once` 在同一个库文件上只跑一次 DDL。
+- attach：`read_connection(..., attach={别名: 路径})` 在读连接上挂载其它库（只挂一次），
+  跨库查询可以在一条 SQL 里完成。
+
+库文件被删除/替换（inode 变化）时，缓存的连接与 schema 标记会自动失效重建；
+原地覆盖文件的脚本可以显式调用 `invalidate_connections`。
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+BUSY_TIMEOUT_MS = 30000
+READ_CACHE_KIB = int(os.getenv("SQLITE_READ_CACHE_KIB", "65536"))
+READ_MMAP_BYTES = int(os.getenv("SQLITE_READ_MMAP_BYTES", str(256 * 1024 * 1024)))
+
+FileIdentity = Optional[Tuple[int, int]]
+
+_registry_lock = threading.Lock()
+_thread_state = threading.local()
+_epoch = 0
+_reader_conns: List[sqlite3.Connection] = []
+_writers: Dict[str, Tuple[FileIdentity, sqlite3.Connection]] = {}
+_writer_locks: Dict[str, threading.RLock] = {}
+_schema_ready: Dict[Tuple[str, str], FileIdentity] = {}
+
+
+def _normalize_path(db_path: str) -> str:
+    return os.path.abspath(str(db_path))
+
+
+def _file_identity(db_path: str) -> FileIdentity:
+    try:
+        stat = os.stat(db_path)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino)
+
+
+def _open_reader(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS};")
+    conn.execute(f"PRAGMA cache_size=-{READ_CACHE_KIB};")
+    conn.execute(f"PRAGMA mmap_size={READ_MMAP_BYTES};")
+    conn.execute("PRAGMA query_only=ON;")
+    return conn
+
+
+def _open_writer(db_path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS};")
+    conn.execute(f"PRAGMA cache_size=-{READ_CACHE_KIB};")
+    conn.execute("PRAGMA journal_mode=WAL;")
+    return conn
+
+
+def _close_quietly(conn: sqlite3.Connection) -> None:
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def _thread_readers() -> Dict[str, Tuple[FileIdentity, sqlite3.Connection]]:
+    if getattr(_thread_state, "epoch", None) != _epoch:
+        _thread_state.epoch = _epoch
+        _thread_state.readers = {}
+        _thread_state.attachments = {}
+    return _thread_state.readers
+
+
+def _sync_attachments(db_path: str, conn: sqlite3.Connection, attach: Dict[str, Optional[str]]) -> None:
+    # 已挂载的别名只在目标路径或其 inode 变化时重新 ATTACH；路径为空则卸载
+    attached: Dict[str, Tuple[str, FileIdentity]] = _thread_state.attachments.setdefault(db_path, {})
+    for alias, target in attach.items():
+        current = attached.get(alias)
+        if not target:
+            if current is not None:
+                conn.execute(f"DETACH DATABASE {alias}")
+                attached.pop(alias, None)
+            continue
+        target_path = _normalize_path(target)
+        wanted = (target_path, _file_identity(target_path))
+        if current == wanted:
+            continue
+        if current is not None:
+            conn.execute(f"DETACH DATABASE {alias}")
+            attached.pop(alias, None)
+        conn.execute(f"ATTACH DATABASE ? AS {alias}", (target_path,))
+        conn.execute(f"PRAGMA {alias}.cache_size=-{READ_CACHE_KIB};")
+        conn.execute(f"PRAGMA {alias}.mmap_size={READ_MMAP_BYTES};")
+        attached[alias] = wanted
+
+
+def _acquire_reader(db_path: str) -> sqlite3.Connection:
+    readers = _thread_readers()
+    identity = _file_identity(db_path)
+    cached = readers.get(db_path)
+    if cached is not None:
+        cached_identity, conn = cached
+        if identity is not None and cached_identity == identity:
+            return conn
+        readers.pop(db_path, None)
+        _thread_state.attachments.pop(db_path, None)
+        with _registry_lock:
+            if conn in _reader_conns:
+                _reader_conns.remove(conn)
+        _close_quietly(conn)
+    conn = _open_reader(db_path)
+    readers[db_path] = (_file_identity(db_path), conn)
+    _thread_state.attachments.pop(db_path, None)
+    with _registry_lock:
+        _reader_conns.append(conn)
+    return conn
+
+
+def _writer_lock(db_path: str) -> threading.RLock:
+    with _registry_lock:
+        lock = _writer_locks.get(db_path)
+        if lock is None:
+            lock = threading.RLock()
+            _writer_locks[db_path] = lock
+        return lock
+
+
+def _acquire_writer(db_path: str) -> sqlite3.Connection:
+    identity = _file_identity(db_path)
+    cached = _writers.get(db_path)
+    if cached is not None:
+        cached_identity, conn = cached
+        if identity is not None and cached_identity == identity:
+            return conn
+        _writers.pop(db_path, None)
+        _close_quietly(conn)
+    conn = _open_writer(db_path)
+    _writers[db_path] = (_file_identity(db_path), conn)
+    return conn
+
+
+@contextmanager
+def read_connection(
+    db_path: str,
+    row_factory=None,
+    attach: Optional[Dict[str, Optional[str]]] = None,
+) -> Iterator[sqlite3.Connection]:
+    """当前线程在 db_path 上的只读长连接；退出时不关闭，只还原 row_factory。"""
+    path = _normalize_path(db_path)
+    conn = _acquire_reader(path)
+    if attach:
+        _sync_attachments(path, conn, attach)
+    previous = conn.row_factory
+    conn.row_factory = row_factory
+    try:
+        yield conn
+    finally:
+        conn.row_factory = previous
+
+
+@contextmanager
+def write_connection(db_path: str, row_factory=None) -> Iterator[sqlite3.Connection]:
+    """串行化的共享写连接；正常退出提交，异常回滚。同一线程可重入。"""
+    path = _normalize_path(db_path)
+    with _writer_lock(path):
+        conn = _acquire_writer(path)
+        previous = conn.row_factory
+        conn.row_factory = row_factory
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.row_factory = previous
+
+
+def ensure_schema_once(db_path: str, name: str, builder: Callable[[sqlite3.Connection], None]) -> None:
+    """同一库文件上 builder 只执行一次；库文件被替换后会重新执行。"""
+    path = _normalize_path(db_path)
+    key = (name, path)
+    identity = _file_identity(path)
+    if identity is not None and _schema_ready.get(key) == identity:
+        return
+    with write_connection(path) as conn:
+        identity = _file_identity(path)
+        if identity is not None and _schema_ready.get(key) == identity:
+            return
+        builder(conn)
+        if conn.in_transaction:
+            conn.commit()
+        _schema_ready[key] = _file_identity(path)
+
+
+def invalidate_connections(db_path: Optional[str] = None) -> None:
+    """丢弃各线程缓存的读连接，关闭 db_path 的写连接并清空其 schema 标记（为空时作用于全部库）。"""
+    global _epoch
+    target = _normalize_path(db_path) if db_path else None
+    with _registry_lock:
+        _epoch += 1
+        readers = list(_reader_conns)
+        _reader_conns.clear()
+        locks = dict(_writer_locks)
+    for conn in readers:
+        _close_quietly(conn)
+    for path, lock in locks.items():
+        if target is not None and path != target:
+            continue
+        with lock:
+            cached = _writers.pop(path, None)
+            if cached is not None:
+                _close_quietly(cached[1])
+    for key in list(_schema_ready):
+        if target is None or key[1] == target:
+            _schema_ready.pop(key, None)
+
+
+def close_all_connections() -> None:
+    invalidate_connections(None)
@@ -2,6 +2,8 @@ import sqlite3
 import os
 from backend.app.core.config import DB_FILE, USER_DB_FILE
 from backend.app.core.time_buckets import is_canonical_30m_start
+from backend.app.db.connection_pool import ensure_schema_once, read_connection, write_connection
+from backend.app.db.sql_predicates import day_range_bounds
 
 def get_db_connection():
     conn = sqlite3.connect(DB_FILE)
@@ -12,6 +14,9 @@ def get_user_db_connection():
     _ensure_user_schema(conn)
     return conn
 
+def _ensure_user_db():
+    ensure_schema_once(USER_DB_FILE, "user", _ensure_user_schema)
+
 
 def _ensure_user_schema(conn: sqlite3.Connection):
     c = conn.cursor()
@@ -22,6 +27,7 @@ def _ensure_user_schema(conn: sqlite3.Connection):
              added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )'''
     )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_watchlist_symbol_nocase ON watchlist (symbol COLLATE NOCASE)")
     c.execute(
         '''CREATE TABLE IF NOT EXISTS app_config (
              key TEXT PRIMARY KEY,
@@ -35,97 +41,258 @@ def _ensure_user_schema(conn: sqlite3.Connection):
     conn.commit()
 
 def get_watchlist_items():
-    conn = get_user_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT * FROM watchlist ORDER BY added_at DESC")
-    rows = c.fetchall()
-    conn.close()
+    _ensure_user_db()
+    with read_connection(USER_DB_FILE) as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM watchlist ORDER BY added_at DESC")
+        rows = c.fetchall()
     return [{"symbol": r[0], "name": r[1], "added_at": r[2]} for r in rows]
 
 def add_watchlist_item(symbol: str, name: str):
-    conn = get_user_db_connection()
-    c = conn.cursor()
-    c.execute("INSERT OR REPLACE INTO watchlist (symbol, name) VALUES (?, ?)", (symbol, name))
-    conn.commit()
-    conn.close()
+    _ensure_user_db()
+    with write_connection(USER_DB_FILE) as conn:
+        c = conn.cursor()
+        c.execute("INSERT OR REPLACE INTO watchlist (symbol, name) VALUES (?, ?)", (symbol, name))
 
 def remove_watchlist_item(symbol: str):
     """从星标列表中删除指定股票"""
-    conn = get_user_db_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM watchlist WHERE symbol = ?", (symbol,))
-    conn.commit()
-    conn.close()
+    _ensure_user_db()
+    with write_connection(USER_DB_FILE) as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM watchlist WHERE symbol = ?", (symbol,))
 
 def get_all_symbols():
-    conn = get_user_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT symbol FROM watchlist")
-    symbols = [row[0] for row in cursor.fetchall()]
-    conn.close()
+    _ensure_user_db()
+    with read_connection(USER_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT symbol FROM watchlist")
+        symbols = [row[0] for row in cursor.fetchall()]
     return symbols
 
+def _ensure_tick_watermark_schema(conn: sqlite3.Connection):
+    conn.execute(
+        '''CREATE TABLE IF NOT EXISTS trade_tick_watermarks (
+             symbol TEXT NOT NULL,
+             date TEXT NOT NULL,
+             last_time TEXT NOT NULL,
+             last_seq INTEGER NOT NULL,
+             row_count INTEGER NOT NULL,
+             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+             PRIMARY KEY(symbol, date)
+        )'''
+    )
+
+
+def advance_tick_watermark(base, rows):
+    """
+    在 base 水位线之后顺序追加 rows，返回新的水位线。
+    水位线 = {last_time, last_seq, row_count}：last_seq 是 last_time 这一秒内已落库的笔数（秒内序号）。
+    rows 为 (symbol, time, price, volume, amount, type, date) 且按成交顺序排列。
+    """
+    last_time = str((base or {}).get("last_time") or "")
+    last_seq = int((base or {}).get("last_seq") or 0)
+    row_count = int((base or {}).get("row_count") or 0)
+    for row in rows:
+        t_time = str(row[1])
+        if t_time == last_time:
+            last_seq += 1
+        else:
+            last_time = t_time
+            last_seq = 1
+    return {"last_time": last_time, "last_seq": last_seq, "row_count": row_count + len(rows)}
+
+
+def _write_tick_watermark(conn: sqlite3.Connection, symbol, date, watermark):
+    conn.execute(
+        '''
+        INSERT OR REPLACE INTO trade_tick_watermarks (symbol, date, last_time, last_seq, row_count, updated_at)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''',
+        (symbol, date, watermark["last_time"], int(watermark["last_seq"]), int(watermark["row_count"])),
+    )
+
+
+def _read_tick_watermark(conn: sqlite3.Connection, symbol, date):
+    row = conn.execute(
+        "SELECT last_time, last_seq, row_count FROM trade_tick_watermarks WHERE symbol=? AND date=?",
+        (symbol, date),
+    ).fetchone()
+    if not row:
+        return None
+    return {"last_time": row[0], "last_seq": int(row[1]), "row_count": int(row[2])}
+
+
+def _ensure_tick_watermark_table():
+    ensure_schema_once(DB_FILE, "tick_watermarks", _ensure_tick_watermark_schema)
+
+
+def get_tick_watermark(symbol, date):
+    _ensure_tick_watermark_table()
+    with read_connection(DB_FILE) as conn:
+        return _read_tick_watermark(conn, symbol, date)
+
+
+def _same_watermark(left, right) -> bool:
+    left = left or {"last_time": "", "last_seq": 0, "row_count": 0}
+    right = right or {"last_time": "", "last_seq": 0, "row_count": 0}
+    return (
+        str(left.get("last_time") or "") == str(right.get("last_time") or "")
+        and int(left.get("last_seq") or 0) == int(right.get("last_seq") or 0)
+        and int(left.get("row_count") or 0) == int(right.get("row_count") or 0)
+    )
+
+
 def save_ticks_daily_overwrite(symbol, date, data_to_insert):
     """
     全量覆盖写入：先删除当日该股票所有数据，再插入新数据。
     用于解决 Sina L2 数据无唯一 ID 导致的重复/丢失问题。
+    同时重置该 symbol+date 的追加水位线。
     """
-    conn = get_db_connection()
-    try:
+    _ensure_tick_watermark_table()
+    with write_connection(DB_FILE) as conn:
         with conn: # 自动提交事务
             conn.execute("DELETE FROM trade_ticks WHERE symbol=? AND date=?", (symbol, date))
             conn.executemany('''
                 INSERT INTO trade_ticks (symbol, time, price, volume, amount, type, date)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', data_to_insert)
-    finally:
-        conn.close()
+            watermark = advance_tick_watermark(None, data_to_insert)
+            _write_tick_watermark(conn, symbol, date, watermark)
+        return watermark
+
+
+def append_ticks_after_watermark(symbol, date, base_watermark, data_to_append):
+    """
+    增量追加写入：仅当服务端水位线与调用方声明的 base_watermark 完全一致时才追加，
+    保证逐笔序列连续。返回 (appended, watermark)：
+    - appended=True  时 watermark 为追加后的新水位线；
+    - appended=False 时 watermark 为服务端当前水位线，调用方需回退到全量覆盖。
+    """
+    _ensure_tick_watermark_table()
+    with write_connection(DB_FILE) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = _read_tick_watermark(conn, symbol, date)
+            base_time = str((base_watermark or {}).get("last_time") or "")
+            continuous = _same_watermark(current, base_watermark) and all(
+                str(row[1]) >= base_time for row in data_to_append
+            )
+            if not continuous:
+                conn.rollback()
+                return False, current
+            if data_to_append:
+                conn.executemany('''
+                    INSERT INTO trade_ticks (symbol, time, price, volume, amount, type, date)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', data_to_append)
+            watermark = advance_tick_watermark(current or base_watermark, data_to_append)
+            _write_tick_watermark(conn, symbol, date, watermark)
+            conn.commit()
+            return True, watermark
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def save_ticks_with_watermark(symbol, date, data_to_insert):
+    """
+    拥有当日全量 tick 快照的调用方（如 DataCollector）使用：
+    若快照前缀与服务端水位线吻合，只追加水位线之后的新行；否则回退为全量覆盖。
+    返回 ("appended" | "overwritten", watermark)。
+    """
+    current = get_tick_watermark(symbol, date)
+    if current and 0 < current["row_count"] <= len(data_to_insert):
+        row_count = current["row_count"]
+        prefix_watermark = advance_tick_watermark(None, data_to_insert[:row_count])
+        if _same_watermark(prefix_watermark, current):
+            appended, watermark = append_ticks_after_watermark(
+                symbol, date, current, data_to_insert[row_count:]
+            )
+            if appended:
+                return "appended", watermark
+    return "overwritten", save_ticks_daily_overwrite(symbol, date, data_to_insert)
 
 def save_trade_ticks(data_list):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.executemany('''
-        INSERT INTO trade_ticks 
-        (symbol, time, price, volume, amount, type, date)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', data_list)
-    conn.commit()
-    conn.close()
+    with write_connection(DB_FILE) as conn:
+        c = conn.cursor()
+        c.executemany('''
+            INSERT INTO trade_ticks 
+            (symbol, time, price, volume, amount, type, date)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', data_list)
 
 def get_ticks_by_date(symbol: str, date_str: str):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT time, price, volume, amount, type FROM trade_ticks WHERE symbol=? AND date=? ORDER BY time DESC", (symbol, date_str))
-    rows = c.fetchall()
-    conn.close()
+    with read_connection(DB_FILE) as conn:
+        c = conn.cursor()
+        c.execute("SELECT time, price, volume, amount, type FROM trade_ticks WHERE symbol=? AND date=? ORDER BY time DESC", (symbol, date_str))
+        rows = c.fetchall()
     return rows
 
+def get_ticks_since(symbol: str, date_str: str, start_time: str, end_time: str):
+    """按时间升序读取 [start_time, end_time] 内的 tick，供增量聚合使用；末列附带 rowid 作为前缀锚点。"""
+    with read_connection(DB_FILE) as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT time, price, volume, amount, type, rowid FROM trade_ticks
+            WHERE symbol=? AND date=? AND time>=? AND time<=?
+            ORDER BY time ASC, rowid ASC
+            """,
+            (symbol, date_str, start_time, end_time),
+        )
+        rows = c.fetchall()
+    return rows
+
+def get_tick_anchor_rows(symbol: str, date_str: str, rowids):
+    """按 rowid 点查锚点 tick，返回 {rowid: (time, amount)}；行已被删除或已不属于该 symbol+date 时缺席。"""
+    ids = sorted({int(rowid) for rowid in rowids})
+    if not ids:
+        return {}
+    placeholders = ",".join("?" * len(ids))
+    with read_connection(DB_FILE) as conn:
+        c = conn.cursor()
+        c.execute(
+            f"SELECT rowid, time, amount FROM trade_ticks WHERE rowid IN ({placeholders}) AND symbol=? AND date=?",
+            (*ids, symbol, date_str),
+        )
+        rows = c.fetchall()
+    return {int(row[0]): (str(row[1]), float(row[2])) for row in rows}
+
+def get_tick_prefix_stats(symbol: str, date_str: str, before_time: str):
+    """`time < before_time` 的 tick 笔数与成交额合计 (count, sum_amount)，走 (symbol, date, time) 索引区间。"""
+    with read_connection(DB_FILE) as conn:
+        c = conn.cursor()
+        c.execute(
+            "SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM trade_ticks WHERE symbol=? AND date=? AND time<?",
+            (symbol, date_str, before_time),
+        )
+        row = c.fetchone()
+    return int(row[0]), float(row[1])
+
 def get_latest_tick_time(symbol: str, date_str: str):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute(
-        "SELECT MAX(time) FROM trade_ticks WHERE symbol=? AND date=?",
-        (symbol, date_str),
-    )
-    row = c.fetchone()
-    conn.close()
+    with read_connection(DB_FILE) as conn:
+        c = conn.cursor()
+        c.execute(
+            "SELECT MAX(time) FROM trade_ticks WHERE symbol=? AND date=?",
+            (symbol, date_str),
+        )
+        row = c.fetchone()
     return row[0] if row and row[0] else None
 
 def get_ticks_for_aggregation(symbol: str, date: str):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT amount, type, price FROM trade_ticks WHERE symbol=? AND date=?", (symbol, date))
-    ticks = c.fetchall()
-    conn.close()
+    with read_connection(DB_FILE) as conn:
+        c = conn.cursor()
+        c.execute("SELECT amount, type, price FROM trade_ticks WHERE symbol=? AND date=?", (symbol, date))
+        ticks = c.fetchall()
     return ticks
 
 def get_app_config():
     """读取业务配置；LLM 仅放行非敏感的 llm_model，Key/Base URL 仍不返回"""
-    conn = get_user_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT key, value FROM app_config")
-    db_rows = c.fetchall()
-    conn.close()
+    _ensure_user_db()
+    with read_connection(USER_DB_FILE) as conn:
+        c = conn.cursor()
+        c.execute("SELECT key, value FROM app_config")
+        db_rows = c.fetchall()
     config = {
         k: v for k, v in db_rows
         if (not k.startswith('llm_')) or k == 'llm_model'
@@ -136,97 +303,85 @@ def update_app_config(key: str, value: str):
     """更新业务配置；仅允许 llm_model 通过前端修改"""
     if key.startswith('llm_') and key != 'llm_model':
         raise ValueError(f"LLM 配置 '{key}' 不可通过 API 修改，请使用服务端环境变量")
-    conn = get_user_db_connection()
-    c = conn.cursor()
-    c.execute("INSERT OR REPLACE INTO app_config (key, value) VALUES (?, ?)", (key, value))
-    conn.commit()
-    conn.close()
+    _ensure_user_db()
+    with write_connection(USER_DB_FILE) as conn:
+        c = conn.cursor()
+        c.execute("INSERT OR REPLACE INTO app_config (key, value) VALUES (?, ?)", (key, value))
 
 def save_local_history(symbol, date, net_inflow, main_buy, main_sell, close, change_pct, activity_ratio, config_sig):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute('''
-        INSERT OR REPLACE INTO local_history 
-        (symbol, date, net_inflow, main_buy_amount, main_sell_amount, close, change_pct, activity_ratio, config_signature)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (symbol, date, net_inflow, main_buy, main_sell, close, change_pct, activity_ratio, config_sig))
-    conn.commit()
-    conn.close()
+    with write_connection(DB_FILE) as conn:
+        c = conn.cursor()
+        c.execute('''
+            INSERT OR REPLACE INTO local_history 
+            (symbol, date, net_inflow, main_buy_amount, main_sell_amount, close, change_pct, activity_ratio, config_signature)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (symbol, date, net_inflow, main_buy, main_sell, close, change_pct, activity_ratio, config_sig))
 
 def get_local_history_data(symbol: str, config_sig: str = None):
-    conn = get_db_connection()
-    c = conn.cursor()
-    if config_sig:
-        c.execute("SELECT * FROM local_history WHERE symbol=? AND config_signature=? ORDER BY date ASC", (symbol, config_sig))
-    else:
-        # Fallback: get all history for this symbol, ordered by date
-        # Useful when configuration signature has changed but we still want to see data
-        c.execute("SELECT * FROM local_history WHERE symbol=? ORDER BY date ASC", (symbol,))
-    rows = c.fetchall()
-    conn.close()
+    with read_connection(DB_FILE) as conn:
+        c = conn.cursor()
+        if config_sig:
+            c.execute("SELECT * FROM local_history WHERE symbol=? AND config_signature=? ORDER BY date ASC", (symbol, config_sig))
+        else:
+            # Fallback: get all history for this symbol, ordered by date
+            # Useful when configuration signature has changed but we still want to see data
+            c.execute("SELECT * FROM local_history WHERE symbol=? ORDER BY date ASC", (symbol,))
+        rows = c.fetchall()
     return rows
 
 def save_sentiment_snapshot(data_list):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # V3.0 Add bid1/ask1/tick
-    cursor.executemany('''
-        INSERT OR REPLACE INTO sentiment_snapshots 
-        (symbol, timestamp, date, cvd, oib, price, outer_vol, inner_vol, signals, bid1_vol, ask1_vol, tick_vol)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', data_list)
-    conn.commit()
-    conn.close()
+    with write_connection(DB_FILE) as conn:
+        cursor = conn.cursor()
+        # V3.0 Add bid1/ask1/tick
+        cursor.executemany('''
+            INSERT OR REPLACE INTO sentiment_snapshots 
+            (symbol, timestamp, date, cvd, oib, price, outer_vol, inner_vol, signals, bid1_vol, ask1_vol, tick_vol)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', data_list)
 
 def get_sentiment_history(symbol: str, date: str):
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    # V3.0: Select new columns
-    c.execute('''
-        SELECT timestamp, cvd, oib, price, outer_vol, inner_vol, signals, bid1_vol, ask1_vol, tick_vol
-        FROM sentiment_snapshots 
-        WHERE symbol=? AND date=? 
-        ORDER BY timestamp ASC
-    ''', (symbol, date))
-    rows = c.fetchall()
-    conn.close()
+    with read_connection(DB_FILE, row_factory=sqlite3.Row) as conn:
+        c = conn.cursor()
+        # V3.0: Select new columns
+        c.execute('''
+            SELECT timestamp, cvd, oib, price, outer_vol, inner_vol, signals, bid1_vol, ask1_vol, tick_vol
+            FROM sentiment_snapshots 
+            WHERE symbol=? AND date=? 
+            ORDER BY timestamp ASC
+        ''', (symbol, date))
+        rows = c.fetchall()
     return [dict(r) for r in rows]
 
 def save_history_30m_batch(data_list):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.executemany('''
-        INSERT OR REPLACE INTO history_30m 
-        (symbol, start_time, net_inflow, main_buy, main_sell, super_net, super_buy, super_sell, close, open, high, low)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', data_list)
-    conn.commit()
-    conn.close()
+    with write_connection(DB_FILE) as conn:
+        c = conn.cursor()
+        c.executemany('''
+            INSERT OR REPLACE INTO history_30m 
+            (symbol, start_time, net_inflow, main_buy, main_sell, super_net, super_buy, super_sell, close, open, high, low)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', data_list)
 
 def get_history_30m(symbol: str, limit_days: int = 20):
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    # 1. Get last N dates (descending)
-    c.execute("SELECT DISTINCT substr(start_time, 1, 10) as d FROM history_30m WHERE symbol=? ORDER BY d DESC LIMIT ?", (symbol, limit_days))
-    dates = [row[0] for row in c.fetchall()]
-    
-    if not dates:
-        conn.close()
-        return []
+    with read_connection(DB_FILE) as conn:
+        c = conn.cursor()
         
-    min_date = dates[-1]
-    
-    # 2. Get all bars since min_date
-    c.execute('''
-        SELECT start_time, net_inflow, main_buy, main_sell, super_net, super_buy, super_sell, close, open, high, low 
-        FROM history_30m 
-        WHERE symbol=? AND substr(start_time, 1, 10) >= ?
-        ORDER BY start_time ASC
-    ''', (symbol, min_date))
-    rows = c.fetchall()
-    conn.close()
+        # 1. Get last N dates (descending)
+        c.execute("SELECT DISTINCT substr(start_time, 1, 10) as d FROM history_30m WHERE symbol=? ORDER BY d DESC LIMIT ?", (symbol, limit_days))
+        dates = [row[0] for row in c.fetchall()]
+        
+        if not dates:
+            return []
+            
+        min_date = dates[-1]
+        
+        # 2. Get all bars since min_date
+        c.execute('''
+            SELECT start_time, net_inflow, main_buy, main_sell, super_net, super_buy, super_sell, close, open, high, low 
+            FROM history_30m 
+            WHERE symbol=? AND start_time >= ?
+            ORDER BY start_time ASC
+        ''', (symbol, min_date))
+        rows = c.fetchall()
     
     return [
         {
@@ -247,35 +402,31 @@ def get_history_30m(symbol: str, limit_days: int = 20):
     ]
 
 def save_history_1m_batch(data_list):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.executemany('''
-        INSERT OR REPLACE INTO history_1m 
-        (symbol, time, total_amount, net_inflow, main_buy, main_sell, super_net, super_buy, super_sell, close, open, high, low)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', data_list)
-    conn.commit()
-    conn.close()
+    with write_connection(DB_FILE) as conn:
+        c = conn.cursor()
+        c.executemany('''
+            INSERT OR REPLACE INTO history_1m 
+            (symbol, time, total_amount, net_inflow, main_buy, main_sell, super_net, super_buy, super_sell, close, open, high, low)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', data_list)
 
 def get_history_1m(symbol: str, date: str):
     """
     Get 1-minute historical bars for a specific date.
     Returns the exact same structure as the real-time calculated chart_data/cumulative_data logic.
     """
-    conn = get_db_connection()
-    c = conn.cursor()
+    with read_connection(DB_FILE) as conn:
+        c = conn.cursor()
     
-    # query all minutes for that specific date (time starts with YYYY-MM-DD or time is HH:MM and we filter by date)
-    # `database.py` schema for history_1m: `time TEXT` (expecting 'YYYY-MM-DD HH:MM:00')
-    prefix = f"{date} "
-    c.execute('''
-        SELECT time, total_amount, net_inflow, main_buy, main_sell, super_net, super_buy, super_sell, close, open, high, low
-        FROM history_1m 
-        WHERE symbol=? AND time LIKE ?
-        ORDER BY time ASC
-    ''', (symbol, f"{prefix}%"))
-    rows = c.fetchall()
-    conn.close()
+        # `database.py` schema for history_1m: `time TEXT` (expecting 'YYYY-MM-DD HH:MM:00')
+        # 半开区间 [date, 次日) 走 UNIQUE(symbol, time) 索引做范围查找，LIKE 前缀匹配用不上索引
+        c.execute('''
+            SELECT time, total_amount, net_inflow, main_buy, main_sell, super_net, super_buy, super_sell, close, open, high, low
+            FROM history_1m 
+            WHERE symbol=? AND time >= ? AND time < ?
+            ORDER BY time ASC
+        ''', (symbol, *day_range_bounds(date, date)))
+        rows = c.fetchall()
     
     return [
         {
@@ -304,18 +455,16 @@ def get_latest_sentiment_snapshot(symbol: str, date: str = None):
         from datetime import datetime
         date = datetime.now().strftime("%Y-%m-%d")
         
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('''
-        SELECT timestamp, price, outer_vol, inner_vol, bid1_vol, ask1_vol 
-        FROM sentiment_snapshots 
-        WHERE symbol=? AND date=?
-        ORDER BY timestamp DESC 
-        LIMIT 1
-    ''', (symbol, date))
-    row = c.fetchone()
-    conn.close()
+    with read_connection(DB_FILE, row_factory=sqlite3.Row) as conn:
+        c = conn.cursor()
+        c.execute('''
+            SELECT timestamp, price, outer_vol, inner_vol, bid1_vol, ask1_vol 
+            FROM sentiment_snapshots 
+            WHERE symbol=? AND date=?
+            ORDER BY timestamp DESC 
+            LIMIT 1
+        ''', (symbol, date))
+        row = c.fetchone()
     if row:
         return dict(row)
     return None
@@ -44,6 +44,7 @@ def init_db():
                  name TEXT,
                  added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                  )''')
+    c_user.execute("CREATE INDEX IF NOT EXISTS idx_watchlist_symbol_nocase ON watchlist (symbol COLLATE NOCASE)")
 
     conn = get_db_connection()
     c = conn.cursor()
@@ -60,6 +61,19 @@ def init_db():
     
     # 创建索引加速按天删除
     c.execute("CREATE INDEX IF NOT EXISTS idx_ticks_symbol_date ON trade_ticks (symbol, date)")
+    # 增量聚合按 (symbol, date, time) 水位线范围读取
+    c.execute("CREATE INDEX IF NOT EXISTS idx_ticks_symbol_date_time ON trade_ticks (symbol, date, time)")
+
+    # 逐笔追加水位线 (Append Ingest Watermarks)：每个 symbol+date 已落库的最后一秒、秒内序号与总行数
+    c.execute('''CREATE TABLE IF NOT EXISTS trade_tick_watermarks (
+                 symbol TEXT NOT NULL,
+                 date TEXT NOT NULL,
+                 last_time TEXT NOT NULL,
+                 last_seq INTEGER NOT NULL,
+                 row_count INTEGER NOT NULL,
+                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 PRIMARY KEY(symbol, date)
+                 )''')
                  
     # 1分钟历史K线表 (History 1m - 用于历史分时图秒切)
     c.execute('''CREATE TABLE IF NOT EXISTS history_1m (
@@ -159,12 +173,36 @@ def init_db():
                  repost_count INTEGER,
                  raw_url TEXT,
                  source_event_id TEXT,
-                 extra_json TEXT
+                 extra_json TEXT,
+                 is_symbol_mismatch INTEGER DEFAULT 0,
+                 is_low_value INTEGER DEFAULT 0,
+                 is_spam INTEGER DEFAULT 0,
+                 is_duplicate INTEGER DEFAULT 0,
+                 content_hash TEXT,
+                 quality_version TEXT
                  )''')
+    # 入库时计算的质量标记；旧库补列后 quality_version 为空，由读取侧/回填脚本按分类器版本重算
+    for column, definition in (
+        ("is_symbol_mismatch", "INTEGER DEFAULT 0"),
+        ("is_low_value", "INTEGER DEFAULT 0"),
+        ("is_spam", "INTEGER DEFAULT 0"),
+        ("is_duplicate", "INTEGER DEFAULT 0"),
+        ("content_hash", "TEXT"),
+        ("quality_version", "TEXT"),
+    ):
+        try:
+            c.execute(f"ALTER TABLE sentiment_events ADD COLUMN {column} {definition}")
+        except sqlite3.OperationalError:
+            pass
     c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sentiment_events_source_event ON sentiment_events (source, source_event_id)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_events_symbol_time ON sentiment_events (symbol, pub_time)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_events_symbol_nocase_time ON sentiment_events (symbol COLLATE NOCASE, pub_time)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_events_symbol_source_time ON sentiment_events (symbol, source, pub_time)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_events_thread_time ON sentiment_events (thread_id, pub_time)")
+    # 选股研究按日期跨全市场聚合事件数（不带 symbol），需要单独的 pub_time 索引做范围查找
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_events_pub_time ON sentiment_events (pub_time)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_events_symbol_quality ON sentiment_events (symbol, quality_version)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_events_symbol_hash_time ON sentiment_events (symbol, content_hash, pub_time)")
 
     # 单票官方/新闻事件流 (Stock Events)
     c.execute('''CREATE TABLE IF NOT EXISTS stock_events (
@@ -192,6 +230,7 @@ def init_db():
                  )''')
     c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_stock_events_source_source_event ON stock_events (source, source_event_id)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_stock_events_symbol_time ON stock_events (symbol, published_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_stock_events_symbol_nocase_time ON stock_events (symbol COLLATE NOCASE, published_at)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_stock_events_symbol_type_time ON stock_events (symbol, source_type, published_at)")
     c.execute("CREATE INDEX IF NOT EXISTS idx_stock_events_ts_code_time ON stock_events (ts_code, published_at)")
 
@@ -344,6 +383,25 @@ def init_db():
                  )''')
     c.execute("CREATE INDEX IF NOT EXISTS idx_stock_event_daily_rollup_date ON stock_event_daily_rollup (trade_date)")
 
+    # 散户舆情热度预聚合（10m / 1d），由 retail_sentiment 在写入后按天增量维护
+    c.execute('''CREATE TABLE IF NOT EXISTS sentiment_heat_rollup (
+                 symbol TEXT NOT NULL,
+                 granularity TEXT NOT NULL,
+                 bucket_start TEXT NOT NULL,
+                 post_count INTEGER DEFAULT 0,
+                 reply_count_sum INTEGER DEFAULT 0,
+                 read_count_sum INTEGER DEFAULT 0,
+                 bull_count INTEGER DEFAULT 0,
+                 bear_count INTEGER DEFAULT 0,
+                 raw_heat REAL DEFAULT 0,
+                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                 PRIMARY KEY(symbol, granularity, bucket_start)
+                 )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS sentiment_heat_rollup_state (
+                 symbol TEXT PRIMARY KEY,
+                 rebuilt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                 )''')
+
     # AI 情绪摘要表 (Sentiment Summaries)
     c.execute('''CREATE TABLE IF NOT EXISTS sentiment_summaries (
                  id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -370,6 +428,7 @@ def init_db():
                  PRIMARY KEY(symbol, trade_date)
                  )''')
     c.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_daily_scores_symbol_date ON sentiment_daily_scores (symbol, trade_date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_daily_scores_symbol_nocase_date ON sentiment_daily_scores (symbol COLLATE NOCASE, trade_date)")
 
                  
     # 配置部分
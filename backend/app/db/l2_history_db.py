@@ -1,10 +1,15 @@
 import os
 import sqlite3
-from datetime import datetime, time
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from backend.app.core.config import DB_FILE, candidate_atomic_db_paths
 from backend.app.core.time_buckets import map_to_30m_bucket_start
+from backend.app.db.connection_pool import ensure_schema_once, read_connection, write_connection
 
 
 History5mRow = Tuple[
@@ -66,8 +71,12 @@ HistoryDailyRow = Tuple[
 ]
 
 
+def _l2_history_db_path() -> str:
+    return os.getenv("DB_PATH", DB_FILE)
+
+
 def get_l2_history_connection() -> sqlite3.Connection:
-    db_path = os.getenv("DB_PATH", DB_FILE)
+    db_path = _l2_history_db_path()
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     return sqlite3.connect(db_path)
 
@@ -79,15 +88,6 @@ def _resolve_atomic_db_path() -> Optional[str]:
     return None
 
 
-def _get_atomic_history_connection() -> Optional[sqlite3.Connection]:
-    db_path = _resolve_atomic_db_path()
-    if not db_path:
-        return None
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
 def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
     row = conn.execute(
         "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
@@ -105,135 +105,272 @@ def _ensure_column(conn: sqlite3.Connection, table: str, column: str, definition
         conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
 
 
+def _create_l2_history_schema(conn: sqlite3.Connection) -> None:
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS history_5m_l2 (
+            symbol TEXT NOT NULL,
+            datetime TEXT NOT NULL,
+            source_date TEXT NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            total_amount REAL NOT NULL,
+            total_volume REAL NULL,
+            l1_main_buy REAL NOT NULL,
+            l1_main_sell REAL NOT NULL,
+            l1_super_buy REAL NOT NULL,
+            l1_super_sell REAL NOT NULL,
+            l2_main_buy REAL NOT NULL,
+            l2_main_sell REAL NOT NULL,
+            l2_super_buy REAL NOT NULL,
+            l2_super_sell REAL NOT NULL,
+            l2_add_buy_amount REAL NULL,
+            l2_add_sell_amount REAL NULL,
+            l2_cancel_buy_amount REAL NULL,
+            l2_cancel_sell_amount REAL NULL,
+            l2_cvd_delta REAL NULL,
+            l2_oib_delta REAL NULL,
+            quality_info TEXT NULL,
+            PRIMARY KEY(symbol, datetime)
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_5m_l2_symbol_date
+        ON history_5m_l2(symbol, source_date);
+
+        CREATE TABLE IF NOT EXISTS history_daily_l2 (
+            symbol TEXT NOT NULL,
+            date TEXT NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            total_amount REAL NOT NULL,
+            l1_main_buy REAL NOT NULL,
+            l1_main_sell REAL NOT NULL,
+            l1_main_net REAL NOT NULL,
+            l1_super_buy REAL NOT NULL,
+            l1_super_sell REAL NOT NULL,
+            l1_super_net REAL NOT NULL,
+            l2_main_buy REAL NOT NULL,
+            l2_main_sell REAL NOT NULL,
+            l2_main_net REAL NOT NULL,
+            l2_super_buy REAL NOT NULL,
+            l2_super_sell REAL NOT NULL,
+            l2_super_net REAL NOT NULL,
+            l1_activity_ratio REAL NOT NULL,
+            l1_super_ratio REAL NOT NULL,
+            l2_activity_ratio REAL NOT NULL,
+            l2_super_ratio REAL NOT NULL,
+            l1_buy_ratio REAL NOT NULL,
+            l1_sell_ratio REAL NOT NULL,
+            l2_buy_ratio REAL NOT NULL,
+            l2_sell_ratio REAL NOT NULL,
+            quality_info TEXT NULL,
+            PRIMARY KEY(symbol, date)
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_daily_l2_date
+        ON history_daily_l2(date);
+
+        CREATE TABLE IF NOT EXISTS l2_daily_ingest_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            trade_date TEXT NOT NULL,
+            source_root TEXT NOT NULL,
+            mode TEXT NOT NULL DEFAULT 'manual',
+            status TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            finished_at TEXT,
+            symbol_count INTEGER NOT NULL DEFAULT 0,
+            rows_5m INTEGER NOT NULL DEFAULT 0,
+            rows_daily INTEGER NOT NULL DEFAULT 0,
+            message TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_l2_daily_ingest_runs_trade_date
+        ON l2_daily_ingest_runs(trade_date, started_at DESC);
+
+        CREATE TABLE IF NOT EXISTS l2_daily_ingest_failures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL,
+            symbol TEXT NOT NULL,
+            trade_date TEXT NOT NULL,
+            source_file TEXT NOT NULL,
+            error_message TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_l2_daily_ingest_failures_run
+        ON l2_daily_ingest_failures(run_id);
+
+        CREATE TABLE IF NOT EXISTS stock_universe_meta (
+            symbol TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            market_cap REAL NOT NULL,
+            as_of_date TEXT NOT NULL,
+            source TEXT NOT NULL,
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_stock_universe_meta_market_cap
+        ON stock_universe_meta(market_cap DESC, symbol ASC);
+        CREATE INDEX IF NOT EXISTS idx_stock_universe_meta_as_of_date
+        ON stock_universe_meta(as_of_date DESC);
+        CREATE INDEX IF NOT EXISTS idx_stock_universe_meta_symbol_nocase
+        ON stock_universe_meta(symbol COLLATE NOCASE, as_of_date);
+
+        CREATE TABLE IF NOT EXISTS symbol_coverage_bounds (
+            source TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            min_date TEXT NOT NULL,
+            max_date TEXT NOT NULL,
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY(source, symbol)
+        );
+
+        CREATE TABLE IF NOT EXISTS l2_history_cache_manifest (
+            scope TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+    _ensure_column(conn, "history_5m_l2", "total_volume", "REAL NULL")
+    _ensure_column(conn, "history_5m_l2", "l2_add_buy_amount", "REAL NULL")
+    _ensure_column(conn, "history_5m_l2", "l2_add_sell_amount", "REAL NULL")
+    _ensure_column(conn, "history_5m_l2", "l2_cancel_buy_amount", "REAL NULL")
+    _ensure_column(conn, "history_5m_l2", "l2_cancel_sell_amount", "REAL NULL")
+    _ensure_column(conn, "history_5m_l2", "l2_cvd_delta", "REAL NULL")
+    _ensure_column(conn, "history_5m_l2", "l2_oib_delta", "REAL NULL")
+    _ensure_column(conn, "history_5m_l2", "quality_info", "TEXT NULL")
+    _ensure_column(conn, "history_daily_l2", "quality_info", "TEXT NULL")
+
+
 def ensure_l2_history_schema() -> None:
-    conn = get_l2_history_connection()
+    ensure_schema_once(_l2_history_db_path(), "l2_history", _create_l2_history_schema)
+
+
+# ---------------------------------------------------------------------------
+# 历史查询结果缓存
+#
+# 两层 LRU：第一层缓存合并后的 5m/日线行（history_5m_l2/history_daily_l2 + atomic 库），
+# 第二层缓存按 granularity 重新分桶后的 K 线。只缓存全部落在“今天之前”的已定稿交易日。
+# 失效依据 (manifest generation, atomic 库文件签名)：
+# - replace_history_* 与合并脚本在写入时递增 l2_history_cache_manifest 中对应 scope 的 generation；
+# - atomic 库被其它回填脚本原地改写或整库替换时，文件 inode/mtime/size 变化；
+# 两者任一变化即整体清空缓存。
+# ---------------------------------------------------------------------------
+
+L2_HISTORY_CACHE_MAX_ENTRIES = int(os.getenv("L2_HISTORY_CACHE_MAX_ENTRIES", "256"))
+_CHINA_TZ = timezone(timedelta(hours=8))
+
+_history_cache: "OrderedDict[Tuple, List[Dict[str, object]]]" = OrderedDict()
+_history_cache_lock = threading.Lock()
+_history_cache_token: Optional[Tuple] = None
+_history_cache_stats = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+
+
+def _bump_cache_generation(conn: sqlite3.Connection, scope: str) -> None:
+    conn.execute(
+        """
+        INSERT INTO l2_history_cache_manifest (scope, generation, updated_at)
+        VALUES (?, 1, CURRENT_TIMESTAMP)
+        ON CONFLICT(scope) DO UPDATE SET
+            generation = generation + 1,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        (scope,),
+    )
+
+
+def bump_l2_history_cache_generation(scope: str = "history") -> None:
+    """供合并/回填脚本在写完历史库或 atomic 库后调用，让所有进程里的查询缓存失效。"""
+    ensure_l2_history_schema()
+    with write_connection(_l2_history_db_path()) as conn:
+        with conn:
+            _bump_cache_generation(conn, scope)
+    invalidate_l2_history_cache()
+
+
+def invalidate_l2_history_cache() -> None:
+    global _history_cache_token
+    with _history_cache_lock:
+        _history_cache.clear()
+        _history_cache_token = None
+        _history_cache_stats["invalidations"] += 1
+
+
+def get_l2_history_cache_stats() -> Dict[str, int]:
+    with _history_cache_lock:
+        return {**_history_cache_stats, "entries": len(_history_cache)}
+
+
+def _atomic_file_signature(db_path: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    if not db_path:
+        return None
     try:
-        conn.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS history_5m_l2 (
-                symbol TEXT NOT NULL,
-                datetime TEXT NOT NULL,
-                source_date TEXT NOT NULL,
-                open REAL NOT NULL,
-                high REAL NOT NULL,
-                low REAL NOT NULL,
-                close REAL NOT NULL,
-                total_amount REAL NOT NULL,
-                total_volume REAL NULL,
-                l1_main_buy REAL NOT NULL,
-                l1_main_sell REAL NOT NULL,
-                l1_super_buy REAL NOT NULL,
-                l1_super_sell REAL NOT NULL,
-                l2_main_buy REAL NOT NULL,
-                l2_main_sell REAL NOT NULL,
-                l2_super_buy REAL NOT NULL,
-                l2_super_sell REAL NOT NULL,
-                l2_add_buy_amount REAL NULL,
-                l2_add_sell_amount REAL NULL,
-                l2_cancel_buy_amount REAL NULL,
-                l2_cancel_sell_amount REAL NULL,
-                l2_cvd_delta REAL NULL,
-                l2_oib_delta REAL NULL,
-                quality_info TEXT NULL,
-                PRIMARY KEY(symbol, datetime)
-            );
-            CREATE INDEX IF NOT EXISTS idx_history_5m_l2_symbol_date
-            ON history_5m_l2(symbol, source_date);
-
-            CREATE TABLE IF NOT EXISTS history_daily_l2 (
-                symbol TEXT NOT NULL,
-                date TEXT NOT NULL,
-                open REAL NOT NULL,
-                high REAL NOT NULL,
-                low REAL NOT NULL,
-                close REAL NOT NULL,
-                total_amount REAL NOT NULL,
-                l1_main_buy REAL NOT NULL,
-                l1_main_sell REAL NOT NULL,
-                l1_main_net REAL NOT NULL,
-                l1_super_buy REAL NOT NULL,
-                l1_super_sell REAL NOT NULL,
-                l1_super_net REAL NOT NULL,
-                l2_main_buy REAL NOT NULL,
-                l2_main_sell REAL NOT NULL,
-                l2_main_net REAL NOT NULL,
-                l2_super_buy REAL NOT NULL,
-                l2_super_sell REAL NOT NULL,
-                l2_super_net REAL NOT NULL,
-                l1_activity_ratio REAL NOT NULL,
-                l1_super_ratio REAL NOT NULL,
-                l2_activity_ratio REAL NOT NULL,
-                l2_super_ratio REAL NOT NULL,
-                l1_buy_ratio REAL NOT NULL,
-                l1_sell_ratio REAL NOT NULL,
-                l2_buy_ratio REAL NOT NULL,
-                l2_sell_ratio REAL NOT NULL,
-                quality_info TEXT NULL,
-                PRIMARY KEY(symbol, date)
-            );
-            CREATE INDEX IF NOT EXISTS idx_history_daily_l2_date
-            ON history_daily_l2(date);
-
-            CREATE TABLE IF NOT EXISTS l2_daily_ingest_runs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                trade_date TEXT NOT NULL,
-                source_root TEXT NOT NULL,
-                mode TEXT NOT NULL DEFAULT 'manual',
-                status TEXT NOT NULL,
-                started_at TEXT NOT NULL,
-                finished_at TEXT,
-                symbol_count INTEGER NOT NULL DEFAULT 0,
-                rows_5m INTEGER NOT NULL DEFAULT 0,
-                rows_daily INTEGER NOT NULL DEFAULT 0,
-                message TEXT
-            );
-            CREATE INDEX IF NOT EXISTS idx_l2_daily_ingest_runs_trade_date
-            ON l2_daily_ingest_runs(trade_date, started_at DESC);
-
-            CREATE TABLE IF NOT EXISTS l2_daily_ingest_failures (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                run_id INTEGER NOT NULL,
-                symbol TEXT NOT NULL,
-                trade_date TEXT NOT NULL,
-                source_file TEXT NOT NULL,
-                error_message TEXT NOT NULL,
-                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-            );
-            CREATE INDEX IF NOT EXISTS idx_l2_daily_ingest_failures_run
-            ON l2_daily_ingest_failures(run_id);
-
-            CREATE TABLE IF NOT EXISTS stock_universe_meta (
-                symbol TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                market_cap REAL NOT NULL,
-                as_of_date TEXT NOT NULL,
-                source TEXT NOT NULL,
-                updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-            );
-            CREATE INDEX IF NOT EXISTS idx_stock_universe_meta_market_cap
-            ON stock_universe_meta(market_cap DESC, symbol ASC);
-            CREATE INDEX IF NOT EXISTS idx_stock_universe_meta_as_of_date
-            ON stock_universe_meta(as_of_date DESC);
-            """
+        stat = os.stat(db_path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _current_cache_token() -> Tuple:
+    db_path = _l2_history_db_path()
+    with read_connection(db_path) as conn:
+        generations = tuple(
+            conn.execute("SELECT scope, generation FROM l2_history_cache_manifest ORDER BY scope").fetchall()
         )
-        _ensure_column(conn, "history_5m_l2", "total_volume", "REAL NULL")
-        _ensure_column(conn, "history_5m_l2", "l2_add_buy_amount", "REAL NULL")
-        _ensure_column(conn, "history_5m_l2", "l2_add_sell_amount", "REAL NULL")
-        _ensure_column(conn, "history_5m_l2", "l2_cancel_buy_amount", "REAL NULL")
-        _ensure_column(conn, "history_5m_l2", "l2_cancel_sell_amount", "REAL NULL")
-        _ensure_column(conn, "history_5m_l2", "l2_cvd_delta", "REAL NULL")
-        _ensure_column(conn, "history_5m_l2", "l2_oib_delta", "REAL NULL")
-        _ensure_column(conn, "history_5m_l2", "quality_info", "TEXT NULL")
-        _ensure_column(conn, "history_daily_l2", "quality_info", "TEXT NULL")
-        conn.commit()
-    finally:
-        conn.close()
+    atomic_path = _resolve_atomic_db_path()
+    return (os.path.abspath(db_path), generations, atomic_path, _atomic_file_signature(atomic_path))
+
+
+def _china_today() -> str:
+    return datetime.now(_CHINA_TZ).strftime("%Y-%m-%d")
+
+
+def _is_finalized_result(rows: Sequence[Dict[str, object]], date_field: str, end_date: Optional[str]) -> bool:
+    today = _china_today()
+    if not rows:
+        return bool(end_date) and str(end_date) < today
+    return all(str(row.get(date_field) or "") < today for row in rows)
+
+
+def _cached_history_query(
+    key: Tuple,
+    date_field: str,
+    end_date: Optional[str],
+    loader: Callable[[], List[Dict[str, object]]],
+) -> List[Dict[str, object]]:
+    global _history_cache_token
+    if L2_HISTORY_CACHE_MAX_ENTRIES <= 0:
+        return loader()
+
+    token = _current_cache_token()
+    with _history_cache_lock:
+        if token != _history_cache_token:
+            _history_cache.clear()
+            _history_cache_token = token
+        cached = _history_cache.get(key)
+        if cached is not None:
+            _history_cache.move_to_end(key)
+            _history_cache_stats["hits"] += 1
+            return [dict(row) for row in cached]
+        _history_cache_stats["misses"] += 1
+
+    rows = loader()
+    if _is_finalized_result(rows, date_field, end_date):
+        snapshot = [dict(row) for row in rows]
+        with _history_cache_lock:
+            # 加载期间发生写入/失效时不回填，避免把旧数据放回缓存
+            if _history_cache_token == token:
+                _history_cache[key] = snapshot
+                _history_cache.move_to_end(key)
+                _history_cache_stats["stores"] += 1
+                while len(_history_cache) > L2_HISTORY_CACHE_MAX_ENTRIES:
+                    _history_cache.popitem(last=False)
+    return rows
 
 
 def replace_history_5m_l2_rows(symbol: str, source_date: str, rows: Sequence[History5mRow]) -> int:
     ensure_l2_history_schema()
-    conn = get_l2_history_connection()
-    try:
+    with write_connection(_l2_history_db_path()) as conn:
         with conn:
             conn.execute(
                 "DELETE FROM history_5m_l2 WHERE symbol=? AND source_date=?",
@@ -267,15 +404,14 @@ def replace_history_5m_l2_rows(symbol: str, source_date: str, rows: Sequence[His
                     """,
                     normalized_rows,
                 )
-        return len(rows)
-    finally:
-        conn.close()
+            _bump_cache_generation(conn, "history")
+    invalidate_l2_history_cache()
+    return len(rows)
 
 
 def replace_history_daily_l2_row(symbol: str, trade_date: str, row: Optional[HistoryDailyRow]) -> int:
     ensure_l2_history_schema()
-    conn = get_l2_history_connection()
-    try:
+    with write_connection(_l2_history_db_path()) as conn:
         with conn:
             conn.execute(
                 "DELETE FROM history_daily_l2 WHERE symbol=? AND date=?",
@@ -300,10 +436,10 @@ def replace_history_daily_l2_row(symbol: str, trade_date: str, row: Optional[His
                     """,
                     normalized_row,
                 )
-                return 1
-        return 0
-    finally:
-        conn.close()
+            refresh_history_coverage_bounds(conn, [symbol])
+            _bump_cache_generation(conn, "history")
+    invalidate_l2_history_cache()
+    return 1 if row else 0
 
 
 def create_l2_daily_ingest_run(
@@ -313,8 +449,7 @@ def create_l2_daily_ingest_run(
     message: str = "",
 ) -> int:
     ensure_l2_history_schema()
-    conn = get_l2_history_connection()
-    try:
+    with write_connection(_l2_history_db_path()) as conn:
         cursor = conn.execute(
             """
             INSERT INTO l2_daily_ingest_runs (
@@ -331,8 +466,6 @@ def create_l2_daily_ingest_run(
         )
         conn.commit()
         return int(cursor.lastrowid)
-    finally:
-        conn.close()
 
 
 def finish_l2_daily_ingest_run(
@@ -344,8 +477,7 @@ def finish_l2_daily_ingest_run(
     message: str = "",
 ) -> None:
     ensure_l2_history_schema()
-    conn = get_l2_history_connection()
-    try:
+    with write_connection(_l2_history_db_path()) as conn:
         conn.execute(
             """
             UPDATE l2_daily_ingest_runs
@@ -363,8 +495,6 @@ def finish_l2_daily_ingest_run(
             ),
         )
         conn.commit()
-    finally:
-        conn.close()
 
 
 def add_l2_daily_ingest_failures(
@@ -379,8 +509,7 @@ def add_l2_daily_ingest_failures(
     failure_rows = list(failures)
     if not failure_rows:
         return 0
-    conn = get_l2_history_connection()
-    try:
+    with write_connection(_l2_history_db_path()) as conn:
         conn.executemany(
             """
             INSERT INTO l2_daily_ingest_failures (
@@ -394,15 +523,11 @@ def add_l2_daily_ingest_failures(
         )
         conn.commit()
         return len(failure_rows)
-    finally:
-        conn.close()
 
 
 def get_latest_l2_daily_ingest_run(trade_date: Optional[str] = None) -> Optional[dict]:
     ensure_l2_history_schema()
-    conn = get_l2_history_connection()
-    try:
-        conn.row_factory = sqlite3.Row
+    with read_connection(_l2_history_db_path(), row_factory=sqlite3.Row) as conn:
         if trade_date:
             row = conn.execute(
                 """
@@ -422,8 +547,6 @@ def get_latest_l2_daily_ingest_run(trade_date: Optional[str] = None) -> Optional
                 """
             ).fetchone()
         return dict(row) if row else None
-    finally:
-        conn.close()
 
 
 ALLOWED_L2_HISTORY_GRANULARITIES = {"5m", "15m", "30m", "1h", "1d"}
@@ -526,10 +649,10 @@ def _query_atomic_history_5m_rows(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
 ) -> List[Dict[str, object]]:
-    conn = _get_atomic_history_connection()
-    if conn is None:
+    db_path = _resolve_atomic_db_path()
+    if not db_path:
         return []
-    try:
+    with read_connection(db_path, row_factory=sqlite3.Row) as conn:
         if not _table_exists(conn, "atomic_trade_5m"):
             return []
         clauses = ["t.symbol=?"]
@@ -587,8 +710,6 @@ def _query_atomic_history_5m_rows(
             )
             out.append(payload)
         return out
-    finally:
-        conn.close()
 
 
 def _query_atomic_history_daily_rows(
@@ -596,10 +717,10 @@ def _query_atomic_history_daily_rows(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
 ) -> List[Dict[str, object]]:
-    conn = _get_atomic_history_connection()
-    if conn is None:
+    db_path = _resolve_atomic_db_path()
+    if not db_path:
         return []
-    try:
+    with read_connection(db_path, row_factory=sqlite3.Row) as conn:
         if not _table_exists(conn, "atomic_trade_daily"):
             return []
         clauses = ["t.symbol=?"]
@@ -669,8 +790,6 @@ def _query_atomic_history_daily_rows(
             )
             out.append(payload)
         return list(reversed(out))
-    finally:
-        conn.close()
 
 
 def _merge_history_rows(
@@ -686,17 +805,291 @@ def _merge_history_rows(
     return [merged[key] for key in sorted(merged.keys())]
 
 
-def query_l2_history_5m_rows(
-    symbol: str,
+L2_HISTORY_MERGE_MODE = os.getenv("L2_HISTORY_MERGE_MODE", "sql").strip().lower()
+_ATOMIC_SCHEMA = "atomic"
+
+_HISTORY_5M_SELECT_COLUMNS = (
+    "symbol", "datetime", "source_date",
+    "open", "high", "low", "close", "total_amount", "total_volume",
+    "l1_main_buy", "l1_main_sell", "l1_super_buy", "l1_super_sell",
+    "l2_main_buy", "l2_main_sell", "l2_super_buy", "l2_super_sell",
+    "l2_add_buy_amount", "l2_add_sell_amount",
+    "l2_cancel_buy_amount", "l2_cancel_sell_amount",
+    "l2_cvd_delta", "l2_oib_delta",
+)
+_HISTORY_DAILY_SELECT_COLUMNS = (
+    "symbol", "date", "open", "high", "low", "close", "total_amount",
+    "l1_main_buy", "l1_main_sell", "l1_main_net",
+    "l1_super_buy", "l1_super_sell", "l1_super_net",
+    "l2_main_buy", "l2_main_sell", "l2_main_net",
+    "l2_super_buy", "l2_super_sell", "l2_super_net",
+    "l1_activity_ratio", "l1_super_ratio",
+    "l2_activity_ratio", "l2_super_ratio",
+    "l1_buy_ratio", "l1_sell_ratio", "l2_buy_ratio", "l2_sell_ratio",
+)
+
+_ATOMIC_5M_BRANCH = f"""
+    SELECT
+        0 AS priority,
+        t.symbol AS symbol,
+        t.bucket_start AS datetime,
+        t.trade_date AS source_date,
+        t.open AS open,
+        t.high AS high,
+        t.low AS low,
+        t.close AS close,
+        t.total_amount AS total_amount,
+        t.total_volume AS total_volume,
+        t.l1_main_buy_amount AS l1_main_buy,
+        t.l1_main_sell_amount AS l1_main_sell,
+        t.l1_super_buy_amount AS l1_super_buy,
+        t.l1_super_sell_amount AS l1_super_sell,
+        t.l2_main_buy_amount AS l2_main_buy,
+        t.l2_main_sell_amount AS l2_main_sell,
+        t.l2_super_buy_amount AS l2_super_buy,
+        t.l2_super_sell_amount AS l2_super_sell,
+        o.add_buy_amount AS l2_add_buy_amount,
+        o.add_sell_amount AS l2_add_sell_amount,
+        o.cancel_buy_amount AS l2_cancel_buy_amount,
+        o.cancel_sell_amount AS l2_cancel_sell_amount,
+        o.cvd_delta_amount AS l2_cvd_delta,
+        o.oib_delta_amount AS l2_oib_delta,
+        NULL AS quality_info,
+        t.quality_info AS trade_quality_info,
+        o.quality_info AS order_quality_info
+    FROM {_ATOMIC_SCHEMA}.atomic_trade_5m AS t
+    LEFT JOIN {_ATOMIC_SCHEMA}.atomic_order_5m AS o
+      ON o.symbol = t.symbol
+     AND o.bucket_start = t.bucket_start
+"""
+
+_LEGACY_5M_BRANCH = f"""
+    SELECT
+        1 AS priority,
+        {", ".join(_HISTORY_5M_SELECT_COLUMNS)},
+        quality_info,
+        NULL AS trade_quality_info,
+        NULL AS order_quality_info
+    FROM main.history_5m_l2 AS t
+"""
+
+
+def _super_ratio_sql(buy_column: str, sell_column: str) -> str:
+    # 与 _calc_super_ratio 相同的计算顺序，保证浮点结果一致
+    return (
+        f"CASE WHEN COALESCE(t.total_amount, 0.0) > 0 "
+        f"THEN ((COALESCE(t.{buy_column}, 0.0) + COALESCE(t.{sell_column}, 0.0)) / t.total_amount) * 100.0 "
+        f"ELSE 0.0 END"
+    )
+
+
+_ATOMIC_DAILY_BRANCH = f"""
+    SELECT
+        0 AS priority,
+        t.symbol AS symbol,
+        t.trade_date AS date,
+        t.open AS open,
+        t.high AS high,
+        t.low AS low,
+        t.close AS close,
+        t.total_amount AS total_amount,
+        t.l1_main_buy_amount AS l1_main_buy,
+        t.l1_main_sell_amount AS l1_main_sell,
+        t.l1_main_net_amount AS l1_main_net,
+        t.l1_super_buy_amount AS l1_super_buy,
+        t.l1_super_sell_amount AS l1_super_sell,
+        t.l1_super_net_amount AS l1_super_net,
+        t.l2_main_buy_amount AS l2_main_buy,
+        t.l2_main_sell_amount AS l2_main_sell,
+        t.l2_main_net_amount AS l2_main_net,
+        t.l2_super_buy_amount AS l2_super_buy,
+        t.l2_super_sell_amount AS l2_super_sell,
+        t.l2_super_net_amount AS l2_super_net,
+        t.l1_activity_ratio AS l1_activity_ratio,
+        {_super_ratio_sql("l1_super_buy_amount", "l1_super_sell_amount")} AS l1_super_ratio,
+        t.l2_activity_ratio AS l2_activity_ratio,
+        {_super_ratio_sql("l2_super_buy_amount", "l2_super_sell_amount")} AS l2_super_ratio,
+        t.l1_buy_ratio AS l1_buy_ratio,
+        t.l1_sell_ratio AS l1_sell_ratio,
+        t.l2_buy_ratio AS l2_buy_ratio,
+        t.l2_sell_ratio AS l2_sell_ratio,
+        NULL AS quality_info,
+        t.quality_info AS trade_quality_info,
+        o.quality_info AS order_quality_info
+    FROM {_ATOMIC_SCHEMA}.atomic_trade_daily AS t
+    LEFT JOIN {_ATOMIC_SCHEMA}.atomic_order_daily AS o
+      ON o.symbol = t.symbol
+     AND o.trade_date = t.trade_date
+"""
+
+_LEGACY_DAILY_BRANCH = f"""
+    SELECT
+        1 AS priority,
+        {", ".join(_HISTORY_DAILY_SELECT_COLUMNS)},
+        quality_info,
+        NULL AS trade_quality_info,
+        NULL AS order_quality_info
+    FROM main.history_daily_l2 AS t
+"""
+
+
+def _date_range_where(symbol: str, date_column: str, start_date: Optional[str], end_date: Optional[str]) -> Tuple[str, List[object]]:
+    clauses = ["t.symbol=?"]
+    params: List[object] = [symbol]
+    if start_date:
+        clauses.append(f"t.{date_column}>=?")
+        params.append(str(start_date))
+    if end_date:
+        clauses.append(f"t.{date_column}<=?")
+        params.append(str(end_date))
+    return " AND ".join(clauses), params
+
+
+def _stream_merged_history_rows(
+    key_field: str,
+    date_field: str,
+    atomic_branch: str,
+    legacy_branch: str,
+    output_columns: Sequence[str],
+    normalized: str,
+    start_date: Optional[str],
+    end_date: Optional[str],
+    limit_sql: str,
+    limit_params: Sequence[object],
+    order_sql: str,
+) -> List[Dict[str, object]]:
+    """
+    legacy 表与挂载的 atomic 库在一条 SQL 里合并：UNION ALL 带 priority，
+    ROW_NUMBER 按 key_field 去重（atomic 优先），游标逐行转成响应 dict。
+    """
+    atomic_path = _resolve_atomic_db_path()
+    atomic_where, atomic_params = _date_range_where(normalized, "trade_date", start_date, end_date)
+    legacy_where, legacy_params = _date_range_where(normalized, date_field, start_date, end_date)
+    branches = [(f"{legacy_branch} WHERE {legacy_where}", legacy_params)]
+    if atomic_path:
+        branches.insert(0, (f"{atomic_branch} WHERE {atomic_where}", atomic_params))
+
+    with read_connection(_l2_history_db_path(), attach={_ATOMIC_SCHEMA: atomic_path}) as conn:
+        while True:
+            union_sql = "\n    UNION ALL\n".join(branch for branch, _ in branches)
+            params: List[object] = [param for _, branch_params in branches for param in branch_params]
+            sql = f"""
+                WITH merged AS ({union_sql}),
+                ranked AS (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY {key_field} ORDER BY priority) AS key_rank
+                    FROM merged
+                ),
+                deduped AS (
+                    SELECT * FROM ranked WHERE key_rank = 1
+                )
+                SELECT priority, {", ".join(output_columns)}, quality_info, trade_quality_info, order_quality_info
+                FROM {limit_sql}
+                {order_sql}
+            """
+            try:
+                cursor = conn.execute(sql, [*params, *limit_params])
+                break
+            except sqlite3.OperationalError as exc:
+                # atomic 库还没建对应表（新部署/本地库）时，退回只查 legacy 表
+                if len(branches) == 1 or "no such table" not in str(exc):
+                    raise
+                branches = branches[1:]
+
+        out: List[Dict[str, object]] = []
+        for record in cursor:
+            payload = dict(zip(output_columns, record[1:-3]))
+            if record[0] == 0:
+                payload["quality_info"] = _merge_quality_info(record[-2], record[-1])
+            else:
+                payload["quality_info"] = record[-3]
+            out.append(payload)
+        return out
+
+
+def _load_l2_history_5m_rows_sql(
+    normalized: str,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     limit_days: Optional[int] = None,
 ) -> List[Dict[str, object]]:
-    ensure_l2_history_schema()
-    normalized = normalize_l2_symbol(symbol)
-    conn = get_l2_history_connection()
-    try:
-        conn.row_factory = sqlite3.Row
+    limit_sql, limit_params = "deduped", []
+    if limit_days is not None:
+        if int(limit_days) <= 0:
+            return []
+        limit_sql = (
+            "deduped WHERE source_date IN "
+            "(SELECT DISTINCT source_date FROM deduped ORDER BY source_date DESC LIMIT ?)"
+        )
+        limit_params = [int(limit_days)]
+    return _stream_merged_history_rows(
+        "datetime",
+        "source_date",
+        _ATOMIC_5M_BRANCH,
+        _LEGACY_5M_BRANCH,
+        _HISTORY_5M_SELECT_COLUMNS,
+        normalized,
+        start_date,
+        end_date,
+        limit_sql,
+        limit_params,
+        "ORDER BY datetime ASC",
+    )
+
+
+def _load_l2_history_daily_rows_sql(
+    normalized: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit_days: Optional[int] = None,
+) -> List[Dict[str, object]]:
+    limit_sql, limit_params = "deduped", []
+    if limit_days is not None and int(limit_days) > 0:
+        limit_sql = "(SELECT * FROM deduped ORDER BY date DESC LIMIT ?)"
+        limit_params = [int(limit_days)]
+    return _stream_merged_history_rows(
+        "date",
+        "date",
+        _ATOMIC_DAILY_BRANCH,
+        _LEGACY_DAILY_BRANCH,
+        _HISTORY_DAILY_SELECT_COLUMNS,
+        normalized,
+        start_date,
+        end_date,
+        limit_sql,
+        limit_params,
+        "ORDER BY date ASC",
+    )
+
+
+def _load_l2_history_5m_rows(
+    normalized: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit_days: Optional[int] = None,
+) -> List[Dict[str, object]]:
+    if L2_HISTORY_MERGE_MODE == "python":
+        return _load_l2_history_5m_rows_python(normalized, start_date, end_date, limit_days)
+    return _load_l2_history_5m_rows_sql(normalized, start_date, end_date, limit_days)
+
+
+def _load_l2_history_daily_rows(
+    normalized: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit_days: Optional[int] = None,
+) -> List[Dict[str, object]]:
+    if L2_HISTORY_MERGE_MODE == "python":
+        return _load_l2_history_daily_rows_python(normalized, start_date, end_date, limit_days)
+    return _load_l2_history_daily_rows_sql(normalized, start_date, end_date, limit_days)
+
+
+def _load_l2_history_5m_rows_python(
+    normalized: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit_days: Optional[int] = None,
+) -> List[Dict[str, object]]:
+    with read_connection(_l2_history_db_path(), row_factory=sqlite3.Row) as conn:
         clauses = ["symbol=?"]
         params: List[object] = [normalized]
         if start_date:
@@ -724,8 +1117,6 @@ def query_l2_history_5m_rows(
             params,
         ).fetchall()
         old_rows = [dict(row) for row in rows]
-    finally:
-        conn.close()
 
     atomic_rows = _query_atomic_history_5m_rows(normalized, start_date=start_date, end_date=end_date)
     merged_rows = _merge_history_rows(atomic_rows, old_rows, "datetime")
@@ -738,17 +1129,13 @@ def query_l2_history_5m_rows(
     return merged_rows
 
 
-def query_l2_history_daily_rows(
-    symbol: str,
+def _load_l2_history_daily_rows_python(
+    normalized: str,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     limit_days: Optional[int] = None,
 ) -> List[Dict[str, object]]:
-    ensure_l2_history_schema()
-    normalized = normalize_l2_symbol(symbol)
-    conn = get_l2_history_connection()
-    try:
-        conn.row_factory = sqlite3.Row
+    with read_connection(_l2_history_db_path(), row_factory=sqlite3.Row) as conn:
         clauses = ["symbol=?"]
         params: List[object] = [normalized]
         if start_date:
@@ -777,8 +1164,6 @@ def query_l2_history_daily_rows(
             params,
         ).fetchall()
         old_rows = [dict(row) for row in reversed(rows)]
-    finally:
-        conn.close()
 
     atomic_rows = _query_atomic_history_daily_rows(normalized, start_date=start_date, end_date=end_date)
     merged_rows = _merge_history_rows(atomic_rows, old_rows, "date")
@@ -787,15 +1172,174 @@ def query_l2_history_daily_rows(
     return merged_rows
 
 
+def _history_cache_key(
+    kind: str,
+    normalized: str,
+    start_date: Optional[str],
+    end_date: Optional[str],
+    limit_days: Optional[int],
+    granularity: str = "",
+) -> Tuple:
+    return (
+        kind,
+        normalized,
+        str(start_date) if start_date else None,
+        str(end_date) if end_date else None,
+        int(limit_days) if limit_days is not None else None,
+        granularity,
+    )
+
+
+def query_l2_history_5m_rows(
+    symbol: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit_days: Optional[int] = None,
+) -> List[Dict[str, object]]:
+    ensure_l2_history_schema()
+    normalized = normalize_l2_symbol(symbol)
+    return _cached_history_query(
+        _history_cache_key("5m", normalized, start_date, end_date, limit_days),
+        "source_date",
+        end_date,
+        lambda: _load_l2_history_5m_rows(normalized, start_date, end_date, limit_days),
+    )
+
+
+def query_l2_history_daily_rows(
+    symbol: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit_days: Optional[int] = None,
+) -> List[Dict[str, object]]:
+    ensure_l2_history_schema()
+    normalized = normalize_l2_symbol(symbol)
+    return _cached_history_query(
+        _history_cache_key("daily", normalized, start_date, end_date, limit_days),
+        "date",
+        end_date,
+        lambda: _load_l2_history_daily_rows(normalized, start_date, end_date, limit_days),
+    )
+
+
 def query_l2_history_daily_row(symbol: str, trade_date: str) -> Optional[Dict[str, object]]:
     rows = query_l2_history_daily_rows(symbol, start_date=trade_date, end_date=trade_date, limit_days=1)
     return rows[0] if rows else None
 
 
+_HISTORY_5M_SUM_FIELDS = (
+    "total_amount",
+    "l1_main_buy",
+    "l1_main_sell",
+    "l1_super_buy",
+    "l1_super_sell",
+    "l2_main_buy",
+    "l2_main_sell",
+    "l2_super_buy",
+    "l2_super_sell",
+)
+# 可缺省字段：区间内全部缺失时为 None，否则只累加有值的行
+_HISTORY_5M_OPTIONAL_FIELDS = (
+    "total_volume",
+    "l2_add_buy_amount",
+    "l2_add_sell_amount",
+    "l2_cancel_buy_amount",
+    "l2_cancel_sell_amount",
+    "l2_cvd_delta",
+    "l2_oib_delta",
+)
+_HISTORY_5M_VALUE_FIELDS = (
+    ("open", "high", "low", "close", "total_amount", "total_volume")
+    + _HISTORY_5M_SUM_FIELDS[1:]
+    + _HISTORY_5M_OPTIONAL_FIELDS[1:]
+)
+_BUCKET_MIXED_MINUTE = -2
+_minute_bucket_tables: Dict[str, np.ndarray] = {}
+
+
+def _minute_bucket_table(granularity: str) -> np.ndarray:
+    """
+    分钟 -> 桶起点秒数 的查表（-1 表示不落任何桶）。
+    直接由 `_bucket_start` 生成；同一分钟内 :00 与 :59 落点不同（如 1h/30m 的 15:00:00 闭区间）
+    标记为 mixed，由调用方逐行回退到 `_bucket_start`。
+    """
+    table = _minute_bucket_tables.get(granularity)
+    if table is not None:
+        return table
+    base = datetime(2000, 1, 3)
+    values = np.empty(24 * 60, dtype=np.int64)
+    for minute in range(24 * 60):
+        head = _bucket_start(base + timedelta(minutes=minute), granularity)
+        tail = _bucket_start(base + timedelta(minutes=minute, seconds=59), granularity)
+        if head != tail:
+            values[minute] = _BUCKET_MIXED_MINUTE
+        elif head is None:
+            values[minute] = -1
+        else:
+            values[minute] = head.hour * 3600 + head.minute * 60 + head.second
+    _minute_bucket_tables[granularity] = values
+    return values
+
+
+def _parse_history_datetimes(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """把 "YYYY-MM-DD HH:MM:SS" 解析为 (yyyymmdd, 当日秒数) 两列；非规范格式逐行走 strptime。"""
+    count = len(texts)
+    array = np.array(texts, dtype=str)
+    if count and array.dtype.itemsize == 19 * 4 and bool(np.all(np.char.str_len(array) == 19)):
+        codes = array.view(np.uint32).reshape(count, 19).astype(np.int64)
+        digits = codes - 48
+        separators_ok = (
+            np.all(codes[:, 4] == ord("-"))
+            and np.all(codes[:, 7] == ord("-"))
+            and np.all(codes[:, 10] == ord(" "))
+            and np.all(codes[:, 13] == ord(":"))
+            and np.all(codes[:, 16] == ord(":"))
+        )
+        digit_cols = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+        if separators_ok and bool(np.all((digits[:, digit_cols] >= 0) & (digits[:, digit_cols] <= 9))):
+            date_ints = (
+                digits[:, 0] * 10000000 + digits[:, 1] * 1000000 + digits[:, 2] * 100000 + digits[:, 3] * 10000
+                + digits[:, 5] * 1000 + digits[:, 6] * 100 + digits[:, 8] * 10 + digits[:, 9]
+            )
+            hours = digits[:, 11] * 10 + digits[:, 12]
+            minutes = digits[:, 14] * 10 + digits[:, 15]
+            seconds = digits[:, 17] * 10 + digits[:, 18]
+            if bool(np.all((hours < 24) & (minutes < 60) & (seconds < 60))):
+                try:
+                    for value in np.unique(date_ints).tolist():
+                        datetime(value // 10000, value // 100 % 100, value % 100)
+                except ValueError:
+                    pass
+                else:
+                    return date_ints, hours * 3600 + minutes * 60 + seconds
+
+    date_ints = np.empty(count, dtype=np.int64)
+    seconds_of_day = np.empty(count, dtype=np.int64)
+    for idx, text in enumerate(texts):
+        dt = datetime.strptime(text, "%Y-%m-%d %H:%M:%S")
+        date_ints[idx] = dt.year * 10000 + dt.month * 100 + dt.day
+        seconds_of_day[idx] = dt.hour * 3600 + dt.minute * 60 + dt.second
+    return date_ints, seconds_of_day
+
+
+def _float_column(values: List[object]) -> np.ndarray:
+    """None/空串/非数字 -> NaN；行值来自 SQLite，不会出现真正的 NaN。"""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        converted = [_to_optional_float(value) for value in values]
+        return np.array([np.nan if value is None else value for value in converted], dtype=np.float64)
+
+
 def aggregate_l2_history_5m_rows(
     rows_5m: Sequence[Dict[str, object]],
     granularity: str = "30m",
 ) -> List[Dict[str, object]]:
+    """
+    把 5m 历史行聚合到 granularity。列式实现：
+    先把每个字段转成数组，用分钟查表算出桶号，再按桶做 NaN 感知的分段归约。
+    OHLC 四项任一缺失的行不参与数值汇总，但其 quality_info / is_placeholder 仍计入该桶。
+    """
     if granularity not in ALLOWED_L2_HISTORY_GRANULARITIES:
         raise ValueError(f"granularity 仅支持: {', '.join(sorted(ALLOWED_L2_HISTORY_GRANULARITIES))}")
     if not rows_5m:
@@ -803,140 +1347,116 @@ def aggregate_l2_history_5m_rows(
     if granularity == "5m":
         return [dict(row) for row in rows_5m]
 
-    aggregated: Dict[str, Dict[str, object]] = {}
-    bucket_order: List[str] = []
-    for row in rows_5m:
-        dt = datetime.strptime(str(row["datetime"]), "%Y-%m-%d %H:%M:%S")
-        bucket_dt = _bucket_start(dt, granularity)
-        if bucket_dt is None:
-            continue
-        bucket_key = bucket_dt.strftime("%Y-%m-%d %H:%M:%S")
-        if bucket_key not in aggregated:
-            aggregated[bucket_key] = {
-                "symbol": row["symbol"],
-                "datetime": bucket_key,
-                "source_date": row["source_date"],
-                "open": None,
-                "high": None,
-                "low": None,
-                "close": None,
-                "total_amount": 0.0,
-                "total_volume": 0.0,
-                "l1_main_buy": 0.0,
-                "l1_main_sell": 0.0,
-                "l1_super_buy": 0.0,
-                "l1_super_sell": 0.0,
-                "l2_main_buy": 0.0,
-                "l2_main_sell": 0.0,
-                "l2_super_buy": 0.0,
-                "l2_super_sell": 0.0,
-                "l2_add_buy_amount": None,
-                "l2_add_sell_amount": None,
-                "l2_cancel_buy_amount": None,
-                "l2_cancel_sell_amount": None,
-                "l2_cvd_delta": None,
-                "l2_oib_delta": None,
-                "quality_info": None,
-                "is_placeholder": False,
-                "_quality_messages": [],
-                "_placeholder_count": 0,
-                "_numeric_count": 0,
-                "_extra_numeric_count": {
-                    "total_volume": 0,
-                    "l2_add_buy_amount": 0,
-                    "l2_add_sell_amount": 0,
-                    "l2_cancel_buy_amount": 0,
-                    "l2_cancel_sell_amount": 0,
-                    "l2_cvd_delta": 0,
-                    "l2_oib_delta": 0,
-                },
-            }
-            bucket_order.append(bucket_key)
-        item = aggregated[bucket_key]
-        item["source_date"] = str(row["source_date"])
+    date_ints, seconds_of_day = _parse_history_datetimes([str(row["datetime"]) for row in rows_5m])
+    bucket_seconds = _minute_bucket_table(granularity)[seconds_of_day // 60]
+    for idx in np.flatnonzero(bucket_seconds == _BUCKET_MIXED_MINUTE).tolist():
+        date_value, second_value = int(date_ints[idx]), int(seconds_of_day[idx])
+        bucket_dt = _bucket_start(
+            datetime(
+                date_value // 10000, date_value // 100 % 100, date_value % 100,
+                second_value // 3600, second_value // 60 % 60, second_value % 60,
+            ),
+            granularity,
+        )
+        bucket_seconds[idx] = -1 if bucket_dt is None else bucket_dt.hour * 3600 + bucket_dt.minute * 60 + bucket_dt.second
+
+    kept = np.flatnonzero(bucket_seconds >= 0)
+    if kept.size == 0:
+        return []
+    rows = [rows_5m[idx] for idx in kept.tolist()]
+    bucket_keys, bucket_ids = np.unique(date_ints[kept] * 100000 + bucket_seconds[kept], return_inverse=True)
+    bucket_ids = bucket_ids.reshape(-1)
+    bucket_count = len(bucket_keys)
+
+    # 每桶首行（symbol）与末行（source_date）：按桶稳定排序后取段首/段尾
+    order = np.argsort(bucket_ids, kind="stable")
+    sorted_ids = bucket_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    ends = np.r_[starts[1:], len(order)] - 1
+    first_rows = order[starts].tolist()
+    last_rows = order[ends].tolist()
+
+    columns = {
+        field: _float_column([row.get(field) for row in rows])
+        for field in ("open", "high", "low", "close") + _HISTORY_5M_SUM_FIELDS + _HISTORY_5M_OPTIONAL_FIELDS
+    }
+    numeric_mask = ~(
+        np.isnan(columns["open"]) | np.isnan(columns["high"]) | np.isnan(columns["low"]) | np.isnan(columns["close"])
+    )
+    numeric_counts = np.bincount(bucket_ids[numeric_mask], minlength=bucket_count)
+
+    ohlc: Dict[str, List[Optional[float]]] = {field: [None] * bucket_count for field in ("open", "high", "low", "close")}
+    numeric_order = order[numeric_mask[order]]
+    if numeric_order.size:
+        numeric_ids = bucket_ids[numeric_order]
+        numeric_starts = np.flatnonzero(np.r_[True, numeric_ids[1:] != numeric_ids[:-1]])
+        numeric_ends = np.r_[numeric_starts[1:], len(numeric_order)] - 1
+        present = numeric_ids[numeric_starts].tolist()
+        values = {
+            "open": columns["open"][numeric_order[numeric_starts]].tolist(),
+            "close": columns["close"][numeric_order[numeric_ends]].tolist(),
+            "high": np.maximum.reduceat(columns["high"][numeric_order], numeric_starts).tolist(),
+            "low": np.minimum.reduceat(columns["low"][numeric_order], numeric_starts).tolist(),
+        }
+        for field, field_values in values.items():
+            for bucket_id, value in zip(present, field_values):
+                ohlc[field][bucket_id] = value
+
+    # bincount 按行序逐个累加，与逐行相加的浮点结果一致
+    numeric_ids_by_row = bucket_ids[numeric_mask]
+    sums: Dict[str, List[float]] = {}
+    for field in _HISTORY_5M_SUM_FIELDS:
+        sums[field] = np.bincount(
+            numeric_ids_by_row,
+            weights=np.nan_to_num(columns[field][numeric_mask], nan=0.0),
+            minlength=bucket_count,
+        ).tolist()
+    optional_counts: Dict[str, List[int]] = {}
+    for field in _HISTORY_5M_OPTIONAL_FIELDS:
+        field_values = columns[field][numeric_mask]
+        present_mask = ~np.isnan(field_values)
+        sums[field] = np.bincount(
+            numeric_ids_by_row[present_mask],
+            weights=field_values[present_mask],
+            minlength=bucket_count,
+        ).tolist()
+        optional_counts[field] = np.bincount(numeric_ids_by_row[present_mask], minlength=bucket_count).tolist()
+
+    quality_messages: List[List[str]] = [[] for _ in range(bucket_count)]
+    placeholder_counts = [0] * bucket_count
+    bucket_id_list = bucket_ids.tolist()
+    for row, bucket_id in zip(rows, bucket_id_list):
         quality_info = str(row.get("quality_info") or "").strip()
         if quality_info:
-            item["_quality_messages"].append(quality_info)
+            quality_messages[bucket_id].append(quality_info)
         if bool(row.get("is_placeholder")):
-            item["_placeholder_count"] += 1
-
-        open_value = _to_optional_float(row.get("open"))
-        high_value = _to_optional_float(row.get("high"))
-        low_value = _to_optional_float(row.get("low"))
-        close_value = _to_optional_float(row.get("close"))
-        if open_value is None or high_value is None or low_value is None or close_value is None:
-            continue
-
-        if int(item["_numeric_count"]) == 0:
-            item["open"] = open_value
-            item["high"] = high_value
-            item["low"] = low_value
-            item["close"] = close_value
-            item["total_amount"] = float(_to_optional_float(row.get("total_amount")) or 0.0)
-            total_volume_value = _to_optional_float(row.get("total_volume"))
-            item["total_volume"] = total_volume_value
-            item["_extra_numeric_count"]["total_volume"] = 1 if total_volume_value is not None else 0
-            item["l1_main_buy"] = float(_to_optional_float(row.get("l1_main_buy")) or 0.0)
-            item["l1_main_sell"] = float(_to_optional_float(row.get("l1_main_sell")) or 0.0)
-            item["l1_super_buy"] = float(_to_optional_float(row.get("l1_super_buy")) or 0.0)
-            item["l1_super_sell"] = float(_to_optional_float(row.get("l1_super_sell")) or 0.0)
-            item["l2_main_buy"] = float(_to_optional_float(row.get("l2_main_buy")) or 0.0)
-            item["l2_main_sell"] = float(_to_optional_float(row.get("l2_main_sell")) or 0.0)
-            item["l2_super_buy"] = float(_to_optional_float(row.get("l2_super_buy")) or 0.0)
-            item["l2_super_sell"] = float(_to_optional_float(row.get("l2_super_sell")) or 0.0)
-            for key in [
-                "l2_add_buy_amount",
-                "l2_add_sell_amount",
-                "l2_cancel_buy_amount",
-                "l2_cancel_sell_amount",
-                "l2_cvd_delta",
-                "l2_oib_delta",
-            ]:
-                value = _to_optional_float(row.get(key))
-                item[key] = value
-                item["_extra_numeric_count"][key] = 1 if value is not None else 0
-            item["_numeric_count"] = 1
-            continue
-
-        item["high"] = max(float(item["high"]), high_value)
-        item["low"] = min(float(item["low"]), low_value)
-        item["close"] = close_value
-        item["total_amount"] = float(item["total_amount"]) + float(_to_optional_float(row.get("total_amount")) or 0.0)
-        total_volume_value = _to_optional_float(row.get("total_volume"))
-        if total_volume_value is not None:
-            item["total_volume"] = float(item["total_volume"] or 0.0) + total_volume_value
-            item["_extra_numeric_count"]["total_volume"] = int(item["_extra_numeric_count"]["total_volume"]) + 1
-        item["l1_main_buy"] = float(item["l1_main_buy"]) + float(_to_optional_float(row.get("l1_main_buy")) or 0.0)
-        item["l1_main_sell"] = float(item["l1_main_sell"]) + float(_to_optional_float(row.get("l1_main_sell")) or 0.0)
-        item["l1_super_buy"] = float(item["l1_super_buy"]) + float(_to_optional_float(row.get("l1_super_buy")) or 0.0)
-        item["l1_super_sell"] = float(item["l1_super_sell"]) + float(_to_optional_float(row.get("l1_super_sell")) or 0.0)
-        item["l2_main_buy"] = float(item["l2_main_buy"]) + float(_to_optional_float(row.get("l2_main_buy")) or 0.0)
-        item["l2_main_sell"] = float(item["l2_main_sell"]) + float(_to_optional_float(row.get("l2_main_sell")) or 0.0)
-        item["l2_super_buy"] = float(item["l2_super_buy"]) + float(_to_optional_float(row.get("l2_super_buy")) or 0.0)
-        item["l2_super_sell"] = float(item["l2_super_sell"]) + float(_to_optional_float(row.get("l2_super_sell")) or 0.0)
-        for key in [
-            "l2_add_buy_amount",
-            "l2_add_sell_amount",
-            "l2_cancel_buy_amount",
-            "l2_cancel_sell_amount",
-            "l2_cvd_delta",
-            "l2_oib_delta",
-        ]:
-            value = _to_optional_float(row.get(key))
-            if value is not None:
-                item[key] = float(item[key] or 0.0) + value
-                item["_extra_numeric_count"][key] = int(item["_extra_numeric_count"][key]) + 1
-        item["_numeric_count"] = int(item["_numeric_count"]) + 1
+            placeholder_counts[bucket_id] += 1
 
     result: List[Dict[str, object]] = []
-    for key in sorted(bucket_order):
-        item = aggregated[key]
-        numeric_count = int(item.pop("_numeric_count"))
-        placeholder_count = int(item.pop("_placeholder_count"))
-        extra_numeric_count = dict(item.pop("_extra_numeric_count"))
-        quality_messages = [msg for msg in item.pop("_quality_messages") if msg]
-        unique_messages = list(dict.fromkeys(quality_messages))
-        if placeholder_count > 0:
+    for bucket_id, key in enumerate(bucket_keys.tolist()):
+        date_value, second_value = divmod(int(key), 100000)
+        bucket_key = (
+            f"{date_value // 10000:04d}-{date_value // 100 % 100:02d}-{date_value % 100:02d} "
+            f"{second_value // 3600:02d}:{second_value // 60 % 60:02d}:{second_value % 60:02d}"
+        )
+        numeric_count = int(numeric_counts[bucket_id])
+        item: Dict[str, object] = {
+            "symbol": rows[first_rows[bucket_id]]["symbol"],
+            "datetime": bucket_key,
+            "source_date": str(rows[last_rows[bucket_id]]["source_date"]),
+        }
+        for field in _HISTORY_5M_VALUE_FIELDS:
+            if numeric_count <= 0:
+                item[field] = None
+            elif field in ohlc:
+                item[field] = ohlc[field][bucket_id]
+            elif field in optional_counts and not optional_counts[field][bucket_id]:
+                item[field] = None
+            else:
+                item[field] = sums[field][bucket_id]
+
+        unique_messages = list(dict.fromkeys(quality_messages[bucket_id]))
+        if placeholder_counts[bucket_id] > 0:
             item["quality_info"] = (
                 "该区间包含缺失 5m，聚合值可能偏小"
                 if numeric_count > 0
@@ -950,46 +1470,40 @@ def aggregate_l2_history_5m_rows(
             )
         else:
             item["quality_info"] = None
-
-        if numeric_count <= 0:
-            item["open"] = None
-            item["high"] = None
-            item["low"] = None
-            item["close"] = None
-            item["total_amount"] = None
-            item["total_volume"] = None
-            item["l1_main_buy"] = None
-            item["l1_main_sell"] = None
-            item["l1_super_buy"] = None
-            item["l1_super_sell"] = None
-            item["l2_main_buy"] = None
-            item["l2_main_sell"] = None
-            item["l2_super_buy"] = None
-            item["l2_super_sell"] = None
-            item["l2_add_buy_amount"] = None
-            item["l2_add_sell_amount"] = None
-            item["l2_cancel_buy_amount"] = None
-            item["l2_cancel_sell_amount"] = None
-            item["l2_cvd_delta"] = None
-            item["l2_oib_delta"] = None
-            item["is_placeholder"] = True
-        else:
-            for field, count in extra_numeric_count.items():
-                if int(count) <= 0:
-                    item[field] = None
-            item["is_placeholder"] = False
+        item["is_placeholder"] = numeric_count <= 0
         result.append(item)
 
     return result
 
+def query_l2_history_bars(
+    symbol: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit_days: Optional[int] = None,
+    granularity: str = "30m",
+) -> List[Dict[str, object]]:
+    """5m 历史按 granularity 聚合后的 K 线；已定稿区间的聚合结果走第二层缓存。"""
+    if granularity not in ALLOWED_L2_HISTORY_GRANULARITIES:
+        raise ValueError(f"granularity 仅支持: {', '.join(sorted(ALLOWED_L2_HISTORY_GRANULARITIES))}")
+    ensure_l2_history_schema()
+    normalized = normalize_l2_symbol(symbol)
+    return _cached_history_query(
+        _history_cache_key("bars", normalized, start_date, end_date, limit_days, granularity),
+        "source_date",
+        end_date,
+        lambda: aggregate_l2_history_5m_rows(
+            query_l2_history_5m_rows(normalized, start_date=start_date, end_date=end_date, limit_days=limit_days),
+            granularity=granularity,
+        ),
+    )
+
 
 def query_l2_history_trend(
     symbol: str,
     limit_days: int = 20,
     granularity: str = "30m",
 ) -> List[Dict[str, object]]:
-    rows_5m = query_l2_history_5m_rows(symbol, limit_days=limit_days)
-    aggregated_rows = aggregate_l2_history_5m_rows(rows_5m, granularity=granularity)
+    aggregated_rows = query_l2_history_bars(symbol, limit_days=limit_days, granularity=granularity)
     result: List[Dict[str, object]] = []
     for row in aggregated_rows:
         result.append(
@@ -1090,8 +1604,7 @@ def replace_stock_universe_meta(
         for symbol, name, market_cap in rows
         if normalize_l2_symbol(symbol)
     ]
-    conn = get_l2_history_connection()
-    try:
+    with write_connection(_l2_history_db_path()) as conn:
         with conn:
             conn.execute("DELETE FROM stock_universe_meta")
             if normalized_rows:
@@ -1104,8 +1617,6 @@ def replace_stock_universe_meta(
                     normalized_rows,
                 )
         return len(normalized_rows)
-    finally:
-        conn.close()
 
 
 def _is_valid_review_symbol(symbol: str) -> bool:
@@ -1115,44 +1626,123 @@ def _is_valid_review_symbol(symbol: str) -> bool:
     return text.startswith(("sh60", "sh68", "sz00", "sz30", "bj"))
 
 
-def _fetch_old_review_bounds(conn: sqlite3.Connection) -> Dict[str, Dict[str, str]]:
-    if not _table_exists(conn, "history_daily_l2"):
-        return {}
-    rows = conn.execute(
-        """
-        SELECT symbol, MIN(date) AS min_date, MAX(date) AS max_date
-        FROM history_daily_l2
-        GROUP BY symbol
+COVERAGE_SOURCE_HISTORY = "history_daily_l2"
+COVERAGE_SOURCE_ATOMIC = "atomic_trade_daily"
+_COVERAGE_SYMBOL_CHUNK = 500
+
+
+def _fetch_symbol_date_bounds(
+    conn: sqlite3.Connection,
+    table: str,
+    date_column: str,
+    symbols: Optional[Sequence[str]] = None,
+) -> List[Tuple[str, str, str]]:
+    if not _table_exists(conn, table):
+        return []
+    sql = f"SELECT symbol, MIN({date_column}), MAX({date_column}) FROM {table}"
+    if symbols is None:
+        rows = conn.execute(f"{sql} GROUP BY symbol").fetchall()
+    else:
+        rows = []
+        unique_symbols = sorted({str(symbol) for symbol in symbols if symbol})
+        for offset in range(0, len(unique_symbols), _COVERAGE_SYMBOL_CHUNK):
+            chunk = unique_symbols[offset : offset + _COVERAGE_SYMBOL_CHUNK]
+            rows.extend(
+                conn.execute(
+                    f"{sql} WHERE symbol IN ({','.join('?' * len(chunk))}) GROUP BY symbol",
+                    chunk,
+                ).fetchall()
+            )
+    return [(str(row[0]), str(row[1] or ""), str(row[2] or "")) for row in rows if row[0]]
+
+
+def _apply_coverage_bounds(
+    conn: sqlite3.Connection,
+    source: str,
+    symbols: Optional[Sequence[str]],
+    bounds: Sequence[Tuple[str, str, str]],
+) -> int:
+    """symbols 为 None 时整源重建；否则只替换这些 symbol（没有数据的行随之删除）。"""
+    if symbols is None:
+        conn.execute("DELETE FROM symbol_coverage_bounds WHERE source=?", (source,))
+    else:
+        unique_symbols = sorted({str(symbol) for symbol in symbols if symbol})
+        for offset in range(0, len(unique_symbols), _COVERAGE_SYMBOL_CHUNK):
+            chunk = unique_symbols[offset : offset + _COVERAGE_SYMBOL_CHUNK]
+            conn.execute(
+                f"DELETE FROM symbol_coverage_bounds WHERE source=? AND symbol IN ({','.join('?' * len(chunk))})",
+                [source, *chunk],
+            )
+    conn.executemany(
         """
-    ).fetchall()
-    return {
-        str(row[0]): {"min_date": str(row[1] or ""), "max_date": str(row[2] or "")}
-        for row in rows
-        if row[0]
-    }
+        INSERT OR REPLACE INTO symbol_coverage_bounds (source, symbol, min_date, max_date, updated_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """,
+        [(source, symbol, min_date, max_date) for symbol, min_date, max_date in bounds],
+    )
+    return len(bounds)
 
 
-def _fetch_atomic_review_bounds() -> Dict[str, Dict[str, str]]:
-    conn = _get_atomic_history_connection()
-    if conn is None:
-        return {}
-    try:
-        if not _table_exists(conn, "atomic_trade_daily"):
-            return {}
-        rows = conn.execute(
-            """
-            SELECT symbol, MIN(trade_date) AS min_date, MAX(trade_date) AS max_date
-            FROM atomic_trade_daily
-            GROUP BY symbol
-            """
-        ).fetchall()
-        return {
-            str(row[0]): {"min_date": str(row[1] or ""), "max_date": str(row[2] or "")}
-            for row in rows
-            if row[0]
-        }
-    finally:
-        conn.close()
+def _coverage_initialized(conn: sqlite3.Connection, source: str) -> bool:
+    return conn.execute("SELECT 1 FROM symbol_coverage_bounds WHERE source=? LIMIT 1", (source,)).fetchone() is not None
+
+
+def refresh_history_coverage_bounds(conn: sqlite3.Connection, symbols: Optional[Sequence[str]] = None) -> int:
+    """在写 history_daily_l2 的同一连接/事务里刷新这些 symbol 的覆盖区间；该源尚未建过时整源重建。"""
+    if symbols is not None and not _coverage_initialized(conn, COVERAGE_SOURCE_HISTORY):
+        symbols = None
+    bounds = _fetch_symbol_date_bounds(conn, "history_daily_l2", "date", symbols)
+    return _apply_coverage_bounds(conn, COVERAGE_SOURCE_HISTORY, symbols, bounds)
+
+
+def refresh_atomic_coverage_bounds(
+    symbols: Optional[Sequence[str]] = None,
+    atomic_db_path: Optional[str] = None,
+) -> int:
+    """从 atomic 库读取覆盖区间写入正式库的 symbol_coverage_bounds（atomic 库本身不改动）。"""
+    ensure_l2_history_schema()
+    if symbols is not None:
+        with read_connection(_l2_history_db_path()) as conn:
+            if not _coverage_initialized(conn, COVERAGE_SOURCE_ATOMIC):
+                symbols = None
+    db_path = atomic_db_path or _resolve_atomic_db_path()
+    bounds: List[Tuple[str, str, str]] = []
+    if db_path and os.path.exists(db_path):
+        with read_connection(db_path) as atomic_conn:
+            bounds = _fetch_symbol_date_bounds(atomic_conn, "atomic_trade_daily", "trade_date", symbols)
+    with write_connection(_l2_history_db_path()) as conn:
+        with conn:
+            return _apply_coverage_bounds(conn, COVERAGE_SOURCE_ATOMIC, symbols, bounds)
+
+
+def rebuild_symbol_coverage_bounds(atomic_db_path: Optional[str] = None) -> Dict[str, int]:
+    ensure_l2_history_schema()
+    with write_connection(_l2_history_db_path()) as conn:
+        with conn:
+            history_count = refresh_history_coverage_bounds(conn)
+    atomic_count = refresh_atomic_coverage_bounds(atomic_db_path=atomic_db_path)
+    return {COVERAGE_SOURCE_HISTORY: history_count, COVERAGE_SOURCE_ATOMIC: atomic_count}
+
+
+def _bootstrap_coverage_bounds(conn: sqlite3.Connection) -> None:
+    # 首次部署（表刚建出来还没维护过）时按源补建一次，之后只做增量维护
+    present = {
+        str(row[0])
+        for row in conn.execute("SELECT DISTINCT source FROM symbol_coverage_bounds").fetchall()
+    }
+    if COVERAGE_SOURCE_HISTORY not in present and conn.execute("SELECT 1 FROM history_daily_l2 LIMIT 1").fetchone():
+        with write_connection(_l2_history_db_path()) as writer:
+            with writer:
+                refresh_history_coverage_bounds(writer)
+    if COVERAGE_SOURCE_ATOMIC not in present:
+        atomic_path = _resolve_atomic_db_path()
+        if atomic_path:
+            with read_connection(atomic_path) as atomic_conn:
+                has_rows = _table_exists(atomic_conn, "atomic_trade_daily") and atomic_conn.execute(
+                    "SELECT 1 FROM atomic_trade_daily LIMIT 1"
+                ).fetchone()
+            if has_rows:
+                refresh_atomic_coverage_bounds(atomic_db_path=atomic_path)
 
 
 def query_review_pool(
@@ -1160,9 +1750,7 @@ def query_review_pool(
     limit: Optional[int] = None,
 ) -> Dict[str, object]:
     ensure_l2_history_schema()
-    conn = get_l2_history_connection()
-    try:
-        conn.row_factory = sqlite3.Row
+    with read_connection(_l2_history_db_path(), row_factory=sqlite3.Row) as conn:
         meta_rows = conn.execute(
             """
             SELECT symbol, name, market_cap, as_of_date, source, updated_at
@@ -1180,8 +1768,18 @@ def query_review_pool(
             for row in meta_rows
             if row[0]
         }
-        old_bounds = _fetch_old_review_bounds(conn)
-        atomic_bounds = _fetch_atomic_review_bounds()
+        _bootstrap_coverage_bounds(conn)
+        bounds_by_source: Dict[str, Dict[str, Dict[str, str]]] = {
+            COVERAGE_SOURCE_ATOMIC: {},
+            COVERAGE_SOURCE_HISTORY: {},
+        }
+        for source, symbol, min_date, max_date in conn.execute(
+            "SELECT source, symbol, min_date, max_date FROM symbol_coverage_bounds"
+        ).fetchall():
+            if source in bounds_by_source and symbol:
+                bounds_by_source[source][str(symbol)] = {"min_date": str(min_date or ""), "max_date": str(max_date or "")}
+        atomic_bounds = bounds_by_source[COVERAGE_SOURCE_ATOMIC]
+        old_bounds = bounds_by_source[COVERAGE_SOURCE_HISTORY]
         merged_bounds: Dict[str, Dict[str, str]] = {}
         for source_bounds in (atomic_bounds, old_bounds):
             for symbol, payload in source_bounds.items():
@@ -1230,5 +1828,3 @@ def query_review_pool(
             "latest_date": latest_date,
             "items": items,
         }
-    finally:
-        conn.close()
@@ -5,6 +5,7 @@ from typing import Dict, List, Optional, Sequence, Tuple
 
 from backend.app.core.config import DB_FILE
 from backend.app.core.time_buckets import map_to_30m_bucket_start
+from backend.app.db.connection_pool import ensure_schema_once, read_connection, write_connection
 
 
 Realtime5mPreviewRow = Tuple[
@@ -49,71 +50,74 @@ RealtimeDailyPreviewRow = Tuple[
 ALLOWED_PREVIEW_GRANULARITIES = {"5m", "15m", "30m", "1h", "1d"}
 
 
+def _realtime_preview_db_path() -> str:
+    return os.getenv("DB_PATH", DB_FILE)
+
+
 def get_realtime_preview_connection() -> sqlite3.Connection:
-    db_path = os.getenv("DB_PATH", DB_FILE)
+    db_path = _realtime_preview_db_path()
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     return sqlite3.connect(db_path)
 
 
+def _create_realtime_preview_schema(conn: sqlite3.Connection) -> None:
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS realtime_5m_preview (
+            symbol TEXT NOT NULL,
+            datetime TEXT NOT NULL,
+            trade_date TEXT NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            total_amount REAL NOT NULL,
+            total_volume REAL NULL,
+            l1_main_buy REAL NOT NULL,
+            l1_main_sell REAL NOT NULL,
+            l1_super_buy REAL NOT NULL,
+            l1_super_sell REAL NOT NULL,
+            source TEXT NOT NULL DEFAULT 'realtime_ticks',
+            preview_level TEXT NOT NULL DEFAULT 'l1_only',
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY(symbol, datetime)
+        );
+        CREATE INDEX IF NOT EXISTS idx_realtime_5m_preview_symbol_date
+        ON realtime_5m_preview(symbol, trade_date);
+
+        CREATE TABLE IF NOT EXISTS realtime_daily_preview (
+            symbol TEXT NOT NULL,
+            date TEXT NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            total_amount REAL NOT NULL,
+            l1_main_buy REAL NOT NULL,
+            l1_main_sell REAL NOT NULL,
+            l1_main_net REAL NOT NULL,
+            l1_super_buy REAL NOT NULL,
+            l1_super_sell REAL NOT NULL,
+            l1_super_net REAL NOT NULL,
+            source TEXT NOT NULL DEFAULT 'realtime_ticks',
+            preview_level TEXT NOT NULL DEFAULT 'l1_only',
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY(symbol, date)
+        );
+        CREATE INDEX IF NOT EXISTS idx_realtime_daily_preview_date
+        ON realtime_daily_preview(date);
+        """
+    )
+    columns = {
+        str(row[1])
+        for row in conn.execute("PRAGMA table_info(realtime_5m_preview)").fetchall()
+    }
+    if "total_volume" not in columns:
+        conn.execute("ALTER TABLE realtime_5m_preview ADD COLUMN total_volume REAL NULL")
+
+
 def ensure_realtime_preview_schema() -> None:
-    conn = get_realtime_preview_connection()
-    try:
-        conn.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS realtime_5m_preview (
-                symbol TEXT NOT NULL,
-                datetime TEXT NOT NULL,
-                trade_date TEXT NOT NULL,
-                open REAL NOT NULL,
-                high REAL NOT NULL,
-                low REAL NOT NULL,
-                close REAL NOT NULL,
-                total_amount REAL NOT NULL,
-                total_volume REAL NULL,
-                l1_main_buy REAL NOT NULL,
-                l1_main_sell REAL NOT NULL,
-                l1_super_buy REAL NOT NULL,
-                l1_super_sell REAL NOT NULL,
-                source TEXT NOT NULL DEFAULT 'realtime_ticks',
-                preview_level TEXT NOT NULL DEFAULT 'l1_only',
-                updated_at TEXT NOT NULL,
-                PRIMARY KEY(symbol, datetime)
-            );
-            CREATE INDEX IF NOT EXISTS idx_realtime_5m_preview_symbol_date
-            ON realtime_5m_preview(symbol, trade_date);
-
-            CREATE TABLE IF NOT EXISTS realtime_daily_preview (
-                symbol TEXT NOT NULL,
-                date TEXT NOT NULL,
-                open REAL NOT NULL,
-                high REAL NOT NULL,
-                low REAL NOT NULL,
-                close REAL NOT NULL,
-                total_amount REAL NOT NULL,
-                l1_main_buy REAL NOT NULL,
-                l1_main_sell REAL NOT NULL,
-                l1_main_net REAL NOT NULL,
-                l1_super_buy REAL NOT NULL,
-                l1_super_sell REAL NOT NULL,
-                l1_super_net REAL NOT NULL,
-                source TEXT NOT NULL DEFAULT 'realtime_ticks',
-                preview_level TEXT NOT NULL DEFAULT 'l1_only',
-                updated_at TEXT NOT NULL,
-                PRIMARY KEY(symbol, date)
-            );
-            CREATE INDEX IF NOT EXISTS idx_realtime_daily_preview_date
-            ON realtime_daily_preview(date);
-            """
-        )
-        columns = {
-            str(row[1])
-            for row in conn.execute("PRAGMA table_info(realtime_5m_preview)").fetchall()
-        }
-        if "total_volume" not in columns:
-            conn.execute("ALTER TABLE realtime_5m_preview ADD COLUMN total_volume REAL NULL")
-        conn.commit()
-    finally:
-        conn.close()
+    ensure_schema_once(_realtime_preview_db_path(), "realtime_preview", _create_realtime_preview_schema)
 
 
 def normalize_preview_symbol(symbol: str) -> str:
@@ -123,8 +127,7 @@ def normalize_preview_symbol(symbol: str) -> str:
 def replace_realtime_5m_preview_rows(symbol: str, trade_date: str, rows: Sequence[Realtime5mPreviewRow]) -> int:
     ensure_realtime_preview_schema()
     normalized = normalize_preview_symbol(symbol)
-    conn = get_realtime_preview_connection()
-    try:
+    with write_connection(_realtime_preview_db_path()) as conn:
         with conn:
             conn.execute(
                 "DELETE FROM realtime_5m_preview WHERE symbol=? AND trade_date=?",
@@ -143,8 +146,6 @@ def replace_realtime_5m_preview_rows(symbol: str, trade_date: str, rows: Sequenc
                     rows,
                 )
         return len(rows)
-    finally:
-        conn.close()
 
 
 def replace_realtime_daily_preview_row(
@@ -154,8 +155,7 @@ def replace_realtime_daily_preview_row(
 ) -> int:
     ensure_realtime_preview_schema()
     normalized = normalize_preview_symbol(symbol)
-    conn = get_realtime_preview_connection()
-    try:
+    with write_connection(_realtime_preview_db_path()) as conn:
         with conn:
             conn.execute(
                 "DELETE FROM realtime_daily_preview WHERE symbol=? AND date=?",
@@ -176,8 +176,6 @@ def replace_realtime_daily_preview_row(
                 )
                 return 1
         return 0
-    finally:
-        conn.close()
 
 
 def query_realtime_5m_preview_rows(
@@ -188,9 +186,7 @@ def query_realtime_5m_preview_rows(
 ) -> List[Dict[str, object]]:
     ensure_realtime_preview_schema()
     normalized = normalize_preview_symbol(symbol)
-    conn = get_realtime_preview_connection()
-    try:
-        conn.row_factory = sqlite3.Row
+    with read_connection(_realtime_preview_db_path(), row_factory=sqlite3.Row) as conn:
         if limit_days is not None:
             dates = [
                 row[0]
@@ -232,16 +228,12 @@ def query_realtime_5m_preview_rows(
             params,
         ).fetchall()
         return [dict(row) for row in rows]
-    finally:
-        conn.close()
 
 
 def query_realtime_daily_preview_row(symbol: str, trade_date: str) -> Optional[Dict[str, object]]:
     ensure_realtime_preview_schema()
     normalized = normalize_preview_symbol(symbol)
-    conn = get_realtime_preview_connection()
-    try:
-        conn.row_factory = sqlite3.Row
+    with read_connection(_realtime_preview_db_path(), row_factory=sqlite3.Row) as conn:
         row = conn.execute(
             """
             SELECT
@@ -256,8 +248,6 @@ def query_realtime_daily_preview_row(symbol: str, trade_date: str) -> Optional[D
             (normalized, str(trade_date)),
         ).fetchone()
         return dict(row) if row else None
-    finally:
-        conn.close()
 
 
 def _preview_bucket_start(dt: datetime, granularity: str) -> Optional[datetime]:
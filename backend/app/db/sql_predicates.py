@@ -0,0 +1,51 @@
+"""
+可走索引（sargable）的 SQL 谓词辅助。
+
+时间列统一存 'YYYY-MM-DD HH:MM:SS'（或至少以 'YYYY-MM-DD' 开头的文本），字典序即时间序，
+所以"某列落在 [start_date, end_date] 这些自然日内"可以写成半开区间
+`col >= 'start_date' AND col < 'end_date 次日'`，SQLite 直接在 (symbol, col) 复合索引上做范围查找；
+而 `substr(col, 1, 10)` / `date(col)` / `col LIKE 'date %'` 会让索引失效，只能把该 symbol 的行逐行过滤。
+
+symbol 同理：`lower(symbol) IN (...)` 用不上索引；写入侧 symbol 已规范成小写，
+查询时改为 `symbol IN (大小写变体)`，兼容历史上少量大写写入的行。
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+
+def next_day(date_text: str) -> str:
+    """
+    'YYYY-MM-DD'（允许带时间后缀）-> 次日 'YYYY-MM-DD'，作为半开区间的上界。
+    解析不了的输入退化为 `前缀 + '\\uffff'`，与原先 `substr(col, 1, 10) <= 前缀` 的字典序语义一致。
+    """
+    text = str(date_text).strip()[:10]
+    try:
+        day = datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        return text + "\uffff"
+    return (day + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def day_range_bounds(start_date: str, end_date: str) -> Tuple[str, str]:
+    """[start_date, end_date] 两端闭的自然日区间 -> 半开区间 (下界, 上界) 参数。"""
+    return str(start_date).strip()[:10], next_day(end_date)
+
+
+def day_range_clause(column: str) -> str:
+    """与 day_range_bounds 搭配的两个占位符：`column >= ? AND column < ?`。"""
+    return f"{column} >= ? AND {column} < ?"
+
+
+def symbol_case_variants(symbols: Iterable[Optional[str]]) -> List[str]:
+    """['SH600000', 'sz000001'] -> ['sh600000', 'SH600000', 'sz000001', 'SZ000001']（去重保序）。"""
+    variants: List[str] = []
+    seen = set()
+    for symbol in symbols:
+        text = str(symbol or "").strip()
+        if not text:
+            continue
+        for variant in (text.lower(), text.upper()):
+            if variant not in seen:
+                seen.add(variant)
+                variants.append(variant)
+    return variants
@@ -10,7 +10,9 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.db.database import init_db
+from backend.app.db.connection_pool import close_all_connections
 from backend.app.core.calendar import TradeCalendar
+from backend.app.core.http_client import HTTPClient
 import logging
 import urllib3
 
@@ -107,6 +109,8 @@ async def shutdown_event():
         if collector:
             collector.stop()
         sentiment_monitor.stop()
+    await HTTPClient.aclose()
+    close_all_connections()
 
 @app.get("/")
 def health_check():
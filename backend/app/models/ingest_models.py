@@ -35,10 +35,19 @@ class History30m(BaseModel):
     high: float
     low: float
 
+class TickWatermark(BaseModel):
+    symbol: str
+    date: str
+    last_time: str = ""
+    last_seq: int = 0
+    row_count: int = 0
+
 class IngestTicksRequest(BaseModel):
     token: str = Field(..., description="Authentication token")
     ticks: List[TradeTick]
     history_30m: Optional[List[History30m]] = None
+    mode: str = Field("overwrite", description="overwrite: 当日全量快照覆盖写; append: 基于 watermarks 仅追加新增 tick")
+    watermarks: Optional[List[TickWatermark]] = None
 
 class IngestSnapshotsRequest(BaseModel):
     token: str = Field(..., description="Authentication token")
@@ -5,7 +5,9 @@ from collections import defaultdict
 from backend.app.models.ingest_models import IngestTicksRequest, IngestSnapshotsRequest
 from backend.app.core.calendar import TradeCalendar
 from backend.app.core.http_client import MarketClock
+from backend.app.services.realtime_stream import notify_ticks_changed
 from backend.app.db.crud import (
+    append_ticks_after_watermark,
     save_sentiment_snapshot,
     save_history_30m_batch,
     save_ticks_daily_overwrite,
@@ -39,19 +41,61 @@ async def ingest_ticks(request: IngestTicksRequest):
     verify_token(request.token)
     
     try:
-        # Windows 节点上传的是“当日全量 tick 快照”，按 symbol+date 覆盖写可避免重复累加
-        if request.ticks:
-            grouped_ticks = defaultdict(list)
-            for t in request.ticks:
-                date_str = normalize_ingest_date(t.date)
-                grouped_ticks[(t.symbol, date_str)].append(
-                    (t.symbol, t.time, t.price, t.volume, t.amount, t.type, date_str)
-                )
+        tick_results = []
+        if request.mode not in ("overwrite", "append"):
+            raise HTTPException(status_code=400, detail=f"Unsupported ingest mode: {request.mode}")
+
+        # overwrite: Windows 节点上传“当日全量 tick 快照”，按 symbol+date 覆盖写可避免重复累加
+        # append: 只上传水位线之后的新增 tick；水位线不连续时返回 resync_required，由节点回退全量覆盖
+        grouped_ticks = defaultdict(list)
+        for t in request.ticks:
+            date_str = normalize_ingest_date(t.date)
+            grouped_ticks[(t.symbol, date_str)].append(
+                (t.symbol, t.time, t.price, t.volume, t.amount, t.type, date_str)
+            )
+
+        if request.mode == "append":
+            base_watermarks = {
+                (w.symbol, normalize_ingest_date(w.date)): w.model_dump(exclude={"symbol", "date"})
+                for w in (request.watermarks or [])
+            }
+            for key in base_watermarks:
+                grouped_ticks.setdefault(key, [])
 
+            appended_rows = 0
+            for (symbol, date_str), rows in grouped_ticks.items():
+                appended, watermark = append_ticks_after_watermark(
+                    symbol,
+                    date_str,
+                    base_watermarks.get((symbol, date_str)),
+                    rows,
+                )
+                if appended:
+                    appended_rows += len(rows)
+                    if rows:
+                        notify_ticks_changed(symbol, date_str)
+                tick_results.append({
+                    "symbol": symbol,
+                    "date": date_str,
+                    "status": "appended" if appended else "resync_required",
+                    "watermark": watermark,
+                })
+            logger.info(
+                f"[Ingest] Appended ticks: payload={len(request.ticks)}, saved={appended_rows}, "
+                f"groups={len(grouped_ticks)}, resync={sum(1 for r in tick_results if r['status'] != 'appended')}."
+            )
+        elif grouped_ticks:
             total_saved = 0
             for (symbol, date_str), rows in grouped_ticks.items():
-                save_ticks_daily_overwrite(symbol, date_str, rows)
+                watermark = save_ticks_daily_overwrite(symbol, date_str, rows)
+                notify_ticks_changed(symbol, date_str)
                 total_saved += len(rows)
+                tick_results.append({
+                    "symbol": symbol,
+                    "date": date_str,
+                    "status": "overwritten",
+                    "watermark": watermark,
+                })
             logger.info(
                 f"[Ingest] Overwrote ticks: payload={len(request.ticks)}, saved={total_saved}, groups={len(grouped_ticks)}."
             )
@@ -62,8 +106,14 @@ async def ingest_ticks(request: IngestTicksRequest):
             save_history_30m_batch(h30m_data)
             logger.info(f"[Ingest] Saved {len(h30m_data)} 30m history bars.")
 
-        return {"status": "success", "message": f"Ingested {len(request.ticks)} ticks"}
+        return {
+            "status": "success",
+            "message": f"Ingested {len(request.ticks)} ticks",
+            "tick_watermarks": tick_results,
+        }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"[Ingest Ticks Error]: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 import asyncio
 import threading
@@ -12,9 +13,18 @@ from datetime import datetime, timedelta, time as dt_time
 from backend.app.core.config import MOCK_DATA_DATE
 from backend.app.core.http_client import MarketClock
 from backend.app.core.calendar import TradeCalendar
+from backend.app.core.single_flight import realtime_flight
 from backend.app.db.crud import save_ticks_daily_overwrite
 from backend.app.db.l2_history_db import query_l2_history_5m_rows
 from backend.app.db.realtime_preview_db import query_realtime_5m_preview_rows
+from backend.app.services.realtime_stream import (
+    HEARTBEAT_SECONDS,
+    format_sse,
+    map_preview_fusion_bar as _map_preview_fusion_bar,
+    notify_ticks_changed,
+    sse_event_id,
+    stream_hub,
+)
 
 router = APIRouter()
 _STALE_HYDRATE_ATTEMPTS = {}
@@ -77,41 +87,6 @@ def _map_finalized_fusion_bar(row: dict) -> dict:
     }
 
 
-def _map_preview_fusion_bar(row: dict, source_override: str = None, preview_level_override: str = None) -> dict:
-    l1_main_buy = _safe_float(row.get("l1_main_buy")) or 0.0
-    l1_main_sell = _safe_float(row.get("l1_main_sell")) or 0.0
-    return {
-        "datetime": str(row["datetime"]),
-        "trade_date": str(row["trade_date"]),
-        "open": _safe_float(row.get("open")),
-        "high": _safe_float(row.get("high")),
-        "low": _safe_float(row.get("low")),
-        "close": _safe_float(row.get("close")),
-        "total_amount": _safe_float(row.get("total_amount")),
-        "total_volume": _safe_float(row.get("total_volume")),
-        "l1_main_buy": l1_main_buy,
-        "l1_main_sell": l1_main_sell,
-        "l1_super_buy": _safe_float(row.get("l1_super_buy")) or 0.0,
-        "l1_super_sell": _safe_float(row.get("l1_super_sell")) or 0.0,
-        "l1_net_inflow": l1_main_buy - l1_main_sell,
-        "l2_main_buy": None,
-        "l2_main_sell": None,
-        "l2_super_buy": None,
-        "l2_super_sell": None,
-        "l2_net_inflow": None,
-        "add_buy_amount": None,
-        "add_sell_amount": None,
-        "cancel_buy_amount": None,
-        "cancel_sell_amount": None,
-        "l2_cvd_delta": None,
-        "l2_oib_delta": None,
-        "source": str(source_override or row.get("source") or "realtime_ticks"),
-        "is_finalized": False,
-        "preview_level": str(preview_level_override or row.get("preview_level") or "l1_only"),
-        "fallback_used": False,
-    }
-
-
 def _has_dashboard_payload(data) -> bool:
     if not data:
         return False
@@ -240,6 +215,40 @@ def _should_hydrate_default_previous_trade_day(
     return str(market_context.get("default_display_scope") or "") == "previous_trade_day"
 
 
+def _clone_response(response: APIResponse) -> APIResponse:
+    """合并后的接口响应按等待方各拷一份：顶层 data 换成新 dict，调用方改写字段不会串到其它等待方。"""
+    if isinstance(response, APIResponse) and isinstance(response.data, dict):
+        return response.model_copy(update={"data": dict(response.data)})
+    return response
+
+
+async def _offload(label: str, fn, symbol: str, date_str: str, *args, fresh_after: Optional[float] = None):
+    """
+    同步计算/DB 读写放进 realtime_flight 的有界线程池，并按 (label, symbol, date) 合并并发调用。
+    补抓写库之后的读取传 fresh_after，避免搭上补抓前就已启动的那次计算。
+    """
+    return await realtime_flight.run(
+        (label, str(symbol), str(date_str)),
+        fn,
+        symbol,
+        date_str,
+        *args,
+        fresh_after=fresh_after,
+    )
+
+
+async def _load_preview_rows(symbol: str, query_date: str, fresh_after: Optional[float]):
+    return await _offload(
+        "realtime_5m_preview_rows",
+        query_realtime_5m_preview_rows,
+        symbol,
+        query_date,
+        query_date,
+        None,
+        fresh_after=fresh_after,
+    )
+
+
 async def _rehydrate_today_if_stale(
     symbol: str,
     query_date: str,
@@ -291,7 +300,15 @@ async def _hydrate_ticks_on_demand(symbol: str, date_str: str) -> bool:
     典型场景：
     - 交易日当天查看今日分时但本地尚无数据；
     - 周末/盘前默认回看上一交易日，但本地尚未同步该股票逐笔。
+    同一 (symbol, date) 的并发补抓经 realtime_flight 合并为一次。
     """
+    return await realtime_flight.run_async(
+        ("hydrate_ticks", str(symbol), str(date_str)),
+        lambda: _fetch_and_store_ticks(symbol, date_str),
+    )
+
+
+async def _fetch_and_store_ticks(symbol: str, date_str: str) -> bool:
     records = await fetch_live_ticks(symbol)
     if not records:
         return False
@@ -310,11 +327,12 @@ async def _hydrate_ticks_on_demand(symbol: str, date_str: str) -> bool:
             )
         )
 
-    await asyncio.to_thread(save_ticks_daily_overwrite, symbol, date_str, data_to_insert)
+    await _offload("save_ticks", save_ticks_daily_overwrite, symbol, date_str, data_to_insert)
+    notify_ticks_changed(symbol, date_str)
 
     from backend.app.services.analysis import aggregate_intraday_1m
 
-    await asyncio.to_thread(aggregate_intraday_1m, symbol, date_str)
+    await _offload("aggregate_intraday_1m", aggregate_intraday_1m, symbol, date_str)
     return True
 
 
@@ -385,7 +403,16 @@ async def get_realtime_dashboard(symbol: str, date: str = Query(None)):
     """
     获取实时仪表盘聚合数据（分钟级资金流 + 最新Ticks）
     支持传入 date 来秒切历史 1分钟预聚合分时图。
+    同一 (symbol, date) 的并发请求只计算一次，每个等待方拿到各自的响应拷贝。
     """
+    return await realtime_flight.run_async(
+        ("realtime_dashboard", str(symbol), str(date or "")),
+        lambda: _build_realtime_dashboard(symbol, date),
+        clone=_clone_response,
+    )
+
+
+async def _build_realtime_dashboard(symbol: str, date: Optional[str]) -> APIResponse:
     if MOCK_DATA_DATE:
         market_context = {
             "natural_today": MOCK_DATA_DATE,
@@ -405,6 +432,8 @@ async def get_realtime_dashboard(symbol: str, date: str = Query(None)):
     requested_date_explicitly = date is not None
 
     query_date = date if date else today_str
+    # 补抓写库后，后续读取不能复用补抓前已启动的合并计算
+    fresh_after: Optional[float] = None
 
     should_use_realtime = (
         query_date == natural_today_str
@@ -416,7 +445,7 @@ async def get_realtime_dashboard(symbol: str, date: str = Query(None)):
         # 周末/节假日/盘前回溯到上一交易日时，应走 history_1m 静态回放，
         # 否则会因为当前不在实时采集窗口而出现“当日分时为空”。
         from backend.app.services.analysis import calculate_realtime_aggregation, get_sentiment_fallback_dashboard
-        data = calculate_realtime_aggregation(symbol, natural_today_str)
+        data = await _offload("realtime_aggregation", calculate_realtime_aggregation, symbol, natural_today_str, fresh_after=fresh_after)
         if _is_today_payload_stale(data, market_context, query_date, natural_today_str):
             hydrated = await _rehydrate_today_if_stale(
                 symbol,
@@ -426,14 +455,16 @@ async def get_realtime_dashboard(symbol: str, date: str = Query(None)):
                 force=_needs_postclose_forced_retry(market_context),
                 max_attempts=2 if _needs_postclose_forced_retry(market_context) else 1,
             )
+            fresh_after = time.monotonic() if hydrated else fresh_after
             if hydrated:
-                data = calculate_realtime_aggregation(symbol, natural_today_str)
+                data = await _offload("realtime_aggregation", calculate_realtime_aggregation, symbol, natural_today_str, fresh_after=fresh_after)
         if not _has_dashboard_payload(data):
             hydrated = await _hydrate_today_ticks_on_demand(symbol, natural_today_str)
+            fresh_after = time.monotonic() if hydrated else fresh_after
             if hydrated:
-                data = calculate_realtime_aggregation(symbol, natural_today_str)
+                data = await _offload("realtime_aggregation", calculate_realtime_aggregation, symbol, natural_today_str, fresh_after=fresh_after)
         if not _has_dashboard_payload(data):
-            fallback = get_sentiment_fallback_dashboard(symbol, natural_today_str)
+            fallback = await _offload("sentiment_fallback", get_sentiment_fallback_dashboard, symbol, natural_today_str, fresh_after=fresh_after)
             if fallback is not None:
                 data = fallback
     else:
@@ -447,9 +478,9 @@ async def get_realtime_dashboard(symbol: str, date: str = Query(None)):
             calculate_realtime_aggregation,
             get_sentiment_fallback_dashboard,
         )
-        data = await asyncio.to_thread(get_history_1m_dashboard, symbol, query_date)
+        data = await _offload("history_1m_dashboard", get_history_1m_dashboard, symbol, query_date, fresh_after=fresh_after)
         if _is_today_payload_stale(data, market_context, query_date, natural_today_str):
-            fallback = calculate_realtime_aggregation(symbol, query_date)
+            fallback = await _offload("realtime_aggregation", calculate_realtime_aggregation, symbol, query_date, fresh_after=fresh_after)
             if _has_dashboard_payload(fallback):
                 data = fallback
             if _is_today_payload_stale(data, market_context, query_date, natural_today_str):
@@ -461,20 +492,22 @@ async def get_realtime_dashboard(symbol: str, date: str = Query(None)):
                     force=_needs_postclose_forced_retry(market_context),
                     max_attempts=2 if _needs_postclose_forced_retry(market_context) else 1,
                 )
+                fresh_after = time.monotonic() if hydrated else fresh_after
                 if hydrated:
-                    data = calculate_realtime_aggregation(symbol, query_date)
+                    data = await _offload("realtime_aggregation", calculate_realtime_aggregation, symbol, query_date, fresh_after=fresh_after)
         if data is None:
-            data = await asyncio.to_thread(get_history_l2_dashboard, symbol, query_date)
+            data = await _offload("history_l2_dashboard", get_history_l2_dashboard, symbol, query_date, fresh_after=fresh_after)
         if data is None:
-            fallback = calculate_realtime_aggregation(symbol, query_date)
+            fallback = await _offload("realtime_aggregation", calculate_realtime_aggregation, symbol, query_date, fresh_after=fresh_after)
             if _has_dashboard_payload(fallback):
                 data = fallback
         if data is None and query_date == natural_today_str:
             hydrated = await _hydrate_today_ticks_on_demand(symbol, natural_today_str)
+            fresh_after = time.monotonic() if hydrated else fresh_after
             if hydrated:
-                data = await asyncio.to_thread(get_history_1m_dashboard, symbol, query_date)
+                data = await _offload("history_1m_dashboard", get_history_1m_dashboard, symbol, query_date, fresh_after=fresh_after)
                 if data is None:
-                    fallback = calculate_realtime_aggregation(symbol, query_date)
+                    fallback = await _offload("realtime_aggregation", calculate_realtime_aggregation, symbol, query_date, fresh_after=fresh_after)
                     if _has_dashboard_payload(fallback):
                         data = fallback
         if data is None and _should_hydrate_default_previous_trade_day(
@@ -484,16 +517,17 @@ async def get_realtime_dashboard(symbol: str, date: str = Query(None)):
             requested_date_explicitly=requested_date_explicitly,
         ):
             hydrated = await _hydrate_ticks_on_demand(symbol, query_date)
+            fresh_after = time.monotonic() if hydrated else fresh_after
             if hydrated:
-                data = await asyncio.to_thread(get_history_1m_dashboard, symbol, query_date)
+                data = await _offload("history_1m_dashboard", get_history_1m_dashboard, symbol, query_date, fresh_after=fresh_after)
                 if data is None:
-                    data = await asyncio.to_thread(get_history_l2_dashboard, symbol, query_date)
+                    data = await _offload("history_l2_dashboard", get_history_l2_dashboard, symbol, query_date, fresh_after=fresh_after)
                 if data is None:
-                    fallback = calculate_realtime_aggregation(symbol, query_date)
+                    fallback = await _offload("realtime_aggregation", calculate_realtime_aggregation, symbol, query_date, fresh_after=fresh_after)
                     if _has_dashboard_payload(fallback):
                         data = fallback
         if data is None and query_date == natural_today_str:
-            fallback = get_sentiment_fallback_dashboard(symbol, query_date)
+            fallback = await _offload("sentiment_fallback", get_sentiment_fallback_dashboard, symbol, query_date, fresh_after=fresh_after)
             if fallback is not None:
                 data = fallback
         if data is None:
@@ -501,6 +535,8 @@ async def get_realtime_dashboard(symbol: str, date: str = Query(None)):
     
     # Inject display date for frontend awareness
     if data:
+        # 合并计算的结果可能被多个请求共享，注入元信息前先浅拷贝
+        data = dict(data)
         data['display_date'] = query_date
         data['natural_today'] = natural_today_str
         data['market_status'] = market_context['market_status']
@@ -523,7 +559,16 @@ async def get_intraday_fusion(symbol: str, date: str = Query(None), include_toda
     - 盘中：L1 5m preview
     - 当天盘后 finalized 到位：L1/L2 finalized 5m
     - 历史日期：L1/L2 finalized 5m
+    同一 (symbol, date) 的并发请求只计算一次，每个等待方拿到各自的响应拷贝。
     """
+    return await realtime_flight.run_async(
+        ("intraday_fusion", str(symbol), str(date or ""), bool(include_today_preview)),
+        lambda: _build_intraday_fusion(symbol, date, include_today_preview),
+        clone=_clone_response,
+    )
+
+
+async def _build_intraday_fusion(symbol: str, date: Optional[str], include_today_preview: bool) -> APIResponse:
     if MOCK_DATA_DATE:
         market_context = {
             "natural_today": MOCK_DATA_DATE,
@@ -541,14 +586,9 @@ async def get_intraday_fusion(symbol: str, date: str = Query(None), include_toda
     natural_today = str(market_context["natural_today"])
     requested_date_explicitly = date is not None
     query_date = date if date else str(market_context["default_display_date"])
+    fresh_after: Optional[float] = None
 
-    finalized_rows = await asyncio.to_thread(
-        query_l2_history_5m_rows,
-        symbol,
-        query_date,
-        query_date,
-        None,
-    )
+    finalized_rows = await _offload("l2_history_5m_rows", query_l2_history_5m_rows, symbol, query_date, query_date, None)
     has_finalized_today = query_date == natural_today and len(finalized_rows) > 0
     mode, mode_label = _build_intraday_fusion_mode(query_date, natural_today, has_finalized_today)
 
@@ -560,14 +600,8 @@ async def get_intraday_fusion(symbol: str, date: str = Query(None), include_toda
         from backend.app.services.analysis import refresh_realtime_preview
 
         if include_today_preview and query_date == natural_today:
-            await asyncio.to_thread(refresh_realtime_preview, symbol, query_date)
-        preview_rows = await asyncio.to_thread(
-            query_realtime_5m_preview_rows,
-            symbol,
-            query_date,
-            query_date,
-            None,
-        )
+            await _offload("refresh_preview", refresh_realtime_preview, symbol, query_date, fresh_after=fresh_after)
+        preview_rows = await _load_preview_rows(symbol, query_date, fresh_after)
         preview_payload = {"bars": [_map_preview_fusion_bar(row) for row in preview_rows]}
         if include_today_preview and _is_today_payload_stale(preview_payload, market_context, query_date, natural_today):
             hydrated = await _rehydrate_today_if_stale(
@@ -578,26 +612,16 @@ async def get_intraday_fusion(symbol: str, date: str = Query(None), include_toda
                 force=_needs_postclose_forced_retry(market_context),
                 max_attempts=2 if _needs_postclose_forced_retry(market_context) else 1,
             )
+            fresh_after = time.monotonic() if hydrated else fresh_after
             if hydrated:
-                await asyncio.to_thread(refresh_realtime_preview, symbol, query_date)
-                preview_rows = await asyncio.to_thread(
-                    query_realtime_5m_preview_rows,
-                    symbol,
-                    query_date,
-                    query_date,
-                    None,
-                )
+                await _offload("refresh_preview", refresh_realtime_preview, symbol, query_date, fresh_after=fresh_after)
+                preview_rows = await _load_preview_rows(symbol, query_date, fresh_after)
         if not preview_rows and query_date == natural_today:
             hydrated = await _hydrate_today_ticks_on_demand(symbol, natural_today)
+            fresh_after = time.monotonic() if hydrated else fresh_after
             if hydrated:
-                await asyncio.to_thread(refresh_realtime_preview, symbol, query_date)
-                preview_rows = await asyncio.to_thread(
-                    query_realtime_5m_preview_rows,
-                    symbol,
-                    query_date,
-                    query_date,
-                    None,
-                )
+                await _offload("refresh_preview", refresh_realtime_preview, symbol, query_date, fresh_after=fresh_after)
+                preview_rows = await _load_preview_rows(symbol, query_date, fresh_after)
         bars = [_map_preview_fusion_bar(row) for row in preview_rows]
         source = "realtime_preview"
         is_l2_finalized = False
@@ -607,14 +631,8 @@ async def get_intraday_fusion(symbol: str, date: str = Query(None), include_toda
         else:
             from backend.app.services.analysis import refresh_realtime_preview
 
-            await asyncio.to_thread(refresh_realtime_preview, symbol, query_date)
-            preview_rows = await asyncio.to_thread(
-                query_realtime_5m_preview_rows,
-                symbol,
-                query_date,
-                query_date,
-                None,
-            )
+            await _offload("refresh_preview", refresh_realtime_preview, symbol, query_date, fresh_after=fresh_after)
+            preview_rows = await _load_preview_rows(symbol, query_date, fresh_after)
             if preview_rows:
                 bars = [
                     _map_preview_fusion_bar(
@@ -633,15 +651,10 @@ async def get_intraday_fusion(symbol: str, date: str = Query(None), include_toda
                 requested_date_explicitly=requested_date_explicitly,
             ):
                 hydrated = await _hydrate_ticks_on_demand(symbol, query_date)
+                fresh_after = time.monotonic() if hydrated else fresh_after
                 if hydrated:
-                    await asyncio.to_thread(refresh_realtime_preview, symbol, query_date)
-                    preview_rows = await asyncio.to_thread(
-                        query_realtime_5m_preview_rows,
-                        symbol,
-                        query_date,
-                        query_date,
-                        None,
-                    )
+                    await _offload("refresh_preview", refresh_realtime_preview, symbol, query_date, fresh_after=fresh_after)
+                    preview_rows = await _load_preview_rows(symbol, query_date, fresh_after)
                     if preview_rows:
                         bars = [
                             _map_preview_fusion_bar(
@@ -674,3 +687,66 @@ async def get_intraday_fusion(symbol: str, date: str = Query(None), include_toda
             "bars": bars,
         },
     )
+
+
+@router.get("/realtime/stream")
+async def stream_realtime(request: Request, symbol: str, date: str = Query(None)):
+    """
+    盘中分时推送（SSE），替代 RealtimeView 的 5s/30s 轮询。
+    首帧 `snapshot` 复用 dashboard / intraday_fusion 的完整回退链（每个连接只跑一次）；
+    处于盘中实时路径时随后订阅 services/realtime_stream 的增量 `delta` / `reset`，
+    非实时日期发完首帧即 `end`。
+    """
+    dashboard = await get_realtime_dashboard(symbol=symbol, date=date)
+    fusion = await get_intraday_fusion(symbol=symbol, date=date, include_today_preview=True)
+    # 两个接口经 realtime_flight 已按等待方各拷一份；这里仍只改本地拷贝，不依赖上游是否共享
+    dashboard_data = dict(dashboard.data) if dashboard.code == 200 and dashboard.data else None
+    fusion_data = dict(fusion.data)
+    query_date = str(fusion_data["trade_date"])
+    live = bool(
+        dashboard_data
+        and dashboard_data.get("is_realtime_session")
+        and dashboard_data.get("display_date") == dashboard_data.get("natural_today")
+        and fusion_data.get("mode") == "intraday_l1_only"
+    )
+
+    async def events():
+        subscription = None
+        try:
+            seq = 0
+            if live:
+                subscription, state = await stream_hub.subscribe(symbol, query_date)
+                seq = state["seq"]
+                if state["chart_data"]:
+                    # 首帧与订阅基线取自同一份聚合状态，之后的增量可以直接接上
+                    for field in ("chart_data", "cumulative_data", "latest_ticks"):
+                        dashboard_data[field] = state[field]
+                    fusion_data["bars"] = state["bars"]
+            yield format_sse(
+                "snapshot",
+                {"seq": seq, "live": live, "dashboard": dashboard_data, "fusion": fusion_data},
+                seq,
+            )
+            if subscription is None:
+                yield format_sse("end", {"seq": seq})
+                return
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                # 首帧已包含的增量不再转发，客户端按 seq 也会再过滤一遍
+                message_seq = sse_event_id(message)
+                if message_seq is not None and message_seq <= seq:
+                    continue
+                yield message
+        finally:
+            if subscription is not None:
+                stream_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -45,6 +45,14 @@ def get_active_symbols():
     active_symbols = heartbeat_registry.get_active_snapshot()
     return APIResponse(code=200, data=active_symbols)
 
+@router.get("/collector_metrics", response_model=APIResponse)
+def get_collector_metrics():
+    """
+    Watchlist tick collector cycle latency / page-resume metrics.
+    """
+    from backend.app.services.collector import collector
+    return APIResponse(code=200, data=collector.get_metrics())
+
 @router.get("/history")
 def get_history(symbol: str = Query(...)):
     if MOCK_DATA_DATE:
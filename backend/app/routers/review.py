@@ -4,8 +4,7 @@ from typing import Dict, List
 from fastapi import APIRouter, Query
 
 from backend.app.db.l2_history_db import (
-    aggregate_l2_history_5m_rows,
-    query_l2_history_5m_rows,
+    query_l2_history_bars,
     query_l2_history_daily_rows,
     query_review_pool,
 )
@@ -173,10 +172,14 @@ def get_review_data(
                 return APIResponse(code=200, message="无数据", data=[])
             return APIResponse(code=200, data=[_map_review_daily_row(row) for row in rows_daily])
 
-        rows_5m = query_l2_history_5m_rows(normalized_symbol, start_date=start_date, end_date=end_date)
-        if not rows_5m:
+        aggregated = query_l2_history_bars(
+            normalized_symbol,
+            start_date=start_date,
+            end_date=end_date,
+            granularity=resolved_granularity,
+        )
+        if not aggregated:
             return APIResponse(code=200, message="无数据", data=[])
-        aggregated = aggregate_l2_history_5m_rows(rows_5m, granularity=resolved_granularity)
         return APIResponse(code=200, data=[_map_review_5m_row(row, resolved_granularity) for row in aggregated])
     except ValueError as exc:
         return APIResponse(code=400, message=str(exc), data=[])
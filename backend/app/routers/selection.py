@@ -319,9 +319,9 @@ def selection_backtests_run(request: SelectionBacktestRunRequest):
 
 
 @router.post("/selection/refresh", response_model=APIResponse, dependencies=[Depends(require_write_access)])
-def selection_refresh(start_date: str = Query(None), end_date: str = Query(None)):
+def selection_refresh(start_date: str = Query(None), end_date: str = Query(None), full: bool = Query(False)):
     try:
-        result = refresh_selection_research(start_date=start_date, end_date=end_date)
+        result = refresh_selection_research(start_date=start_date, end_date=end_date, incremental=not full)
         return APIResponse(
             code=200,
             data={
@@ -329,6 +329,9 @@ def selection_refresh(start_date: str = Query(None), end_date: str = Query(None)
                 "end_date": result.end_date,
                 "feature_rows": result.feature_rows,
                 "signal_rows": result.signal_rows,
+                "mode": result.mode,
+                "target_rows": result.target_rows,
+                "reused_rows": result.reused_rows,
                 "source_snapshot": result.source_snapshot,
             },
         )
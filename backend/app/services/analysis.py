@@ -15,25 +15,14 @@ from backend.app.core.trade_side import (
     is_sell_series,
     normalize_trade_side,
 )
-import copy
-import threading
-import time
-
-_REALTIME_CACHE = {}
-_REALTIME_CACHE_LOCK = threading.Lock()
-_REALTIME_CACHE_TTL_SECONDS = 2.0
-
-
-def _prepare_tick_dataframe(raw_rows, date_str: str) -> pd.DataFrame:
-    df = pd.DataFrame(raw_rows, columns=['time', 'price', 'volume', 'amount', 'type'])
-    if df.empty:
-        return df
-    df = df[df['time'] <= '15:05:00']
-    if df.empty:
-        return df
-    df = df.sort_values('time', ascending=True).copy()
-    df['datetime'] = pd.to_datetime(date_str + ' ' + df['time'])
-    return df
+from backend.app.services.realtime_aggregator import (
+    TICK_CUTOFF_TIME,
+    aggregate_tick_buckets,
+    build_preview_rows_from_buckets,
+    five_minute_key,
+    get_tick_aggregator,
+    merge_buckets,
+)
 
 
 def _build_realtime_preview_rows(
@@ -43,85 +32,49 @@ def _build_realtime_preview_rows(
     large_threshold: float,
     super_threshold: float,
 ) -> Tuple[List[Realtime5mPreviewRow], Optional[RealtimeDailyPreviewRow]]:
-    df = _prepare_tick_dataframe(raw_rows, date_str)
-    if df.empty:
+    # get_ticks_by_date returns time DESC; the bucket kernel expects ascending order.
+    rows = sorted(
+        (row for row in reversed(list(raw_rows)) if row[0] <= TICK_CUTOFF_TIME),
+        key=lambda row: row[0],
+    )
+    if not rows:
         return [], None
 
-    df['is_buy'] = is_buy_series(df['type'])
-    df['is_sell'] = is_sell_series(df['type'])
-    df['is_main'] = df['amount'] >= large_threshold
-    df['is_super'] = df['amount'] >= super_threshold
-    df['bucket_time'] = df['datetime'].dt.floor('5min')
-
-    updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    rows_5m: List[Realtime5mPreviewRow] = []
-
-    for bucket_time, group in df.groupby('bucket_time', sort=True):
-        l1_main_buy = float(group[group['is_main'] & group['is_buy']]['amount'].sum())
-        l1_main_sell = float(group[group['is_main'] & group['is_sell']]['amount'].sum())
-        l1_super_buy = float(group[group['is_super'] & group['is_buy']]['amount'].sum())
-        l1_super_sell = float(group[group['is_super'] & group['is_sell']]['amount'].sum())
-        total_amount = float(group['amount'].sum())
-        total_volume = float(group['volume'].sum())
-        rows_5m.append(
-            (
-                symbol,
-                bucket_time.strftime("%Y-%m-%d %H:%M:%S"),
-                date_str,
-                float(group['price'].iloc[0]),
-                float(group['price'].max()),
-                float(group['price'].min()),
-                float(group['price'].iloc[-1]),
-                total_amount,
-                total_volume,
-                l1_main_buy,
-                l1_main_sell,
-                l1_super_buy,
-                l1_super_sell,
-                "realtime_ticks",
-                "l1_only",
-                updated_at,
-            )
-        )
-
-    l1_main_buy_total = float(df[df['is_main'] & df['is_buy']]['amount'].sum())
-    l1_main_sell_total = float(df[df['is_main'] & df['is_sell']]['amount'].sum())
-    l1_super_buy_total = float(df[df['is_super'] & df['is_buy']]['amount'].sum())
-    l1_super_sell_total = float(df[df['is_super'] & df['is_sell']]['amount'].sum())
-    total_amount = float(df['amount'].sum())
-    daily_row: RealtimeDailyPreviewRow = (
-        symbol,
-        date_str,
-        float(df['price'].iloc[0]),
-        float(df['price'].max()),
-        float(df['price'].min()),
-        float(df['price'].iloc[-1]),
-        total_amount,
-        l1_main_buy_total,
-        l1_main_sell_total,
-        l1_main_buy_total - l1_main_sell_total,
-        l1_super_buy_total,
-        l1_super_sell_total,
-        l1_super_buy_total - l1_super_sell_total,
-        "realtime_ticks",
-        "l1_only",
-        updated_at,
+    buckets_5m = aggregate_tick_buckets(
+        rows,
+        [five_minute_key(row[0]) for row in rows],
+        large_threshold,
+        super_threshold,
     )
-    return rows_5m, daily_row
+    return build_preview_rows_from_buckets(symbol, date_str, buckets_5m, merge_buckets(buckets_5m))
+
+
+def _load_realtime_thresholds() -> Tuple[float, float]:
+    config = get_app_config()
+    # Default to 500k if not set, as per user request
+    large_threshold = float(config.get('large_threshold', 500000))
+    super_threshold = float(config.get('super_large_threshold', 1000000))
+    return large_threshold, super_threshold
 
 
 def refresh_realtime_preview(symbol: str, date_str: str, raw_rows=None):
     if raw_rows is None:
-        raw_rows = get_ticks_by_date(symbol, date_str)
+        # 未显式传入 ticks 时复用增量聚合状态，只读取新落库的逐笔。
+        large_threshold, super_threshold = _load_realtime_thresholds()
+        aggregator = get_tick_aggregator(symbol, date_str, large_threshold, super_threshold)
+        with aggregator.lock:
+            aggregator.sync()
+            rows_5m, daily_row = aggregator.build_preview_rows()
+        rows_5m_count = replace_realtime_5m_preview_rows(symbol, date_str, rows_5m)
+        rows_daily_count = replace_realtime_daily_preview_row(symbol, date_str, daily_row)
+        return {"rows_5m": rows_5m_count, "rows_daily": rows_daily_count}
 
     if not raw_rows:
         replace_realtime_5m_preview_rows(symbol, date_str, [])
         replace_realtime_daily_preview_row(symbol, date_str, None)
         return {"rows_5m": 0, "rows_daily": 0}
 
-    config = get_app_config()
-    large_threshold = float(config.get('large_threshold', 500000))
-    super_threshold = float(config.get('super_large_threshold', 1000000))
+    large_threshold, super_threshold = _load_realtime_thresholds()
     rows_5m, daily_row = _build_realtime_preview_rows(
         symbol,
         date_str,
@@ -134,38 +87,11 @@ def refresh_realtime_preview(symbol: str, date_str: str, raw_rows=None):
     return {"rows_5m": rows_5m_count, "rows_daily": rows_daily_count}
 
 
-def _build_realtime_signature(raw_rows, large_threshold: float, super_threshold: float):
-    latest = raw_rows[0] if raw_rows else None
-    earliest = raw_rows[-1] if raw_rows else None
-    return (len(raw_rows), latest, earliest, large_threshold, super_threshold)
-
-
-def _get_cached_realtime(symbol: str, date_str: str, signature):
-    cache_key = (symbol, date_str)
-    now = time.time()
-    with _REALTIME_CACHE_LOCK:
-        cache = _REALTIME_CACHE.get(cache_key)
-        if not cache:
-            return None
-        if cache["signature"] != signature:
-            return None
-        if now - cache["ts"] > _REALTIME_CACHE_TTL_SECONDS:
-            return None
-        return copy.deepcopy(cache["data"])
-
-
-def _set_cached_realtime(symbol: str, date_str: str, signature, data: Dict):
-    cache_key = (symbol, date_str)
-    with _REALTIME_CACHE_LOCK:
-        _REALTIME_CACHE[cache_key] = {
-            "signature": signature,
-            "data": copy.deepcopy(data),
-            "ts": time.time(),
-        }
-
 def calculate_realtime_aggregation(symbol: str, date_str: str) -> Dict:
     """
     Calculate real-time capital flow aggregation (1-minute bars).
+    Ticks are folded incrementally per (symbol, date): each call only reads ticks
+    that landed after the aggregator watermark (see services/realtime_aggregator.py).
     Returns:
         {
             "chart_data": List[CapitalRatioData],
@@ -173,145 +99,48 @@ def calculate_realtime_aggregation(symbol: str, date_str: str) -> Dict:
             "latest_ticks": List[TickData]
         }
     """
-    # 1. Fetch raw ticks from DB
-    raw_rows = get_ticks_by_date(symbol, date_str)
-    
-    if not raw_rows:
-        return {
-            "chart_data": [],
-            "cumulative_data": [],
-            "latest_ticks": []
-        }
-
-    # Convert to DataFrame
-    # columns: time, price, volume, amount, type
-    df = _prepare_tick_dataframe(raw_rows, date_str)
-    
-    if df.empty:
-        return {
-            "chart_data": [],
-            "cumulative_data": [],
-            "latest_ticks": []
-        }
-
-    # 3. Prepare Thresholds (From Config)
-    config = get_app_config()
-    # Default to 500k if not set, as per user request
-    LARGE_THRESHOLD = float(config.get('large_threshold', 500000))     
-    SUPER_THRESHOLD = float(config.get('super_large_threshold', 1000000))
+    LARGE_THRESHOLD, SUPER_THRESHOLD = _load_realtime_thresholds()
+    aggregator = get_tick_aggregator(symbol, date_str, LARGE_THRESHOLD, SUPER_THRESHOLD)
 
-    signature = _build_realtime_signature(raw_rows, LARGE_THRESHOLD, SUPER_THRESHOLD)
-    cached = _get_cached_realtime(symbol, date_str, signature)
-    if cached is not None:
-        return cached
+    rows_5m, daily_row = [], None
+    with aggregator.lock:
+        changed = aggregator.sync()
+        result = aggregator.build_dashboard()
+        if changed:
+            rows_5m, daily_row = aggregator.build_preview_rows()
 
     # Persist preview layer as a write-through side effect for future multi-frame queries.
-    refresh_realtime_preview(symbol, date_str, raw_rows=raw_rows)
-
-    # 4. Group by Minute (HH:MM)
-    df['minute'] = df['time'].str.slice(0, 5)
-    
-    # Pre-calculate flags
-    # Support Chinese/English/single-letter sides (买盘/buy/B etc.)
-    df['is_buy'] = is_buy_series(df['type'])
-    df['is_sell'] = is_sell_series(df['type'])
-    df['is_main'] = df['amount'] >= LARGE_THRESHOLD
-    df['is_super'] = df['amount'] >= SUPER_THRESHOLD
-
-    # Aggregation
-    grouped = df.groupby('minute')
-    
-    minutes = sorted(df['minute'].unique())
-    
-    chart_data = []
-    cumulative_data = []
-    
-    running_main_buy = 0.0
-    running_main_sell = 0.0
-    running_super_buy = 0.0
-    running_super_sell = 0.0
-    
-    for minute in minutes:
-        group = grouped.get_group(minute)
-        
-        total_amount = group['amount'].sum() or 1.0
-        
-        # --- Instantaneous Ratios (Chart Data) ---
-        # Main Force (>20w) in this minute
-        main_buy_amt = group[group['is_main'] & group['is_buy']]['amount'].sum()
-        main_sell_amt = group[group['is_main'] & group['is_sell']]['amount'].sum()
-        
-        # Super Large (>100w) in this minute
-        super_buy_amt = group[group['is_super'] & group['is_buy']]['amount'].sum()
-        super_sell_amt = group[group['is_super'] & group['is_sell']]['amount'].sum()
-        
-        # Close Price for this minute (Last tick)
-        close_price = group['price'].iloc[-1]
-        
-        main_buy_ratio = (main_buy_amt / total_amount) * 100
-        main_sell_ratio = (main_sell_amt / total_amount) * 100
-        participation_ratio = ((main_buy_amt + main_sell_amt) / total_amount) * 100
-        super_participation_ratio = ((super_buy_amt + super_sell_amt) / total_amount) * 100
-        
-        chart_data.append({
-            "time": minute,
-            "mainBuyRatio": round(main_buy_ratio, 1),
-            "mainSellRatio": round(main_sell_ratio, 1),
-            "mainParticipationRatio": round(participation_ratio, 1),
-            "mainBuyAmount": float(main_buy_amt),
-            "mainSellAmount": float(main_sell_amt),
-            "superBuyAmount": float(super_buy_amt),
-            "superSellAmount": float(super_sell_amt),
-            "superParticipationRatio": round(super_participation_ratio, 1),
-            "closePrice": float(close_price)
-        })
-        
-        # --- Cumulative Flow (Cumulative Data) ---
-        # Note: We need to accumulate from start of day
-        
-        # Main Force
-        running_main_buy += main_buy_amt
-        running_main_sell += main_sell_amt
-        
-        # Super Large (>100w)
-        super_buy_amt = group[group['is_super'] & group['is_buy']]['amount'].sum()
-        super_sell_amt = group[group['is_super'] & group['is_sell']]['amount'].sum()
-        
-        running_super_buy += super_buy_amt
-        running_super_sell += super_sell_amt
-        
-        cumulative_data.append({
-            "time": minute,
-            "cumMainBuy": running_main_buy,
-            "cumMainSell": running_main_sell,
-            "cumNetInflow": running_main_buy - running_main_sell,
-            "cumSuperBuy": running_super_buy,
-            "cumSuperSell": running_super_sell,
-            "cumSuperNetInflow": running_super_buy - running_super_sell
-        })
-
-    # 5. Latest Ticks (Top 50 reversed)
-    # df is sorted asc, so tail is latest. We need desc for display.
-    latest_df = df.tail(50).iloc[::-1]
-    latest_ticks = []
-    for _, row in latest_df.iterrows():
-        t_type = normalize_trade_side(row['type'])
-        
-        latest_ticks.append({
-            "time": row['time'],
-            "price": row['price'],
-            "volume": int(row['volume']),
-            "amount": row['amount'],
-            "type": t_type
-        })
+    # 当日 tick 被清空时 rows_5m 为空，同样写穿，把残留的 preview 一并清掉。
+    if changed:
+        replace_realtime_5m_preview_rows(symbol, date_str, rows_5m)
+        replace_realtime_daily_preview_row(symbol, date_str, daily_row)
+    return result
 
-    result = {
-        "chart_data": chart_data,
-        "cumulative_data": cumulative_data,
-        "latest_ticks": latest_ticks
+def sync_realtime_stream_state(symbol: str, date_str: str) -> Dict:
+    """
+    推送流（services/realtime_stream.py）专用：增量同步聚合状态，
+    一次返回 dashboard 三件套、5m preview 行与 tick 计数，供按订阅键计算增量。
+    与 calculate_realtime_aggregation 一样把变化写穿到 preview 层。
+    """
+    large_threshold, super_threshold = _load_realtime_thresholds()
+    aggregator = get_tick_aggregator(symbol, date_str, large_threshold, super_threshold)
+
+    with aggregator.lock:
+        changed = aggregator.sync()
+        dashboard = aggregator.build_dashboard()
+        rows_5m, daily_row = aggregator.build_preview_rows()
+        tick_count = aggregator.tick_count
+        rebuild_count = aggregator.rebuild_count
+
+    if changed:
+        replace_realtime_5m_preview_rows(symbol, date_str, rows_5m)
+        replace_realtime_daily_preview_row(symbol, date_str, daily_row)
+    return {
+        "dashboard": dashboard,
+        "rows_5m": rows_5m,
+        "tick_count": tick_count,
+        "rebuild_count": rebuild_count,
     }
-    _set_cached_realtime(symbol, date_str, signature, result)
-    return result
 
 from backend.app.db.crud import get_app_config, get_ticks_for_aggregation, save_local_history, save_history_30m_batch
 from datetime import datetime
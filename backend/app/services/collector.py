@@ -1,11 +1,18 @@
 import os
+import asyncio
 import threading
 import time
 import sys
 import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
 import akshare as ak
-from backend.app.db.crud import get_all_symbols, save_ticks_daily_overwrite
-from backend.app.core.http_client import MarketClock
+from backend.app.db.crud import get_all_symbols, save_ticks_with_watermark
+from backend.app.core.http_client import HTTPClient, MarketClock
+from backend.app.core.rate_limiter import HostRateLimiter
+from backend.app.services.realtime_stream import notify_ticks_changed
+from backend.app.services.tencent_ticks import TickRow, extract_detail_rows, parse_detail_rows
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +21,39 @@ def is_cloud_collector_enabled() -> bool:
     return os.getenv("ENABLE_CLOUD_COLLECTOR", "false").lower() == "true"
 
 
+COLLECTOR_CONCURRENCY = int(os.getenv("COLLECTOR_CONCURRENCY", "8"))
+COLLECTOR_HOST_RPS = float(os.getenv("COLLECTOR_HOST_RPS", "8"))
+COLLECTOR_HOST_BURST = float(os.getenv("COLLECTOR_HOST_BURST", "8"))
+TENCENT_DETAIL_URL = "https://stock.gtimg.cn/data/index.php"
+MAX_TICK_PAGES = 200 # 避免无限循环
+
+
+@dataclass
+class SymbolPageState:
+    """
+    单只股票当日的翻页进度：complete_pages 是已确认写满的页（其后还有非空页），
+    下一轮从 len(complete_pages) 页继续拉取，不再重复请求这些页。
+    """
+    date: str
+    complete_pages: List[List[TickRow]] = field(default_factory=list)
+
+    @property
+    def resume_page(self) -> int:
+        return len(self.complete_pages)
+
+
 class DataCollector:
     def __init__(self):
         self.running = False
         self.thread = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.rate_limiter = HostRateLimiter(COLLECTOR_HOST_RPS, COLLECTOR_HOST_BURST)
+        self.page_states: Dict[str, SymbolPageState] = {}
+        self._cycle_lock: Optional[asyncio.Lock] = None
+        self._standalone_lock = threading.Lock()
+        self._cycle_durations: Deque[float] = deque(maxlen=50)
+        self._last_cycle: Dict[str, object] = {}
+        self._cycle_count = 0
 
     def start(self):
         if self.running: return
@@ -36,167 +72,210 @@ class DataCollector:
         return MarketClock.is_trading_time()
 
     def _loop(self):
-            
-        # 初次启动只在交易时段拉取，避免凌晨/周末误把上一交易日写成“今天”
-            
-        if self._is_trading_time():
-            logger.info("Executing initial fetch (trading hours)...")
-            try:
-                self._poll_watchlist()
-            except Exception as e:
-                import traceback
-                logger.error(f"Initial Fetch Error: {e}\n{traceback.format_exc()}")
-        else:
-            logger.info("Skipping initial fetch: not in trading hours.")
-
-        while self.running:
-            time.sleep(10) # 临时改为10秒用于快速测试
-            if not self.running: break
-            
-            if not self._is_trading_time():
-                continue
+        # 整个采集线程只跑一个常驻事件循环，HTTP 连接池与限速器在各轮之间复用
+        asyncio.run(self._run_forever())
 
-            try:
-                self._poll_watchlist()
-            except Exception as e:
-                import traceback
-                logger.error(f"Data Collector Error: {e}\n{traceback.format_exc()}")
-                
+    async def _run_forever(self):
+        self.loop = asyncio.get_running_loop()
+        self._cycle_lock = asyncio.Lock()
+        try:
+            # 初次启动只在交易时段拉取，避免凌晨/周末误把上一交易日写成“今天”
+            if self._is_trading_time():
+                logger.info("Executing initial fetch (trading hours)...")
+                try:
+                    await self._poll_watchlist_async()
+                except Exception as e:
+                    import traceback
+                    logger.error(f"Initial Fetch Error: {e}\n{traceback.format_exc()}")
+            else:
+                logger.info("Skipping initial fetch: not in trading hours.")
 
-    def _poll_watchlist(self):
+            while self.running:
+                await asyncio.sleep(10) # 临时改为10秒用于快速测试
+                if not self.running: break
+
+                if not self._is_trading_time():
+                    continue
+
+                try:
+                    await self._poll_watchlist_async()
+                except Exception as e:
+                    import traceback
+                    logger.error(f"Data Collector Error: {e}\n{traceback.format_exc()}")
+        finally:
+            self.loop = None
+            await HTTPClient.aclose()
+
+    def _poll_watchlist(self, full_refresh: bool = False):
+        """
+        同步入口（路由后台任务 / finalize 脚本使用）。
+        采集线程的事件循环在跑时把本轮提交过去执行，否则在当前线程临时起一个 loop。
+        """
+        loop = self.loop
+        if loop is not None and loop.is_running() and threading.current_thread() is not self.thread:
+            return asyncio.run_coroutine_threadsafe(self._poll_watchlist_async(full_refresh), loop).result()
+        with self._standalone_lock:
+            return asyncio.run(self._poll_watchlist_standalone(full_refresh))
+
+    async def _poll_watchlist_standalone(self, full_refresh: bool = False):
+        try:
+            return await self._run_cycle(full_refresh)
+        finally:
+            await HTTPClient.aclose()
+
+    async def _poll_watchlist_async(self, full_refresh: bool = False):
+        if self._cycle_lock is None:
+            return await self._run_cycle(full_refresh)
+        async with self._cycle_lock:
+            return await self._run_cycle(full_refresh)
+
+    async def _run_cycle(self, full_refresh: bool = False):
         if not is_cloud_collector_enabled():
             logger.info("Skip watchlist polling: cloud collector is disabled.")
-            return
+            return None
 
         is_trading = self._is_trading_time()
         logger.info(f"DEBUG _poll_watchlist: is_trading={is_trading}, now={MarketClock._now_china()}")
         if not is_trading:
             logger.info("Skip watchlist polling outside trading hours.")
-            return
+            return None
 
-        symbols = get_all_symbols()
+        symbols = await asyncio.to_thread(get_all_symbols)
         today_str = MarketClock.get_display_date()
-        
-        for symbol in symbols:
-            logger.info(f"Auto-fetching ticks for {symbol}...")
-                
+        started = time.perf_counter()
+        cycle = {
+            "started_at": MarketClock._now_china().strftime("%Y-%m-%d %H:%M:%S"),
+            "symbols": len(symbols),
+            "succeeded": 0,
+            "failed": 0,
+            "empty": 0,
+            "pages_fetched": 0,
+            "pages_resumed": 0,
+            "rows": 0,
+        }
+        semaphore = asyncio.Semaphore(max(1, COLLECTOR_CONCURRENCY))
+
+        async def _collect(symbol: str):
+            async with semaphore:
+                logger.info(f"Auto-fetching ticks for {symbol}...")
+                try:
+                    ticks = await self._fetch_tencent_tick_data_robust(
+                        symbol, today_str=today_str, full_refresh=full_refresh, stats=cycle
+                    )
+                except Exception as e:
+                    cycle["failed"] += 1
+                    logger.warning(f"Failed to fetch {symbol}: {e}")
+                    return
+            if not ticks:
+                cycle["empty"] += 1
+                logger.warning(f"Empty data for {symbol}")
+                return
             try:
-                import pandas as pd
-                import asyncio
-                df = asyncio.run(self._fetch_tencent_tick_data_robust(symbol))
-                
-                    
-                if df is not None and not df.empty:
-                    self._save_ticks(symbol, df, today_str)
-                else:
-                    logger.warning(f"Empty data for {symbol}")
+                await asyncio.to_thread(self._save_ticks, symbol, ticks, today_str)
+                cycle["succeeded"] += 1
+                cycle["rows"] += len(ticks)
             except Exception as e:
-                logger.warning(f"Failed to fetch {symbol}: {e}")
-
-    async def _fetch_tencent_tick_data_robust(self, symbol: str) -> 'pd.DataFrame':
-        """手写腾讯逐笔明细接口以替代容易死锁的 akshare 版本"""
-        import pandas as pd
-        from backend.app.core.http_client import HTTPClient
-        import asyncio
-        
-        big_df = pd.DataFrame()
-        page = 0
-        max_pages = 200 # 避免无限循环
-        
-        url = "https://stock.gtimg.cn/data/index.php"
-        while page < max_pages:
+                cycle["failed"] += 1
+                logger.warning(f"Failed to save {symbol}: {e}")
+
+        await asyncio.gather(*(_collect(symbol) for symbol in symbols))
+
+        duration = time.perf_counter() - started
+        cycle["duration_ms"] = round(duration * 1000, 1)
+        self._cycle_durations.append(duration)
+        self._cycle_count += 1
+        self._last_cycle = cycle
+        logger.info(
+            "Collector cycle done: symbols=%s ok=%s failed=%s pages=%s resumed=%s in %.2fs",
+            cycle["symbols"], cycle["succeeded"], cycle["failed"],
+            cycle["pages_fetched"], cycle["pages_resumed"], duration,
+        )
+        return cycle
+
+    def get_metrics(self) -> Dict[str, object]:
+        durations = sorted(self._cycle_durations)
+
+        def _ms(value: float) -> float:
+            return round(value * 1000, 1)
+
+        return {
+            "running": self.running,
+            "cycles": self._cycle_count,
+            "concurrency": COLLECTOR_CONCURRENCY,
+            "host_rps": COLLECTOR_HOST_RPS,
+            "last_cycle": dict(self._last_cycle),
+            "recent_cycle_ms": {
+                "count": len(durations),
+                "p50": _ms(durations[len(durations) // 2]) if durations else None,
+                "p90": _ms(durations[min(len(durations) - 1, int(len(durations) * 0.9))]) if durations else None,
+                "max": _ms(durations[-1]) if durations else None,
+            },
+            "tracked_symbols": len(self.page_states),
+        }
+
+    def _page_state(self, symbol: str, today_str: str, full_refresh: bool) -> SymbolPageState:
+        state = self.page_states.get(symbol)
+        if full_refresh or state is None or state.date != today_str:
+            state = SymbolPageState(date=today_str)
+            self.page_states[symbol] = state
+        return state
+
+    async def _fetch_tencent_page(self, symbol: str, page: int) -> Optional[List[str]]:
+        """拉取单页逐笔，返回 "序号/时间/价格/..." 原始行；None 表示无数据或翻页结束。"""
+        params = {
+            "appn": "detail",
+            "action": "data",
+            "c": symbol,
+            "p": page,
+        }
+        await self.rate_limiter.acquire(TENCENT_DETAIL_URL) # 按上游 host 限速防封
+        # HTTPClient.get 内部有 10s timeout，防止挂死
+        response = await HTTPClient.get(TENCENT_DETAIL_URL, params=params, timeout=10.0)
+        if not response:
+            return None
+        rows = extract_detail_rows(response.text)
+        if not rows or rows[0] == '':
+            return None
+        return rows
+
+    async def _fetch_tencent_tick_data_robust(
+        self,
+        symbol: str,
+        today_str: Optional[str] = None,
+        full_refresh: bool = False,
+        stats: Optional[Dict[str, object]] = None,
+    ) -> List[TickRow]:
+        """手写腾讯逐笔明细接口以替代容易死锁的 akshare 版本，逐页解析为 trade_ticks 插入元组"""
+        date_str = today_str or MarketClock.get_display_date()
+        state = self._page_state(symbol, date_str, full_refresh)
+        page = state.resume_page
+        fetched_pages: List[List[TickRow]] = []
+        while page < MAX_TICK_PAGES:
             try:
-                params = {
-                    "appn": "detail",
-                    "action": "data",
-                    "c": symbol,
-                    "p": page,
-                }
-                # HTTPClient.get 内部有 10s timeout，防止挂死
-                response = await HTTPClient.get(url, params=params, timeout=10.0)
-                if not response or not response.text:
-                    break
-                    
-                text_data = response.text
-                start_idx = text_data.find("[")
-                if start_idx == -1:
-                    break
-                    
-                data_str = text_data[start_idx:]
-                # 提取类似 ["v1/v2/v3", "v1/v2/v3"] 的数据
-                parsed_data = eval(data_str)
-                if len(parsed_data) < 2:
-                    break
-                    
-                rows = parsed_data[1].split("|")
-                if not rows or rows[0] == '':
-                    break
-                    
-                temp_df = pd.DataFrame(rows).iloc[:, 0].str.split("/", expand=True)
-                page += 1
-                big_df = pd.concat([big_df, temp_df], ignore_index=True)
-                
-                await asyncio.sleep(0.5) # 限速防封
-                
+                rows = await self._fetch_tencent_page(symbol, page)
             except Exception as e:
                 logger.warning(f"Error fetching page {page} for {symbol}: {e}")
                 break
-                
-        if not big_df.empty:
-            big_df = big_df.iloc[:, 1:].copy()
-            # 兼容 akshare 的列名要求
-            try:
-                big_df.columns = ["成交时间", "成交价格", "价格变动", "成交量", "成交额", "性质"]
-                return big_df
-            except Exception as e:
-                logger.error(f"Failed to rename columns for {symbol}: {e}")
-                
-        return pd.DataFrame()
-
-    def _save_ticks(self, symbol, df, date_str):
-        data_to_insert = []
-        cols = df.columns.tolist()
-        
-        # 智能匹配列名
-        vol_col = next((c for c in cols if '成交量' in c), None)
-        amt_col = next((c for c in cols if '成交额' in c or '成交金额' in c), None)
-        
-        if not vol_col or not amt_col:
-            logger.error(f"Missing columns for {symbol}. Available: {cols}")
-            return
+            if rows is None:
+                break
+            fetched_pages.append(parse_detail_rows(symbol, rows, date_str))
+            page += 1
 
-        for _, row in df.iterrows():
-            try:
-                t_time = row['成交时间']
-                # FILTER: Drop any ticks after 15:00:05
-                if t_time > "15:00:05":
-                    continue
-                    
-                raw_type = str(row['性质']).upper()
-                t_type = 'neutral'
-                if raw_type in ['B', '买盘', 'BUY', 'UP']:
-                    t_type = 'buy'
-                elif raw_type in ['S', '卖盘', 'SELL', 'DOWN']:
-                    t_type = 'sell'
-                else:
-                    t_type = raw_type
-
-                data_to_insert.append((
-                    symbol,
-                    t_time,
-                    float(row['成交价格']),
-                    int(row[vol_col]),
-                    float(row[amt_col]),
-                    t_type, # 买盘/卖盘/中性盘
-                    date_str
-                ))
-            except Exception as row_err:
-                logger.error(f"Row extraction error for {symbol}: {row_err} - Row data: {row}")
-                continue
+        if stats is not None:
+            stats["pages_fetched"] = int(stats.get("pages_fetched", 0)) + len(fetched_pages)
+            stats["pages_resumed"] = int(stats.get("pages_resumed", 0)) + state.resume_page
+
+        # 只有后面还跟着非空页的页才算写满；最后一页下一轮还会增长，需要重拉
+        all_pages = state.complete_pages + fetched_pages
+        state.complete_pages.extend(fetched_pages[:-1])
+        return [tick for ticks in all_pages for tick in ticks]
 
+    def _save_ticks(self, symbol, data_to_insert: List[TickRow], date_str):
         if data_to_insert:
-            save_ticks_daily_overwrite(symbol, date_str, data_to_insert)
-            logger.info(f"Saved {len(data_to_insert)} ticks for {symbol}")
+            # 当日快照前缀与已落库水位线一致时只追加新增 tick，否则回退全量覆盖
+            status, watermark = save_ticks_with_watermark(symbol, date_str, data_to_insert)
+            notify_ticks_changed(symbol, date_str)
+            logger.info(f"Saved {len(data_to_insert)} ticks for {symbol} ({status}, rows={watermark['row_count']})")
 
 # Remove the global instance
 collector = DataCollector()
@@ -0,0 +1,404 @@
+"""
+盘中逐笔 -> 分钟资金流的增量聚合引擎。
+
+每个 (symbol, date) 维护一份常驻状态：已封口的分钟桶、累计主力/超大单金额、
+最近 50 笔 tick。每次轮询只读取水位线之后新落库的 tick 并增量折叠，
+避免 /realtime/dashboard 在尾盘每次都全量重读、重算当日所有逐笔。
+
+水位线语义：
+- `time < watermark` 的 tick 已永久折叠进状态（sealed）；
+- `time == watermark` 的 tick 同一秒内可能还会继续到达，因此每次轮询都重新读取，
+  只作为临时 overlay 参与渲染，不写入状态。
+
+trade_ticks 可能按 symbol+date 全量覆盖写入（上游修订/重抓），所以每次同步先校验已折叠前缀
+是否仍在：按 rowid 点查折叠进状态的首、末两笔 tick（时间与金额须一致），再用一条
+`time < watermark` 的 COUNT/SUM(amount) 区间聚合核对整段前缀的笔数与成交额，
+中间某笔被改写、补入或删除也能发现。聚合走 (symbol, date, time) 索引区间、只回传一行；
+任一不符就整体重建，当日 tick 全部消失时状态随之清空。
+"""
+import math
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.app.core.trade_side import BUY_MARKERS, SELL_MARKERS, normalize_trade_side
+from backend.app.db.crud import get_tick_anchor_rows, get_tick_prefix_stats, get_ticks_since
+from backend.app.db.realtime_preview_db import Realtime5mPreviewRow, RealtimeDailyPreviewRow
+
+TICK_CUTOFF_TIME = "15:05:00"
+LATEST_TICKS_LIMIT = 50
+_MAX_TRACKED_STATES = 256
+_BUY_MARKERS = sorted(BUY_MARKERS)
+_SELL_MARKERS = sorted(SELL_MARKERS)
+
+# time, price, volume, amount, type, rowid
+TickRow = Tuple[str, float, int, float, str, int]
+
+
+def five_minute_key(time_str: str) -> str:
+    """'HH:MM[:SS]' -> 所属 5m 桶起点 'HH:MM'。"""
+    return _five_minute_key(str(time_str)[:5])
+
+
+@lru_cache(maxsize=2048)
+def _five_minute_key(minute: str) -> str:
+    hour, minute_part = minute.split(":")
+    return f"{hour}:{int(minute_part) // 5 * 5:02d}"
+
+
+def aggregate_tick_buckets(
+    rows: Sequence[TickRow],
+    bucket_keys: Sequence[str],
+    large_threshold: float,
+    super_threshold: float,
+) -> List[Tuple[str, Dict[str, float]]]:
+    """
+    向量化聚合内核：按桶一次性求 OHLC、成交额/量与主力/超大单买卖额。
+    rows 必须已按时间升序排列，bucket_keys 与 rows 一一对应且随时间单调，
+    因此同一桶的 tick 在数组中是连续的，可以直接用 reduceat / bincount 分段归约。
+    """
+    if not rows:
+        return []
+
+    columns = list(zip(*rows))
+    price = np.asarray(columns[1], dtype=float)
+    volume = np.asarray(columns[2], dtype=float)
+    amount = np.asarray(columns[3], dtype=float)
+    sides = np.char.strip(np.asarray(columns[4], dtype=str))
+    keys = np.asarray(bucket_keys, dtype=str)
+
+    is_start = np.empty(len(keys), dtype=bool)
+    is_start[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=is_start[1:])
+    starts = np.flatnonzero(is_start)
+    ends = np.append(starts[1:], len(keys)) - 1
+    bucket_ids = np.cumsum(is_start) - 1
+    n_buckets = len(starts)
+
+    is_buy = np.isin(sides, _BUY_MARKERS)
+    is_sell = np.isin(sides, _SELL_MARKERS)
+    is_main = amount >= float(large_threshold)
+    is_super = amount >= float(super_threshold)
+
+    def _bucket_sum(mask):
+        weights = amount if mask is None else np.where(mask, amount, 0.0)
+        return np.bincount(bucket_ids, weights=weights, minlength=n_buckets)
+
+    sums = {
+        "total_amount": _bucket_sum(None),
+        "total_volume": np.bincount(bucket_ids, weights=volume, minlength=n_buckets),
+        "main_buy": _bucket_sum(is_main & is_buy),
+        "main_sell": _bucket_sum(is_main & is_sell),
+        "super_buy": _bucket_sum(is_super & is_buy),
+        "super_sell": _bucket_sum(is_super & is_sell),
+    }
+    opens = price[starts]
+    closes = price[ends]
+    highs = np.maximum.reduceat(price, starts)
+    lows = np.minimum.reduceat(price, starts)
+
+    out: List[Tuple[str, Dict[str, float]]] = []
+    for idx in range(n_buckets):
+        bucket = {
+            "open": float(opens[idx]),
+            "high": float(highs[idx]),
+            "low": float(lows[idx]),
+            "close": float(closes[idx]),
+        }
+        for field, values in sums.items():
+            bucket[field] = float(values[idx])
+        out.append((str(keys[starts[idx]]), bucket))
+    return out
+
+
+def build_preview_rows_from_buckets(
+    symbol: str,
+    date_str: str,
+    buckets_5m: Sequence[Tuple[str, Dict[str, float]]],
+    daily: Optional[Dict[str, float]],
+) -> Tuple[List[Realtime5mPreviewRow], Optional[RealtimeDailyPreviewRow]]:
+    if not buckets_5m or daily is None:
+        return [], None
+
+    updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows_5m: List[Realtime5mPreviewRow] = [
+        (
+            symbol,
+            f"{date_str} {key}:00",
+            date_str,
+            float(b["open"]),
+            float(b["high"]),
+            float(b["low"]),
+            float(b["close"]),
+            float(b["total_amount"]),
+            float(b["total_volume"]),
+            float(b["main_buy"]),
+            float(b["main_sell"]),
+            float(b["super_buy"]),
+            float(b["super_sell"]),
+            "realtime_ticks",
+            "l1_only",
+            updated_at,
+        )
+        for key, b in buckets_5m
+    ]
+    daily_row: RealtimeDailyPreviewRow = (
+        symbol,
+        date_str,
+        float(daily["open"]),
+        float(daily["high"]),
+        float(daily["low"]),
+        float(daily["close"]),
+        float(daily["total_amount"]),
+        float(daily["main_buy"]),
+        float(daily["main_sell"]),
+        float(daily["main_buy"] - daily["main_sell"]),
+        float(daily["super_buy"]),
+        float(daily["super_sell"]),
+        float(daily["super_buy"] - daily["super_sell"]),
+        "realtime_ticks",
+        "l1_only",
+        updated_at,
+    )
+    return rows_5m, daily_row
+
+
+def _merge_bucket(target: Dict[str, float], bucket: Dict[str, float]) -> None:
+    target["high"] = max(target["high"], bucket["high"])
+    target["low"] = min(target["low"], bucket["low"])
+    target["close"] = bucket["close"]
+    for field in ("total_amount", "total_volume", "main_buy", "main_sell", "super_buy", "super_sell"):
+        target[field] += bucket[field]
+
+
+def merge_buckets(buckets: Sequence[Tuple[str, Dict[str, float]]]) -> Optional[Dict[str, float]]:
+    """把按时间排好的一串桶合并成一个（例如 5m 桶 -> 日线 preview）。"""
+    merged: Optional[Dict[str, float]] = None
+    for _, bucket in buckets:
+        if merged is None:
+            merged = dict(bucket)
+        else:
+            _merge_bucket(merged, bucket)
+    return merged
+
+
+def _anchor_of(row: TickRow) -> Tuple[int, str, float]:
+    return int(row[5]), str(row[0]), float(row[3])
+
+
+class IncrementalTickAggregator:
+    """单个 (symbol, date) 的增量分钟聚合状态。"""
+
+    def __init__(self, symbol: str, date_str: str, large_threshold: float, super_threshold: float):
+        self.symbol = symbol
+        self.date_str = date_str
+        self.large_threshold = float(large_threshold)
+        self.super_threshold = float(super_threshold)
+        self.lock = threading.Lock()
+        self.rebuild_count = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.watermark = ""
+        self.sealed_count = 0
+        self.sealed_amount = 0.0
+        # 已折叠前缀的首、末两笔 (rowid, time, amount)，用于点查校验前缀是否被改写
+        self.first_anchor: Optional[Tuple[int, str, float]] = None
+        self.last_anchor: Optional[Tuple[int, str, float]] = None
+        self.minutes: Dict[str, Dict[str, float]] = {}
+        self.sealed_tail: Deque[TickRow] = deque(maxlen=LATEST_TICKS_LIMIT)
+        self.overlay: List[TickRow] = []
+
+    def _merge_into(self, target: Dict[str, Dict[str, float]], rows: Sequence[TickRow]) -> None:
+        partials = aggregate_tick_buckets(
+            rows,
+            [str(row[0])[:5] for row in rows],
+            self.large_threshold,
+            self.super_threshold,
+        )
+        for minute, partial in partials:
+            bucket = target.get(minute)
+            if bucket is None:
+                target[minute] = partial
+            else:
+                merged = dict(bucket)
+                _merge_bucket(merged, partial)
+                target[minute] = merged
+
+    def _fold_rows(self, rows: Sequence[TickRow]) -> None:
+        if not rows:
+            return
+        self._merge_into(self.minutes, rows)
+        self.sealed_count += len(rows)
+        self.sealed_amount += sum(float(row[3]) for row in rows)
+        self.sealed_tail.extend(rows)
+        if self.first_anchor is None:
+            self.first_anchor = _anchor_of(rows[0])
+        self.last_anchor = _anchor_of(rows[-1])
+
+    def _prefix_matches(self) -> bool:
+        if not self.watermark or self.first_anchor is None or self.last_anchor is None:
+            return True
+        stored = get_tick_anchor_rows(
+            self.symbol,
+            self.date_str,
+            [self.first_anchor[0], self.last_anchor[0]],
+        )
+        for rowid, time_text, amount in (self.first_anchor, self.last_anchor):
+            current = stored.get(rowid)
+            if current is None or current[0] != time_text:
+                return False
+            if not math.isclose(current[1], amount, rel_tol=1e-9, abs_tol=1e-6):
+                return False
+        # 首末锚点之间的改写由整段前缀的笔数与成交额合计兜底
+        count, amount_sum = get_tick_prefix_stats(self.symbol, self.date_str, self.watermark)
+        if count != self.sealed_count:
+            return False
+        return math.isclose(amount_sum, self.sealed_amount, rel_tol=1e-9, abs_tol=1e-6)
+
+    def sync(self) -> bool:
+        """
+        拉取水位线之后的新 tick 并折叠。返回本次是否有数据变化。
+        调用方需持有 self.lock。
+        """
+        rebuilt = False
+        if not self._prefix_matches():
+            self._reset()
+            self.rebuild_count += 1
+            rebuilt = True
+
+        rows = get_ticks_since(self.symbol, self.date_str, self.watermark, TICK_CUTOFF_TIME)
+        previous_overlay = self.overlay
+        if not rows:
+            self.overlay = []
+            if not self.sealed_count and self.watermark:
+                # 只剩 overlay 的那一秒也消失了：没有可校验的前缀，回到空状态从头读
+                self._reset()
+            return rebuilt or bool(previous_overlay)
+
+        new_watermark = str(rows[-1][0])
+        split = len(rows)
+        while split > 0 and str(rows[split - 1][0]) == new_watermark:
+            split -= 1
+        self._fold_rows(rows[:split])
+        self.watermark = new_watermark
+        self.overlay = list(rows[split:])
+        return rebuilt or split > 0 or self.overlay != previous_overlay
+
+    @property
+    def tick_count(self) -> int:
+        """当前状态覆盖的 tick 总数（sealed + overlay），推送流据此切出新增的最新成交。"""
+        return self.sealed_count + len(self.overlay)
+
+    def _snapshot_minutes(self) -> List[Tuple[str, Dict[str, float]]]:
+        if not self.overlay:
+            return sorted(self.minutes.items())
+        merged = dict(self.minutes)
+        self._merge_into(merged, self.overlay)
+        return sorted(merged.items())
+
+    def build_dashboard(self) -> Dict:
+        chart_data = []
+        cumulative_data = []
+        running_main_buy = 0.0
+        running_main_sell = 0.0
+        running_super_buy = 0.0
+        running_super_sell = 0.0
+
+        for minute, bucket in self._snapshot_minutes():
+            total_amount = bucket["total_amount"] or 1.0
+            main_buy_amt = bucket["main_buy"]
+            main_sell_amt = bucket["main_sell"]
+            super_buy_amt = bucket["super_buy"]
+            super_sell_amt = bucket["super_sell"]
+
+            chart_data.append({
+                "time": minute,
+                "mainBuyRatio": round((main_buy_amt / total_amount) * 100, 1),
+                "mainSellRatio": round((main_sell_amt / total_amount) * 100, 1),
+                "mainParticipationRatio": round(((main_buy_amt + main_sell_amt) / total_amount) * 100, 1),
+                "mainBuyAmount": float(main_buy_amt),
+                "mainSellAmount": float(main_sell_amt),
+                "superBuyAmount": float(super_buy_amt),
+                "superSellAmount": float(super_sell_amt),
+                "superParticipationRatio": round(((super_buy_amt + super_sell_amt) / total_amount) * 100, 1),
+                "closePrice": float(bucket["close"]),
+            })
+
+            running_main_buy += main_buy_amt
+            running_main_sell += main_sell_amt
+            running_super_buy += super_buy_amt
+            running_super_sell += super_sell_amt
+            cumulative_data.append({
+                "time": minute,
+                "cumMainBuy": running_main_buy,
+                "cumMainSell": running_main_sell,
+                "cumNetInflow": running_main_buy - running_main_sell,
+                "cumSuperBuy": running_super_buy,
+                "cumSuperSell": running_super_sell,
+                "cumSuperNetInflow": running_super_buy - running_super_sell,
+            })
+
+        latest_rows = (list(self.sealed_tail) + self.overlay)[-LATEST_TICKS_LIMIT:]
+        latest_ticks = [
+            {
+                "time": row[0],
+                "price": row[1],
+                "volume": int(row[2]),
+                "amount": row[3],
+                "type": normalize_trade_side(row[4]),
+            }
+            for row in reversed(latest_rows)
+        ]
+
+        return {
+            "chart_data": chart_data,
+            "cumulative_data": cumulative_data,
+            "latest_ticks": latest_ticks,
+        }
+
+    def build_preview_rows(self) -> Tuple[List[Realtime5mPreviewRow], Optional[RealtimeDailyPreviewRow]]:
+        buckets_5m: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        for minute, bucket in self._snapshot_minutes():
+            key = five_minute_key(minute)
+            if key in buckets_5m:
+                _merge_bucket(buckets_5m[key], bucket)
+            else:
+                buckets_5m[key] = dict(bucket)
+        rows_5m = list(buckets_5m.items())
+        return build_preview_rows_from_buckets(self.symbol, self.date_str, rows_5m, merge_buckets(rows_5m))
+
+
+_AGGREGATORS: "OrderedDict[Tuple[str, str], IncrementalTickAggregator]" = OrderedDict()
+_AGGREGATORS_LOCK = threading.Lock()
+
+
+def get_tick_aggregator(
+    symbol: str,
+    date_str: str,
+    large_threshold: float,
+    super_threshold: float,
+) -> IncrementalTickAggregator:
+    key = (str(symbol), str(date_str))
+    with _AGGREGATORS_LOCK:
+        aggregator = _AGGREGATORS.get(key)
+        if (
+            aggregator is None
+            or aggregator.large_threshold != float(large_threshold)
+            or aggregator.super_threshold != float(super_threshold)
+        ):
+            aggregator = IncrementalTickAggregator(symbol, date_str, large_threshold, super_threshold)
+            _AGGREGATORS[key] = aggregator
+        _AGGREGATORS.move_to_end(key)
+        while len(_AGGREGATORS) > _MAX_TRACKED_STATES:
+            _AGGREGATORS.popitem(last=False)
+        return aggregator
+
+
+def reset_tick_aggregators() -> None:
+    with _AGGREGATORS_LOCK:
+        _AGGREGATORS.clear()
@@ -0,0 +1,344 @@
+"""
+盘中分时的服务端推送（SSE）：订阅 (symbol, date)，先收一份快照，之后只收增量。
+
+轮询模式下每个打开的标签页每 5s/30s 都会把 /realtime/dashboard 与
+/realtime/intraday_fusion 的整条回退链重跑一遍，服务端开销 = 观看人数 × 轮询频率。
+推送模式把计算挂到写入侧：
+
+- ingest `/ticks`、DataCollector 落库与按需补抓写完 trade_ticks 后调用
+  `notify_ticks_changed(symbol, date)`；没有订阅者时直接返回，不做任何计算；
+- 同一订阅键的多次通知合并成一次 pump：只在事件循环上跑一个同步任务，
+  增量聚合（realtime_aggregator）只读水位线之后的新 tick；
+- 与上次推送的基线比对，得出变化的分钟桶 / 累计行 / 5m bar 与新增成交，
+  编码一次，原样广播给该键的所有订阅者。
+
+因此服务端工作量只随写入事件增长，与观看人数无关。
+
+事件类型：
+- `snapshot`：连接建立时的首帧（由路由层补充市场状态等元信息）；
+- `delta`：增量，按 time / datetime upsert，`latest_ticks` 为新增成交（新在前）；
+- `reset`：聚合状态重建（上游覆盖修订）或订阅者积压溢出时的整帧替换。
+"""
+import asyncio
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from backend.app.services.realtime_aggregator import LATEST_TICKS_LIMIT
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 256
+HEARTBEAT_SECONDS = 15.0
+
+_PREVIEW_COLUMNS = (
+    "symbol",
+    "datetime",
+    "trade_date",
+    "open",
+    "high",
+    "low",
+    "close",
+    "total_amount",
+    "total_volume",
+    "l1_main_buy",
+    "l1_main_sell",
+    "l1_super_buy",
+    "l1_super_sell",
+    "source",
+    "preview_level",
+    "updated_at",
+)
+
+
+def _safe_float(value):
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def map_preview_fusion_bar(row: dict, source_override: str = None, preview_level_override: str = None) -> dict:
+    """realtime_5m_preview 行 -> intraday_fusion 的 bar 结构（轮询接口与推送流共用）。"""
+    l1_main_buy = _safe_float(row.get("l1_main_buy")) or 0.0
+    l1_main_sell = _safe_float(row.get("l1_main_sell")) or 0.0
+    return {
+        "datetime": str(row["datetime"]),
+        "trade_date": str(row["trade_date"]),
+        "open": _safe_float(row.get("open")),
+        "high": _safe_float(row.get("high")),
+        "low": _safe_float(row.get("low")),
+        "close": _safe_float(row.get("close")),
+        "total_amount": _safe_float(row.get("total_amount")),
+        "total_volume": _safe_float(row.get("total_volume")),
+        "l1_main_buy": l1_main_buy,
+        "l1_main_sell": l1_main_sell,
+        "l1_super_buy": _safe_float(row.get("l1_super_buy")) or 0.0,
+        "l1_super_sell": _safe_float(row.get("l1_super_sell")) or 0.0,
+        "l1_net_inflow": l1_main_buy - l1_main_sell,
+        "l2_main_buy": None,
+        "l2_main_sell": None,
+        "l2_super_buy": None,
+        "l2_super_sell": None,
+        "l2_net_inflow": None,
+        "add_buy_amount": None,
+        "add_sell_amount": None,
+        "cancel_buy_amount": None,
+        "cancel_sell_amount": None,
+        "l2_cvd_delta": None,
+        "l2_oib_delta": None,
+        "source": str(source_override or row.get("source") or "realtime_ticks"),
+        "is_finalized": False,
+        "preview_level": str(preview_level_override or row.get("preview_level") or "l1_only"),
+        "fallback_used": False,
+    }
+
+
+def sse_event_id(message: str) -> Optional[int]:
+    """取 format_sse 编码帧的 id 行（即 seq）；心跳等无 id 的帧返回 None。"""
+    for line in message.split("\n"):
+        if line.startswith("id: "):
+            try:
+                return int(line[4:])
+            except ValueError:
+                return None
+        if line.startswith("data: "):
+            break
+    return None
+
+
+def format_sse(event: str, payload: Dict, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+class StreamSubscription:
+    def __init__(self, channel: "StreamChannel"):
+        self.channel = channel
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def offer(self, message: str) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def replace_backlog(self, reset_message: str) -> None:
+        # 慢连接积压：丢掉未发送的增量，改发一帧当前整帧，客户端整体替换即可对齐
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(reset_message)
+
+
+class StreamChannel:
+    """单个 (symbol, date) 的推送基线与订阅者集合。基线只在事件循环上经 self.lock 串行推进。"""
+
+    def __init__(self, symbol: str, date_str: str, loop: asyncio.AbstractEventLoop):
+        self.symbol = symbol
+        self.date_str = date_str
+        self.loop = loop
+        self.lock = asyncio.Lock()
+        self.subscribers: List[StreamSubscription] = []
+        self.dirty = False
+        self.pumping = False
+        self.seq = 0
+        self.ready = False
+        self.tick_count = 0
+        self.rebuild_count = 0
+        self.chart_rows: Dict[str, Dict] = {}
+        self.cumulative_rows: List[Dict] = []
+        self.latest_ticks: List[Dict] = []
+        self.bars: Dict[str, Dict] = {}
+
+    def state_payload(self) -> Dict:
+        return {
+            "symbol": self.symbol,
+            "trade_date": self.date_str,
+            "seq": self.seq,
+            "chart_data": [self.chart_rows[key] for key in sorted(self.chart_rows)],
+            "cumulative_data": list(self.cumulative_rows),
+            "latest_ticks": list(self.latest_ticks),
+            "bars": [self.bars[key] for key in sorted(self.bars)],
+        }
+
+    def advance(self) -> Optional[Tuple[str, Dict]]:
+        """同步聚合状态并与基线比对，返回 (事件类型, 载荷)；无变化时返回 None。在线程池中执行。"""
+        from backend.app.services.analysis import sync_realtime_stream_state
+
+        state = sync_realtime_stream_state(self.symbol, self.date_str)
+        dashboard = state["dashboard"]
+        chart_data = dashboard["chart_data"]
+        bars = {}
+        for row in state["rows_5m"]:
+            bar = map_preview_fusion_bar(dict(zip(_PREVIEW_COLUMNS, row)))
+            bars[bar["datetime"]] = bar
+        tick_count = int(state["tick_count"])
+        rebuild_count = int(state["rebuild_count"])
+
+        new_minutes = {row["time"] for row in chart_data}
+        needs_reset = (
+            not self.ready
+            or not self.chart_rows
+            or rebuild_count != self.rebuild_count
+            or tick_count < self.tick_count
+            or not new_minutes.issuperset(self.chart_rows)
+            or not set(bars).issuperset(self.bars)
+        )
+
+        changed_index = None
+        changed_rows = []
+        for index, row in enumerate(chart_data):
+            if self.chart_rows.get(row["time"]) != row:
+                changed_rows.append(row)
+                if changed_index is None:
+                    changed_index = index
+        changed_bars = [bar for key, bar in sorted(bars.items()) if self.bars.get(key) != bar]
+        new_tick_count = min(LATEST_TICKS_LIMIT, max(0, tick_count - self.tick_count))
+
+        was_empty = self.ready and not self.chart_rows and not self.bars and not self.latest_ticks
+        self.ready = True
+        self.tick_count = tick_count
+        self.rebuild_count = rebuild_count
+        self.chart_rows = {row["time"]: row for row in chart_data}
+        self.cumulative_rows = list(dashboard["cumulative_data"])
+        self.latest_ticks = list(dashboard["latest_ticks"])
+        self.bars = bars
+
+        if needs_reset:
+            if was_empty and not chart_data and not bars and not self.latest_ticks:
+                return None
+            self.seq += 1
+            return "reset", self.state_payload()
+        if not changed_rows and not changed_bars and not new_tick_count:
+            return None
+        self.seq += 1
+        return "delta", {
+            "symbol": self.symbol,
+            "trade_date": self.date_str,
+            "seq": self.seq,
+            "chart_data": changed_rows,
+            "cumulative_data": self.cumulative_rows[changed_index:] if changed_index is not None else [],
+            "latest_ticks": self.latest_ticks[:new_tick_count],
+            "bars": changed_bars,
+        }
+
+
+class RealtimeStreamHub:
+    """订阅键 -> StreamChannel。notify 可在任意线程调用，计算总是回到订阅者所在的事件循环上调度。"""
+
+    def __init__(self):
+        self._channels: Dict[Tuple[str, str], StreamChannel] = {}
+        self._lock = threading.Lock()
+        self.stats = {"notifications": 0, "pumps": 0, "events": 0, "coalesced": 0}
+
+    def subscriber_count(self, symbol: str, date_str: str) -> int:
+        with self._lock:
+            channel = self._channels.get((str(symbol), str(date_str)))
+            return len(channel.subscribers) if channel else 0
+
+    async def subscribe(self, symbol: str, date_str: str) -> Tuple[StreamSubscription, Dict]:
+        """
+        取当前整帧并注册订阅，两步都在 channel.lock 内完成：pump 推进基线也持有该锁，
+        因此新订阅者只会收到 seq 大于首帧的增量，首帧与后续增量之间既无缝隙也不重叠。
+        """
+        key = (str(symbol), str(date_str))
+        while True:
+            with self._lock:
+                channel = self._channels.get(key)
+                if channel is None:
+                    channel = StreamChannel(key[0], key[1], asyncio.get_running_loop())
+                    self._channels[key] = channel
+            async with channel.lock:
+                try:
+                    if not channel.ready:
+                        await asyncio.to_thread(channel.advance)
+                except Exception:
+                    with self._lock:
+                        if not channel.subscribers and self._channels.get(key) is channel:
+                            del self._channels[key]
+                    raise
+                with self._lock:
+                    # 等锁期间最后一个订阅者退出、频道已被摘掉时，换新频道重来
+                    if self._channels.get(key) is not channel:
+                        continue
+                    subscription = StreamSubscription(channel)
+                    channel.subscribers.append(subscription)
+                return subscription, channel.state_payload()
+
+    def unsubscribe(self, subscription: StreamSubscription) -> None:
+        channel = subscription.channel
+        with self._lock:
+            if subscription in channel.subscribers:
+                channel.subscribers.remove(subscription)
+            if not channel.subscribers and self._channels.get((channel.symbol, channel.date_str)) is channel:
+                del self._channels[(channel.symbol, channel.date_str)]
+
+    def notify(self, symbol: str, date_str: str) -> bool:
+        """trade_ticks 写入后调用。返回是否有订阅者（即是否会触发推送计算）。"""
+        with self._lock:
+            channel = self._channels.get((str(symbol), str(date_str)))
+            if channel is None or not channel.subscribers:
+                return False
+            self.stats["notifications"] += 1
+            channel.dirty = True
+            if channel.pumping:
+                self.stats["coalesced"] += 1
+                return True
+            channel.pumping = True
+        try:
+            channel.loop.call_soon_threadsafe(channel.loop.create_task, self._pump(channel))
+        except RuntimeError:
+            with self._lock:
+                channel.pumping = False
+            return False
+        return True
+
+    async def _pump(self, channel: StreamChannel) -> None:
+        try:
+            while True:
+                with self._lock:
+                    if not channel.dirty or not channel.subscribers:
+                        channel.pumping = False
+                        channel.dirty = False
+                        return
+                    channel.dirty = False
+                async with channel.lock:
+                    self.stats["pumps"] += 1
+                    result = await asyncio.to_thread(channel.advance)
+                    if result is None:
+                        continue
+                    event, payload = result
+                    message = format_sse(event, payload, payload["seq"])
+                    reset_message = message if event == "reset" else None
+                    self.stats["events"] += 1
+                    with self._lock:
+                        subscribers = list(channel.subscribers)
+                    for subscription in subscribers:
+                        if subscription.offer(message):
+                            continue
+                        if reset_message is None:
+                            reset_message = format_sse("reset", channel.state_payload(), channel.seq)
+                        subscription.replace_backlog(reset_message)
+        except Exception as exc:
+            logger.error(f"[RealtimeStream] pump failed for {channel.symbol} {channel.date_str}: {exc}")
+            with self._lock:
+                channel.pumping = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._channels.clear()
+            self.stats = {key: 0 for key in self.stats}
+
+
+stream_hub = RealtimeStreamHub()
+
+
+def notify_ticks_changed(symbol: str, date_str: str) -> bool:
+    return stream_hub.notify(symbol, date_str)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import re
@@ -13,6 +14,7 @@ import pandas as pd
 from backend.app.db.database import get_db_connection
 from backend.app.db.l2_history_db import query_l2_history_5m_rows, query_l2_history_daily_rows
 from backend.app.db.realtime_preview_db import query_realtime_5m_preview_rows, query_realtime_daily_preview_row
+from backend.app.db.sql_predicates import day_range_bounds, day_range_clause, next_day
 
 logger = logging.getLogger(__name__)
 
@@ -95,6 +97,35 @@ LOW_VALUE_EVENT_TERMS = {
     "卖卖卖",
 }
 
+# 引流话术按完整短语匹配：单字"群"、"vx"会误伤"散户群体"、"一群人"、"VX指数"这类正常讨论
+SPAM_EVENT_TERMS = (
+    "加微",
+    "加v",
+    "加群",
+    "进群",
+    "入群",
+    "群号",
+    "qq群",
+    "微信群",
+    "vx号",
+    "私信我",
+    "免费领",
+    "荐股",
+)
+
+# 事件质量分类器版本：改动低价值词表、广告词、股票错配或内容指纹规则时必须递增。
+# 版本不一致的行会在读取该股票前 / 回填脚本里定向重算，而不是沿用旧标记静默漂移
+EVENT_QUALITY_CLASSIFIER_VERSION = "event_quality_v2"
+EVENT_QUALITY_COLUMNS = {
+    "is_symbol_mismatch": "INTEGER DEFAULT 0",
+    "is_low_value": "INTEGER DEFAULT 0",
+    "is_spam": "INTEGER DEFAULT 0",
+    "is_duplicate": "INTEGER DEFAULT 0",
+    "content_hash": "TEXT",
+    "quality_version": "TEXT",
+}
+EVENT_QUALITY_BATCH_SIZE = 2000
+
 THEME_PATTERNS = {
     "涨停预期": ("涨停", "一字板", "板上", "连板", "封板"),
     "洗盘震荡": ("洗盘", "震荡", "回调", "洗一洗", "磨底"),
@@ -963,18 +994,43 @@ def _ensure_sentiment_events_schema(conn) -> None:
             repost_count INTEGER,
             raw_url TEXT,
             source_event_id TEXT,
-            extra_json TEXT
+            extra_json TEXT,
+            is_symbol_mismatch INTEGER DEFAULT 0,
+            is_low_value INTEGER DEFAULT 0,
+            is_spam INTEGER DEFAULT 0,
+            is_duplicate INTEGER DEFAULT 0,
+            content_hash TEXT,
+            quality_version TEXT
         );
         CREATE UNIQUE INDEX IF NOT EXISTS idx_sentiment_events_source_event
         ON sentiment_events (source, source_event_id);
         CREATE INDEX IF NOT EXISTS idx_sentiment_events_symbol_time
         ON sentiment_events (symbol, pub_time);
+        CREATE INDEX IF NOT EXISTS idx_sentiment_events_symbol_nocase_time
+        ON sentiment_events (symbol COLLATE NOCASE, pub_time);
         CREATE INDEX IF NOT EXISTS idx_sentiment_events_symbol_source_time
         ON sentiment_events (symbol, source, pub_time);
         CREATE INDEX IF NOT EXISTS idx_sentiment_events_thread_time
         ON sentiment_events (thread_id, pub_time);
+        CREATE INDEX IF NOT EXISTS idx_sentiment_events_pub_time
+        ON sentiment_events (pub_time);
         """
     )
+    ensure_event_quality_schema(conn)
+
+
+def ensure_event_quality_schema(conn) -> None:
+    """给旧库的 sentiment_events 补质量标记列和对应索引；抓取写入侧也会调用。"""
+    existing = {str(row[1]) for row in conn.execute("PRAGMA table_info(sentiment_events)").fetchall()}
+    for column, definition in EVENT_QUALITY_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE sentiment_events ADD COLUMN {column} {definition}")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sentiment_events_symbol_quality ON sentiment_events (symbol, quality_version)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sentiment_events_symbol_hash_time ON sentiment_events (symbol, content_hash, pub_time)"
+    )
 
 
 def _event_symbol(symbol: str) -> str:
@@ -1024,9 +1080,18 @@ def _ensure_sentiment_events_backfill(symbol: str) -> None:
                 *params,
             ),
         )
+        legacy_imported = cursor.rowcount > 0
+        if legacy_imported:
+            # 遗留导入补进了新帖：作废该股票的热度桶，下次读取时整股重建
+            _ensure_sentiment_heat_rollup_schema(conn)
+            conn.execute("DELETE FROM sentiment_heat_rollup_state WHERE symbol=?", (canonical_symbol,))
+        # 遗留导入 / 直接写库 / 分类器升级留下的未标记行，在读取该股票前补齐质量标记
+        _, heat_days = _classify_stale_events(conn, canonical_symbol)
         conn.commit()
     finally:
         conn.close()
+    if heat_days and not legacy_imported:
+        refresh_sentiment_heat_rollup(canonical_symbol, heat_days)
 
 
 def _ensure_recent_source_data(symbol: str, window: str) -> None:
@@ -1191,8 +1256,8 @@ def _daily_price_map(symbol: str, start_date: str, end_date: str) -> Dict[str, D
 
 def _event_daily_aggregate(symbol: str, start_date: str, end_date: str, source: Optional[str] = None) -> pd.DataFrame:
     query_symbol = _event_symbol(symbol)
-    clauses = ["symbol=?", "pub_time IS NOT NULL", "date(pub_time)>=?", "date(pub_time)<=?"]
-    params: List[Any] = [query_symbol, start_date, end_date]
+    clauses = ["symbol=?", "pub_time IS NOT NULL", day_range_clause("pub_time"), "is_symbol_mismatch=0"]
+    params: List[Any] = [query_symbol, *day_range_bounds(start_date, end_date)]
     if source and source != "all":
         clauses.append("source=?")
         params.append(source)
@@ -1202,34 +1267,18 @@ def _event_daily_aggregate(symbol: str, start_date: str, end_date: str, source:
         query = f"""
             SELECT
                 date(pub_time) AS bucket_date,
-                content,
-                event_type,
-                raw_url,
-                extra_json
+                COUNT(*) AS event_count,
+                SUM(CASE WHEN event_type='post' THEN 1 ELSE 0 END) AS post_count,
+                SUM(CASE WHEN event_type='reply' THEN 1 ELSE 0 END) AS reply_count
             FROM sentiment_events
             WHERE {' AND '.join(clauses)}
+            GROUP BY date(pub_time)
             ORDER BY bucket_date ASC
         """
-        raw_df = pd.read_sql(query, conn, params=params)
+        return pd.read_sql(query, conn, params=params)
     finally:
         conn.close()
 
-    if raw_df.empty:
-        return raw_df
-    filtered = _apply_event_quality_filter(raw_df, symbol)
-    if filtered.empty:
-        return pd.DataFrame(columns=["bucket_date", "event_count", "post_count", "reply_count"])
-    grouped = (
-        filtered.groupby("bucket_date", as_index=False)
-        .agg(
-            event_count=("event_type", "count"),
-            post_count=("event_type", lambda s: int((s == "post").sum())),
-            reply_count=("event_type", lambda s: int((s == "reply").sum())),
-        )
-        .sort_values("bucket_date")
-    )
-    return grouped
-
 
 def _relative_heat_label(value: Optional[float]) -> str:
     if value is None:
@@ -1281,13 +1330,14 @@ def _is_symbol_mismatch(symbol: str, raw_url: Any, extra_json: Any) -> bool:
     return False
 
 
-def _is_low_value_event_text(content: Any) -> bool:
-    text = str(content or "").strip()
-    if not text:
-        return True
-    normalized = re.sub(r"\s+", "", text)
+def _normalize_event_content(content: Any) -> str:
+    normalized = re.sub(r"\s+", "", str(content or "").strip())
     normalized = re.sub(r"<[^>]+>", "", normalized)
-    normalized = normalized.strip()
+    return normalized.strip()
+
+
+def _is_low_value_event_text(content: Any) -> bool:
+    normalized = _normalize_event_content(content)
     if not normalized:
         return True
     if normalized in LOW_VALUE_EVENT_TERMS:
@@ -1307,23 +1357,182 @@ def _is_low_value_event_text(content: Any) -> bool:
     return False
 
 
-def _apply_event_quality_filter(df: pd.DataFrame, symbol: str, drop_low_value: bool = False) -> pd.DataFrame:
-    if df.empty:
-        return df
-    filtered = df.copy()
-    if "raw_url" not in filtered.columns:
-        filtered["raw_url"] = None
-    if "extra_json" not in filtered.columns:
-        filtered["extra_json"] = None
-    filtered["_symbol_mismatch"] = filtered.apply(
-        lambda row: _is_symbol_mismatch(symbol, row.get("raw_url"), row.get("extra_json")),
-        axis=1,
+def _is_spam_event_text(content: Any) -> bool:
+    lowered = _normalize_event_content(content).lower()
+    return bool(lowered) and any(term in lowered for term in SPAM_EVENT_TERMS)
+
+
+def classify_event_quality(symbol: str, content: Any, raw_url: Any = None, extra_json: Any = None) -> Dict[str, Any]:
+    """
+    单条事件的入库质量标记（不含 is_duplicate：重复需要看同股票同日其它事件，由 resolve_duplicate_events 补）。
+
+    symbol 取事件落库的股票代码；content_hash 为归一化正文（去空白、去标签）的指纹，正文为空时为 None。
+    """
+    normalized = _normalize_event_content(content)
+    return {
+        "is_symbol_mismatch": int(_is_symbol_mismatch(symbol, raw_url, extra_json)),
+        "is_low_value": int(_is_low_value_event_text(content)),
+        "is_spam": int(_is_spam_event_text(content)),
+        "content_hash": hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16] if normalized else None,
+        "quality_version": EVENT_QUALITY_CLASSIFIER_VERSION,
+    }
+
+
+def resolve_duplicate_events(conn, symbol: str, trade_dates: Sequence[str]) -> None:
+    """
+    同股票同一自然日、同一事件类型内 content_hash 相同的事件只保留最早一条（pub_time, event_id 排序）为非重复，其余标 is_duplicate。
+
+    只和未被判为股票错配的事件比较：错配行本身不参与读取，不能让一条有效帖子因为与它同文而被挤掉；
+    回复与主帖同文也不算主帖重复。
+    """
+    for day in sorted({str(day)[:10] for day in trade_dates if len(str(day or "")) >= 10}):
+        start_text, end_text = day_range_bounds(day, day)
+        conn.execute(
+            """
+            UPDATE sentiment_events
+            SET is_duplicate = CASE
+                WHEN content_hash IS NOT NULL AND EXISTS (
+                    SELECT 1
+                    FROM sentiment_events AS earlier
+                    WHERE earlier.symbol=sentiment_events.symbol
+                      AND earlier.content_hash=sentiment_events.content_hash
+                      AND earlier.pub_time>=? AND earlier.pub_time<sentiment_events.pub_time
+                      AND earlier.event_type=sentiment_events.event_type
+                      AND earlier.is_symbol_mismatch=0
+                ) THEN 1
+                WHEN content_hash IS NOT NULL AND EXISTS (
+                    SELECT 1
+                    FROM sentiment_events AS earlier
+                    WHERE earlier.symbol=sentiment_events.symbol
+                      AND earlier.content_hash=sentiment_events.content_hash
+                      AND earlier.pub_time=sentiment_events.pub_time
+                      AND earlier.event_id<sentiment_events.event_id
+                      AND earlier.event_type=sentiment_events.event_type
+                      AND earlier.is_symbol_mismatch=0
+                ) THEN 1
+                ELSE 0
+            END
+            WHERE symbol=? AND pub_time>=? AND pub_time<?
+            """,
+            (start_text, symbol, start_text, end_text),
+        )
+
+
+def _stale_event_quality_clause() -> str:
+    return "(quality_version IS NULL OR quality_version<? OR quality_version>?)"
+
+
+def _classify_stale_events(conn, symbol: str, batch_size: int = EVENT_QUALITY_BATCH_SIZE) -> tuple[int, List[str]]:
+    """
+    按当前分类器版本重算该股票所有缺标记 / 旧版本的事件，返回 (重算条数, 股票错配标记有变化的发帖日)。
+
+    错配标记决定帖子是否计入热度，后者交给调用方刷新热度预聚合；受影响自然日的重复标记在这里一并重算。
+    """
+    classified = 0
+    duplicate_days: set = set()
+    heat_days: set = set()
+    # 每次读取前都会跑一遍：拆成三段 UNION ALL，各自走 (symbol, quality_version) 索引的等值 / 区间查找；
+    # 写成 OR 时规划器会退回 (symbol, pub_time) 索引，把该股票的全部事件都过一遍
+    columns = "event_id, event_type, content, pub_time, raw_url, extra_json, is_symbol_mismatch, content_hash"
+    query = f"""
+        SELECT {columns} FROM sentiment_events WHERE symbol=? AND quality_version IS NULL
+        UNION ALL
+        SELECT {columns} FROM sentiment_events WHERE symbol=? AND quality_version<?
+        UNION ALL
+        SELECT {columns} FROM sentiment_events WHERE symbol=? AND quality_version>?
+        LIMIT ?
+    """
+    params = (
+        symbol,
+        symbol,
+        EVENT_QUALITY_CLASSIFIER_VERSION,
+        symbol,
+        EVENT_QUALITY_CLASSIFIER_VERSION,
+        max(1, int(batch_size)),
     )
-    filtered = filtered[~filtered["_symbol_mismatch"]].copy()
-    if drop_low_value:
-        filtered["_low_value"] = filtered["content"].map(_is_low_value_event_text)
-        filtered = filtered[~filtered["_low_value"]].copy()
-    return filtered
+    while True:
+        rows = conn.execute(query, params).fetchall()
+        if not rows:
+            break
+        payload = []
+        for event_id, event_type, content, pub_time, raw_url, extra_json, old_mismatch, old_hash in rows:
+            flags = classify_event_quality(symbol, content, raw_url, extra_json)
+            payload.append(
+                (
+                    flags["is_symbol_mismatch"],
+                    flags["is_low_value"],
+                    flags["is_spam"],
+                    flags["content_hash"],
+                    flags["quality_version"],
+                    event_id,
+                )
+            )
+            day = str(pub_time or "")[:10]
+            if not day:
+                continue
+            duplicate_days.add(day)
+            if event_type == "post" and int(old_mismatch or 0) != flags["is_symbol_mismatch"]:
+                heat_days.add(day)
+        conn.executemany(
+            """
+            UPDATE sentiment_events
+            SET is_symbol_mismatch=?, is_low_value=?, is_spam=?, content_hash=?, quality_version=?
+            WHERE event_id=?
+            """,
+            payload,
+        )
+        classified += len(rows)
+    resolve_duplicate_events(conn, symbol, duplicate_days)
+    return classified, sorted(heat_days)
+
+
+def reclassify_sentiment_event_quality(
+    symbol: Optional[str] = None,
+    *,
+    force: bool = False,
+    batch_size: int = EVENT_QUALITY_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """
+    回填 / 规则升级用：按 EVENT_QUALITY_CLASSIFIER_VERSION 重算 quality_version 不一致的事件。
+
+    不传 symbol 时只处理存在旧版本行的股票；force=True 时无视版本整股重算。
+    错配标记变化的发帖日同步刷新热度预聚合。
+    """
+    conn = get_db_connection()
+    try:
+        _ensure_sentiment_events_schema(conn)
+        conn.commit()
+        if symbol:
+            symbols = [_event_symbol(symbol)]
+        elif force:
+            symbols = [str(row[0]) for row in conn.execute("SELECT DISTINCT symbol FROM sentiment_events")]
+        else:
+            symbols = [
+                str(row[0])
+                for row in conn.execute(
+                    f"SELECT DISTINCT symbol FROM sentiment_events WHERE {_stale_event_quality_clause()}",
+                    (EVENT_QUALITY_CLASSIFIER_VERSION, EVENT_QUALITY_CLASSIFIER_VERSION),
+                )
+            ]
+    finally:
+        conn.close()
+
+    report = {"classifier_version": EVENT_QUALITY_CLASSIFIER_VERSION, "symbols": 0, "events": 0, "heat_days": 0}
+    for canonical_symbol in symbols:
+        conn = get_db_connection()
+        try:
+            if force:
+                conn.execute("UPDATE sentiment_events SET quality_version=NULL WHERE symbol=?", (canonical_symbol,))
+            classified, heat_days = _classify_stale_events(conn, canonical_symbol, batch_size)
+            conn.commit()
+        finally:
+            conn.close()
+        if heat_days:
+            refresh_sentiment_heat_rollup(canonical_symbol, heat_days)
+        report["symbols"] += 1
+        report["events"] += classified
+        report["heat_days"] += len(heat_days)
+    return report
 
 
 def build_overview_v2(symbol: str, window: str = "5d") -> Dict[str, Any]:
@@ -1350,24 +1559,17 @@ def build_overview_v2(symbol: str, window: str = "5d") -> Dict[str, Any]:
             current_start = trading_dates[0]
             current_end = trading_dates[-1]
             daily_df = _event_daily_aggregate(symbol, current_start, current_end)
-            raw_source_df = pd.read_sql(
+            cursor.execute(
                 """
-                SELECT source, content, raw_url, extra_json
+                SELECT source, COUNT(*) AS size
                 FROM sentiment_events
-                WHERE symbol=? AND pub_time IS NOT NULL AND date(pub_time)>=? AND date(pub_time)<=?
+                WHERE symbol=? AND pub_time IS NOT NULL AND pub_time>=? AND pub_time<? AND is_symbol_mismatch=0
+                GROUP BY source
+                ORDER BY size DESC, source ASC
                 """,
-                conn,
-                params=[query_symbol, current_start, current_end],
+                (query_symbol, *day_range_bounds(current_start, current_end)),
             )
-            raw_source_df = _apply_event_quality_filter(raw_source_df, symbol)
-            if not raw_source_df.empty:
-                source_rows = (
-                    raw_source_df.groupby("source", as_index=False)
-                    .size()
-                    .sort_values(["size", "source"], ascending=[False, True])
-                    .to_records(index=False)
-                    .tolist()
-                )
+            source_rows = [(str(row[0]), int(row[1])) for row in cursor.fetchall()]
 
             baseline_dates = _baseline_dates(symbol, current_start, limit=30)
             if baseline_dates:
@@ -1526,8 +1728,8 @@ def build_feed_v2(
 
     start_date = trading_dates[0]
     end_date = trading_dates[-1]
-    clauses = ["symbol=?", "pub_time IS NOT NULL", "date(pub_time)>=?", "date(pub_time)<=?"]
-    params: List[Any] = [_event_symbol(symbol), start_date, end_date]
+    clauses = ["symbol=?", "pub_time IS NOT NULL", day_range_clause("pub_time"), "is_symbol_mismatch=0"]
+    params: List[Any] = [_event_symbol(symbol), *day_range_bounds(start_date, end_date)]
     if normalized_source != "all":
         clauses.append("source=?")
         params.append(normalized_source)
@@ -1544,7 +1746,6 @@ def build_feed_v2(
             WHERE {' AND '.join(clauses)}
         """
         df = pd.read_sql(query, conn, params=params)
-        df = _apply_event_quality_filter(df, symbol)
     finally:
         conn.close()
 
@@ -1639,6 +1840,7 @@ SENTIMENT_V3_WINDOWS = {
 SENTIMENT_METRIC_EXPLANATIONS = {
     "current_stock_heat": "当前股票热度：当前所选窗口内主帖热度累计值 = 帖数 + 评论总数权重 + 阅读总数弱权重。",
     "relative_heat_index": "相对热度：最近一个时间桶/交易日的热度，相对过去 5 个交易日自身同类基线的放大量。",
+    "bull_count": "看多 / 看空帖数：窗口内主帖按多空关键词规则逐帖判定的数量（bull_count / bear_count）。",
     "sentiment_score": "情绪得分：LLM 对当天高价值样本做出的综合判断，范围 -100 到 100。",
     "consensus_strength": "一致性：散户观点是否一边倒，越高说明观点越集中。",
     "emotion_temperature": "情绪温度：讨论是否亢奋或恐慌，越高说明情绪越激烈。",
@@ -1671,6 +1873,8 @@ def _ensure_sentiment_daily_scores_schema(conn) -> None:
         );
         CREATE INDEX IF NOT EXISTS idx_sentiment_daily_scores_symbol_date
         ON sentiment_daily_scores(symbol, trade_date);
+        CREATE INDEX IF NOT EXISTS idx_sentiment_daily_scores_symbol_nocase_date
+        ON sentiment_daily_scores(symbol COLLATE NOCASE, trade_date);
         """
     )
 
@@ -1721,14 +1925,14 @@ def _load_sentiment_posts_df(
     end_date: Optional[str],
 ) -> pd.DataFrame:
     canonical_symbol = _event_symbol(symbol)
-    clauses = ["symbol=?", "event_type='post'", "pub_time IS NOT NULL"]
+    clauses = ["symbol=?", "event_type='post'", "pub_time IS NOT NULL", "is_symbol_mismatch=0"]
     params: List[Any] = [canonical_symbol]
     if start_date:
-        clauses.append("date(pub_time)>=?")
-        params.append(start_date)
+        clauses.append("pub_time>=?")
+        params.append(str(start_date)[:10])
     if end_date:
-        clauses.append("date(pub_time)<=?")
-        params.append(end_date)
+        clauses.append("pub_time<?")
+        params.append(next_day(end_date))
 
     conn = get_db_connection()
     try:
@@ -1736,18 +1940,16 @@ def _load_sentiment_posts_df(
             SELECT
                 event_id, symbol, content, author_name, pub_time, crawl_time,
                 view_count, reply_count, like_count, repost_count,
-                raw_url, source_event_id, extra_json
+                raw_url, source_event_id, extra_json,
+                is_low_value, is_spam, is_duplicate
             FROM sentiment_events
             WHERE {' AND '.join(clauses)}
             ORDER BY pub_time ASC
         """
-        df = pd.read_sql(query, conn, params=params)
+        filtered = pd.read_sql(query, conn, params=params)
     finally:
         conn.close()
 
-    if df.empty:
-        return df
-    filtered = _apply_event_quality_filter(df, symbol, drop_low_value=False)
     if filtered.empty:
         return filtered
 
@@ -1768,70 +1970,258 @@ def _load_sentiment_posts_df(
     return filtered.drop(columns=["bucket_date", "_legacy_import"], errors="ignore")
 
 
-def _aggregate_heat_daily(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
-    daily_map: Dict[str, Dict[str, Any]] = {}
-    if df.empty:
-        return daily_map
+SENTIMENT_HEAT_GRANULARITIES = ("10m", "1d")
+# 增量刷新时相隔不超过该天数的受影响日期合并成一段读取，避免零散日期逐天查询
+HEAT_ROLLUP_SPAN_GAP_DAYS = 3
 
-    work = df.copy()
-    work["bucket_date"] = work["pub_time"].map(lambda text: str(text)[:10])
-    grouped = (
-        work.groupby("bucket_date", as_index=False)
-        .agg(
-            post_count=("event_id", "count"),
-            reply_count_sum=("reply_count", "sum"),
-            read_count_sum=("view_count", "sum"),
-        )
-        .sort_values("bucket_date")
-    )
-    for _, row in grouped.iterrows():
-        post_count = int(row["post_count"] or 0)
-        reply_sum = float(row["reply_count_sum"] or 0.0)
-        read_sum = float(row["read_count_sum"] or 0.0)
-        raw_heat = round(post_count * 1.0 + reply_sum * 2.0 + (read_sum / 2000.0) * 0.5, 2)
-        daily_map[str(row["bucket_date"])] = {
-            "post_count": post_count,
-            "reply_count_sum": int(round(reply_sum)),
-            "read_count_sum": int(round(read_sum)),
-            "raw_heat": raw_heat,
-        }
-    return daily_map
+
+def _empty_heat_bucket() -> Dict[str, Any]:
+    return {"post_count": 0, "reply_count_sum": 0, "read_count_sum": 0, "bull_count": 0, "bear_count": 0, "raw_heat": 0.0}
+
+
+def _heat_bucket_key(pub_time: Any, granularity: str) -> str:
+    text = str(pub_time)
+    if granularity == "1d":
+        return text[:10]
+    if len(text) >= 19:
+        return _bucket_10m(datetime.strptime(text[:19], "%Y-%m-%d %H:%M:%S")).strftime("%Y-%m-%d %H:%M:%S")
+    return text
 
 
-def _aggregate_heat_intraday_10m(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+def _aggregate_heat_buckets(df: pd.DataFrame, granularity: str) -> Dict[str, Dict[str, Any]]:
+    """帖子明细 -> {bucket_start: 发帖数/回复数/阅读数/看多/看空/加权热度}；多空按 sentiment_analyzer 规则逐帖判定。"""
     bucket_map: Dict[str, Dict[str, Any]] = {}
     if df.empty:
         return bucket_map
 
+    from backend.app.services.sentiment_analyzer import sentiment_analyzer
+
     work = df.copy()
-    work["bucket_time"] = work["pub_time"].map(
-        lambda text: _bucket_10m(datetime.strptime(str(text), "%Y-%m-%d %H:%M:%S")).strftime("%Y-%m-%d %H:%M:%S")
-        if len(str(text)) >= 19
-        else str(text)
-    )
+    work["bucket_start"] = work["pub_time"].map(lambda text: _heat_bucket_key(text, granularity))
+    direction = work["content"].map(lambda text: sentiment_analyzer.calculate_sentiment(str(text or "")))
+    work["is_bull"] = (direction > 0).astype(int)
+    work["is_bear"] = (direction < 0).astype(int)
     grouped = (
-        work.groupby("bucket_time", as_index=False)
+        work.groupby("bucket_start", as_index=False)
         .agg(
             post_count=("event_id", "count"),
             reply_count_sum=("reply_count", "sum"),
             read_count_sum=("view_count", "sum"),
+            bull_count=("is_bull", "sum"),
+            bear_count=("is_bear", "sum"),
         )
-        .sort_values("bucket_time")
+        .sort_values("bucket_start")
     )
     for _, row in grouped.iterrows():
         post_count = int(row["post_count"] or 0)
         reply_sum = float(row["reply_count_sum"] or 0.0)
         read_sum = float(row["read_count_sum"] or 0.0)
         raw_heat = round(post_count * 1.0 + reply_sum * 2.0 + (read_sum / 2000.0) * 0.5, 2)
-        bucket_map[str(row["bucket_time"])] = {
+        bucket_map[str(row["bucket_start"])] = {
             "post_count": post_count,
             "reply_count_sum": int(round(reply_sum)),
             "read_count_sum": int(round(read_sum)),
+            "bull_count": int(row["bull_count"] or 0),
+            "bear_count": int(row["bear_count"] or 0),
             "raw_heat": raw_heat,
         }
     return bucket_map
 
 
+def _ensure_sentiment_heat_rollup_schema(conn) -> None:
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS sentiment_heat_rollup (
+            symbol TEXT NOT NULL,
+            granularity TEXT NOT NULL,
+            bucket_start TEXT NOT NULL,
+            post_count INTEGER DEFAULT 0,
+            reply_count_sum INTEGER DEFAULT 0,
+            read_count_sum INTEGER DEFAULT 0,
+            bull_count INTEGER DEFAULT 0,
+            bear_count INTEGER DEFAULT 0,
+            raw_heat REAL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY(symbol, granularity, bucket_start)
+        );
+        CREATE TABLE IF NOT EXISTS sentiment_heat_rollup_state (
+            symbol TEXT PRIMARY KEY,
+            rebuilt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+
+
+def _write_heat_rollup(symbol: str, start_date: str, end_date: str) -> int:
+    """按 [start_date, end_date] 自然日重算并覆盖该区间的 10m / 1d 热度桶，返回写入桶数。"""
+    df = _load_sentiment_posts_df(symbol, start_date, end_date)
+    payload = []
+    for granularity in SENTIMENT_HEAT_GRANULARITIES:
+        for bucket_start, bucket in _aggregate_heat_buckets(df, granularity).items():
+            payload.append(
+                (
+                    symbol,
+                    granularity,
+                    bucket_start,
+                    bucket["post_count"],
+                    bucket["reply_count_sum"],
+                    bucket["read_count_sum"],
+                    bucket["bull_count"],
+                    bucket["bear_count"],
+                    bucket["raw_heat"],
+                )
+            )
+    conn = get_db_connection()
+    try:
+        _ensure_sentiment_heat_rollup_schema(conn)
+        conn.execute(
+            f"DELETE FROM sentiment_heat_rollup WHERE symbol=? AND {day_range_clause('bucket_start')}",
+            (symbol, *day_range_bounds(start_date, end_date)),
+        )
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO sentiment_heat_rollup (
+                symbol, granularity, bucket_start, post_count, reply_count_sum, read_count_sum,
+                bull_count, bear_count, raw_heat, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """,
+            payload,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return len(payload)
+
+
+def refresh_sentiment_heat_rollup(symbol: str, trade_dates: Sequence[str]) -> int:
+    """
+    写入侧增量维护：只重算受影响的自然日。
+
+    遗留导入去重（同一天有新抓取帖子时丢弃遗留导入帖）以"天"为单位，按天重算与全量重建结果一致。
+    """
+    canonical_symbol = _event_symbol(symbol)
+    days = sorted({str(day)[:10] for day in trade_dates if len(str(day or "")) >= 10})
+    if not canonical_symbol or not days:
+        return 0
+    spans: List[List[str]] = []
+    for day in days:
+        if spans and (datetime.strptime(day, "%Y-%m-%d") - datetime.strptime(spans[-1][1], "%Y-%m-%d")).days <= HEAT_ROLLUP_SPAN_GAP_DAYS:
+            spans[-1][1] = day
+        else:
+            spans.append([day, day])
+    return sum(_write_heat_rollup(canonical_symbol, start_date, end_date) for start_date, end_date in spans)
+
+
+def rebuild_sentiment_heat_rollup(
+    symbol: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    回填 / 修复用的全量重建。不传 symbol 时遍历 sentiment_events 里所有有帖子的股票；
+    不传日期区间时清空该股票已有的热度桶后按其全部帖子重建，并记入 sentiment_heat_rollup_state。
+    """
+    conn = get_db_connection()
+    try:
+        _ensure_sentiment_events_schema(conn)
+        _ensure_sentiment_heat_rollup_schema(conn)
+        if symbol:
+            symbols = [_event_symbol(symbol)]
+        else:
+            symbols = [str(row[0]) for row in conn.execute("SELECT DISTINCT symbol FROM sentiment_events WHERE event_type='post'")]
+        conn.commit()
+    finally:
+        conn.close()
+
+    full_rebuild = not start_date and not end_date
+    bucket_count = 0
+    for canonical_symbol in symbols:
+        conn = get_db_connection()
+        try:
+            # 热度桶按错配标记过滤帖子，重建前先补齐未标记 / 旧版本的事件
+            _, stale_heat_days = _classify_stale_events(conn, canonical_symbol)
+            conn.commit()
+            bounds = conn.execute(
+                "SELECT MIN(pub_time), MAX(pub_time) FROM sentiment_events WHERE symbol=? AND pub_time IS NOT NULL",
+                (canonical_symbol,),
+            ).fetchone()
+            if full_rebuild:
+                conn.execute("DELETE FROM sentiment_heat_rollup WHERE symbol=?", (canonical_symbol,))
+                conn.commit()
+        finally:
+            conn.close()
+        range_start = start_date or (str(bounds[0])[:10] if bounds and bounds[0] else None)
+        range_end = end_date or (str(bounds[1])[:10] if bounds and bounds[1] else None)
+        if range_start and range_end:
+            bucket_count += _write_heat_rollup(canonical_symbol, range_start, range_end)
+        if not full_rebuild:
+            outside_days = [day for day in stale_heat_days if not (range_start or "") <= day <= (range_end or "9999-12-31")]
+            bucket_count += refresh_sentiment_heat_rollup(canonical_symbol, outside_days)
+        if full_rebuild:
+            conn = get_db_connection()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sentiment_heat_rollup_state (symbol, rebuilt_at) VALUES (?, CURRENT_TIMESTAMP)",
+                    (canonical_symbol,),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+    return {"symbols": len(symbols), "buckets": bucket_count, "full_rebuild": full_rebuild}
+
+
+def invalidate_sentiment_heat_rollup(symbol: str) -> None:
+    """删掉该股票的整股重建记录，下次读取时由 _ensure_sentiment_heat_rollup 整股重建；增量刷新失败时兜底。"""
+    conn = get_db_connection()
+    try:
+        _ensure_sentiment_heat_rollup_schema(conn)
+        conn.execute("DELETE FROM sentiment_heat_rollup_state WHERE symbol=?", (_event_symbol(symbol),))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _ensure_sentiment_heat_rollup(symbol: str) -> None:
+    """首次读取（或遗留导入补进新帖后）按股票全量建一次热度桶，之后由写入侧增量维护。"""
+    canonical_symbol = _event_symbol(symbol)
+    conn = get_db_connection()
+    try:
+        _ensure_sentiment_heat_rollup_schema(conn)
+        conn.commit()
+        built = conn.execute("SELECT 1 FROM sentiment_heat_rollup_state WHERE symbol=?", (canonical_symbol,)).fetchone()
+    finally:
+        conn.close()
+    if not built:
+        rebuild_sentiment_heat_rollup(canonical_symbol)
+
+
+def _load_heat_rollup(symbol: str, granularity: str, start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            f"""
+            SELECT bucket_start, post_count, reply_count_sum, read_count_sum, bull_count, bear_count, raw_heat
+            FROM sentiment_heat_rollup
+            WHERE symbol=? AND granularity=? AND {day_range_clause('bucket_start')}
+            ORDER BY bucket_start ASC
+            """,
+            (_event_symbol(symbol), granularity, *day_range_bounds(start_date, end_date)),
+        ).fetchall()
+    finally:
+        conn.close()
+    return {
+        str(row[0]): {
+            "post_count": int(row[1] or 0),
+            "reply_count_sum": int(row[2] or 0),
+            "read_count_sum": int(row[3] or 0),
+            "bull_count": int(row[4] or 0),
+            "bear_count": int(row[5] or 0),
+            "raw_heat": float(row[6] or 0.0),
+        }
+        for row in rows
+    }
+
+
 def _previous_trade_dates(symbol: str, before_date: str, limit: int = 5) -> List[str]:
     baseline = _baseline_dates(symbol, before_date, limit=limit)
     return [d for d in baseline if d < before_date][-limit:]
@@ -1994,8 +2384,7 @@ def _build_daily_trend_rows(symbol: str, trade_dates: List[str]) -> List[Dict[st
     history_dates = _recent_event_dates(symbol, len(trade_dates) + 10, fallback_days=180)
     all_needed_dates = sorted(set(history_dates + trade_dates))
     baseline_start = all_needed_dates[0] if all_needed_dates else start_date
-    df = _load_sentiment_posts_df(symbol, baseline_start, end_date)
-    day_map = _aggregate_heat_daily(df)
+    day_map = _load_heat_rollup(symbol, "1d", baseline_start, end_date)
     price_map = _daily_price_map(symbol, start_date, end_date)
     rows: List[Dict[str, Any]] = []
 
@@ -2004,7 +2393,7 @@ def _build_daily_trend_rows(symbol: str, trade_dates: List[str]) -> List[Dict[st
         previous_dates_map[trade_date] = all_needed_dates[max(0, idx - 5):idx]
 
     for trade_date in trade_dates:
-        current = day_map.get(trade_date, {"post_count": 0, "reply_count_sum": 0, "read_count_sum": 0, "raw_heat": 0.0})
+        current = day_map.get(trade_date) or _empty_heat_bucket()
         baseline_dates = previous_dates_map.get(trade_date, [])
         baseline_avg = (
             sum(float(day_map.get(day, {}).get("raw_heat") or 0.0) for day in baseline_dates) / len(baseline_dates)
@@ -2022,6 +2411,8 @@ def _build_daily_trend_rows(symbol: str, trade_dates: List[str]) -> List[Dict[st
                 "post_count": int(current.get("post_count") or 0),
                 "reply_count_sum": int(current.get("reply_count_sum") or 0),
                 "read_count_sum": int(current.get("read_count_sum") or 0),
+                "bull_count": int(current.get("bull_count") or 0),
+                "bear_count": int(current.get("bear_count") or 0),
                 "relative_heat_index": heat_surge,
                 "relative_heat_label": _relative_heat_label(heat_surge),
                 "is_gap": raw_heat <= 0,
@@ -2043,8 +2434,7 @@ def _build_intraday_5d_rows(symbol: str, trade_dates: List[str]) -> List[Dict[st
     history_dates = _recent_event_dates(symbol, len(trade_dates) + 10, fallback_days=180)
     all_needed_dates = sorted(set(history_dates + trade_dates))
     baseline_start = all_needed_dates[0] if all_needed_dates else start_date
-    df = _load_sentiment_posts_df(symbol, baseline_start, end_date)
-    bucket_map = _aggregate_heat_intraday_10m(df)
+    bucket_map = _load_heat_rollup(symbol, "10m", baseline_start, end_date)
     price_map = _build_price_map_intraday_10m(symbol, trade_dates)
     rows: List[Dict[str, Any]] = []
 
@@ -2055,7 +2445,7 @@ def _build_intraday_5d_rows(symbol: str, trade_dates: List[str]) -> List[Dict[st
     current_dates = set(trade_dates)
     full_buckets = [key for key in _generate_window_10m_buckets(trade_dates) if key[:10] in current_dates]
     for bucket_key in full_buckets:
-        current = bucket_map.get(bucket_key, {"post_count": 0, "reply_count_sum": 0, "read_count_sum": 0, "raw_heat": 0.0})
+        current = bucket_map.get(bucket_key) or _empty_heat_bucket()
         bucket_date = bucket_key[:10]
         bucket_clock = bucket_key[11:16]
         baseline_dates = previous_dates_map.get(bucket_date, [])
@@ -2077,6 +2467,8 @@ def _build_intraday_5d_rows(symbol: str, trade_dates: List[str]) -> List[Dict[st
                 "post_count": int(current.get("post_count") or 0),
                 "reply_count_sum": int(current.get("reply_count_sum") or 0),
                 "read_count_sum": int(current.get("read_count_sum") or 0),
+                "bull_count": int(current.get("bull_count") or 0),
+                "bear_count": int(current.get("bear_count") or 0),
                 "relative_heat_index": heat_surge,
                 "relative_heat_label": _relative_heat_label(heat_surge),
                 "is_gap": raw_heat <= 0,
@@ -2092,6 +2484,7 @@ def _build_intraday_5d_rows(symbol: str, trade_dates: List[str]) -> List[Dict[st
 
 def _build_heat_rows(symbol: str, window: str) -> List[Dict[str, Any]]:
     _ensure_sentiment_v3_base(symbol)
+    _ensure_sentiment_heat_rollup(symbol)
     _start_date, end_date, trade_dates = _date_range_for_window(symbol, window)
     if not trade_dates:
         return []
@@ -2113,15 +2506,9 @@ def _daily_posts_for_scoring(symbol: str, trade_date: str) -> List[Dict[str, Any
     if df.empty:
         return []
     rows: List[Dict[str, Any]] = []
-    seen_keys = set()
     for row in df.to_dict(orient="records"):
-        content = str(row.get("content") or "").strip()
-        if _is_low_value_event_text(content):
-            continue
-        dedupe_key = re.sub(r"\s+", "", content[:80])
-        if not dedupe_key or dedupe_key in seen_keys:
+        if int(row.get("is_low_value") or 0) or int(row.get("is_spam") or 0) or int(row.get("is_duplicate") or 0):
             continue
-        seen_keys.add(dedupe_key)
         item = dict(row)
         item["candidate_score"] = _score_candidate_value(item)
         rows.append(item)
@@ -2320,6 +2707,8 @@ def build_overview_v2(symbol: str, window: str = "5d") -> Dict[str, Any]:
     post_count = int(sum(int(item.get("post_count") or 0) for item in rows))
     reply_count_sum = int(sum(int(item.get("reply_count_sum") or 0) for item in rows))
     read_count_sum = int(sum(int(item.get("read_count_sum") or 0) for item in rows))
+    bull_count = int(sum(int(item.get("bull_count") or 0) for item in rows))
+    bear_count = int(sum(int(item.get("bear_count") or 0) for item in rows))
     latest_heat_row = next((item for item in reversed(rows) if item.get("relative_heat_index") is not None), rows[-1] if rows else None)
     relative_heat = latest_heat_row.get("relative_heat_index") if latest_heat_row else None
     relative_label = latest_heat_row.get("relative_heat_label") if latest_heat_row else "基线不足"
@@ -2342,6 +2731,8 @@ def build_overview_v2(symbol: str, window: str = "5d") -> Dict[str, Any]:
         "post_count": post_count,
         "reply_count_sum": reply_count_sum,
         "read_count_sum": read_count_sum,
+        "bull_count": bull_count,
+        "bear_count": bear_count,
         "relative_heat_index": relative_heat,
         "relative_heat_label": relative_label,
         "coverage_status": coverage_status,
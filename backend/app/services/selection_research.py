@@ -1,3 +1,4 @@
+import hashlib
 import json
 import math
 import os
@@ -6,11 +7,14 @@ from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
 from backend.app.core.config import DB_FILE, USER_DB_FILE, candidate_atomic_db_paths
 from backend.app.core.calendar import TradeCalendar
+from backend.app.db.sql_predicates import day_range_bounds, next_day
 from backend.app.db.selection_db import (
+    apply_feature_refresh,
     create_backtest_run,
     ensure_selection_schema,
     fail_backtest_run,
@@ -21,9 +25,9 @@ from backend.app.db.selection_db import (
     query_candidates,
     query_feature_profile,
     query_feature_profile_on_or_before,
+    query_feature_snapshots,
+    query_input_fingerprints,
     replace_backtest_results,
-    replace_feature_rows,
-    replace_signal_rows,
 )
 
 FEATURE_VERSION = "selection_features_v1"
@@ -37,6 +41,9 @@ DEFAULT_SELECTION_UNIVERSE_PREFIXES = tuple(
 )
 DEFAULT_SELECTION_UNIVERSE_LABEL = "沪深A（默认排除科创板/北交所）"
 SELECTION_AUTO_REFRESH_ON_READ = os.getenv("SELECTION_AUTO_REFRESH_ON_READ", "false").strip().lower() in {"1", "true", "yes", "on"}
+# 特征最长回看窗口（ma60 / low60 / high60 按行滚动）：某行输入变化最多影响其后 60 行（含当行）的特征
+FEATURE_LOOKBACK_ROWS = 60
+_FINGERPRINT_TEXT_COLUMNS = ("symbol", "name")
 
 
 @dataclass
@@ -46,6 +53,9 @@ class RefreshResult:
     source_snapshot: str
     feature_rows: int
     signal_rows: int
+    mode: str = "full"
+    target_rows: int = 0
+    reused_rows: int = 0
 
 
 def _main_connection() -> sqlite3.Connection:
@@ -80,42 +90,21 @@ def _dominant_signature(conn: sqlite3.Connection) -> str:
     return str(row[0]) if row and row[0] else "fixed_200k_1m_v1"
 
 
-def _source_snapshot(conn: sqlite3.Connection, start_date: str, end_date: str) -> str:
+def _source_snapshot(start_date: str, end_date: str, fingerprint_df: pd.DataFrame) -> str:
+    """目标区间的确定性快照：由区间内每行的窗口指纹汇总而成，输入不变则快照不变。"""
+    digest = hashlib.sha1()
+    if not fingerprint_df.empty:
+        ordered = fingerprint_df.sort_values(["symbol", "trade_date"])
+        lines = ordered["symbol"] + "|" + ordered["trade_date"] + "|" + ordered["window_fingerprint"]
+        digest.update("\n".join(lines.tolist()).encode("utf-8"))
     payload = {
-        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "feature_version": FEATURE_VERSION,
         "start_date": start_date,
         "end_date": end_date,
+        "row_count": int(len(fingerprint_df)),
+        "symbol_count": int(fingerprint_df["symbol"].nunique()) if not fingerprint_df.empty else 0,
+        "input_digest": digest.hexdigest(),
     }
-    for table, date_col in [
-        ("local_history", "date"),
-        ("history_daily_l2", "date"),
-        ("history_5m_l2", "source_date"),
-        ("atomic_trade_daily", "trade_date"),
-        ("atomic_trade_5m", "trade_date"),
-        ("sentiment_events", "substr(pub_time,1,10)"),
-    ]:
-        try:
-            if table.startswith("atomic_"):
-                atomic_conn = _atomic_connection()
-                if atomic_conn is None:
-                    raise RuntimeError("atomic db unavailable")
-                try:
-                    row = atomic_conn.execute(
-                        f"SELECT MIN({date_col}) AS min_date, MAX({date_col}) AS max_date, COUNT(*) AS row_count FROM {table}"
-                    ).fetchone()
-                finally:
-                    atomic_conn.close()
-            else:
-                row = conn.execute(
-                    f"SELECT MIN({date_col}) AS min_date, MAX({date_col}) AS max_date, COUNT(*) AS row_count FROM {table}"
-                ).fetchone()
-            payload[table] = {
-                "min_date": row[0] if row else None,
-                "max_date": row[1] if row else None,
-                "row_count": int(row[2] or 0) if row else 0,
-            }
-        except Exception:
-            payload[table] = {"min_date": None, "max_date": None, "row_count": 0}
     return json.dumps(payload, ensure_ascii=False, sort_keys=True)
 
 
@@ -375,11 +364,11 @@ def _load_sentiment_events(conn: sqlite3.Connection, start_date: str, end_date:
             """
             SELECT symbol, substr(pub_time, 1, 10) AS trade_date, COUNT(*) AS event_count
             FROM sentiment_events
-            WHERE substr(pub_time, 1, 10) >= ? AND substr(pub_time, 1, 10) <= ?
+            WHERE pub_time >= ? AND pub_time < ?
             GROUP BY symbol, substr(pub_time, 1, 10)
             """,
             conn,
-            params=(start_date, end_date),
+            params=day_range_bounds(start_date, end_date),
         )
     except Exception:
         return pd.DataFrame()
@@ -492,17 +481,15 @@ def _risk_level(distribution_score: Optional[float]) -> str:
     return "低"
 
 
-def _compute_feature_frame(
+def _merge_feature_inputs(
     daily_df: pd.DataFrame,
     l2_daily_df: pd.DataFrame,
     l2_5m_df: pd.DataFrame,
     sentiment_events_df: pd.DataFrame,
     sentiment_scores_df: pd.DataFrame,
     meta_df: pd.DataFrame,
-    target_start_date: str,
-    target_end_date: str,
-    source_snapshot: str,
 ) -> pd.DataFrame:
+    """把各输入源按 (symbol, trade_date) 拼成一张按 symbol/trade_date 排序的输入宽表。"""
     if daily_df.empty:
         return pd.DataFrame()
 
@@ -548,7 +535,56 @@ def _compute_feature_frame(
     else:
         df["name"] = df["symbol"]
         df["market_cap"] = pd.NA
+    return df.sort_values(["symbol", "trade_date"]).reset_index(drop=True)
+
+
+def _input_fingerprint_frame(input_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    每个 (symbol, trade_date) 的输入指纹与窗口指纹。
+
+    input_fingerprint 是该行全部输入列的哈希；window_fingerprint 是该行及其前 FEATURE_LOOKBACK_ROWS-1 行
+    input 哈希的模 2^64 和——覆盖了这一行特征依赖的全部输入。某天输入变化、插入或删除，
+    都会让其后回看窗口内各行的窗口指纹变化，从而只重算这些行。
+    """
+    if input_df.empty:
+        return pd.DataFrame(columns=["symbol", "trade_date", "input_fingerprint", "window_fingerprint", "row_pos"])
+    canonical = pd.DataFrame(index=input_df.index)
+    for col in sorted(input_df.columns):
+        if col == "trade_date":
+            canonical[col] = input_df[col].dt.strftime("%Y-%m-%d")
+        elif col in _FINGERPRINT_TEXT_COLUMNS:
+            canonical[col] = input_df[col].astype(object).where(input_df[col].notna(), "").astype(str)
+        else:
+            canonical[col] = pd.to_numeric(input_df[col], errors="coerce").astype("float64")
+    row_hash = pd.util.hash_pandas_object(canonical, index=False).to_numpy(dtype=np.uint64)
+
+    symbols = input_df["symbol"].astype(str)
+    row_pos = symbols.groupby(symbols, sort=False).cumcount().to_numpy()
+    prefix = np.concatenate([np.zeros(1, dtype=np.uint64), np.cumsum(row_hash, dtype=np.uint64)])
+    idx = np.arange(len(row_hash))
+    window_rows = np.minimum(row_pos + 1, FEATURE_LOOKBACK_ROWS)
+    window_hash = prefix[idx + 1] - prefix[idx + 1 - window_rows]
+    return pd.DataFrame(
+        {
+            "symbol": symbols.to_numpy(),
+            "trade_date": canonical["trade_date"].to_numpy(),
+            "input_fingerprint": [f"{value:016x}" for value in row_hash.tolist()],
+            "window_fingerprint": [f"{value:016x}" for value in window_hash.tolist()],
+            "row_pos": row_pos,
+        }
+    )
+
 
+def _compute_feature_frame(
+    input_df: pd.DataFrame,
+    target_start_date: str,
+    target_end_date: str,
+    source_snapshot: str,
+) -> pd.DataFrame:
+    if input_df.empty:
+        return pd.DataFrame()
+
+    df = input_df
     feature_frames: List[pd.DataFrame] = []
     for symbol, group in df.groupby("symbol", sort=False):
         g = group.sort_values("trade_date").copy()
@@ -725,7 +761,101 @@ def _compute_signal_frame(feature_df: pd.DataFrame) -> pd.DataFrame:
     return pd.DataFrame(signal_rows)
 
 
-def refresh_selection_research(start_date: Optional[str] = None, end_date: Optional[str] = None) -> RefreshResult:
+_FEATURE_FLOAT_COLUMNS = (
+    "prev_close", "daily_return_pct", "return_3d_pct", "return_5d_pct", "return_10d_pct", "return_20d_pct",
+    "volatility_10d", "volatility_20d", "ma20", "ma60", "dist_ma20_pct", "dist_ma60_pct",
+    "price_position_20d", "price_position_60d", "breakout_vs_prev20_high_pct",
+    "net_inflow_5d", "net_inflow_10d", "net_inflow_20d",
+    "positive_inflow_ratio_5d", "positive_inflow_ratio_10d", "positive_inflow_ratio_20d",
+    "main_activity_20d", "activity_ratio_5d", "activity_ratio_20d",
+    "l1_main_net_3d", "l2_main_net_3d", "l2_vs_l1_strength",
+)
+_FEATURE_L2_FLOAT_COLUMNS = (
+    "l2_add_buy_3d", "l2_add_sell_3d", "l2_cancel_buy_3d", "l2_cancel_sell_3d", "l2_cvd_3d", "l2_oib_3d",
+    "sentiment_event_count_5d", "sentiment_event_count_20d", "sentiment_heat_ratio",
+    "sentiment_score", "market_cap",
+)
+_SIGNAL_FLOAT_COLUMNS = (
+    "stealth_reason_strength", "breakout_reason_strength", "distribution_reason_strength",
+    "l2_confirm_bonus", "heat_risk_score", "price_extension_score", "inflow_quality_score",
+    "outflow_pressure_score", "sentiment_heat_score", "l2_distribution_score",
+)
+
+
+def _nullable_floats(df: pd.DataFrame, column: str) -> List[Optional[float]]:
+    if column not in df.columns:
+        return [None] * len(df)
+    values = pd.to_numeric(df[column], errors="coerce").astype("float64").tolist()
+    return [None if value != value else value for value in values]
+
+
+def _ints_or_zero(df: pd.DataFrame, column: str) -> List[int]:
+    if column not in df.columns:
+        return [0] * len(df)
+    return pd.to_numeric(df[column], errors="coerce").fillna(0).astype("int64").tolist()
+
+
+def _feature_row_tuples(feature_df: pd.DataFrame) -> List[Tuple]:
+    """按列批量转换成 selection_feature_daily 写入元组，替代逐行 iterrows。"""
+    if feature_df.empty:
+        return []
+    symbols = feature_df["symbol"].astype(str)
+    names = feature_df["name"].astype(object).where(feature_df["name"].notna(), None) if "name" in feature_df.columns else pd.Series(None, index=feature_df.index)
+    name_values = [str(name) if name not in (None, "") else symbol for name, symbol in zip(names.tolist(), symbols.tolist())]
+    columns = [
+        symbols.tolist(),
+        feature_df["trade_date"].astype(str).tolist(),
+        [FEATURE_VERSION] * len(feature_df),
+        feature_df["source_snapshot"].astype(str).tolist(),
+        pd.to_numeric(feature_df["close"], errors="coerce").astype("float64").tolist(),
+        *[_nullable_floats(feature_df, col) for col in _FEATURE_FLOAT_COLUMNS],
+        _ints_or_zero(feature_df, "l2_order_event_available"),
+        *[_nullable_floats(feature_df, col) for col in _FEATURE_L2_FLOAT_COLUMNS],
+        name_values,
+    ]
+    return list(zip(*columns))
+
+
+def _signal_row_tuples(signal_df: pd.DataFrame) -> List[Tuple]:
+    if signal_df.empty:
+        return []
+    columns = [
+        signal_df["symbol"].astype(str).tolist(),
+        signal_df["trade_date"].astype(str).tolist(),
+        [FEATURE_VERSION] * len(signal_df),
+        [STRATEGY_VERSION] * len(signal_df),
+        signal_df["source_snapshot"].astype(str).tolist(),
+        signal_df["stealth_score"].astype("float64").tolist(),
+        signal_df["stealth_signal"].astype("int64").tolist(),
+        signal_df["breakout_score"].astype("float64").tolist(),
+        signal_df["confirm_signal"].astype("int64").tolist(),
+        signal_df["distribution_score"].astype("float64").tolist(),
+        signal_df["exit_signal"].astype("int64").tolist(),
+        *[_nullable_floats(signal_df, col) for col in _SIGNAL_FLOAT_COLUMNS],
+    ]
+    return list(zip(*columns))
+
+
+def _dirty_input_slice(input_df: pd.DataFrame, fingerprint_df: pd.DataFrame, dirty_mask: pd.Series) -> pd.DataFrame:
+    """只保留含脏行的个股，并从最早脏行往前多留一个回看窗口，保证重算结果与全量计算一致。"""
+    dirty = fingerprint_df.loc[dirty_mask.to_numpy(), ["symbol", "row_pos"]]
+    first_dirty = dirty.groupby("symbol", sort=False)["row_pos"].min() - (FEATURE_LOOKBACK_ROWS - 1)
+    keep_from = fingerprint_df["symbol"].map(first_dirty)
+    keep = keep_from.notna() & (fingerprint_df["row_pos"] >= keep_from)
+    return input_df.loc[keep.to_numpy()]
+
+
+def refresh_selection_research(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    incremental: bool = True,
+) -> RefreshResult:
+    """
+    生成/刷新目标区间的特征与信号。
+
+    incremental=True 时按 (symbol, trade_date) 的窗口指纹比对已落库结果：只重算输入变化的行及其
+    回看窗口内的后续行；指纹全部一致且快照相同时直接复用，不写库。incremental=False 为全量重算。
+    """
     ensure_selection_schema()
     with _main_connection() as conn:
         min_date, max_date = _available_selection_history_bounds(conn)
@@ -734,7 +864,6 @@ def refresh_selection_research(start_date: Optional[str] = None, end_date: Optio
         resolved_end = _coerce_date(end_date) or max_date
         resolved_start = _coerce_date(start_date) or min_date
         padded_start = max(min_date, _history_padding_start(resolved_start, days=150))
-        source_snapshot = _source_snapshot(conn, resolved_start, resolved_end)
         local_history_df = _load_local_history(conn, padded_start, resolved_end)
         l2_daily_df = _load_l2_daily(conn, padded_start, resolved_end)
         l2_5m_df = _load_l2_5m_daily(conn, padded_start, resolved_end)
@@ -742,103 +871,83 @@ def refresh_selection_research(start_date: Optional[str] = None, end_date: Optio
         sentiment_scores_df = _load_sentiment_scores(conn, padded_start, resolved_end)
         meta_df = _load_stock_meta(conn)
 
-    feature_df = _compute_feature_frame(
+    input_df = _merge_feature_inputs(
         local_history_df,
         l2_daily_df,
         l2_5m_df,
         sentiment_events_df,
         sentiment_scores_df,
         meta_df,
-        resolved_start,
-        resolved_end,
-        source_snapshot,
     )
+    fingerprint_df = _input_fingerprint_frame(input_df)
+    target_mask = (fingerprint_df["trade_date"] >= resolved_start) & (fingerprint_df["trade_date"] <= resolved_end)
+    target_count = int(target_mask.sum())
+    source_snapshot = _source_snapshot(resolved_start, resolved_end, fingerprint_df.loc[target_mask])
+
+    mode = "incremental" if incremental else "full"
+    if incremental:
+        stored = query_input_fingerprints(resolved_start, resolved_end, FEATURE_VERSION)
+        keys = list(zip(fingerprint_df["symbol"].tolist(), fingerprint_df["trade_date"].tolist()))
+        previous = pd.Series([stored.get(key) for key in keys], index=fingerprint_df.index, dtype=object)
+        dirty_mask = target_mask & (previous != fingerprint_df["window_fingerprint"])
+    else:
+        dirty_mask = target_mask
+    dirty_count = int(dirty_mask.sum())
+
+    if incremental and dirty_count == 0:
+        snapshots = query_feature_snapshots(resolved_start, resolved_end, FEATURE_VERSION)
+        if set(snapshots) <= {source_snapshot}:
+            return RefreshResult(
+                start_date=resolved_start,
+                end_date=resolved_end,
+                source_snapshot=source_snapshot,
+                feature_rows=0,
+                signal_rows=0,
+                mode="reused",
+                target_rows=target_count,
+                reused_rows=target_count,
+            )
+
+    feature_df = pd.DataFrame()
+    if dirty_count:
+        compute_df = input_df if not incremental else _dirty_input_slice(input_df, fingerprint_df, dirty_mask)
+        feature_df = _compute_feature_frame(compute_df, resolved_start, resolved_end, source_snapshot)
+        if incremental and not feature_df.empty:
+            dirty_keys = fingerprint_df.loc[dirty_mask, ["symbol", "trade_date"]]
+            feature_df = feature_df.merge(dirty_keys, on=["symbol", "trade_date"], how="inner")
     signal_df = _compute_signal_frame(feature_df)
 
-    feature_rows = [
-        (
-            str(row["symbol"]),
-            str(row["trade_date"]),
-            FEATURE_VERSION,
-            str(row["source_snapshot"]),
-            float(row["close"]),
-            _float_or_none(row.get("prev_close")),
-            _float_or_none(row.get("daily_return_pct")),
-            _float_or_none(row.get("return_3d_pct")),
-            _float_or_none(row.get("return_5d_pct")),
-            _float_or_none(row.get("return_10d_pct")),
-            _float_or_none(row.get("return_20d_pct")),
-            _float_or_none(row.get("volatility_10d")),
-            _float_or_none(row.get("volatility_20d")),
-            _float_or_none(row.get("ma20")),
-            _float_or_none(row.get("ma60")),
-            _float_or_none(row.get("dist_ma20_pct")),
-            _float_or_none(row.get("dist_ma60_pct")),
-            _float_or_none(row.get("price_position_20d")),
-            _float_or_none(row.get("price_position_60d")),
-            _float_or_none(row.get("breakout_vs_prev20_high_pct")),
-            _float_or_none(row.get("net_inflow_5d")),
-            _float_or_none(row.get("net_inflow_10d")),
-            _float_or_none(row.get("net_inflow_20d")),
-            _float_or_none(row.get("positive_inflow_ratio_5d")),
-            _float_or_none(row.get("positive_inflow_ratio_10d")),
-            _float_or_none(row.get("positive_inflow_ratio_20d")),
-            _float_or_none(row.get("main_activity_20d")),
-            _float_or_none(row.get("activity_ratio_5d")),
-            _float_or_none(row.get("activity_ratio_20d")),
-            _float_or_none(row.get("l1_main_net_3d")),
-            _float_or_none(row.get("l2_main_net_3d")),
-            _float_or_none(row.get("l2_vs_l1_strength")),
-            _int_or_zero(row.get("l2_order_event_available")),
-            _float_or_none(row.get("l2_add_buy_3d")),
-            _float_or_none(row.get("l2_add_sell_3d")),
-            _float_or_none(row.get("l2_cancel_buy_3d")),
-            _float_or_none(row.get("l2_cancel_sell_3d")),
-            _float_or_none(row.get("l2_cvd_3d")),
-            _float_or_none(row.get("l2_oib_3d")),
-            _float_or_none(row.get("sentiment_event_count_5d")),
-            _float_or_none(row.get("sentiment_event_count_20d")),
-            _float_or_none(row.get("sentiment_heat_ratio")),
-            _float_or_none(row.get("sentiment_score")),
-            _float_or_none(row.get("market_cap")),
-            str(row.get("name") or row["symbol"]),
-        )
-        for _, row in feature_df.iterrows()
-    ]
-    signal_rows = [
-        (
-            str(row["symbol"]),
-            str(row["trade_date"]),
-            FEATURE_VERSION,
-            STRATEGY_VERSION,
-            str(row["source_snapshot"]),
-            float(row["stealth_score"]),
-            int(row["stealth_signal"]),
-            float(row["breakout_score"]),
-            int(row["confirm_signal"]),
-            float(row["distribution_score"]),
-            int(row["exit_signal"]),
-            _float_or_none(row.get("stealth_reason_strength")),
-            _float_or_none(row.get("breakout_reason_strength")),
-            _float_or_none(row.get("distribution_reason_strength")),
-            _float_or_none(row.get("l2_confirm_bonus")),
-            _float_or_none(row.get("heat_risk_score")),
-            _float_or_none(row.get("price_extension_score")),
-            _float_or_none(row.get("inflow_quality_score")),
-            _float_or_none(row.get("outflow_pressure_score")),
-            _float_or_none(row.get("sentiment_heat_score")),
-            _float_or_none(row.get("l2_distribution_score")),
+    feature_rows = _feature_row_tuples(feature_df)
+    signal_rows = _signal_row_tuples(signal_df)
+    dirty_fingerprints = fingerprint_df.loc[dirty_mask]
+    fingerprint_rows = list(
+        zip(
+            dirty_fingerprints["symbol"].tolist(),
+            dirty_fingerprints["trade_date"].tolist(),
+            [FEATURE_VERSION] * len(dirty_fingerprints),
+            dirty_fingerprints["input_fingerprint"].tolist(),
+            dirty_fingerprints["window_fingerprint"].tolist(),
         )
-        for _, row in signal_df.iterrows()
-    ]
-    replace_feature_rows(feature_rows)
-    replace_signal_rows(signal_rows)
+    )
+    apply_feature_refresh(
+        feature_rows,
+        signal_rows,
+        fingerprint_rows,
+        FEATURE_VERSION,
+        STRATEGY_VERSION,
+        resolved_start,
+        resolved_end,
+        source_snapshot,
+    )
     return RefreshResult(
         start_date=resolved_start,
         end_date=resolved_end,
         source_snapshot=source_snapshot,
         feature_rows=len(feature_rows),
         signal_rows=len(signal_rows),
+        mode=mode,
+        target_rows=target_count,
+        reused_rows=target_count - dirty_count,
     )
 
 
@@ -1050,11 +1159,11 @@ def _query_recent_event_timeline(symbol: str, trade_date: str, limit: int = 12)
                 """
                 SELECT event_type, source, content, author_name, pub_time
                 FROM sentiment_events
-                WHERE symbol = ? AND substr(pub_time, 1, 10) <= ?
+                WHERE symbol = ? AND pub_time < ?
                 ORDER BY pub_time DESC
                 LIMIT ?
                 """,
-                (symbol, trade_date, int(limit)),
+                (symbol, next_day(trade_date), int(limit)),
             ).fetchall()
             timeline.extend(
                 {
@@ -1074,11 +1183,11 @@ def _query_recent_event_timeline(symbol: str, trade_date: str, limit: int = 12)
                 """
                 SELECT source, source_type, event_subtype, title, published_at
                 FROM stock_events
-                WHERE symbol = ? AND substr(published_at, 1, 10) <= ?
+                WHERE symbol = ? AND published_at < ?
                 ORDER BY published_at DESC
                 LIMIT ?
                 """,
-                (symbol, trade_date, int(limit)),
+                (symbol, next_day(trade_date), int(limit)),
             ).fetchall()
             timeline.extend(
                 {
@@ -1467,6 +1576,12 @@ def run_selection_backtest(
             "win_rate_definition": "固定持有到期收益>0",
             "opportunity_definition": "持有窗口内最高涨幅>0",
             "source_snapshot": json.loads(refresh_result.source_snapshot),
+            "feature_refresh": {
+                "mode": refresh_result.mode,
+                "target_rows": refresh_result.target_rows,
+                "reused_rows": refresh_result.reused_rows,
+                "recomputed_rows": refresh_result.feature_rows,
+            },
         }
         replace_backtest_results(run_id, trades, summary_rows, json.dumps(summary_payload, ensure_ascii=False), "done")
         return get_backtest_run(run_id) or {"run": {"id": run_id}, "summaries": [], "trades": []}
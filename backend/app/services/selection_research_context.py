@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from backend.app.db.database import get_db_connection
+from backend.app.db.sql_predicates import day_range_bounds, next_day
 from backend.app.services.selection_research import get_profile as get_legacy_profile
 from backend.app.services.selection_stable_callback import (
     STRATEGY_INTERNAL_ID as STABLE_CALLBACK_STRATEGY_ID,
@@ -441,7 +442,7 @@ def _query_stock_event_feed(symbol: str, cutoff_date: str, limit: int = 50, days
         return {"items": [], "coverage_status": "uncovered", "latest_event_time": None}
     start_date = _window_start(cutoff_date, days)
     placeholders = ",".join(["?"] * len(candidates))
-    params: List[Any] = list(candidates) + [start_date, cutoff_date, int(limit)]
+    params: List[Any] = list(candidates) + [*day_range_bounds(start_date, cutoff_date), int(limit)]
     with _set_row_factory(get_db_connection()) as conn:
         if not _table_exists(conn, "stock_events"):
             return {"items": [], "coverage_status": "table_missing", "latest_event_time": None}
@@ -453,8 +454,8 @@ def _query_stock_event_feed(symbol: str, cutoff_date: str, limit: int = 50, days
             FROM stock_events
             WHERE symbol IN ({placeholders})
               AND published_at IS NOT NULL
-              AND substr(published_at, 1, 10) >= ?
-              AND substr(published_at, 1, 10) <= ?
+              AND published_at >= ?
+              AND published_at < ?
             ORDER BY published_at DESC, updated_at DESC
             LIMIT ?
             """,
@@ -466,9 +467,9 @@ def _query_stock_event_feed(symbol: str, cutoff_date: str, limit: int = 50, days
             FROM stock_events
             WHERE symbol IN ({placeholders})
               AND published_at IS NOT NULL
-              AND substr(published_at, 1, 10) <= ?
+              AND published_at < ?
             """,
-            tuple(list(candidates) + [cutoff_date]),
+            tuple(list(candidates) + [next_day(cutoff_date)]),
         ).fetchone()
     items = []
     for row in rows:
@@ -525,11 +526,11 @@ def _query_stock_event_coverage(symbol: str, cutoff_date: str, days: int = 365)
             FROM stock_events
             WHERE symbol IN ({placeholders})
               AND published_at IS NOT NULL
-              AND substr(published_at, 1, 10) >= ?
-              AND substr(published_at, 1, 10) <= ?
+              AND published_at >= ?
+              AND published_at < ?
             GROUP BY source_type
             """,
-            tuple(list(candidates) + [start_date, cutoff_date]),
+            tuple(list(candidates) + list(day_range_bounds(start_date, cutoff_date))),
         ).fetchall()
         source_rows = conn.execute(
             f"""
@@ -537,12 +538,12 @@ def _query_stock_event_coverage(symbol: str, cutoff_date: str, days: int = 365)
             FROM stock_events
             WHERE symbol IN ({placeholders})
               AND published_at IS NOT NULL
-              AND substr(published_at, 1, 10) >= ?
-              AND substr(published_at, 1, 10) <= ?
+              AND published_at >= ?
+              AND published_at < ?
             GROUP BY source
             ORDER BY total_count DESC, source ASC
             """,
-            tuple(list(candidates) + [start_date, cutoff_date]),
+            tuple(list(candidates) + list(day_range_bounds(start_date, cutoff_date))),
         ).fetchall()
         alias_count = 0
         if _table_exists(conn, "stock_symbol_aliases"):
@@ -1303,11 +1304,11 @@ def _query_sentiment_snapshot(symbol: str, cutoff_date: str, limit: int = 10) ->
                 FROM sentiment_events
                 WHERE symbol IN ({placeholders})
                   AND pub_time IS NOT NULL
-                  AND substr(pub_time, 1, 10) <= ?
+                  AND pub_time < ?
                 ORDER BY pub_time DESC
                 LIMIT ?
                 """,
-                tuple(list(candidates) + [cutoff_date, int(limit)]),
+                tuple(list(candidates) + [next_day(cutoff_date), int(limit)]),
             ).fetchall()
             recent_events = [_as_row_dict(row) or {} for row in rows]
     return {
@@ -2,12 +2,17 @@ from __future__ import annotations
 
 import os
 import sqlite3
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
 from dataclasses import asdict, dataclass
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
 from backend.app.core.config import DB_FILE, USER_DB_FILE, candidate_atomic_db_paths
+from backend.app.db.sql_predicates import symbol_case_variants
 
 DEFAULT_MARKET_DATA_ROOT = "/Users/dong/Desktop/AIGC/market-data"
 DEFAULT_FORMAL_MAIN_DB = os.path.join(DEFAULT_MARKET_DATA_ROOT, "market_data.db")
@@ -18,6 +23,7 @@ DEFAULT_FORMAL_ATOMIC_DB = os.path.join(
     "market_atomic_mainboard_full_reverse.db",
 )
 STRATEGY_VERSION_V2 = "selection_strategy_v2_lifecycle"
+V2_METRICS_CACHE_MAX_ENTRIES = int(os.getenv("SELECTION_V2_METRICS_CACHE_ENTRIES", "4"))
 THEME_KEYWORDS: Dict[str, tuple[str, ...]] = {
     "算力": ("算力", "服务器", "租赁", "gpu", "a800", "智算", "数据中心"),
     "AI": ("ai", "人工智能", "大模型", "训练", "推理"),
@@ -193,10 +199,10 @@ def load_atomic_daily_window(
     conditions = ["t.trade_date >= ?", "t.trade_date <= ?"]
     params: List[Any] = [start_date, end_date]
     if symbols:
-        normalized = [str(symbol).strip().lower() for symbol in symbols if str(symbol).strip()]
-        placeholders = ",".join("?" for _ in normalized)
-        conditions.append(f"lower(t.symbol) IN ({placeholders})")
-        params.extend(normalized)
+        variants = symbol_case_variants(symbols)
+        placeholders = ",".join("?" for _ in variants)
+        conditions.append(f"t.symbol IN ({placeholders})")
+        params.extend(variants)
     where = " AND ".join(conditions)
     sql = f"""
         SELECT
@@ -282,58 +288,148 @@ def load_atomic_daily_window(
     return df
 
 
+_metrics_cache: "OrderedDict[Tuple, pd.DataFrame]" = OrderedDict()
+_metrics_cache_lock = threading.Lock()
+_metrics_cache_stats = {"hits": 0, "misses": 0}
+
+
+# 主库头 offset 24 是 file change counter（rollback 模式每次提交 +1）；
+# WAL 头 offset 12..24 是 checkpoint 序号与 salt（每轮 WAL 重置都会变）
+_DB_HEADER_SLICES = ((24, 4), (12, 12))
+
+
+def _db_file_signature(db_path: str) -> Tuple:
+    """
+    库文件与 WAL 的 (mtime_ns, size, 头部计数)；未 checkpoint 的写入只落在 -wal，也要算进缓存键。
+    mtime 粒度较粗、写入又没改变文件大小时，仅靠 (mtime, size) 会漏掉变化，因此再读头部计数。
+    """
+    parts: List[Optional[Tuple[int, int, bytes]]] = []
+    for path, (offset, length) in zip((db_path, f"{db_path}-wal"), _DB_HEADER_SLICES):
+        try:
+            stat = os.stat(path)
+            with open(path, "rb") as fh:
+                fh.seek(offset)
+                header = fh.read(length)
+        except OSError:
+            parts.append(None)
+            continue
+        parts.append((stat.st_mtime_ns, stat.st_size, header))
+    return tuple(parts)
+
+
+def load_v2_metrics_panel(
+    start_date: str,
+    end_date: str,
+    *,
+    symbols: Optional[Sequence[str]] = None,
+    db_path: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    load_atomic_daily_window + compute_v2_metrics 的缓存版本，键为 (库文件 mtime, 日期区间, symbols)。
+
+    返回的面板在多次调用间共享，调用方只读；需要改列时先 copy。
+    """
+    resolved_path = os.path.abspath(db_path or resolve_selection_v2_atomic_db_path())
+    symbol_key = tuple(sorted({str(symbol).strip().lower() for symbol in symbols if str(symbol).strip()})) if symbols else None
+    key = (resolved_path, _db_file_signature(resolved_path), start_date, end_date, symbol_key)
+    if V2_METRICS_CACHE_MAX_ENTRIES > 0:
+        with _metrics_cache_lock:
+            cached = _metrics_cache.get(key)
+            if cached is not None:
+                _metrics_cache.move_to_end(key)
+                _metrics_cache_stats["hits"] += 1
+                return cached
+            _metrics_cache_stats["misses"] += 1
+    metrics_df = compute_v2_metrics(load_atomic_daily_window(start_date, end_date, symbols=symbols, db_path=resolved_path))
+    if V2_METRICS_CACHE_MAX_ENTRIES > 0:
+        with _metrics_cache_lock:
+            _metrics_cache[key] = metrics_df
+            _metrics_cache.move_to_end(key)
+            while len(_metrics_cache) > V2_METRICS_CACHE_MAX_ENTRIES:
+                _metrics_cache.popitem(last=False)
+    return metrics_df
+
+
+def clear_v2_metrics_cache() -> None:
+    with _metrics_cache_lock:
+        _metrics_cache.clear()
+
+
+def get_v2_metrics_cache_stats() -> Dict[str, int]:
+    with _metrics_cache_lock:
+        return {**_metrics_cache_stats, "entries": len(_metrics_cache)}
+
+
+def _group_shift(values: pd.Series, keys: np.ndarray, periods: int) -> pd.Series:
+    return values.groupby(keys, sort=False).shift(periods)
+
+
+def _group_rolling(values: pd.Series, keys: np.ndarray, window: int, min_periods: int, how: str) -> pd.Series:
+    """按 symbol 分组的按行滚动；全体 symbol 一次 cython 调用，窗口不跨组，结果与逐组 rolling 一致。"""
+    rolled = getattr(values.groupby(keys, sort=False).rolling(window, min_periods=min_periods), how)()
+    return pd.Series(rolled.to_numpy(), index=values.index)
+
+
+# compute_v2_metrics 单行最多依赖的前序行数（60 行 rolling 最远回看 59 行）：
+# 某行之前同股票行数不少于此数时，指标与输入窗口从哪天开始无关
+V2_METRICS_HISTORY_ROWS = 59
+
+
 def compute_v2_metrics(raw_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    全市场面板一次性计算 v2 指标：按 (symbol, trade_date) 排序一次，shift / rolling 全部走分组向量化。
+
+    symbol 保持首次出现顺序、组内按 trade_date 升序，列与逐组计算版本一致。
+    """
     if raw_df.empty:
         return raw_df.copy()
-    feature_frames: List[pd.DataFrame] = []
-    for _, group in raw_df.groupby("symbol", sort=False):
-        g = group.sort_values("trade_date").copy()
-        g["prev_close"] = g["close"].shift(1)
-        g["return_1d_pct"] = ((g["close"] / g["prev_close"]) - 1.0) * 100.0
-        g["return_3d_pct"] = ((g["close"] / g["close"].shift(3)) - 1.0) * 100.0
-        g["return_5d_pct"] = ((g["close"] / g["close"].shift(5)) - 1.0) * 100.0
-        g["return_10d_pct"] = ((g["close"] / g["close"].shift(10)) - 1.0) * 100.0
-        g["return_20d_pct"] = ((g["close"] / g["close"].shift(20)) - 1.0) * 100.0
-        g["amount_ma20"] = g["total_amount"].rolling(20, min_periods=5).mean()
-        g["volume_ma20"] = g["total_volume"].rolling(20, min_periods=5).mean()
-        g["trade_count_ma20"] = g["trade_count"].rolling(20, min_periods=5).mean()
-        g["amount_anomaly_20d"] = _safe_ratio(g["total_amount"], g["amount_ma20"])
-        g["volume_anomaly_20d"] = _safe_ratio(g["total_volume"], g["volume_ma20"])
-        g["trade_count_anomaly_20d"] = _safe_ratio(g["trade_count"], g["trade_count_ma20"])
-        prev20_high = g["close"].shift(1).rolling(20, min_periods=5).max()
-        recent20_high = g["close"].rolling(20, min_periods=5).max()
-        g["breakout_vs_prev20_high_pct"] = ((g["close"] / prev20_high) - 1.0) * 100.0
-        g["max_drawdown_from_20d_high_pct"] = ((g["close"] / recent20_high) - 1.0) * 100.0
-        low20 = g["close"].rolling(20, min_periods=5).min()
-        low60 = g["close"].rolling(60, min_periods=10).min()
-        high20 = g["close"].rolling(20, min_periods=5).max()
-        high60 = g["close"].rolling(60, min_periods=10).max()
-        g["price_position_20d"] = _safe_ratio(g["close"] - low20, (high20 - low20))
-        g["price_position_60d"] = _safe_ratio(g["close"] - low60, (high60 - low60))
-        g["l2_main_net_ratio"] = _safe_ratio(g["l2_main_net_amount"], g["total_amount"])
-        g["l2_super_net_ratio"] = _safe_ratio(g["l2_super_net_amount"], g["total_amount"])
-        g["l1_l2_divergence"] = g["l2_main_net_amount"] - g["l1_main_net_amount"]
-        g["main_net_3d"] = g["l2_main_net_amount"].rolling(3, min_periods=1).sum()
-        g["super_net_3d"] = g["l2_super_net_amount"].rolling(3, min_periods=1).sum()
-        g["main_net_5d"] = g["l2_main_net_amount"].rolling(5, min_periods=1).sum()
-        g["super_net_5d"] = g["l2_super_net_amount"].rolling(5, min_periods=1).sum()
-        g["active_buy_strength"] = g["l2_buy_ratio"] - g["l2_sell_ratio"]
-        positive_total = g["positive_l2_net_bar_count"] + g["negative_l2_net_bar_count"]
-        g["positive_l2_bar_ratio"] = _safe_ratio(g["positive_l2_net_bar_count"], positive_total)
-        g["order_imbalance_ratio"] = _safe_ratio(g["oib_delta_amount"], g["total_amount"])
-        g["cvd_ratio"] = _safe_ratio(g["cvd_delta_amount"], g["total_amount"])
-        g["add_buy_ratio"] = _safe_ratio(g["add_buy_amount"], g["total_amount"])
-        g["add_sell_ratio"] = _safe_ratio(g["add_sell_amount"], g["total_amount"])
-        g["cancel_buy_ratio"] = _safe_ratio(g["cancel_buy_amount"], g["total_amount"])
-        g["cancel_sell_ratio"] = _safe_ratio(g["cancel_sell_amount"], g["total_amount"])
-        g["support_pressure_spread"] = g["buy_support_ratio"] - g["sell_pressure_ratio"]
-        g["prior_3d_min_return_1d_pct"] = g["return_1d_pct"].shift(1).rolling(3, min_periods=1).min()
-        g["prior_3d_min_l2_main_net"] = g["l2_main_net_amount"].shift(1).rolling(3, min_periods=1).min()
-        g["prior_3d_min_l2_super_net"] = g["l2_super_net_amount"].shift(1).rolling(3, min_periods=1).min()
-        feature_frames.append(g)
-    metrics_df = pd.concat(feature_frames, ignore_index=True)
-    metrics_df["trade_date"] = pd.to_datetime(metrics_df["trade_date"]).dt.strftime("%Y-%m-%d")
-    return metrics_df
+    symbol_codes, _ = pd.factorize(raw_df["symbol"], sort=False)
+    order = np.lexsort((raw_df["trade_date"].to_numpy(), symbol_codes))
+    g = raw_df.iloc[order].reset_index(drop=True)
+    keys = symbol_codes[order]
+    close = g["close"]
+
+    g["prev_close"] = _group_shift(close, keys, 1)
+    g["return_1d_pct"] = ((close / g["prev_close"]) - 1.0) * 100.0
+    for days in (3, 5, 10, 20):
+        g[f"return_{days}d_pct"] = ((close / _group_shift(close, keys, days)) - 1.0) * 100.0
+    g["amount_ma20"] = _group_rolling(g["total_amount"], keys, 20, 5, "mean")
+    g["volume_ma20"] = _group_rolling(g["total_volume"], keys, 20, 5, "mean")
+    g["trade_count_ma20"] = _group_rolling(g["trade_count"], keys, 20, 5, "mean")
+    g["amount_anomaly_20d"] = _safe_ratio(g["total_amount"], g["amount_ma20"])
+    g["volume_anomaly_20d"] = _safe_ratio(g["total_volume"], g["volume_ma20"])
+    g["trade_count_anomaly_20d"] = _safe_ratio(g["trade_count"], g["trade_count_ma20"])
+    prev20_high = _group_rolling(g["prev_close"], keys, 20, 5, "max")
+    high20 = _group_rolling(close, keys, 20, 5, "max")
+    g["breakout_vs_prev20_high_pct"] = ((close / prev20_high) - 1.0) * 100.0
+    g["max_drawdown_from_20d_high_pct"] = ((close / high20) - 1.0) * 100.0
+    low20 = _group_rolling(close, keys, 20, 5, "min")
+    low60 = _group_rolling(close, keys, 60, 10, "min")
+    high60 = _group_rolling(close, keys, 60, 10, "max")
+    g["price_position_20d"] = _safe_ratio(close - low20, (high20 - low20))
+    g["price_position_60d"] = _safe_ratio(close - low60, (high60 - low60))
+    g["l2_main_net_ratio"] = _safe_ratio(g["l2_main_net_amount"], g["total_amount"])
+    g["l2_super_net_ratio"] = _safe_ratio(g["l2_super_net_amount"], g["total_amount"])
+    g["l1_l2_divergence"] = g["l2_main_net_amount"] - g["l1_main_net_amount"]
+    g["main_net_3d"] = _group_rolling(g["l2_main_net_amount"], keys, 3, 1, "sum")
+    g["super_net_3d"] = _group_rolling(g["l2_super_net_amount"], keys, 3, 1, "sum")
+    g["main_net_5d"] = _group_rolling(g["l2_main_net_amount"], keys, 5, 1, "sum")
+    g["super_net_5d"] = _group_rolling(g["l2_super_net_amount"], keys, 5, 1, "sum")
+    g["active_buy_strength"] = g["l2_buy_ratio"] - g["l2_sell_ratio"]
+    positive_total = g["positive_l2_net_bar_count"] + g["negative_l2_net_bar_count"]
+    g["positive_l2_bar_ratio"] = _safe_ratio(g["positive_l2_net_bar_count"], positive_total)
+    g["order_imbalance_ratio"] = _safe_ratio(g["oib_delta_amount"], g["total_amount"])
+    g["cvd_ratio"] = _safe_ratio(g["cvd_delta_amount"], g["total_amount"])
+    g["add_buy_ratio"] = _safe_ratio(g["add_buy_amount"], g["total_amount"])
+    g["add_sell_ratio"] = _safe_ratio(g["add_sell_amount"], g["total_amount"])
+    g["cancel_buy_ratio"] = _safe_ratio(g["cancel_buy_amount"], g["total_amount"])
+    g["cancel_sell_ratio"] = _safe_ratio(g["cancel_sell_amount"], g["total_amount"])
+    g["support_pressure_spread"] = g["buy_support_ratio"] - g["sell_pressure_ratio"]
+    g["prior_3d_min_return_1d_pct"] = _group_rolling(_group_shift(g["return_1d_pct"], keys, 1), keys, 3, 1, "min")
+    g["prior_3d_min_l2_main_net"] = _group_rolling(_group_shift(g["l2_main_net_amount"], keys, 1), keys, 3, 1, "min")
+    g["prior_3d_min_l2_super_net"] = _group_rolling(_group_shift(g["l2_super_net_amount"], keys, 1), keys, 3, 1, "min")
+    g["trade_date"] = pd.to_datetime(g["trade_date"]).dt.strftime("%Y-%m-%d")
+    return g
 
 
 def _compute_intent_profile(row: pd.Series, params: SelectionV2Params) -> Dict[str, Any]:
@@ -498,6 +594,10 @@ def _candidate_reasons(row: pd.Series, params: SelectionV2Params) -> tuple[list[
     return types, reasons, warnings
 
 
+def _screen_lookback_start(trade_date: str) -> str:
+    return (pd.Timestamp(trade_date) - pd.Timedelta(days=90)).strftime("%Y-%m-%d")
+
+
 def screen_candidates_v2(
     trade_date: str,
     *,
@@ -507,9 +607,12 @@ def screen_candidates_v2(
     symbols: Optional[Sequence[str]] = None,
 ) -> Dict[str, Any]:
     active_params = params or SelectionV2Params()
-    start_date = (pd.Timestamp(trade_date) - pd.Timedelta(days=90)).strftime("%Y-%m-%d")
-    raw_df = load_atomic_daily_window(start_date, trade_date, symbols=symbols, db_path=db_path)
-    metrics_df = compute_v2_metrics(raw_df)
+    metrics_df = load_v2_metrics_panel(_screen_lookback_start(trade_date), trade_date, symbols=symbols, db_path=db_path)
+    return _screen_metrics_frame(trade_date, metrics_df, limit=limit, params=active_params)
+
+
+def _screen_metrics_frame(trade_date: str, metrics_df: pd.DataFrame, *, limit: int, params: SelectionV2Params) -> Dict[str, Any]:
+    active_params = params
     if metrics_df.empty:
         return {
             "trade_date": trade_date,
@@ -662,10 +765,29 @@ def replay_symbol_v2(
     db_path: Optional[str] = None,
 ) -> Dict[str, Any]:
     active_params = params or SelectionV2Params()
-    lookback_start = (pd.Timestamp(start_date) - pd.Timedelta(days=90)).strftime("%Y-%m-%d")
-    raw_df = load_atomic_daily_window(lookback_start, end_date, symbols=[symbol], db_path=db_path)
-    metrics_df = compute_v2_metrics(raw_df)
-    metrics_df = metrics_df[metrics_df["trade_date"] >= start_date].copy()
+    context = SelectionV2ReplayContext(start_date, end_date, params=active_params, db_path=db_path, symbols=[symbol])
+    return context.replay_symbol(symbol, start_date)
+
+
+def _replay_symbol_metrics(symbol: str, metrics_df: pd.DataFrame, active_params: SelectionV2Params) -> Dict[str, Any]:
+    """逐日状态机回放；metrics_df 为该股从信号起始日开始的指标行。"""
+    payload, _, _ = _replay_symbol_run(symbol, metrics_df, active_params)
+    return payload
+
+
+def _replay_symbol_run(
+    symbol: str,
+    metrics_df: pd.DataFrame,
+    active_params: SelectionV2Params,
+    known_flat: Optional[Dict[str, tuple[Dict[str, Any], int]]] = None,
+) -> tuple[Dict[str, Any], Dict[str, int], bool]:
+    """
+    _replay_symbol_metrics 的实现，另返回"空仓进入"的交易日 -> daily_states 下标，以及是否拼接了已有回放。
+
+    空仓、无待成交进出场信号进入某日时，状态机从该日起的演化与从该日新起回放完全相同；
+    known_flat 给出已有回放的空仓日，走到其中一天就拼接已有回放的后半段，不再逐行重算。
+    """
+    flat_dates: Dict[str, int] = {}
     if metrics_df.empty:
         return {
             "symbol": symbol.lower(),
@@ -673,7 +795,7 @@ def replay_symbol_v2(
             "params": asdict(active_params),
             "daily_states": [],
             "trades": [],
-        }
+        }, flat_dates, False
 
     daily_states: List[Dict[str, Any]] = []
     trades: List[Dict[str, Any]] = []
@@ -681,8 +803,19 @@ def replay_symbol_v2(
     pending_exit: Optional[Dict[str, Any]] = None
     position: Optional[Dict[str, Any]] = None
     distribution_streak = 0
+    spliced = False
 
     for _, row in metrics_df.iterrows():
+        if position is None and pending_entry is None and pending_exit is None:
+            flat_date = str(row["trade_date"])
+            joined = (known_flat or {}).get(flat_date)
+            if joined is not None and daily_states:
+                joined_payload, joined_index = joined
+                daily_states.extend(joined_payload["daily_states"][joined_index:])
+                trades.extend(trade for trade in joined_payload["trades"] if str(trade["signal_date"]) >= flat_date)
+                spliced = True
+                break
+            flat_dates[flat_date] = len(daily_states)
         intent_profile = _compute_intent_profile(row, active_params)
         candidate_types, reasons, warnings = _candidate_reasons(row, active_params)
         derived_state = "watch"
@@ -824,7 +957,7 @@ def replay_symbol_v2(
             }
         )
 
-    if position is not None and not metrics_df.empty:
+    if position is not None and not spliced:
         last_row = metrics_df.iloc[-1]
         gross_exit_price = float(last_row["close"])
         exit_price = _apply_sell_costs(gross_exit_price, active_params)
@@ -857,38 +990,55 @@ def replay_symbol_v2(
         "params": asdict(active_params),
         "daily_states": daily_states,
         "trades": trades,
-    }
+    }, flat_dates, spliced
 
 
-def _load_company_basics(
-    symbol: str,
+def _normalized_symbol(symbol: str) -> str:
+    return str(symbol).strip().lower()
+
+
+def _normalized_symbols(symbols: Sequence[str]) -> List[str]:
+    return list(dict.fromkeys(_normalized_symbol(symbol) for symbol in symbols if _normalized_symbol(symbol)))
+
+
+def _load_company_basics_batch(
+    symbols: Sequence[str],
     trade_date: str,
     *,
     main_db_path: Optional[str] = None,
     user_db_path: Optional[str] = None,
-) -> Dict[str, Any]:
-    normalized_symbol = symbol.lower()
-    basics: Dict[str, Any] = {
-        "symbol": normalized_symbol,
-        "name": None,
-        "market_cap": None,
-        "source": None,
-        "market_cap_missing": True,
-        "company_context_missing": True,
+) -> Dict[str, Dict[str, Any]]:
+    normalized = _normalized_symbols(symbols)
+    result: Dict[str, Dict[str, Any]] = {
+        symbol: {
+            "symbol": symbol,
+            "name": None,
+            "market_cap": None,
+            "source": None,
+            "market_cap_missing": True,
+            "company_context_missing": True,
+        }
+        for symbol in normalized
     }
+    if not normalized:
+        return result
+    placeholders = ",".join("?" for _ in normalized)
     with _main_connection(main_db_path) as conn:
-        row = conn.execute(
-            """
-            SELECT symbol, name, market_cap, as_of_date, source
-            FROM stock_universe_meta
-            WHERE lower(symbol)=lower(?) AND as_of_date <= ?
-            ORDER BY as_of_date DESC
-            LIMIT 1
+        rows = conn.execute(
+            f"""
+            SELECT symbol_key, name, market_cap, source
+            FROM (
+                SELECT lower(symbol) AS symbol_key, name, market_cap, source,
+                       ROW_NUMBER() OVER (PARTITION BY lower(symbol) ORDER BY as_of_date DESC) AS rn
+                FROM stock_universe_meta
+                WHERE symbol COLLATE NOCASE IN ({placeholders}) AND as_of_date <= ?
+            )
+            WHERE rn = 1
             """,
-            (normalized_symbol, trade_date),
-        ).fetchone()
-        if row:
-            basics.update(
+            (*normalized, trade_date),
+        ).fetchall()
+        for row in rows:
+            result[str(row["symbol_key"])].update(
                 {
                     "name": str(row["name"]),
                     "market_cap": float(row["market_cap"]) if row["market_cap"] is not None else None,
@@ -897,28 +1047,32 @@ def _load_company_basics(
                     "company_context_missing": False,
                 }
             )
+    missing = [symbol for symbol in normalized if result[symbol]["name"] is None]
     resolved_user_db = user_db_path or resolve_selection_v2_user_db_path()
-    if basics["name"] is None and resolved_user_db and os.path.exists(resolved_user_db):
+    if missing and resolved_user_db and os.path.exists(resolved_user_db):
         conn = sqlite3.connect(resolved_user_db)
         conn.row_factory = sqlite3.Row
         try:
-            row = conn.execute(
-                "SELECT symbol, name FROM watchlist WHERE lower(symbol)=lower(?) LIMIT 1",
-                (normalized_symbol,),
-            ).fetchone()
-            if row:
-                basics.update(
-                    {
-                        "name": str(row["name"]),
-                        "source": "watchlist",
-                        "company_context_missing": False,
-                    }
-                )
+            rows = conn.execute(
+                f"SELECT lower(symbol) AS symbol_key, name FROM watchlist WHERE symbol COLLATE NOCASE IN ({','.join('?' for _ in missing)})",
+                missing,
+            ).fetchall()
+            for row in rows:
+                basics = result[str(row["symbol_key"])]
+                if basics["name"] is None:
+                    basics.update(
+                        {
+                            "name": str(row["name"]),
+                            "source": "watchlist",
+                            "company_context_missing": False,
+                        }
+                    )
         finally:
             conn.close()
-    if basics["name"] is None:
-        basics["name"] = normalized_symbol
-    return basics
+    for symbol, basics in result.items():
+        if basics["name"] is None:
+            basics["name"] = symbol
+    return result
 
 
 def _derive_theme_tags(texts: Sequence[str]) -> List[str]:
@@ -930,97 +1084,109 @@ def _derive_theme_tags(texts: Sequence[str]) -> List[str]:
     return tags
 
 
-def _load_event_timeline(
-    symbol: str,
+def _load_event_timeline_batch(
+    symbols: Sequence[str],
     trade_date: str,
     *,
     limit: int = 12,
     main_db_path: Optional[str] = None,
-) -> Dict[str, Any]:
-    normalized_symbol = symbol.lower()
+) -> Dict[str, Dict[str, Any]]:
+    """每只股票截至 trade_date 的最近 limit 条公告/舆情；ROW_NUMBER 分组取前 N，一次查询覆盖全部候选。"""
+    normalized = _normalized_symbols(symbols)
     cutoff = f"{trade_date} 23:59:59"
-    timeline: List[Dict[str, Any]] = []
-    official_count = 0
-    sentiment_count = 0
-    with _main_connection(main_db_path) as conn:
-        try:
-            rows = conn.execute(
-                """
-                SELECT source, source_type, event_subtype, title, content_text, published_at, importance, is_official
-                FROM stock_events
-                WHERE lower(symbol)=lower(?) AND published_at <= ?
-                ORDER BY published_at DESC
-                LIMIT ?
-                """,
-                (normalized_symbol, cutoff, int(limit)),
-            ).fetchall()
-            for row in rows:
-                official_count += int(row["is_official"] or 0)
-                timeline.append(
-                    {
-                        "kind": "stock_event",
-                        "time": str(row["published_at"] or ""),
-                        "source": str(row["source"] or ""),
-                        "source_type": str(row["source_type"] or ""),
-                        "event_subtype": str(row["event_subtype"] or ""),
-                        "title": str(row["title"] or ""),
-                        "content": str(row["content_text"] or "")[:180],
-                        "importance": int(row["importance"] or 0),
-                        "is_official": bool(row["is_official"] or 0),
-                    }
-                )
-        except sqlite3.OperationalError:
-            pass
-        try:
-            rows = conn.execute(
-                """
-                SELECT source, event_type, content, pub_time, reply_count, like_count
-                FROM sentiment_events
-                WHERE lower(symbol)=lower(?) AND pub_time <= ?
-                ORDER BY pub_time DESC
-                LIMIT ?
-                """,
-                (normalized_symbol, cutoff, int(limit)),
-            ).fetchall()
-            for row in rows:
-                sentiment_count += 1
-                timeline.append(
-                    {
-                        "kind": "sentiment_event",
-                        "time": str(row["pub_time"] or ""),
-                        "source": str(row["source"] or ""),
-                        "source_type": str(row["event_type"] or ""),
-                        "event_subtype": "",
-                        "title": str(row["content"] or "")[:60],
-                        "content": str(row["content"] or "")[:180],
-                        "importance": 0,
-                        "is_official": False,
-                        "engagement": {
-                            "reply_count": int(row["reply_count"] or 0),
-                            "like_count": int(row["like_count"] or 0),
-                        },
-                    }
-                )
-        except sqlite3.OperationalError:
-            pass
-    timeline = sorted(timeline, key=lambda item: str(item.get("time") or ""), reverse=True)[:limit]
-    texts = [str(item.get("title") or "") for item in timeline] + [str(item.get("content") or "") for item in timeline]
-    return {
-        "items": timeline,
-        "event_context_missing": len(timeline) == 0,
-        "official_event_count": official_count,
-        "sentiment_event_count": sentiment_count,
-        "theme_tags": _derive_theme_tags(texts),
-    }
+    timelines: Dict[str, List[Dict[str, Any]]] = {symbol: [] for symbol in normalized}
+    official_counts: Dict[str, int] = {symbol: 0 for symbol in normalized}
+    sentiment_counts: Dict[str, int] = {symbol: 0 for symbol in normalized}
+    placeholders = ",".join("?" for _ in normalized)
+    if normalized:
+        with _main_connection(main_db_path) as conn:
+            try:
+                rows = conn.execute(
+                    f"""
+                    SELECT symbol_key, source, source_type, event_subtype, title, content_text, published_at, importance, is_official
+                    FROM (
+                        SELECT lower(symbol) AS symbol_key, source, source_type, event_subtype, title, content_text,
+                               published_at, importance, is_official,
+                               ROW_NUMBER() OVER (PARTITION BY lower(symbol) ORDER BY published_at DESC) AS rn
+                        FROM stock_events
+                        WHERE symbol COLLATE NOCASE IN ({placeholders}) AND published_at <= ?
+                    )
+                    WHERE rn <= ?
+                    ORDER BY symbol_key, rn
+                    """,
+                    (*normalized, cutoff, int(limit)),
+                ).fetchall()
+                for row in rows:
+                    symbol = str(row["symbol_key"])
+                    official_counts[symbol] += int(row["is_official"] or 0)
+                    timelines[symbol].append(
+                        {
+                            "kind": "stock_event",
+                            "time": str(row["published_at"] or ""),
+                            "source": str(row["source"] or ""),
+                            "source_type": str(row["source_type"] or ""),
+                            "event_subtype": str(row["event_subtype"] or ""),
+                            "title": str(row["title"] or ""),
+                            "content": str(row["content_text"] or "")[:180],
+                            "importance": int(row["importance"] or 0),
+                            "is_official": bool(row["is_official"] or 0),
+                        }
+                    )
+            except sqlite3.OperationalError:
+                pass
+            try:
+                rows = conn.execute(
+                    f"""
+                    SELECT symbol_key, source, event_type, content, pub_time, reply_count, like_count
+                    FROM (
+                        SELECT lower(symbol) AS symbol_key, source, event_type, content, pub_time, reply_count, like_count,
+                               ROW_NUMBER() OVER (PARTITION BY lower(symbol) ORDER BY pub_time DESC) AS rn
+                        FROM sentiment_events
+                        WHERE symbol COLLATE NOCASE IN ({placeholders}) AND pub_time <= ?
+                    )
+                    WHERE rn <= ?
+                    ORDER BY symbol_key, rn
+                    """,
+                    (*normalized, cutoff, int(limit)),
+                ).fetchall()
+                for row in rows:
+                    symbol = str(row["symbol_key"])
+                    sentiment_counts[symbol] += 1
+                    timelines[symbol].append(
+                        {
+                            "kind": "sentiment_event",
+                            "time": str(row["pub_time"] or ""),
+                            "source": str(row["source"] or ""),
+                            "source_type": str(row["event_type"] or ""),
+                            "event_subtype": "",
+                            "title": str(row["content"] or "")[:60],
+                            "content": str(row["content"] or "")[:180],
+                            "importance": 0,
+                            "is_official": False,
+                            "engagement": {
+                                "reply_count": int(row["reply_count"] or 0),
+                                "like_count": int(row["like_count"] or 0),
+                            },
+                        }
+                    )
+            except sqlite3.OperationalError:
+                pass
+    result: Dict[str, Dict[str, Any]] = {}
+    for symbol in normalized:
+        timeline = sorted(timelines[symbol], key=lambda item: str(item.get("time") or ""), reverse=True)[:limit]
+        texts = [str(item.get("title") or "") for item in timeline] + [str(item.get("content") or "") for item in timeline]
+        result[symbol] = {
+            "items": timeline,
+            "event_context_missing": len(timeline) == 0,
+            "official_event_count": official_counts[symbol],
+            "sentiment_event_count": sentiment_counts[symbol],
+            "theme_tags": _derive_theme_tags(texts),
+        }
+    return result
 
 
-def _load_sentiment_snapshot(
-    symbol: str,
-    trade_date: str,
-    *,
-    main_db_path: Optional[str] = None,
-) -> Dict[str, Any]:
-    snapshot: Dict[str, Any] = {
+def _empty_sentiment_snapshot() -> Dict[str, Any]:
+    return {
         "available": False,
         "trade_date": None,
         "sample_count": 0,
@@ -1031,23 +1197,40 @@ def _load_sentiment_snapshot(
         "risk_tag": None,
         "summary_text": None,
     }
+
+
+def _load_sentiment_snapshot_batch(
+    symbols: Sequence[str],
+    trade_date: str,
+    *,
+    main_db_path: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    normalized = _normalized_symbols(symbols)
+    result = {symbol: _empty_sentiment_snapshot() for symbol in normalized}
+    if not normalized:
+        return result
+    placeholders = ",".join("?" for _ in normalized)
     with _main_connection(main_db_path) as conn:
         try:
-            row = conn.execute(
-                """
-                SELECT trade_date, sample_count, sentiment_score, direction_label,
+            rows = conn.execute(
+                f"""
+                SELECT symbol_key, trade_date, sample_count, sentiment_score, direction_label,
                        consensus_strength, emotion_temperature, risk_tag, summary_text
-                FROM sentiment_daily_scores
-                WHERE lower(symbol)=lower(?) AND trade_date <= ?
-                ORDER BY trade_date DESC
-                LIMIT 1
+                FROM (
+                    SELECT lower(symbol) AS symbol_key, trade_date, sample_count, sentiment_score, direction_label,
+                           consensus_strength, emotion_temperature, risk_tag, summary_text,
+                           ROW_NUMBER() OVER (PARTITION BY lower(symbol) ORDER BY trade_date DESC) AS rn
+                    FROM sentiment_daily_scores
+                    WHERE symbol COLLATE NOCASE IN ({placeholders}) AND trade_date <= ?
+                )
+                WHERE rn = 1
                 """,
-                (symbol.lower(), trade_date),
-            ).fetchone()
+                (*normalized, trade_date),
+            ).fetchall()
         except sqlite3.OperationalError:
-            row = None
-    if row:
-        snapshot.update(
+            rows = []
+    for row in rows:
+        result[str(row["symbol_key"])].update(
             {
                 "available": True,
                 "trade_date": str(row["trade_date"] or ""),
@@ -1060,7 +1243,21 @@ def _load_sentiment_snapshot(
                 "summary_text": str(row["summary_text"] or ""),
             }
         )
-    return snapshot
+    return result
+
+
+def _load_research_inputs_batch(
+    symbols: Sequence[str],
+    trade_date: str,
+    *,
+    main_db_path: Optional[str] = None,
+    user_db_path: Optional[str] = None,
+) -> Dict[str, tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]]:
+    """研究卡片的三类输入（公司基础 / 事件时间线 / 情绪快照）按候选批量读取，每类一条 SQL。"""
+    basics = _load_company_basics_batch(symbols, trade_date, main_db_path=main_db_path, user_db_path=user_db_path)
+    events = _load_event_timeline_batch(symbols, trade_date, main_db_path=main_db_path)
+    sentiment = _load_sentiment_snapshot_batch(symbols, trade_date, main_db_path=main_db_path)
+    return {symbol: (basics[symbol], events[symbol], sentiment[symbol]) for symbol in basics}
 
 
 def build_research_card_v2(
@@ -1071,14 +1268,23 @@ def build_research_card_v2(
     main_db_path: Optional[str] = None,
     user_db_path: Optional[str] = None,
 ) -> Dict[str, Any]:
-    basics = _load_company_basics(
-        symbol,
+    basics, events, sentiment = _load_research_inputs_batch(
+        [symbol],
         trade_date,
         main_db_path=main_db_path,
         user_db_path=user_db_path,
-    )
-    events = _load_event_timeline(symbol, trade_date, main_db_path=main_db_path)
-    sentiment = _load_sentiment_snapshot(symbol, trade_date, main_db_path=main_db_path)
+    )[_normalized_symbol(symbol)]
+    return _assemble_research_card(symbol, trade_date, candidate, basics, events, sentiment)
+
+
+def _assemble_research_card(
+    symbol: str,
+    trade_date: str,
+    candidate: Dict[str, Any],
+    basics: Dict[str, Any],
+    events: Dict[str, Any],
+    sentiment: Dict[str, Any],
+) -> Dict[str, Any]:
     consistency = "unknown"
     if events["official_event_count"] > 0 and candidate["candidate_types"]:
         consistency = "confirmed"
@@ -1244,6 +1450,222 @@ def _compute_live_rank_score(item: Dict[str, Any], params: SelectionV2Params) ->
     return live_rank_score, phase_code, phase_label, action_label
 
 
+class SelectionV2ReplayContext:
+    """
+    一段回测共享的数据上下文。
+
+    原子日线窗口 [start_date-90d, end_date] 只查一次库，compute_v2_metrics 也只在整段面板上算一次；
+    逐日筛选按交易日、逐票回放按股票在指标面板上切片。单次调用只看 [信号日-90d, ...]：
+    长假、停牌使该窗口内前序行不足 V2_METRICS_HISTORY_ROWS、而面板又有更早的行时，
+    这些股票按单次调用的窗口重算，保证与 screen_candidates_v2 / replay_symbol_v2 逐行相同。
+    逐票回放按 (symbol, 回放截止日) 记忆化：空仓进入的交易日可直接切片复用，其它起点回放到
+    第一个已知空仓日后拼接已有结果；窗口重算的行只在与面板一致之后参与复用。研究卡片输入按每日候选批量读取并缓存。
+    """
+
+    def __init__(
+        self,
+        start_date: str,
+        end_date: str,
+        *,
+        params: Optional[SelectionV2Params] = None,
+        db_path: Optional[str] = None,
+        symbols: Optional[Sequence[str]] = None,
+        main_db_path: Optional[str] = None,
+        user_db_path: Optional[str] = None,
+    ) -> None:
+        self.params = params or SelectionV2Params()
+        self.start_date = start_date
+        self.end_date = end_date
+        self.lookback_start = _screen_lookback_start(start_date)
+        self.main_db_path = main_db_path
+        self.user_db_path = user_db_path
+        self.raw_df = load_atomic_daily_window(self.lookback_start, end_date, symbols=symbols, db_path=db_path)
+        self._metrics_df: Optional[pd.DataFrame] = None
+        self._date_positions: Dict[str, np.ndarray] = {}
+        self._sorted_dates: List[str] = []
+        self._symbol_positions: Dict[str, np.ndarray] = {}
+        self._symbol_codes = np.zeros(0, dtype=np.int64)
+        self._symbol_ordinals = np.zeros(0, dtype=np.int64)
+        self._raw_symbol_positions: Dict[str, np.ndarray] = {}
+        self._flat_replays: Dict[tuple[str, str], Dict[str, tuple[Dict[str, Any], int]]] = {}
+        self._research_inputs: Dict[tuple[str, str], tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]] = {}
+        self.stats = {
+            "db_loads": 1,
+            "metrics_builds": 0,
+            "window_recomputes": 0,
+            "replay_hits": 0,
+            "replay_splices": 0,
+            "replay_misses": 0,
+            "research_batches": 0,
+        }
+
+    def _check_window(self, start_date: str, end_date: str) -> None:
+        if start_date < self.lookback_start or end_date > self.end_date:
+            raise ValueError(f"回放窗口 {start_date}~{end_date} 超出上下文范围 {self.lookback_start}~{self.end_date}")
+
+    def metrics_panel(self) -> pd.DataFrame:
+        if self._metrics_df is None:
+            self.stats["metrics_builds"] += 1
+            self._metrics_df = compute_v2_metrics(self.raw_df)
+            if not self._metrics_df.empty:
+                self._date_positions = {str(key): value for key, value in self._metrics_df.groupby("trade_date", sort=False).indices.items()}
+                self._sorted_dates = sorted(self._date_positions)
+                self._symbol_positions = {str(key): value for key, value in self._metrics_df.groupby("symbol", sort=False).indices.items()}
+                self._symbol_codes = pd.factorize(self._metrics_df["symbol"], sort=False)[0]
+                self._symbol_ordinals = self._metrics_df.groupby("symbol", sort=False).cumcount().to_numpy()
+                self._raw_symbol_positions = {str(key): value for key, value in self.raw_df.groupby("symbol", sort=False).indices.items()}
+        return self._metrics_df
+
+    def _window_row_counts(self, start_date: str, end_date: str) -> np.ndarray:
+        """各股票（按面板 symbol 编码）在 [start_date, end_date) 内的行数。"""
+        counts = np.zeros(len(self._symbol_positions), dtype=np.int64)
+        lo = bisect_left(self._sorted_dates, start_date)
+        hi = bisect_left(self._sorted_dates, end_date)
+        if lo < hi:
+            positions = np.concatenate([self._date_positions[day] for day in self._sorted_dates[lo:hi]])
+            counts += np.bincount(self._symbol_codes[positions], minlength=len(counts))
+        return counts
+
+    def _window_metrics(self, symbols: Sequence[str], start_date: str, end_date: str) -> pd.DataFrame:
+        """按单次调用的窗口 [start_date, end_date] 重算少数股票的指标。"""
+        self.stats["window_recomputes"] += 1
+        positions = np.concatenate([self._raw_symbol_positions[symbol] for symbol in symbols])
+        rows = self.raw_df.iloc[np.sort(positions)]
+        dates = rows["trade_date"]
+        return compute_v2_metrics(rows.loc[(dates >= start_date) & (dates <= end_date)])
+
+    def _symbol_metrics(self, symbol: str, start_date: str, end_date: str) -> tuple[pd.DataFrame, Optional[str]]:
+        """
+        该股 [start_date, end_date] 的指标行，与 replay_symbol_v2 单次调用逐行相同；
+        另返回从哪个交易日起这些行与共享面板一致（之后的行才能参与跨起点复用），没有则为 None。
+        """
+        window_start = _screen_lookback_start(start_date)
+        self._check_window(window_start, end_date)
+        metrics_df = self.metrics_panel()
+        key = _normalized_symbol(symbol)
+        positions = self._symbol_positions.get(key)
+        if positions is None:
+            return metrics_df.iloc[0:0].copy(), None
+        rows = metrics_df.iloc[positions]
+        dates = rows["trade_date"].to_numpy()
+        window_lo = int(np.searchsorted(dates, window_start, side="left"))
+        first = int(np.searchsorted(dates, start_date, side="left"))
+        last = int(np.searchsorted(dates, end_date, side="right"))
+        shared_index = window_lo + V2_METRICS_HISTORY_ROWS if window_lo > 0 else 0
+        shared_from = str(dates[shared_index]) if shared_index < len(dates) else None
+        if first >= shared_index:
+            return rows.iloc[first:last].reset_index(drop=True), shared_from
+        windowed = self._window_metrics([key], window_start, end_date)
+        return windowed[windowed["trade_date"] >= start_date].reset_index(drop=True), shared_from
+
+    def screen(self, trade_date: str, *, limit: int = 10) -> Dict[str, Any]:
+        window_start = _screen_lookback_start(trade_date)
+        self._check_window(window_start, trade_date)
+        metrics_df = self.metrics_panel()
+        positions = self._date_positions.get(trade_date)
+        if positions is None:
+            return _screen_metrics_frame(trade_date, metrics_df.iloc[0:0], limit=limit, params=self.params)
+        day_df = metrics_df.iloc[positions]
+        prior_rows = self._window_row_counts(window_start, trade_date)[self._symbol_codes[positions]]
+        # 窗口内前序行不足、面板却用到了窗口外更早的行：按单次调用的窗口重算
+        clipped = (prior_rows < V2_METRICS_HISTORY_ROWS) & (prior_rows < self._symbol_ordinals[positions])
+        if clipped.any():
+            day_df = day_df.copy()
+            symbols = [str(symbol) for symbol in day_df["symbol"].to_numpy()[clipped]]
+            windowed = self._window_metrics(symbols, window_start, trade_date)
+            windowed = windowed[windowed["trade_date"] == trade_date].set_index("symbol")
+            clipped_index = day_df.index[clipped]
+            for column in windowed.columns:
+                day_df.loc[clipped_index, column] = windowed.loc[symbols, column].to_numpy()
+        return _screen_metrics_frame(trade_date, day_df, limit=limit, params=self.params)
+
+    def replay_symbol(self, symbol: str, start_date: str, end_date: Optional[str] = None) -> Dict[str, Any]:
+        resolved_end = end_date or self.end_date
+        metrics_df, shared_from = self._symbol_metrics(symbol, start_date, resolved_end)
+        flat_runs = self._flat_replays.setdefault((_normalized_symbol(symbol), resolved_end), {})
+        first_date = str(metrics_df["trade_date"].iloc[0]) if not metrics_df.empty else None
+        if shared_from is None:
+            known_flat: Dict[str, tuple[Dict[str, Any], int]] = {}
+        elif first_date is not None and first_date < shared_from:
+            known_flat = {day: value for day, value in flat_runs.items() if day >= shared_from}
+        else:
+            known_flat = flat_runs
+        if first_date is not None and known_flat is flat_runs:
+            cached = flat_runs.get(first_date)
+            if cached is not None:
+                self.stats["replay_hits"] += 1
+                payload, index = cached
+                return {
+                    **payload,
+                    "daily_states": payload["daily_states"][index:],
+                    "trades": [trade for trade in payload["trades"] if str(trade["signal_date"]) >= first_date],
+                }
+        payload, flat_dates, spliced = _replay_symbol_run(symbol, metrics_df, self.params, known_flat)
+        self.stats["replay_splices" if spliced else "replay_misses"] += 1
+        if shared_from is not None:
+            for flat_date, index in flat_dates.items():
+                if flat_date >= shared_from:
+                    flat_runs.setdefault(flat_date, (payload, index))
+        return payload
+
+    def research_cards(self, trade_date: str, candidates: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        missing = [
+            _normalized_symbol(item["symbol"])
+            for item in candidates
+            if (_normalized_symbol(item["symbol"]), trade_date) not in self._research_inputs
+        ]
+        if missing:
+            self.stats["research_batches"] += 1
+            loaded = _load_research_inputs_batch(
+                missing,
+                trade_date,
+                main_db_path=self.main_db_path,
+                user_db_path=self.user_db_path,
+            )
+            for symbol, inputs in loaded.items():
+                self._research_inputs[(symbol, trade_date)] = inputs
+        cards: Dict[str, Dict[str, Any]] = {}
+        for item in candidates:
+            symbol = str(item["symbol"])
+            basics, events, sentiment = self._research_inputs[(_normalized_symbol(symbol), trade_date)]
+            cards[symbol] = _assemble_research_card(symbol, trade_date, item, basics, events, sentiment)
+        return cards
+
+    def replay_trade_date(self, trade_date: str, *, limit: int = 10, replay_end_date: Optional[str] = None) -> Dict[str, Any]:
+        resolved_end_date = _resolve_replay_end_date(trade_date, replay_end_date, self.params)
+        candidates_payload = self.screen(trade_date, limit=limit)
+        research_cards = self.research_cards(trade_date, candidates_payload["items"])
+        trade_results: List[Dict[str, Any]] = []
+        for item in candidates_payload["items"]:
+            replay_payload = self.replay_symbol(item["symbol"], trade_date, resolved_end_date)
+            matching_trade = next(
+                (trade for trade in replay_payload["trades"] if str(trade["signal_date"]) == trade_date),
+                None,
+            )
+            trade_results.append(
+                {
+                    "symbol": item["symbol"],
+                    "candidate_types": item["candidate_types"],
+                    "quant_score": item["quant_score"],
+                    "top_reasons": item["top_reasons"],
+                    "warnings": item["warnings"],
+                    "intent_profile": item.get("intent_profile", {}),
+                    "entry_allowed": item.get("entry_allowed", True),
+                    "entry_block_reasons": item.get("entry_block_reasons", []),
+                    "research": research_cards[item["symbol"]],
+                    "trade": matching_trade,
+                    "daily_state_count": len(replay_payload["daily_states"]),
+                }
+            )
+        return {
+            "trade_date": trade_date,
+            "replay_end_date": resolved_end_date,
+            "strategy_version": STRATEGY_VERSION_V2,
+            "params": asdict(self.params),
+            "candidates": trade_results,
+        }
+
+
 def replay_trade_date_v2(
     trade_date: str,
     *,
@@ -1254,56 +1676,9 @@ def replay_trade_date_v2(
     replay_end_date: Optional[str] = None,
 ) -> Dict[str, Any]:
     active_params = params or SelectionV2Params()
-    candidates_payload = screen_candidates_v2(
-        trade_date=trade_date,
-        limit=limit,
-        params=active_params,
-        db_path=db_path,
-        symbols=symbols,
-    )
     resolved_end_date = _resolve_replay_end_date(trade_date, replay_end_date, active_params)
-    trade_results: List[Dict[str, Any]] = []
-    for item in candidates_payload["items"]:
-        research = build_research_card_v2(
-            item["symbol"],
-            trade_date,
-            item,
-            main_db_path=None,
-            user_db_path=None,
-        )
-        replay_payload = replay_symbol_v2(
-            symbol=item["symbol"],
-            start_date=trade_date,
-            end_date=resolved_end_date,
-            params=active_params,
-            db_path=db_path,
-        )
-        matching_trade = next(
-            (trade for trade in replay_payload["trades"] if str(trade["signal_date"]) == trade_date),
-            None,
-        )
-        trade_results.append(
-            {
-                "symbol": item["symbol"],
-                "candidate_types": item["candidate_types"],
-                "quant_score": item["quant_score"],
-                "top_reasons": item["top_reasons"],
-                "warnings": item["warnings"],
-                "intent_profile": item.get("intent_profile", {}),
-                "entry_allowed": item.get("entry_allowed", True),
-                "entry_block_reasons": item.get("entry_block_reasons", []),
-                "research": research,
-                "trade": matching_trade,
-                "daily_state_count": len(replay_payload["daily_states"]),
-            }
-        )
-    return {
-        "trade_date": trade_date,
-        "replay_end_date": resolved_end_date,
-        "strategy_version": STRATEGY_VERSION_V2,
-        "params": asdict(active_params),
-        "candidates": trade_results,
-    }
+    context = SelectionV2ReplayContext(trade_date, resolved_end_date, params=active_params, db_path=db_path, symbols=symbols)
+    return context.replay_trade_date(trade_date, limit=limit, replay_end_date=resolved_end_date)
 
 
 def _summarize_trades(trades: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
@@ -1374,15 +1749,15 @@ def backtest_range_v2(
     def _new_positions_on(entry_date: str) -> int:
         return sum(1 for trade in accepted_trades if str(trade["entry_date"]) == entry_date)
 
+    context = SelectionV2ReplayContext(
+        start_date,
+        max(resolved_replay_end, end_date),
+        params=active_params,
+        db_path=db_path,
+        symbols=symbols,
+    )
     for trade_date in trading_days:
-        daily_payload = replay_trade_date_v2(
-            trade_date=trade_date,
-            limit=limit,
-            params=active_params,
-            db_path=db_path,
-            symbols=symbols,
-            replay_end_date=resolved_replay_end,
-        )
+        daily_payload = context.replay_trade_date(trade_date, limit=limit, replay_end_date=resolved_replay_end)
         accepted_for_day = 0
         skipped_position_limit = 0
         skipped_symbol_conflict = 0
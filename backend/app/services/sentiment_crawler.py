@@ -299,9 +299,17 @@ class SentimentCrawler:
         if not comments:
             return 0
             
+        from backend.app.services.retail_sentiment import (
+            classify_event_quality,
+            ensure_event_quality_schema,
+            resolve_duplicate_events,
+        )
+
         conn = get_db_connection()
         c = conn.cursor()
         saved_count = 0
+        touched_post_days: Dict[str, set] = {}
+        touched_event_days: Dict[str, set] = {}
         
         try:
             c.executescript("""
@@ -327,6 +335,7 @@ class SentimentCrawler:
                 CREATE UNIQUE INDEX IF NOT EXISTS idx_sentiment_events_source_event
                 ON sentiment_events (source, source_event_id);
             """)
+            ensure_event_quality_schema(conn)
             for item in comments:
                 # 1. 清洗与分析
                 processed = sentiment_analyzer.process_item(item)
@@ -366,6 +375,17 @@ class SentimentCrawler:
                     event_id = str(item.get("event_id") or processed['id'])
                     source = str(item.get('source') or 'guba')
                     source_event_id = str(item.get('source_event_id') or event_id)
+                    # 质量标记入库时算一次，读取侧只做 WHERE 过滤
+                    quality = classify_event_quality(
+                        processed['stock_code'], processed['content'], item.get('raw_url'), extra_payload
+                    )
+                    quality_payload = (
+                        quality['is_symbol_mismatch'],
+                        quality['is_low_value'],
+                        quality['is_spam'],
+                        quality['content_hash'],
+                        quality['quality_version'],
+                    )
                     payload = (
                         source,
                         processed['stock_code'],
@@ -383,13 +403,23 @@ class SentimentCrawler:
                         item.get('raw_url'),
                         extra_payload,
                     )
+                    # 改写已有事件时记下旧的股票/类型/发布时间：发布时间或股票变了，旧那一天的热度桶和重复标记也要重算
+                    previous = c.execute(
+                        """
+                        SELECT symbol, event_type, pub_time FROM sentiment_events
+                        WHERE event_id=? OR (source=? AND source_event_id=?)
+                        """,
+                        (event_id, source, source_event_id),
+                    ).fetchall()
                     c.execute("""
                         UPDATE sentiment_events
                         SET source=?, symbol=?, event_type=?, thread_id=?, parent_id=?, content=?, author_name=?, pub_time=?, crawl_time=?,
-                            view_count=?, reply_count=?, like_count=?, repost_count=?, raw_url=?, extra_json=?
+                            view_count=?, reply_count=?, like_count=?, repost_count=?, raw_url=?, extra_json=?,
+                            is_symbol_mismatch=?, is_low_value=?, is_spam=?, content_hash=?, quality_version=?
                         WHERE event_id=? OR (source=? AND source_event_id=?)
                     """, (
                         *payload,
+                        *quality_payload,
                         event_id,
                         source,
                         source_event_id,
@@ -398,8 +428,9 @@ class SentimentCrawler:
                         c.execute("""
                             INSERT OR IGNORE INTO sentiment_events
                             (event_id, source, symbol, event_type, thread_id, parent_id, content, author_name, pub_time, crawl_time,
-                             view_count, reply_count, like_count, repost_count, raw_url, source_event_id, extra_json)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                             view_count, reply_count, like_count, repost_count, raw_url, source_event_id, extra_json,
+                             is_symbol_mismatch, is_low_value, is_spam, content_hash, quality_version)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                         """, (
                             event_id,
                             source,
@@ -418,16 +449,49 @@ class SentimentCrawler:
                             item.get('raw_url'),
                             source_event_id,
                             extra_payload,
+                            *quality_payload,
                         ))
+                    if c.rowcount > 0:
+                        touched = [(processed['stock_code'], payload[2], processed['pub_time'])] + [tuple(row) for row in previous]
+                        for touched_symbol, touched_type, touched_time in touched:
+                            if not touched_time:
+                                continue
+                            day = str(touched_time)[:10]
+                            touched_event_days.setdefault(touched_symbol, set()).add(day)
+                            if touched_type == 'post':
+                                touched_post_days.setdefault(touched_symbol, set()).add(day)
                 except sqlite3.Error as e:
                     logger.error(f"DB Event Insert error: {e}")
-            
+
+            # 重复标记要看同股票同日的其它事件，整批写完后按受影响自然日重算
+            for symbol, days in touched_event_days.items():
+                resolve_duplicate_events(conn, symbol, days)
             conn.commit()
         finally:
             conn.close()
-            
+
+        self._refresh_heat_rollup(touched_post_days)
         return saved_count
 
+    def _refresh_heat_rollup(self, touched_post_days: Dict[str, set]) -> None:
+        """
+        主帖写入后按受影响的自然日增量刷新热度预聚合。
+        失败不影响抓取结果：作废该股票的整股重建记录，下次读取时整股重建。
+        """
+        if not touched_post_days:
+            return
+        from backend.app.services.retail_sentiment import invalidate_sentiment_heat_rollup, refresh_sentiment_heat_rollup
+
+        for symbol, days in touched_post_days.items():
+            try:
+                refresh_sentiment_heat_rollup(symbol, sorted(days))
+            except Exception as e:
+                logger.warning(f"Heat rollup refresh failed for {symbol}: {e}")
+                try:
+                    invalidate_sentiment_heat_rollup(symbol)
+                except Exception as invalidate_error:
+                    logger.error(f"Heat rollup invalidation failed for {symbol}: {invalidate_error}")
+
     def _parse_db_time(self, time_str: str) -> datetime.datetime:
         try:
             return datetime.datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
@@ -13,6 +13,7 @@ from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 from urllib.parse import parse_qs, urljoin, urlparse
 
 from backend.app.db.database import get_db_connection, get_user_db_connection
+from backend.app.db.sql_predicates import day_range_bounds, next_day
 from bs4 import BeautifulSoup
 
 logger = logging.getLogger(__name__)
@@ -858,10 +859,10 @@ def _delete_existing_source_events(
         FROM stock_events
         WHERE symbol = ?
           AND source = ?
-          AND substr(published_at, 1, 10) >= ?
-          AND substr(published_at, 1, 10) <= ?
+          AND published_at >= ?
+          AND published_at < ?
         """,
-        (symbol, source, start_date, end_date),
+        (symbol, source, *day_range_bounds(start_date, end_date)),
     ).fetchall()
     event_ids = [str(row[0]) for row in rows if str(row[0] or "").strip()]
     if not event_ids:
@@ -872,10 +873,10 @@ def _delete_existing_source_events(
         DELETE FROM stock_events
         WHERE symbol = ?
           AND source = ?
-          AND substr(published_at, 1, 10) >= ?
-          AND substr(published_at, 1, 10) <= ?
+          AND published_at >= ?
+          AND published_at < ?
         """,
-        (symbol, source, start_date, end_date),
+        (symbol, source, *day_range_bounds(start_date, end_date)),
     )
     return len(event_ids)
 
@@ -918,11 +919,11 @@ def rebuild_stock_event_daily_rollup(
             FROM stock_events
             WHERE symbol = ?
               AND published_at IS NOT NULL
-              AND substr(published_at, 1, 10) >= ?
-              AND substr(published_at, 1, 10) <= ?
+              AND published_at >= ?
+              AND published_at < ?
             GROUP BY symbol, substr(published_at, 1, 10)
             """,
-            (normalized_symbol, start_text, end_text),
+            (normalized_symbol, *day_range_bounds(start_text, end_text)),
         ).fetchall()
         if not rows:
             return 0
@@ -2297,11 +2298,11 @@ def list_stock_event_feed(
         clauses.append("source = ?")
         params.append(str(source))
     if start_date:
-        clauses.append("substr(published_at, 1, 10) >= ?")
+        clauses.append("published_at >= ?")
         params.append(_normalize_date_text(start_date, start_date))
     if end_date:
-        clauses.append("substr(published_at, 1, 10) <= ?")
-        params.append(_normalize_date_text(end_date, end_date))
+        clauses.append("published_at < ?")
+        params.append(next_day(_normalize_date_text(end_date, end_date)))
     base_where = " AND ".join(clauses)
     query = f"""
         SELECT event_id, source, source_type, event_subtype, title, content_text, raw_url, pdf_url, published_at, importance, is_official
@@ -2353,7 +2354,7 @@ def get_stock_event_coverage(
     end_date = datetime.now().strftime("%Y-%m-%d")
     start_date = (datetime.now() - timedelta(days=max(1, int(days)))).strftime("%Y-%m-%d")
     placeholders = ",".join(["?"] * len(candidates))
-    base_params: List[Any] = list(candidates) + [start_date, end_date]
+    base_params: List[Any] = list(candidates) + list(day_range_bounds(start_date, end_date))
     with get_db_connection() as conn:
         type_rows = conn.execute(
             f"""
@@ -2361,8 +2362,8 @@ def get_stock_event_coverage(
             FROM stock_events
             WHERE symbol IN ({placeholders})
               AND published_at IS NOT NULL
-              AND substr(published_at, 1, 10) >= ?
-              AND substr(published_at, 1, 10) <= ?
+              AND published_at >= ?
+              AND published_at < ?
             GROUP BY source_type
             ORDER BY total_count DESC, source_type ASC
             """,
@@ -2374,8 +2375,8 @@ def get_stock_event_coverage(
             FROM stock_events
             WHERE symbol IN ({placeholders})
               AND published_at IS NOT NULL
-              AND substr(published_at, 1, 10) >= ?
-              AND substr(published_at, 1, 10) <= ?
+              AND published_at >= ?
+              AND published_at < ?
             GROUP BY source
             ORDER BY total_count DESC, source ASC
             """,
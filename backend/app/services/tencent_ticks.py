@@ -0,0 +1,86 @@
+"""
+腾讯逐笔明细 (stock.gtimg.cn/data/index.php?appn=detail) 的流式解析。
+
+单页响应形如：
+    v_detail_data_sz000833=[3,"210/09:36:12/25.10/0.01/120/301200/B|211/..."]
+每行 "序号/成交时间/成交价格/价格变动/成交量/成交额/性质"。
+这里不再 eval 响应体、也不经过 DataFrame，直接产出 trade_ticks 的插入元组。
+"""
+import ast
+import json
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (symbol, time, price, volume, amount, type, date)
+TickRow = Tuple[str, str, float, int, float, str, str]
+
+TICK_CLOSE_CUTOFF = "15:00:05"
+_BUY_SIDES = frozenset({"B", "买盘", "BUY", "UP"})
+_SELL_SIDES = frozenset({"S", "卖盘", "SELL", "DOWN"})
+
+
+def extract_detail_rows(payload: Optional[str]) -> List[str]:
+    """取出单页的原始行列表；响应为空、格式不对或已翻到末页时返回 []。"""
+    if not payload:
+        return []
+    start_idx = payload.find("[")
+    if start_idx == -1:
+        return []
+    body = payload[start_idx:].strip().rstrip(";").strip()
+    try:
+        parsed = json.loads(body)
+    except ValueError:
+        try:
+            parsed = ast.literal_eval(body)
+        except (ValueError, SyntaxError):
+            logger.warning("Unparseable tencent detail payload: %s", body[:80])
+            return []
+    if not isinstance(parsed, (list, tuple)) or len(parsed) < 2 or not isinstance(parsed[1], str):
+        return []
+    if not parsed[1]:
+        return []
+    return parsed[1].split("|")
+
+
+def normalize_tick_side(raw_type: str) -> str:
+    text = str(raw_type).upper()
+    if text in _BUY_SIDES:
+        return "buy"
+    if text in _SELL_SIDES:
+        return "sell"
+    return text
+
+
+def parse_detail_rows(symbol: str, rows: Iterable[str], date_str: str) -> List[TickRow]:
+    """把原始行转换为插入元组，丢弃 15:00:05 之后的成交与残缺行。"""
+    out: List[TickRow] = []
+    append = out.append
+    for raw in rows:
+        parts = raw.split("/")
+        if len(parts) < 7:
+            if raw:
+                logger.error(f"Row extraction error for {symbol}: malformed row {raw!r}")
+            continue
+        t_time = parts[1]
+        # FILTER: Drop any ticks after 15:00:05
+        if t_time > TICK_CLOSE_CUTOFF:
+            continue
+        try:
+            append((
+                symbol,
+                t_time,
+                float(parts[2]),
+                int(parts[4]),
+                float(parts[5]),
+                normalize_tick_side(parts[6]), # 买盘/卖盘/中性盘
+                date_str,
+            ))
+        except ValueError as row_err:
+            logger.error(f"Row extraction error for {symbol}: {row_err} - Row data: {raw!r}")
+    return out
+
+
+def parse_detail_payload(symbol: str, payload: Optional[str], date_str: str) -> List[TickRow]:
+    return parse_detail_rows(symbol, extract_detail_rows(payload), date_str)
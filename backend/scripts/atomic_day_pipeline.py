@@ -0,0 +1,154 @@
+"""
+单次读取的 atomic 日构建阶段：一个 symbol-day 只加载/标准化一次，扇出到全部派生表。
+
+load_l2_symbol_bundle 读一次三个原始文件（优先列式缓存）、格式化一次时间列并标准化逐笔；
+随后 trade / order / book_state / open_auction 各 builder 都只消费这份 bundle，
+不再各自回到 symbol 目录重读重解析。limit_state 依赖跨日昨收，仍由
+build_limit_state_from_atomic 在 atomic 表写完后统一推导。
+
+写库由 write_atomic_day_rows 完成：每个 symbol-day 包在一个 SAVEPOINT 里，
+调用方（如 run_atomic_backfill_windows 的 shard worker）一个 shard 只提交一次事务，
+单只失败只回滚它自己的部分写入。
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backend.scripts.backfill_atomic_order_from_raw import (
+    L2SymbolBundle,
+    _apply_support_ratios,
+    _build_order_rows,
+    _replace_rows as replace_order_rows,
+    load_l2_symbol_bundle,
+)
+from backend.scripts.build_book_state_from_raw import build_book_rows, replace_book_rows
+from backend.scripts.build_open_auction_summaries import (
+    _build_l1_summary_from_frames,
+    _build_l2_summary_from_frames,
+    _build_manifest,
+    _build_phase_l1_summary_from_frames,
+    _build_phase_l2_summary_from_frames,
+    _prepare_order_auction_df,
+    _prepare_quote_auction_df,
+    _prepare_trade_auction_df,
+    _upsert as upsert_auction,
+)
+from backend.scripts.run_symbol_atomic_validation import (
+    _build_atomic_trade_5m_rows_from_l2,
+    _build_atomic_trade_daily_row,
+    _replace_trade_rows,
+)
+
+AUCTION_TABLES = (
+    "atomic_open_auction_l1_daily",
+    "atomic_open_auction_l2_daily",
+    "atomic_open_auction_phase_l1_daily",
+    "atomic_open_auction_phase_l2_daily",
+    "atomic_open_auction_manifest",
+)
+
+
+@dataclass
+class AtomicDayRows:
+    symbol: str
+    trade_date: str
+    trade_5m: List[Tuple]
+    trade_daily: Optional[Tuple]
+    order_5m: List[Tuple]
+    order_daily: Tuple
+    book_5m: List[Tuple]
+    book_daily: Optional[Tuple]
+    auction_rows: Dict[str, Dict[str, object]] = field(default_factory=dict)
+    diagnostics: Dict[str, object] = field(default_factory=dict)
+
+
+def _compact_date(trade_date: str) -> str:
+    return trade_date.replace("-", "")
+
+
+def build_atomic_day_rows(
+    symbol_dir: Path,
+    trade_date: str,
+    large_threshold: float,
+    super_threshold: float,
+    prepared: Optional[L2SymbolBundle] = None,
+) -> AtomicDayRows:
+    """一次加载 symbol-day，产出 trade/order/book/auction 全部待写行（纯计算，不碰库）。"""
+    bundle = prepared or load_l2_symbol_bundle(symbol_dir, trade_date)
+    symbol = bundle.symbol
+
+    trade_5m, quality_info, daily_feature = _build_atomic_trade_5m_rows_from_l2(
+        symbol_dir, trade_date, large_threshold, super_threshold, prepared=bundle
+    )
+    trade_daily = _build_atomic_trade_daily_row(symbol, trade_date, trade_5m, "trade_order", quality_info, daily_feature)
+
+    _, order_5m, order_daily, _ = _build_order_rows(symbol_dir, trade_date, prepared=bundle)
+    if order_daily is None:
+        raise ValueError(f"{symbol} {trade_date} 无有效 atomic_order 结果")
+    order_daily = _apply_support_ratios(order_daily, float(trade_daily[6]) if trade_daily else None)
+
+    book_5m, book_daily = build_book_rows(symbol_dir, trade_date, quote_df=bundle.quote_raw, quote_time=bundle.quote_time)
+
+    compact_trade_date = _compact_date(trade_date)
+    auction_trade_df = _prepare_trade_auction_df(bundle.trade_raw, time_text=bundle.trade_time)
+    auction_order_df = _prepare_order_auction_df(bundle.order_raw, time_text=bundle.order_time)
+    auction_quote_df = _prepare_quote_auction_df(bundle.quote_raw, time_text=bundle.quote_time)
+    l1_row = _build_l1_summary_from_frames(symbol, compact_trade_date, auction_trade_df, auction_quote_df, bundle.quote_raw)
+    l2_row = _build_l2_summary_from_frames(symbol, compact_trade_date, auction_trade_df, auction_order_df)
+    auction_rows = {
+        "atomic_open_auction_l1_daily": l1_row,
+        "atomic_open_auction_l2_daily": l2_row,
+        "atomic_open_auction_phase_l1_daily": _build_phase_l1_summary_from_frames(
+            symbol, compact_trade_date, auction_trade_df, auction_quote_df
+        ),
+        "atomic_open_auction_phase_l2_daily": _build_phase_l2_summary_from_frames(
+            symbol, compact_trade_date, auction_trade_df, auction_order_df
+        ),
+        "atomic_open_auction_manifest": _build_manifest(l1_row, l2_row),
+    }
+    return AtomicDayRows(
+        symbol=symbol,
+        trade_date=trade_date,
+        trade_5m=trade_5m,
+        trade_daily=trade_daily,
+        order_5m=order_5m,
+        order_daily=order_daily,
+        book_5m=book_5m,
+        book_daily=book_daily,
+        auction_rows=auction_rows,
+        diagnostics=bundle.diagnostics,
+    )
+
+
+@contextmanager
+def symbol_savepoint(conn: sqlite3.Connection, name: str = "atomic_symbol_day") -> Iterator[None]:
+    """在调用方的事务里为单只股票开 SAVEPOINT；异常时只回滚这一只。"""
+    conn.execute(f"SAVEPOINT {name}")
+    try:
+        yield
+    except BaseException:
+        conn.execute(f"ROLLBACK TO {name}")
+        conn.execute(f"RELEASE {name}")
+        raise
+    conn.execute(f"RELEASE {name}")
+
+
+def write_atomic_day_rows(conn: sqlite3.Connection, rows: AtomicDayRows) -> Dict[str, object]:
+    with symbol_savepoint(conn):
+        trade_stats = _replace_trade_rows(conn, rows.trade_5m, rows.trade_daily) if rows.trade_daily else {"rows_5m": 0, "rows_daily": 0}
+        replace_order_rows(conn, rows.order_5m, rows.order_daily)
+        replace_book_rows(conn, rows.book_5m, rows.book_daily)
+        for table in AUCTION_TABLES:
+            upsert_auction(conn, table, rows.auction_rows[table])
+    return {
+        "symbol": rows.symbol,
+        "rows_5m": len(rows.trade_5m),
+        "order_5m_rows": len(rows.order_5m),
+        "book_5m_rows": len(rows.book_5m),
+        **trade_stats,
+    }
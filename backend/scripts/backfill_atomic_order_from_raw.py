@@ -16,6 +16,8 @@ if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
 from backend.app.core.l2_package_layout import is_symbol_dir, normalize_month_day_root
+from backend.scripts.l2_bar_builder import build_atomic_order_5m_rows
+from backend.scripts.l2_raw_cache import ORDER_USECOLS, QUOTE_USECOLS, TRADE_USECOLS, read_raw_csv
 
 REPO_ROOT = Path(ROOT_DIR)
 DEFAULT_ATOMIC_DB = REPO_ROOT / 'data' / 'atomic_facts' / 'market_atomic.db'
@@ -30,15 +32,6 @@ ORDER_SIDE_MAP = {
     'B': 'buy',
     'S': 'sell',
 }
-TRADE_USECOLS = ['时间', '成交价格', '成交数量', 'BS标志', '叫卖序号', '叫买序号']
-ORDER_USECOLS = ['时间', '交易所委托号', '委托类型', '委托代码', '委托价格', '委托数量']
-QUOTE_USECOLS = (
-    ['时间', '叫买总量', '叫卖总量', '成交价', '最新价', '现价', '收盘价', '昨收', '昨收价', '前收盘', '前收盘价']
-    + [f'申买价{i}' for i in range(1, 11)]
-    + [f'申卖价{i}' for i in range(1, 11)]
-    + [f'申买量{i}' for i in range(1, 11)]
-    + [f'申卖量{i}' for i in range(1, 11)]
-)
 
 
 @dataclass
@@ -52,6 +45,12 @@ class L2SymbolBundle:
     ticks: pd.DataFrame
     order_events: pd.DataFrame
     diagnostics: Dict[str, object]
+    # 原始 时间 列格式化后的 HH:MM:SS 文本，供竞价/盘口 builder 复用，避免重复解析
+    trade_time: Optional[pd.Series] = None
+    order_time: Optional[pd.Series] = None
+    quote_time: Optional[pd.Series] = None
+    # 流式读取超大逐笔委托时：order_events 为空，挂撤单已按 5m 折叠在这里，order_raw 只留竞价窗口
+    order_flow: Optional[pd.DataFrame] = None
 
 
 def normalize_symbol_dir_name(name: str) -> str:
@@ -81,25 +80,20 @@ def _build_datetime(trade_date: str, time_text: pd.Series) -> pd.Series:
 
 
 def _read_csv(path: Path, usecols: Optional[Sequence[str]] = None) -> pd.DataFrame:
-    csv_usecols = None
-    if usecols:
-        wanted = {str(x).strip() for x in usecols}
-        csv_usecols = lambda c: str(c).strip() in wanted
-    df = pd.read_csv(path, encoding='gb18030', low_memory=False, usecols=csv_usecols, engine='c', memory_map=True)
-    bad_cols = [c for c in df.columns if str(c).strip() == '' or str(c).startswith('Unnamed')]
-    if bad_cols:
-        df = df.drop(columns=bad_cols)
-    df.columns = [str(c).strip() for c in df.columns]
-    return df
-
-
-def _build_standardized_order_events(order: pd.DataFrame, trade_date: str) -> Tuple[pd.DataFrame, Dict[str, object]]:
+    return read_raw_csv(path, usecols=usecols)
+
+
+def _standardize_order_frame(
+    order: pd.DataFrame,
+    trade_date: str,
+    time_text: Optional[pd.Series] = None,
+) -> pd.DataFrame:
     required_order = ['时间', '交易所委托号', '委托类型', '委托代码', '委托价格', '委托数量']
     missing_order = [c for c in required_order if c not in order.columns]
     if missing_order:
         raise ValueError(f'逐笔委托缺列: {", ".join(missing_order)}')
 
-    time_text = _format_trade_time(order['时间'])
+    time_text = _format_trade_time(order['时间']) if time_text is None else time_text
     trading_mask = _trading_mask_from_time_text(time_text)
     order = order.loc[trading_mask].reset_index(drop=True)
     time_text = time_text.loc[trading_mask].reset_index(drop=True)
@@ -121,44 +115,54 @@ def _build_standardized_order_events(order: pd.DataFrame, trade_date: str) -> Tu
             events = events.reset_index(drop=True)
         else:
             events = events.sort_values('datetime').reset_index(drop=True)
+    return events
 
-    positive_price_rows = events[events['price'] > 0].copy()
-    known_price_by_order_id = (
-        positive_price_rows.groupby('order_id', sort=False)['price'].last().to_dict()
-        if not positive_price_rows.empty
-        else {}
-    )
+
+def _known_price_by_order_id(events: pd.DataFrame) -> pd.Series:
+    positive_price_rows = events[events['price'] > 0]
+    if positive_price_rows.empty:
+        return pd.Series(dtype='float64')
+    return positive_price_rows.groupby('order_id', sort=False)['price'].last()
+
+
+def _price_order_events(events: pd.DataFrame, known_price_by_order_id: pd.Series) -> pd.DataFrame:
+    """撤单常带零价：按同一委托号最后一个正价回填，再算金额并剔除无法定价的事件。"""
     events['fallback_price'] = events['order_id'].map(known_price_by_order_id)
     events['effective_price'] = events['price'].where(events['price'] > 0, events['fallback_price'])
     events['amount'] = events['effective_price'] * events['volume']
     events = events.dropna(subset=['amount'])
-    events = events[events['amount'] > 0].reset_index(drop=True)
+    return events[events['amount'] > 0].reset_index(drop=True)
 
-    diagnostics = {
+
+def _order_event_diagnostics(events: pd.DataFrame) -> Dict[str, int]:
+    is_cancel = events['event_type'] == 'cancel'
+    zero_price = events['price'] <= 0
+    return {
         'order_event_rows': int(len(events)),
         'order_add_rows': int((events['event_type'] == 'add').sum()),
-        'order_cancel_rows': int((events['event_type'] == 'cancel').sum()),
-        'order_cancel_zero_price_rows': int(((events['event_type'] == 'cancel') & (events['price'] <= 0)).sum()),
-        'order_cancel_repriced_rows': int(
-            ((events['event_type'] == 'cancel') & (events['price'] <= 0) & events['fallback_price'].notna()).sum()
-        ),
+        'order_cancel_rows': int(is_cancel.sum()),
+        'order_cancel_zero_price_rows': int((is_cancel & zero_price).sum()),
+        'order_cancel_repriced_rows': int((is_cancel & zero_price & events['fallback_price'].notna()).sum()),
     }
-    return events, diagnostics
 
 
-def build_standardized_ticks_from_frames(
-    trade: pd.DataFrame,
+def _build_standardized_order_events(
     order: pd.DataFrame,
     trade_date: str,
-) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, object]]:
-    required_trade = ['时间', '成交价格', '成交数量', 'BS标志', '叫卖序号', '叫买序号']
-    missing_trade = [c for c in required_trade if c not in trade.columns]
-    if missing_trade:
-        raise ValueError(f'逐笔成交缺列: {", ".join(missing_trade)}')
+    time_text: Optional[pd.Series] = None,
+) -> Tuple[pd.DataFrame, Dict[str, object]]:
+    events = _standardize_order_frame(order, trade_date, time_text=time_text)
+    events = _price_order_events(events, _known_price_by_order_id(events))
+    return events, _order_event_diagnostics(events)
 
-    order_events, order_diagnostics = _build_standardized_order_events(order, trade_date)
 
-    time_text = _format_trade_time(trade['时间'])
+def _build_standardized_trade_ticks(
+    trade: pd.DataFrame,
+    trade_date: str,
+    time_text: Optional[pd.Series] = None,
+) -> Tuple[pd.DataFrame, int]:
+    """返回 (ticks, 交易时段内原始成交行数)。"""
+    time_text = _format_trade_time(trade['时间']) if time_text is None else time_text
     trading_mask = _trading_mask_from_time_text(time_text)
     trade = trade.loc[trading_mask].reset_index(drop=True)
     time_text = time_text.loc[trading_mask].reset_index(drop=True)
@@ -180,8 +184,20 @@ def build_standardized_ticks_from_frames(
             ticks = ticks.reset_index(drop=True)
         else:
             ticks = ticks.sort_values('datetime').reset_index(drop=True)
+    return ticks, int(len(trade))
+
+
+def _raw_order_ids(order: pd.DataFrame) -> pd.Index:
+    return pd.Index(pd.to_numeric(order['交易所委托号'], errors='coerce').dropna().astype('int64').unique())
 
-    order_ids = pd.Index(pd.to_numeric(order['交易所委托号'], errors='coerce').dropna().astype('int64').unique())
+
+def _build_tick_diagnostics(
+    trade_rows: int,
+    ticks: pd.DataFrame,
+    order_rows: int,
+    order_ids: pd.Index,
+    trade_date: str,
+) -> Dict[str, object]:
     buy_refs = pd.Index(ticks.loc[ticks['buy_order_id'] > 0, 'buy_order_id'].astype('int64').unique())
     sell_refs = pd.Index(ticks.loc[ticks['sell_order_id'] > 0, 'sell_order_id'].astype('int64').unique())
     overlap_buy_count = int(buy_refs.intersection(order_ids).size)
@@ -193,10 +209,10 @@ def build_standardized_ticks_from_frames(
             f'OrderID 无法在逐笔委托中对齐: buy_missing={missing_buy_count}, sell_missing={missing_sell_count}'
         )
 
-    diagnostics = {
-        'trade_rows': int(len(trade)),
+    return {
+        'trade_rows': int(trade_rows),
         'ticks_rows': int(len(ticks)),
-        'order_rows': int(len(order)),
+        'order_rows': int(order_rows),
         'trade_date': trade_date,
         'sample_time_range': [
             ticks['time'].min() if not ticks.empty else None,
@@ -207,15 +223,81 @@ def build_standardized_ticks_from_frames(
         'order_alignment_buy_missing': missing_buy_count,
         'order_alignment_sell_missing': missing_sell_count,
     }
+
+
+def _require_trade_columns(trade: pd.DataFrame) -> None:
+    required_trade = ['时间', '成交价格', '成交数量', 'BS标志', '叫卖序号', '叫买序号']
+    missing_trade = [c for c in required_trade if c not in trade.columns]
+    if missing_trade:
+        raise ValueError(f'逐笔成交缺列: {", ".join(missing_trade)}')
+
+
+def build_standardized_ticks_from_frames(
+    trade: pd.DataFrame,
+    order: pd.DataFrame,
+    trade_date: str,
+    trade_time: Optional[pd.Series] = None,
+    order_time: Optional[pd.Series] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, object]]:
+    _require_trade_columns(trade)
+    order_events, order_diagnostics = _build_standardized_order_events(order, trade_date, time_text=order_time)
+    ticks, session_trade_rows = _build_standardized_trade_ticks(trade, trade_date, time_text=trade_time)
+    diagnostics = _build_tick_diagnostics(session_trade_rows, ticks, len(order), _raw_order_ids(order), trade_date)
     diagnostics.update(order_diagnostics)
     return ticks, order_events, diagnostics
 
 
+def _load_streamed_order_bundle(
+    symbol_dir: Path,
+    trade_date: str,
+    trade: pd.DataFrame,
+    quote: pd.DataFrame,
+    trade_time: Optional[pd.Series],
+    quote_time: Optional[pd.Series],
+) -> L2SymbolBundle:
+    from backend.scripts.l2_order_stream import stream_order_file
+
+    _require_trade_columns(trade)
+    summary = stream_order_file(symbol_dir / '逐笔委托.csv', trade_date)
+    ticks, session_trade_rows = _build_standardized_trade_ticks(trade, trade_date, time_text=trade_time)
+    diagnostics = _build_tick_diagnostics(session_trade_rows, ticks, summary.order_rows, summary.order_ids, trade_date)
+    diagnostics.update(summary.diagnostics)
+    return L2SymbolBundle(
+        symbol=normalize_symbol_dir_name(symbol_dir.name),
+        trade_date=trade_date,
+        symbol_dir=symbol_dir,
+        trade_raw=trade,
+        order_raw=summary.auction_raw,
+        quote_raw=quote,
+        ticks=ticks,
+        order_events=pd.DataFrame(),
+        diagnostics=diagnostics,
+        trade_time=trade_time,
+        order_time=summary.auction_time,
+        quote_time=quote_time,
+        order_flow=summary.order_flow,
+    )
+
+
 def load_l2_symbol_bundle(symbol_dir: Path, trade_date: str) -> L2SymbolBundle:
+    from backend.scripts.l2_order_stream import should_stream_order_file
+
     trade = _read_csv(symbol_dir / '逐笔成交.csv', usecols=TRADE_USECOLS)
-    order = _read_csv(symbol_dir / '逐笔委托.csv', usecols=ORDER_USECOLS)
+    order_path = symbol_dir / '逐笔委托.csv'
+    if should_stream_order_file(order_path):
+        quote = _read_csv(symbol_dir / '行情.csv', usecols=QUOTE_USECOLS)
+        trade_time = _format_trade_time(trade['时间']) if '时间' in trade.columns else None
+        quote_time = _format_trade_time(quote['时间']) if '时间' in quote.columns else None
+        return _load_streamed_order_bundle(symbol_dir, trade_date, trade, quote, trade_time, quote_time)
+
+    order = _read_csv(order_path, usecols=ORDER_USECOLS)
     quote = _read_csv(symbol_dir / '行情.csv', usecols=QUOTE_USECOLS)
-    ticks, order_events, diagnostics = build_standardized_ticks_from_frames(trade, order, trade_date)
+    trade_time = _format_trade_time(trade['时间']) if '时间' in trade.columns else None
+    order_time = _format_trade_time(order['时间']) if '时间' in order.columns else None
+    quote_time = _format_trade_time(quote['时间']) if '时间' in quote.columns else None
+    ticks, order_events, diagnostics = build_standardized_ticks_from_frames(
+        trade, order, trade_date, trade_time=trade_time, order_time=order_time
+    )
     return L2SymbolBundle(
         symbol=normalize_symbol_dir_name(symbol_dir.name),
         trade_date=trade_date,
@@ -226,6 +308,9 @@ def load_l2_symbol_bundle(symbol_dir: Path, trade_date: str) -> L2SymbolBundle:
         ticks=ticks,
         order_events=order_events,
         diagnostics=diagnostics,
+        trade_time=trade_time,
+        order_time=order_time,
+        quote_time=quote_time,
     )
 
 
@@ -290,121 +375,27 @@ def _build_order_rows(
 ) -> Tuple[str, List[Tuple], Optional[Tuple], Dict[str, object]]:
     symbol = normalize_symbol_dir_name(symbol_dir.name)
     if prepared is None:
-        ticks, order_events, diagnostics = build_standardized_ticks(symbol_dir, trade_date)
-    else:
-        ticks, order_events, diagnostics = prepared.ticks, prepared.order_events, prepared.diagnostics
+        prepared = load_l2_symbol_bundle(symbol_dir, trade_date)
+    ticks, order_events, diagnostics = prepared.ticks, prepared.order_events, prepared.diagnostics
     quality_info = _build_quality_info(diagnostics)
-    if order_events.empty and quality_info:
+    has_order_events = int(diagnostics.get('order_event_rows', 0) or 0) > 0
+    if not has_order_events and quality_info:
         quality_info = f'{quality_info}；无有效逐笔委托事件'
-    elif order_events.empty:
+    elif not has_order_events:
         quality_info = '无有效逐笔委托事件'
 
-    tick_side = pd.DataFrame(columns=['bucket', 'cvd_buy_amount', 'cvd_sell_amount'])
-    if not ticks.empty:
-        tick_frame = ticks.copy()
-        tick_frame['bucket'] = tick_frame['datetime'].dt.floor('5min')
-        tick_frame['cvd_buy_amount'] = tick_frame['amount'].where(tick_frame['side'] == 'buy', 0.0)
-        tick_frame['cvd_sell_amount'] = tick_frame['amount'].where(tick_frame['side'] == 'sell', 0.0)
-        tick_side = (
-            tick_frame.groupby('bucket', sort=False)
-            [['cvd_buy_amount', 'cvd_sell_amount']]
-            .sum()
-            .reset_index()
-        )
-
-    event_side = pd.DataFrame(
-        columns=[
-            'bucket',
-            'add_buy_amount', 'add_sell_amount', 'cancel_buy_amount', 'cancel_sell_amount',
-            'add_buy_count', 'add_sell_count', 'cancel_buy_count', 'cancel_sell_count',
-            'add_buy_volume', 'add_sell_volume', 'cancel_buy_volume', 'cancel_sell_volume',
-        ]
+    rows_5m = build_atomic_order_5m_rows(
+        ticks,
+        order_events,
+        symbol=symbol,
+        trade_date=_canonical_trade_date(trade_date),
+        quality_info=quality_info,
+        order_flow=prepared.order_flow,
     )
-    if not order_events.empty:
-        event_frame = order_events.copy()
-        event_frame['bucket'] = event_frame['datetime'].dt.floor('5min')
-        event_frame['is_add_buy'] = ((event_frame['event_type'] == 'add') & (event_frame['side'] == 'buy')).astype('int64')
-        event_frame['is_add_sell'] = ((event_frame['event_type'] == 'add') & (event_frame['side'] == 'sell')).astype('int64')
-        event_frame['is_cancel_buy'] = ((event_frame['event_type'] == 'cancel') & (event_frame['side'] == 'buy')).astype('int64')
-        event_frame['is_cancel_sell'] = ((event_frame['event_type'] == 'cancel') & (event_frame['side'] == 'sell')).astype('int64')
-        event_frame['add_buy_amount'] = event_frame['amount'] * event_frame['is_add_buy']
-        event_frame['add_sell_amount'] = event_frame['amount'] * event_frame['is_add_sell']
-        event_frame['cancel_buy_amount'] = event_frame['amount'] * event_frame['is_cancel_buy']
-        event_frame['cancel_sell_amount'] = event_frame['amount'] * event_frame['is_cancel_sell']
-        event_frame['add_buy_volume'] = event_frame['volume'] * event_frame['is_add_buy']
-        event_frame['add_sell_volume'] = event_frame['volume'] * event_frame['is_add_sell']
-        event_frame['cancel_buy_volume'] = event_frame['volume'] * event_frame['is_cancel_buy']
-        event_frame['cancel_sell_volume'] = event_frame['volume'] * event_frame['is_cancel_sell']
-        event_side = (
-            event_frame.groupby('bucket', sort=False)
-            [[
-                'add_buy_amount', 'add_sell_amount', 'cancel_buy_amount', 'cancel_sell_amount',
-                'is_add_buy', 'is_add_sell', 'is_cancel_buy', 'is_cancel_sell',
-                'add_buy_volume', 'add_sell_volume', 'cancel_buy_volume', 'cancel_sell_volume',
-            ]]
-            .sum()
-            .reset_index()
-            .rename(columns={
-                'is_add_buy': 'add_buy_count',
-                'is_add_sell': 'add_sell_count',
-                'is_cancel_buy': 'cancel_buy_count',
-                'is_cancel_sell': 'cancel_sell_count',
-            })
-        )
-
-    bucket_df = pd.concat(
-        [
-            tick_side[['bucket']] if not tick_side.empty else pd.DataFrame(columns=['bucket']),
-            event_side[['bucket']] if not event_side.empty else pd.DataFrame(columns=['bucket']),
-        ],
-        ignore_index=True,
-    ).drop_duplicates().sort_values('bucket')
-
-    if bucket_df.empty:
+    if not rows_5m:
         diagnostics['bars_5m'] = 0
         return symbol, [], None, diagnostics
 
-    merged = bucket_df.merge(tick_side, how='left', on='bucket').merge(event_side, how='left', on='bucket')
-    fill_zero_cols = [c for c in merged.columns if c != 'bucket']
-    merged[fill_zero_cols] = merged[fill_zero_cols].fillna(0)
-    merged['cvd_delta_amount'] = merged['cvd_buy_amount'] - merged['cvd_sell_amount']
-    merged['oib_delta_amount'] = (
-        merged['add_buy_amount']
-        - merged['cancel_buy_amount']
-        - merged['add_sell_amount']
-        + merged['cancel_sell_amount']
-    )
-    merged['buy_add_cancel_net_amount'] = merged['add_buy_amount'] - merged['cancel_buy_amount']
-    merged['sell_add_cancel_net_amount'] = merged['add_sell_amount'] - merged['cancel_sell_amount']
-
-    rows_5m = [
-        (
-            symbol,
-            _canonical_trade_date(trade_date),
-            row['bucket'].strftime('%Y-%m-%d %H:%M:%S'),
-            float(row['add_buy_amount']),
-            float(row['add_sell_amount']),
-            float(row['cancel_buy_amount']),
-            float(row['cancel_sell_amount']),
-            float(row['cvd_delta_amount']),
-            float(row['oib_delta_amount']),
-            int(row['add_buy_count']),
-            int(row['add_sell_count']),
-            int(row['cancel_buy_count']),
-            int(row['cancel_sell_count']),
-            float(row['add_buy_volume']),
-            float(row['add_sell_volume']),
-            float(row['cancel_buy_volume']),
-            float(row['cancel_sell_volume']),
-            int(row['add_buy_count'] + row['add_sell_count'] + row['cancel_buy_count'] + row['cancel_sell_count']),
-            float(row['buy_add_cancel_net_amount']),
-            float(row['sell_add_cancel_net_amount']),
-            'trade_order',
-            quality_info,
-        )
-        for _, row in merged.iterrows()
-    ]
-
     daily_key = (symbol, _canonical_trade_date(trade_date))
     positive_oib_values = [float(r[8]) for r in rows_5m if float(r[8]) > 0]
     positive_total = float(sum(positive_oib_values))
@@ -16,6 +16,7 @@ if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
 from backend.app.core.l2_package_layout import is_symbol_dir, normalize_month_day_root
+from backend.scripts.l2_raw_cache import read_raw_csv
 
 REPO_ROOT = Path(ROOT_DIR)
 DEFAULT_ATOMIC_DB = REPO_ROOT / 'data' / 'atomic_facts' / 'market_atomic.db'
@@ -47,12 +48,7 @@ def list_symbol_dirs(day_root: Path, symbols: Optional[Sequence[str]] = None) ->
 
 
 def _read_csv(path: Path) -> pd.DataFrame:
-    df = pd.read_csv(path, encoding='gb18030', low_memory=False)
-    bad_cols = [c for c in df.columns if str(c).strip() == '' or str(c).startswith('Unnamed')]
-    if bad_cols:
-        df = df.drop(columns=bad_cols)
-    df.columns = [str(c).strip() for c in df.columns]
-    return df
+    return read_raw_csv(path)
 
 
 def _format_trade_time(raw_series: pd.Series) -> pd.Series:
@@ -7,7 +7,6 @@ import shutil
 import sqlite3
 import sys
 import time
-from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from typing import Dict, List, Sequence
 
@@ -15,7 +14,7 @@ ROOT_DIR = Path(__file__).resolve().parents[2]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from backend.scripts.run_atomic_backfill_windows import _run_process_shard, list_l2_symbol_dirs
+from backend.scripts.run_atomic_backfill_windows import list_l2_symbol_dirs, run_work_stealing_shards
 
 
 def trade_date_from_day_root(day_root: Path) -> str:
@@ -23,54 +22,24 @@ def trade_date_from_day_root(day_root: Path) -> str:
     return f"{name[:4]}-{name[4:6]}-{name[6:]}"
 
 
-def _run_shard(day_root: str, symbol_dirs: Sequence[str], out_db: str, max_error_details: int = 5) -> Dict[str, object]:
-    result = _run_process_shard(
-        "l2",
-        trade_date_from_day_root(Path(day_root)),
-        out_db,
-        symbol_dirs,
-        200000.0,
-        1000000.0,
-    )
-    return {
-        "ok": int(result.get("success_count", 0)),
-        "fail": int(result.get("failure_count", 0)),
-        "errors": list(result.get("failures", []))[:max_error_details],
-    }
-
-
 def bench_process_shards(day_root: Path, items: Sequence[Path], workers: int, out_dir: Path) -> Dict[str, object]:
     if out_dir.exists():
         shutil.rmtree(out_dir, ignore_errors=True)
     out_dir.mkdir(parents=True, exist_ok=True)
-    shards = [list(items[i::workers]) for i in range(workers)]
+    dbs: List[Path] = [out_dir / f"proc_{idx}.db" for idx in range(1, min(workers, len(items)) + 1)]
     started = time.perf_counter()
-    ok = 0
-    fail = 0
-    dbs: List[Path] = []
-    error_details: List[Dict[str, str]] = []
-    with ProcessPoolExecutor(max_workers=workers) as ex:
-        future_map = {}
-        for idx, shard in enumerate(shards, start=1):
-            if not shard:
-                continue
-            db = out_dir / f"proc_{idx}.db"
-            dbs.append(db)
-            future_map[
-                ex.submit(
-                    _run_shard,
-                    str(day_root),
-                    [str(x) for x in shard],
-                    str(db),
-                    5,
-                )
-            ] = idx
-        for future in as_completed(future_map):
-            result = future.result()
-            ok += int(result["ok"])
-            fail += int(result["fail"])
-            error_details.extend(result.get("errors", []))
+    results, scheduler_report = run_work_stealing_shards(
+        "l2",
+        trade_date_from_day_root(day_root),
+        items,
+        dbs,
+        200000.0,
+        1000000.0,
+    )
     elapsed = time.perf_counter() - started
+    ok = sum(int(r.get("success_count", 0)) for r in results)
+    fail = sum(int(r.get("failure_count", 0)) for r in results)
+    error_details: List[Dict[str, str]] = [e for r in results for e in list(r.get("failures", []))[:5]]
 
     total_size = 0
     total_trade_daily = 0
@@ -94,6 +63,7 @@ def bench_process_shards(day_root: Path, items: Sequence[Path], workers: int, ou
         "trade_5m_rows": total_trade_5m,
         "worker_db_count": len(dbs),
         "error_details": error_details[:10],
+        "scheduler": scheduler_report,
     }
 
 
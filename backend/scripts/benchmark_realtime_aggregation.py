@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+盘中资金流聚合基准：旧版逐组 pandas 布尔掩码 vs 向量化分桶内核。
+
+用合成的一日逐笔（默认 30k 笔）对比：
+- 1m 分时图（chart_data/cumulative_data）
+- 5m preview + 日线 preview 行
+- 增量聚合器在全日状态上追加一小批新 tick 的耗时
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pandas as pd
+
+from backend.app.core.trade_side import is_buy_series, is_sell_series
+from backend.app.services.analysis import _build_realtime_preview_rows
+from backend.app.services.realtime_aggregator import IncrementalTickAggregator
+
+LARGE_THRESHOLD = 200000.0
+SUPER_THRESHOLD = 1000000.0
+
+
+def synthetic_day(n_ticks: int, seed: int) -> List[Tuple[str, float, int, float, str]]:
+    rng = random.Random(seed)
+    session_seconds = [
+        h * 3600 + m * 60 + s
+        for h, m_start, m_end in ((9, 30, 60), (10, 0, 60), (11, 0, 30), (13, 0, 60), (14, 0, 60))
+        for m in range(m_start, m_end)
+        for s in range(60)
+    ]
+    picked = sorted(rng.choice(session_seconds) for _ in range(n_ticks))
+    price = 25.0
+    rows = []
+    for sec in picked:
+        price = max(1.0, price + rng.choice((-0.01, 0.0, 0.01)))
+        volume = rng.choice((100, 200, 500, 1000, 5000, 20000, 80000))
+        side = rng.choice(("buy", "sell", "neutral", "买盘", "卖盘", "B", "S"))
+        hhmmss = f"{sec // 3600:02d}:{sec % 3600 // 60:02d}:{sec % 60:02d}"
+        rows.append((hhmmss, round(price, 2), volume, round(price * volume, 2), side))
+    return rows
+
+
+def legacy_minute_chart(rows) -> Dict[str, list]:
+    df = pd.DataFrame(rows, columns=["time", "price", "volume", "amount", "type"])
+    df = df.sort_values("time").copy()
+    df["minute"] = df["time"].str.slice(0, 5)
+    df["is_buy"] = is_buy_series(df["type"])
+    df["is_sell"] = is_sell_series(df["type"])
+    df["is_main"] = df["amount"] >= LARGE_THRESHOLD
+    df["is_super"] = df["amount"] >= SUPER_THRESHOLD
+    grouped = df.groupby("minute")
+    chart_data = []
+    for minute in sorted(df["minute"].unique()):
+        group = grouped.get_group(minute)
+        chart_data.append((
+            minute,
+            group[group["is_main"] & group["is_buy"]]["amount"].sum(),
+            group[group["is_main"] & group["is_sell"]]["amount"].sum(),
+            group[group["is_super"] & group["is_buy"]]["amount"].sum(),
+            group[group["is_super"] & group["is_sell"]]["amount"].sum(),
+            group["price"].iloc[-1],
+        ))
+    return {"chart_data": chart_data}
+
+
+def legacy_preview_rows(rows) -> int:
+    df = pd.DataFrame(rows, columns=["time", "price", "volume", "amount", "type"])
+    df = df.sort_values("time").copy()
+    df["datetime"] = pd.to_datetime("2026-03-12 " + df["time"])
+    df["is_buy"] = is_buy_series(df["type"])
+    df["is_sell"] = is_sell_series(df["type"])
+    df["is_main"] = df["amount"] >= LARGE_THRESHOLD
+    df["is_super"] = df["amount"] >= SUPER_THRESHOLD
+    df["bucket_time"] = df["datetime"].dt.floor("5min")
+    out = []
+    for bucket_time, group in df.groupby("bucket_time", sort=True):
+        out.append((
+            bucket_time,
+            float(group[group["is_main"] & group["is_buy"]]["amount"].sum()),
+            float(group[group["is_main"] & group["is_sell"]]["amount"].sum()),
+            float(group[group["is_super"] & group["is_buy"]]["amount"].sum()),
+            float(group[group["is_super"] & group["is_sell"]]["amount"].sum()),
+        ))
+    float(df[df["is_main"] & df["is_buy"]]["amount"].sum())
+    float(df[df["is_main"] & df["is_sell"]]["amount"].sum())
+    float(df[df["is_super"] & df["is_buy"]]["amount"].sum())
+    float(df[df["is_super"] & df["is_sell"]]["amount"].sum())
+    return len(out)
+
+
+def kernel_minute_chart(rows) -> Dict[str, list]:
+    aggregator = IncrementalTickAggregator("sz000833", "2026-03-12", LARGE_THRESHOLD, SUPER_THRESHOLD)
+    aggregator._fold_rows(rows)
+    return aggregator.build_dashboard()
+
+
+def kernel_preview_rows(rows) -> int:
+    rows_5m, _ = _build_realtime_preview_rows(
+        "sz000833",
+        "2026-03-12",
+        list(reversed(rows)),
+        LARGE_THRESHOLD,
+        SUPER_THRESHOLD,
+    )
+    return len(rows_5m)
+
+
+def time_call(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ticks", type=int, default=30000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--append-batch", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=20260312)
+    args = ap.parse_args()
+
+    rows = synthetic_day(args.ticks, args.seed)
+    history, tail = rows[: -args.append_batch], rows[-args.append_batch:]
+
+    legacy_1m = time_call(lambda: legacy_minute_chart(rows), args.repeat)
+    kernel_1m = time_call(lambda: kernel_minute_chart(rows), args.repeat)
+    legacy_5m = time_call(lambda: legacy_preview_rows(rows), args.repeat)
+    kernel_5m = time_call(lambda: kernel_preview_rows(rows), args.repeat)
+
+    def incremental_append():
+        aggregator._fold_rows(tail)
+        aggregator.build_dashboard()
+
+    incremental_times = []
+    for _ in range(args.repeat):
+        aggregator = IncrementalTickAggregator("sz000833", "2026-03-12", LARGE_THRESHOLD, SUPER_THRESHOLD)
+        aggregator._fold_rows(history)
+        incremental_times.append(time_call(incremental_append, 1))
+
+    def _ms(value: float) -> float:
+        return round(value * 1000, 2)
+
+    print(json.dumps({
+        "ticks": len(rows),
+        "repeat": args.repeat,
+        "minute_chart": {
+            "legacy_ms": _ms(legacy_1m),
+            "kernel_ms": _ms(kernel_1m),
+            "speedup": round(legacy_1m / kernel_1m, 1) if kernel_1m > 0 else None,
+        },
+        "preview_5m_daily": {
+            "legacy_ms": _ms(legacy_5m),
+            "kernel_ms": _ms(kernel_5m),
+            "speedup": round(legacy_5m / kernel_5m, 1) if kernel_5m > 0 else None,
+        },
+        "incremental_append": {
+            "batch_ticks": len(tail),
+            "best_ms": _ms(min(incremental_times)),
+        },
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+腾讯逐笔翻页解析基准：旧版 eval + 逐页 pd.concat + iterrows vs 流式解析。
+
+回放 backend/tests/fixtures/tencent_detail_pages.json 中录制格式的单页响应，
+按 --pages 循环复用（默认 200 页，即采集器单只股票的翻页上限）。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import pandas as pd
+
+from backend.app.services.tencent_ticks import parse_detail_payload
+
+DEFAULT_FIXTURE = ROOT_DIR / "backend" / "tests" / "fixtures" / "tencent_detail_pages.json"
+
+
+def legacy_parse(symbol: str, payloads: List[str], date_str: str) -> list:
+    big_df = pd.DataFrame()
+    for text_data in payloads:
+        parsed_data = eval(text_data[text_data.find("["):])
+        rows = parsed_data[1].split("|")
+        temp_df = pd.DataFrame(rows).iloc[:, 0].str.split("/", expand=True)
+        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = big_df.iloc[:, 1:].copy()
+    big_df.columns = ["成交时间", "成交价格", "价格变动", "成交量", "成交额", "性质"]
+    out = []
+    for _, row in big_df.iterrows():
+        t_time = row["成交时间"]
+        if t_time > "15:00:05":
+            continue
+        raw_type = str(row["性质"]).upper()
+        if raw_type in ["B", "买盘", "BUY", "UP"]:
+            t_type = "buy"
+        elif raw_type in ["S", "卖盘", "SELL", "DOWN"]:
+            t_type = "sell"
+        else:
+            t_type = raw_type
+        out.append((symbol, t_time, float(row["成交价格"]), int(row["成交量"]), float(row["成交额"]), t_type, date_str))
+    return out
+
+
+def streaming_parse(symbol: str, payloads: List[str], date_str: str) -> list:
+    return [tick for payload in payloads for tick in parse_detail_payload(symbol, payload, date_str)]
+
+
+def time_call(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fixture", default=str(DEFAULT_FIXTURE))
+    ap.add_argument("--pages", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    fixture = json.loads(Path(args.fixture).read_text(encoding="utf-8"))
+    symbol, date_str, recorded = fixture["symbol"], fixture["date"], fixture["pages"]
+    payloads = [recorded[idx % len(recorded)] for idx in range(args.pages)]
+
+    legacy_rows = legacy_parse(symbol, payloads, date_str)
+    streaming_rows = streaming_parse(symbol, payloads, date_str)
+    if legacy_rows != streaming_rows:
+        raise SystemExit("streaming parser output differs from legacy path")
+
+    legacy_s = time_call(lambda: legacy_parse(symbol, payloads, date_str), args.repeat)
+    streaming_s = time_call(lambda: streaming_parse(symbol, payloads, date_str), args.repeat)
+
+    print(json.dumps({
+        "pages": len(payloads),
+        "ticks": len(streaming_rows),
+        "repeat": args.repeat,
+        "legacy_ms": round(legacy_s * 1000, 2),
+        "streaming_ms": round(streaming_s * 1000, 2),
+        "speedup": round(legacy_s / streaming_s, 1) if streaming_s > 0 else None,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
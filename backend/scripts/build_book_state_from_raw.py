@@ -3,23 +3,24 @@ from __future__ import annotations
 
 import argparse
 import sqlite3
+import sys
 from pathlib import Path
 from typing import Dict, List, Optional, Sequence, Tuple
 
 import pandas as pd
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from backend.scripts.l2_raw_cache import read_raw_csv
+
 DEFAULT_ATOMIC_DB = REPO_ROOT / 'data' / 'atomic_facts' / 'market_atomic.db'
 BOOK_STATE_SCHEMA = REPO_ROOT / 'backend' / 'scripts' / 'sql' / 'book_state_schema.sql'
 
 
 def _read_csv(path: Path) -> pd.DataFrame:
-    df = pd.read_csv(path, encoding='gb18030', low_memory=False, engine='c', memory_map=True)
-    bad_cols = [c for c in df.columns if str(c).strip() == '' or str(c).startswith('Unnamed')]
-    if bad_cols:
-        df = df.drop(columns=bad_cols)
-    df.columns = [str(c).strip() for c in df.columns]
-    return df
+    return read_raw_csv(path)
 
 
 def _format_time(raw_series: pd.Series) -> pd.Series:
@@ -81,7 +82,11 @@ def _label_book_state(imbalance_ratio: Optional[float], total_top5_amount: float
     return 'balanced'
 
 
-def _prepare_quote_snapshot_df_from_quote(quote: pd.DataFrame, trade_date: str) -> pd.DataFrame:
+def _prepare_quote_snapshot_df_from_quote(
+    quote: pd.DataFrame,
+    trade_date: str,
+    time_text: Optional[pd.Series] = None,
+) -> pd.DataFrame:
     time_col = '时间'
     if time_col not in quote.columns:
         raise ValueError('行情.csv 缺少 时间 列')
@@ -95,7 +100,7 @@ def _prepare_quote_snapshot_df_from_quote(quote: pd.DataFrame, trade_date: str)
     if missing:
         raise ValueError(f'行情.csv 缺少盘口列: {missing[:6]}')
 
-    df = pd.DataFrame({'time': _format_time(quote[time_col])})
+    df = pd.DataFrame({'time': _format_time(quote[time_col]) if time_text is None else time_text})
     for col in required:
         df[col] = _safe_num(quote[col])
     df['叫买总量'] = _safe_num(quote['叫买总量']) if '叫买总量' in quote.columns else pd.NA
@@ -157,9 +162,17 @@ def _prepare_quote_snapshot_df(symbol_dir: Path, trade_date: str) -> pd.DataFram
     return _prepare_quote_snapshot_df_from_quote(quote, trade_date)
 
 
-def build_book_rows(symbol_dir: Path, trade_date: str, quote_df: Optional[pd.DataFrame] = None) -> Tuple[List[Tuple], Optional[Tuple]]:
+def build_book_rows(
+    symbol_dir: Path,
+    trade_date: str,
+    quote_df: Optional[pd.DataFrame] = None,
+    quote_time: Optional[pd.Series] = None,
+) -> Tuple[List[Tuple], Optional[Tuple]]:
     normalized_trade_date = f'{trade_date[:4]}-{trade_date[4:6]}-{trade_date[6:]}' if len(trade_date) == 8 else trade_date
-    df = _prepare_quote_snapshot_df_from_quote(quote_df, normalized_trade_date) if quote_df is not None else _prepare_quote_snapshot_df(symbol_dir, normalized_trade_date)
+    if quote_df is not None:
+        df = _prepare_quote_snapshot_df_from_quote(quote_df, normalized_trade_date, time_text=quote_time)
+    else:
+        df = _prepare_quote_snapshot_df(symbol_dir, normalized_trade_date)
     symbol = _normalize_symbol_dir_name(symbol_dir.name)
     if df.empty:
         return [], None
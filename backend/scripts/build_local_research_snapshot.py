@@ -172,6 +172,8 @@ def _create_base_snapshot_schema(output_db: Path) -> None:
             );
             CREATE INDEX IF NOT EXISTS idx_stock_universe_meta_market_cap
             ON stock_universe_meta(market_cap DESC, symbol ASC);
+            CREATE INDEX IF NOT EXISTS idx_stock_universe_meta_symbol_nocase
+            ON stock_universe_meta(symbol COLLATE NOCASE, as_of_date);
 
             CREATE TABLE IF NOT EXISTS local_history (
                 symbol TEXT,
@@ -209,6 +211,8 @@ def _create_base_snapshot_schema(output_db: Path) -> None:
             );
             CREATE INDEX IF NOT EXISTS idx_sentiment_events_symbol_time
             ON sentiment_events(symbol, pub_time);
+            CREATE INDEX IF NOT EXISTS idx_sentiment_events_symbol_nocase_time
+            ON sentiment_events(symbol COLLATE NOCASE, pub_time);
 
             CREATE TABLE IF NOT EXISTS sentiment_daily_scores (
                 symbol TEXT,
@@ -227,6 +231,8 @@ def _create_base_snapshot_schema(output_db: Path) -> None:
             );
             CREATE INDEX IF NOT EXISTS idx_sentiment_daily_scores_symbol_date
             ON sentiment_daily_scores(symbol, trade_date);
+            CREATE INDEX IF NOT EXISTS idx_sentiment_daily_scores_symbol_nocase_date
+            ON sentiment_daily_scores(symbol COLLATE NOCASE, trade_date);
 
             CREATE TABLE IF NOT EXISTS research_snapshot_manifest (
                 key TEXT PRIMARY KEY,
@@ -526,6 +532,11 @@ def _copy_sentiment(conn: sqlite3.Connection, start_date: str, end_date: str) ->
         )
         row = conn.execute("SELECT changes()").fetchone()
         stats["sentiment_events"] = int(row[0] or 0) if row else 0
+        # 直接改写了事件表，作废这些股票的热度预聚合，下次读取时整股重建
+        if _table_exists(conn, "sentiment_heat_rollup_state"):
+            conn.execute(
+                "DELETE FROM sentiment_heat_rollup_state WHERE symbol IN (SELECT symbol FROM scope_symbols)"
+            )
 
     if _table_exists(conn, "sentiment_daily_scores", "src"):
         conn.execute(
@@ -16,6 +16,7 @@ if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
 from backend.app.core.l2_package_layout import is_symbol_dir, normalize_month_day_root
+from backend.scripts.l2_raw_cache import read_raw_csv
 
 ORDER_EVENT_TYPE_MAP = {
     "0": "add",
@@ -61,12 +62,7 @@ DEFAULT_SCHEMA = REPO_ROOT / 'backend' / 'scripts' / 'sql' / 'open_auction_summa
 
 
 def _read_csv(path: Path) -> pd.DataFrame:
-    df = pd.read_csv(path, encoding='gb18030', low_memory=False)
-    bad_cols = [c for c in df.columns if str(c).strip() == '' or str(c).startswith('Unnamed')]
-    if bad_cols:
-        df = df.drop(columns=bad_cols)
-    df.columns = [str(c).strip() for c in df.columns]
-    return df
+    return read_raw_csv(path)
 
 
 def _format_time(raw_series: pd.Series) -> pd.Series:
@@ -126,9 +122,9 @@ def _quote_prev_close(quote: pd.DataFrame) -> Optional[float]:
     return None
 
 
-def _prepare_trade_auction_df(trade: pd.DataFrame) -> pd.DataFrame:
+def _prepare_trade_auction_df(trade: pd.DataFrame, time_text: Optional[pd.Series] = None) -> pd.DataFrame:
     trade_df = pd.DataFrame({
-        'time': _format_time(trade['时间']),
+        'time': _format_time(trade['时间']) if time_text is None else time_text,
         'price': _safe_num(trade['成交价格']) / 10000,
         'volume': _safe_num(trade['成交数量']),
     })
@@ -138,16 +134,16 @@ def _prepare_trade_auction_df(trade: pd.DataFrame) -> pd.DataFrame:
     return trade_df
 
 
-def _prepare_quote_auction_df(quote: pd.DataFrame) -> pd.DataFrame:
+def _prepare_quote_auction_df(quote: pd.DataFrame, time_text: Optional[pd.Series] = None) -> pd.DataFrame:
     quote_df = quote.copy()
-    quote_df['time'] = _format_time(quote_df['时间'])
+    quote_df['time'] = _format_time(quote_df['时间']) if time_text is None else time_text
     quote_df = quote_df.dropna(subset=['time'])
     return quote_df
 
 
-def _prepare_order_auction_df(order: pd.DataFrame) -> pd.DataFrame:
+def _prepare_order_auction_df(order: pd.DataFrame, time_text: Optional[pd.Series] = None) -> pd.DataFrame:
     order_df = pd.DataFrame({
-        'time': _format_time(order['时间']),
+        'time': _format_time(order['时间']) if time_text is None else time_text,
         'event_code': order['委托类型'].astype(str).str.strip().str.upper(),
         'side': order['委托代码'].astype(str).str.strip().str.upper().map(ORDER_SIDE_MAP),
         'price': _safe_num(order['委托价格']) / 10000,
@@ -29,7 +29,7 @@ def finalize_data():
     # 1. Force Fetch Ticks (Sync Mode)
     logger.info(f"1. Fetching Full Ticks for {len(symbols)} stocks...")
     # Use collector's internal method directly
-    collector._poll_watchlist()
+    collector._poll_watchlist(full_refresh=True)
     
     # 2. Aggregate History
     logger.info("2. Aggregating Daily History...")
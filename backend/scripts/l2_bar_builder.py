@@ -0,0 +1,240 @@
+"""
+L2 逐笔 -> 5m 聚合的共享向量化构建器。
+
+l2_daily_backfill（history_5m_l2）、backfill_atomic_order_from_raw（atomic_order_5m）
+与 run_symbol_atomic_validation / run_atomic_backfill_windows 共用同一套实现：
+先按方向/事件类型预先算好带掩码的金额列，再做一次 groupby 求和，
+最后按列 to_numpy 后 zip 成写库元组，不再逐组回表或 iterrows。
+"""
+
+from __future__ import annotations
+
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+BUCKET_FREQ = "5min"
+BUCKET_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+ORDER_FLOW_AMOUNT_COLUMNS = ["add_buy_amount", "add_sell_amount", "cancel_buy_amount", "cancel_sell_amount"]
+ORDER_FLOW_COUNT_COLUMNS = ["add_buy_count", "add_sell_count", "cancel_buy_count", "cancel_sell_count"]
+ORDER_FLOW_VOLUME_COLUMNS = ["add_buy_volume", "add_sell_volume", "cancel_buy_volume", "cancel_sell_volume"]
+ORDER_FLOW_COLUMNS = ORDER_FLOW_AMOUNT_COLUMNS + ORDER_FLOW_COUNT_COLUMNS + ORDER_FLOW_VOLUME_COLUMNS
+
+_TRADE_SUM_COLUMNS = [
+    "total_amount", "total_volume",
+    "l1_main_buy", "l1_main_sell", "l1_super_buy", "l1_super_sell",
+    "l2_main_buy", "l2_main_sell", "l2_super_buy", "l2_super_sell",
+    "cvd_buy", "cvd_sell",
+]
+
+
+def bucket_labels(index: pd.Index) -> List[str]:
+    return pd.DatetimeIndex(index).strftime(BUCKET_FORMAT).tolist()
+
+
+def float_column(frame: pd.DataFrame, column: str) -> List[float]:
+    return frame[column].to_numpy(dtype="float64").tolist()
+
+
+def int_column(frame: pd.DataFrame, column: str) -> List[int]:
+    return frame[column].to_numpy(dtype="float64").astype("int64").tolist()
+
+
+def optional_float_column(frame: pd.DataFrame, column: str) -> List[Optional[float]]:
+    """NaN（左连接缺桶或整列缺失）转成 None，与写库语义一致。"""
+    values = frame[column].to_numpy(dtype="float64", na_value=np.nan).tolist()
+    return [None if math.isnan(v) else v for v in values]
+
+
+def _masked(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    return np.where(mask, values, 0.0)
+
+
+def _parent_totals(df: pd.DataFrame, id_column: str) -> np.ndarray:
+    ids = df[id_column]
+    valid = ids > 0
+    totals = df.loc[valid, "amount"].groupby(ids[valid], sort=False).sum()
+    return ids.map(totals).fillna(0.0).to_numpy(dtype="float64")
+
+
+def aggregate_trade_flow(ticks: pd.DataFrame, large_threshold: float, super_threshold: float) -> pd.DataFrame:
+    """按 5m 桶聚合 OHLC、成交额量、L1/L2 主力超大单与 CVD 买卖额，桶升序。"""
+    amount = ticks["amount"].to_numpy(dtype="float64")
+    side = ticks["side"].to_numpy()
+    is_buy = side == "buy"
+    is_sell = side == "sell"
+    if "buy_parent_total" in ticks.columns:
+        buy_parent = ticks["buy_parent_total"].to_numpy(dtype="float64")
+    else:
+        buy_parent = _parent_totals(ticks, "buy_order_id")
+    if "sell_parent_total" in ticks.columns:
+        sell_parent = ticks["sell_parent_total"].to_numpy(dtype="float64")
+    else:
+        sell_parent = _parent_totals(ticks, "sell_order_id")
+
+    is_large = amount >= large_threshold
+    is_super = amount >= super_threshold
+    frame = pd.DataFrame(
+        {
+            "bucket": ticks["datetime"].dt.floor(BUCKET_FREQ).to_numpy(),
+            "price": ticks["price"].to_numpy(dtype="float64"),
+            "total_amount": amount,
+            "total_volume": ticks["volume"].to_numpy(dtype="float64"),
+            "l1_main_buy": _masked(amount, is_buy & is_large),
+            "l1_main_sell": _masked(amount, is_sell & is_large),
+            "l1_super_buy": _masked(amount, is_buy & is_super),
+            "l1_super_sell": _masked(amount, is_sell & is_super),
+            "l2_main_buy": _masked(amount, buy_parent >= large_threshold),
+            "l2_main_sell": _masked(amount, sell_parent >= large_threshold),
+            "l2_super_buy": _masked(amount, buy_parent >= super_threshold),
+            "l2_super_sell": _masked(amount, sell_parent >= super_threshold),
+            "cvd_buy": _masked(amount, is_buy),
+            "cvd_sell": _masked(amount, is_sell),
+        }
+    )
+    grouped = frame.groupby("bucket", sort=True)
+    ohlc = grouped["price"].agg(open="first", high="max", low="min", close="last")
+    return ohlc.join(grouped[_TRADE_SUM_COLUMNS].sum())
+
+
+def aggregate_order_flow(order_events: pd.DataFrame) -> pd.DataFrame:
+    """按 5m 桶聚合挂单/撤单的买卖金额、笔数与量，桶升序；无事件时返回空表。"""
+    if order_events.empty:
+        return pd.DataFrame(columns=ORDER_FLOW_COLUMNS, index=pd.DatetimeIndex([], name="bucket"), dtype="float64")
+
+    event_type = order_events["event_type"].to_numpy()
+    side = order_events["side"].to_numpy()
+    is_add = event_type == "add"
+    is_cancel = event_type == "cancel"
+    is_buy = side == "buy"
+    is_sell = side == "sell"
+    masks = [is_add & is_buy, is_add & is_sell, is_cancel & is_buy, is_cancel & is_sell]
+
+    amount = order_events["amount"].to_numpy(dtype="float64")
+    volume = order_events["volume"].to_numpy(dtype="float64")
+    data = {"bucket": order_events["datetime"].dt.floor(BUCKET_FREQ).to_numpy()}
+    for column, mask in zip(ORDER_FLOW_AMOUNT_COLUMNS, masks):
+        data[column] = _masked(amount, mask)
+    for column, mask in zip(ORDER_FLOW_COUNT_COLUMNS, masks):
+        data[column] = mask.astype("int64")
+    for column, mask in zip(ORDER_FLOW_VOLUME_COLUMNS, masks):
+        data[column] = _masked(volume, mask)
+    return pd.DataFrame(data).groupby("bucket", sort=True)[ORDER_FLOW_COLUMNS].sum()
+
+
+def build_history_5m_rows(
+    ticks: pd.DataFrame,
+    order_events: pd.DataFrame,
+    symbol: str,
+    trade_date: str,
+    large_threshold: float,
+    super_threshold: float,
+    order_flow: Optional[pd.DataFrame] = None,
+) -> List[Tuple]:
+    """history_5m_l2 的 23 列元组（不含 quality_info），只保留有成交的桶。
+
+    挂撤单金额按成交桶左连接：无委托事件或该桶无事件时为 None，OIB 按 0 计。
+    order_flow 为流式读取已折叠好的挂撤单桶（l2_order_stream），给出时不再聚合 order_events。
+    """
+    if ticks.empty:
+        return []
+
+    merged = aggregate_trade_flow(ticks, large_threshold, super_threshold)
+    if order_flow is None:
+        order_flow = aggregate_order_flow(order_events)
+    if order_flow.empty:
+        for column in ORDER_FLOW_AMOUNT_COLUMNS:
+            merged[column] = np.nan
+    else:
+        merged = merged.join(order_flow[ORDER_FLOW_AMOUNT_COLUMNS], how="left")
+
+    filled = merged[ORDER_FLOW_AMOUNT_COLUMNS].fillna(0.0)
+    merged["cvd_delta"] = merged["cvd_buy"] - merged["cvd_sell"]
+    merged["oib_delta"] = (
+        filled["add_buy_amount"] - filled["cancel_buy_amount"] - filled["add_sell_amount"] + filled["cancel_sell_amount"]
+    )
+
+    n = len(merged)
+    return list(
+        zip(
+            [symbol] * n,
+            bucket_labels(merged.index),
+            [trade_date] * n,
+            *(float_column(merged, c) for c in ("open", "high", "low", "close", "total_amount", "total_volume")),
+            *(float_column(merged, c) for c in (
+                "l1_main_buy", "l1_main_sell", "l1_super_buy", "l1_super_sell",
+                "l2_main_buy", "l2_main_sell", "l2_super_buy", "l2_super_sell",
+            )),
+            *(optional_float_column(merged, c) for c in ORDER_FLOW_AMOUNT_COLUMNS),
+            float_column(merged, "cvd_delta"),
+            float_column(merged, "oib_delta"),
+        )
+    )
+
+
+def build_atomic_order_5m_rows(
+    ticks: pd.DataFrame,
+    order_events: pd.DataFrame,
+    symbol: str,
+    trade_date: str,
+    quality_info: Optional[str],
+    source_type: str = "trade_order",
+    order_flow: Optional[pd.DataFrame] = None,
+) -> List[Tuple]:
+    """atomic_order_5m 的 22 列元组；桶取成交与委托事件的并集，缺失值按 0 计。"""
+    if order_flow is None:
+        order_flow = aggregate_order_flow(order_events)
+    if ticks.empty:
+        cvd = pd.DataFrame(columns=["cvd_buy", "cvd_sell"], index=pd.DatetimeIndex([], name="bucket"), dtype="float64")
+    else:
+        amount = ticks["amount"].to_numpy(dtype="float64")
+        side = ticks["side"].to_numpy()
+        cvd = (
+            pd.DataFrame(
+                {
+                    "bucket": ticks["datetime"].dt.floor(BUCKET_FREQ).to_numpy(),
+                    "cvd_buy": _masked(amount, side == "buy"),
+                    "cvd_sell": _masked(amount, side == "sell"),
+                }
+            )
+            .groupby("bucket", sort=True)[["cvd_buy", "cvd_sell"]]
+            .sum()
+        )
+
+    buckets = cvd.index.union(order_flow.index)
+    if buckets.empty:
+        return []
+    merged = cvd.reindex(buckets).join(order_flow.reindex(buckets)).fillna(0.0)
+    merged["cvd_delta"] = merged["cvd_buy"] - merged["cvd_sell"]
+    merged["buy_net"] = merged["add_buy_amount"] - merged["cancel_buy_amount"]
+    merged["sell_net"] = merged["add_sell_amount"] - merged["cancel_sell_amount"]
+    merged["oib_delta"] = (
+        merged["add_buy_amount"] - merged["cancel_buy_amount"] - merged["add_sell_amount"] + merged["cancel_sell_amount"]
+    )
+    merged["event_count"] = merged[ORDER_FLOW_COUNT_COLUMNS].sum(axis=1)
+
+    n = len(merged)
+    return list(
+        zip(
+            [symbol] * n,
+            [trade_date] * n,
+            bucket_labels(merged.index),
+            *(float_column(merged, c) for c in ORDER_FLOW_AMOUNT_COLUMNS),
+            float_column(merged, "cvd_delta"),
+            float_column(merged, "oib_delta"),
+            *(int_column(merged, c) for c in ORDER_FLOW_COUNT_COLUMNS),
+            *(float_column(merged, c) for c in ORDER_FLOW_VOLUME_COLUMNS),
+            int_column(merged, "event_count"),
+            float_column(merged, "buy_net"),
+            float_column(merged, "sell_net"),
+            [source_type] * n,
+            [quality_info] * n,
+        )
+    )
+
+
+def append_column(rows: Sequence[Tuple], value: object) -> List[Tuple]:
+    return [row + (value,) for row in rows]
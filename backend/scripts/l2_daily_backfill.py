@@ -36,6 +36,9 @@ from backend.app.db.l2_history_db import (
     replace_history_5m_l2_rows,
     replace_history_daily_l2_row,
 )
+from backend.scripts.l2_bar_builder import append_column, build_history_5m_rows
+from backend.scripts.l2_order_stream import WORKER_MEMORY_ENV, should_stream_order_file, stream_order_file
+from backend.scripts.l2_raw_cache import read_raw_csv
 
 
 REQUIRED_FILES = ("行情.csv", "逐笔成交.csv", "逐笔委托.csv")
@@ -76,12 +79,7 @@ def _format_trade_time(raw_series: pd.Series) -> pd.Series:
 
 
 def _read_csv(path: Path) -> pd.DataFrame:
-    df = pd.read_csv(path, encoding="gb18030", low_memory=False)
-    bad_cols = [c for c in df.columns if str(c).strip() == "" or str(c).startswith("Unnamed")]
-    if bad_cols:
-        df = df.drop(columns=bad_cols)
-    df.columns = [str(c).strip() for c in df.columns]
-    return df
+    return read_raw_csv(path)
 
 
 def list_symbol_dirs(day_root: Path, symbols: Optional[Sequence[str]] = None) -> List[Path]:
@@ -155,20 +153,54 @@ def _build_standardized_order_events(order: pd.DataFrame, trade_date: str) -> Tu
     return events, diagnostics
 
 
-def build_standardized_ticks(symbol_dir: Path, trade_date: str) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, object]]:
+def _order_parent_totals(order: pd.DataFrame) -> Dict[int, float]:
+    if "委托价格" not in order.columns or "委托数量" not in order.columns:
+        return {}
+    order_amount_df = pd.DataFrame()
+    order_amount_df["order_id"] = pd.to_numeric(order["交易所委托号"], errors="coerce")
+    order_amount_df["order_price"] = pd.to_numeric(order["委托价格"], errors="coerce") / 10000
+    order_amount_df["order_volume"] = pd.to_numeric(order["委托数量"], errors="coerce")
+    order_amount_df["order_amount"] = order_amount_df["order_price"] * order_amount_df["order_volume"]
+    order_amount_df = order_amount_df.dropna(subset=["order_id", "order_amount"])
+    order_amount_df = order_amount_df[order_amount_df["order_amount"] > 0]
+    return order_amount_df.groupby(order_amount_df["order_id"].astype("int64"))["order_amount"].max().to_dict()
+
+
+def _load_standardized_inputs(
+    symbol_dir: Path, trade_date: str
+) -> Tuple[pd.DataFrame, pd.DataFrame, Optional[pd.DataFrame], Dict[str, object]]:
+    """返回 (ticks, order_events, order_flow, diagnostics)。
+
+    超大逐笔委托走 l2_order_stream 分块两遍扫描：order_events 为空，挂撤单已折叠进 order_flow，
+    母单最大委托额与委托号集合由流式汇总给出；其余情况整表读取，order_flow 为 None。
+    """
     trade_path = symbol_dir / "逐笔成交.csv"
     order_path = symbol_dir / "逐笔委托.csv"
     quote_path = symbol_dir / "行情.csv"
 
     trade = _read_csv(trade_path)
-    order = _read_csv(order_path)
+    streamed = should_stream_order_file(order_path)
+    order = None if streamed else _read_csv(order_path)
     _ = _read_csv(quote_path)  # Read once to fail fast on encoding/shape issues.
 
     required_trade = ["时间", "成交价格", "成交数量", "BS标志", "叫卖序号", "叫买序号"]
     missing_trade = [c for c in required_trade if c not in trade.columns]
     if missing_trade:
         raise ValueError(f"逐笔成交缺列: {', '.join(missing_trade)}")
-    order_events, order_diagnostics = _build_standardized_order_events(order, trade_date)
+    if streamed:
+        summary = stream_order_file(order_path, trade_date, with_parent_amounts=True)
+        order_events = pd.DataFrame()
+        order_flow = summary.order_flow
+        order_diagnostics = summary.diagnostics
+        order_ids = set(summary.order_ids.tolist())
+        order_rows = summary.order_rows
+        order_parent_totals = summary.parent_amounts.to_dict() if summary.parent_amounts is not None else {}
+    else:
+        order_events, order_diagnostics = _build_standardized_order_events(order, trade_date)
+        order_flow = None
+        order_ids = set(pd.to_numeric(order["交易所委托号"], errors="coerce").dropna().astype("int64").tolist())
+        order_rows = len(order)
+        order_parent_totals = _order_parent_totals(order)
 
     ticks = pd.DataFrame()
     ticks["time"] = _format_trade_time(trade["时间"])
@@ -191,7 +223,6 @@ def build_standardized_ticks(symbol_dir: Path, trade_date: str) -> Tuple[pd.Data
     )
     ticks = ticks[trading_mask].sort_values("datetime").reset_index(drop=True)
 
-    order_ids = set(pd.to_numeric(order["交易所委托号"], errors="coerce").dropna().astype("int64").tolist())
     buy_refs = set(ticks.loc[ticks["buy_order_id"] > 0, "buy_order_id"])
     sell_refs = set(ticks.loc[ticks["sell_order_id"] > 0, "sell_order_id"])
     overlap_buy_refs = sorted(buy_refs & order_ids)
@@ -203,19 +234,6 @@ def build_standardized_ticks(symbol_dir: Path, trade_date: str) -> Tuple[pd.Data
             f"OrderID 无法在逐笔委托中对齐: buy_missing={len(missing_buy_refs)}, sell_missing={len(missing_sell_refs)}"
         )
 
-    order_parent_totals: Dict[int, float] = {}
-    if "委托价格" in order.columns and "委托数量" in order.columns:
-        order_amount_df = pd.DataFrame()
-        order_amount_df["order_id"] = pd.to_numeric(order["交易所委托号"], errors="coerce")
-        order_amount_df["order_price"] = pd.to_numeric(order["委托价格"], errors="coerce") / 10000
-        order_amount_df["order_volume"] = pd.to_numeric(order["委托数量"], errors="coerce")
-        order_amount_df["order_amount"] = order_amount_df["order_price"] * order_amount_df["order_volume"]
-        order_amount_df = order_amount_df.dropna(subset=["order_id", "order_amount"])
-        order_amount_df = order_amount_df[order_amount_df["order_amount"] > 0]
-        order_parent_totals = (
-            order_amount_df.groupby(order_amount_df["order_id"].astype("int64"))["order_amount"].max().to_dict()
-        )
-
     buy_trade_parent_totals = ticks[ticks["buy_order_id"] > 0].groupby("buy_order_id")["amount"].sum().to_dict()
     sell_trade_parent_totals = ticks[ticks["sell_order_id"] > 0].groupby("sell_order_id")["amount"].sum().to_dict()
     ticks["buy_parent_total"] = ticks["buy_order_id"].map(order_parent_totals)
@@ -226,7 +244,7 @@ def build_standardized_ticks(symbol_dir: Path, trade_date: str) -> Tuple[pd.Data
     diagnostics = {
         "trade_rows": int(len(trade)),
         "ticks_rows": int(len(ticks)),
-        "order_rows": int(len(order)),
+        "order_rows": int(order_rows),
         "trade_date": trade_date,
         "sample_time_range": [
             ticks["time"].min() if not ticks.empty else None,
@@ -238,6 +256,11 @@ def build_standardized_ticks(symbol_dir: Path, trade_date: str) -> Tuple[pd.Data
         "order_alignment_sell_missing": int(len(missing_sell_refs)),
     }
     diagnostics.update(order_diagnostics)
+    return ticks, order_events, order_flow, diagnostics
+
+
+def build_standardized_ticks(symbol_dir: Path, trade_date: str) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, object]]:
+    ticks, order_events, _, diagnostics = _load_standardized_inputs(symbol_dir, trade_date)
     return ticks, order_events, diagnostics
 
 
@@ -266,104 +289,17 @@ def compute_5m_bars(
     trade_date: str,
     large_threshold: float,
     super_threshold: float,
+    order_flow: Optional[pd.DataFrame] = None,
 ) -> List[Tuple]:
-    if ticks.empty:
-        return []
-
-    df = ticks.copy()
-    df["bucket"] = df["datetime"].dt.floor("5min")
-
-    if "buy_parent_total" not in df.columns:
-        buy_parent_totals = (
-            df[df["buy_order_id"] > 0].groupby("buy_order_id")["amount"].sum().to_dict()
-        )
-        df["buy_parent_total"] = df["buy_order_id"].map(buy_parent_totals).fillna(0.0)
-    if "sell_parent_total" not in df.columns:
-        sell_parent_totals = (
-            df[df["sell_order_id"] > 0].groupby("sell_order_id")["amount"].sum().to_dict()
-        )
-        df["sell_parent_total"] = df["sell_order_id"].map(sell_parent_totals).fillna(0.0)
-
-    df["l1_main_buy_amt"] = ((df["side"] == "buy") & (df["amount"] >= large_threshold)) * df["amount"]
-    df["l1_main_sell_amt"] = ((df["side"] == "sell") & (df["amount"] >= large_threshold)) * df["amount"]
-    df["l1_super_buy_amt"] = ((df["side"] == "buy") & (df["amount"] >= super_threshold)) * df["amount"]
-    df["l1_super_sell_amt"] = ((df["side"] == "sell") & (df["amount"] >= super_threshold)) * df["amount"]
-
-    df["l2_main_buy_amt"] = (df["buy_parent_total"] >= large_threshold) * df["amount"]
-    df["l2_main_sell_amt"] = (df["sell_parent_total"] >= large_threshold) * df["amount"]
-    df["l2_super_buy_amt"] = (df["buy_parent_total"] >= super_threshold) * df["amount"]
-    df["l2_super_sell_amt"] = (df["sell_parent_total"] >= super_threshold) * df["amount"]
-
-    ohlc = df.groupby("bucket")["price"].agg(open="first", high="max", low="min", close="last")
-    flow = df.groupby("bucket").agg(
-        total_amount=("amount", "sum"),
-        total_volume=("volume", "sum"),
-        l1_main_buy=("l1_main_buy_amt", "sum"),
-        l1_main_sell=("l1_main_sell_amt", "sum"),
-        l1_super_buy=("l1_super_buy_amt", "sum"),
-        l1_super_sell=("l1_super_sell_amt", "sum"),
-        l2_main_buy=("l2_main_buy_amt", "sum"),
-        l2_main_sell=("l2_main_sell_amt", "sum"),
-        l2_super_buy=("l2_super_buy_amt", "sum"),
-        l2_super_sell=("l2_super_sell_amt", "sum"),
-        l2_cvd_buy=("amount", lambda s: float(s[df.loc[s.index, "side"] == "buy"].sum())),
-        l2_cvd_sell=("amount", lambda s: float(s[df.loc[s.index, "side"] == "sell"].sum())),
-    )
-    merged = ohlc.join(flow, how="inner")
-
-    if not order_events.empty:
-        events = order_events.copy()
-        events["bucket"] = events["datetime"].dt.floor("5min")
-        event_agg = events.groupby("bucket").agg(
-            l2_add_buy_amount=("amount", lambda s: float(s[(events.loc[s.index, "event_type"] == "add") & (events.loc[s.index, "side"] == "buy")].sum())),
-            l2_add_sell_amount=("amount", lambda s: float(s[(events.loc[s.index, "event_type"] == "add") & (events.loc[s.index, "side"] == "sell")].sum())),
-            l2_cancel_buy_amount=("amount", lambda s: float(s[(events.loc[s.index, "event_type"] == "cancel") & (events.loc[s.index, "side"] == "buy")].sum())),
-            l2_cancel_sell_amount=("amount", lambda s: float(s[(events.loc[s.index, "event_type"] == "cancel") & (events.loc[s.index, "side"] == "sell")].sum())),
-        )
-        merged = merged.join(event_agg, how="left")
-    else:
-        merged["l2_add_buy_amount"] = None
-        merged["l2_add_sell_amount"] = None
-        merged["l2_cancel_buy_amount"] = None
-        merged["l2_cancel_sell_amount"] = None
-
-    merged["l2_cvd_delta"] = merged["l2_cvd_buy"] - merged["l2_cvd_sell"]
-    merged["l2_oib_delta"] = (
-        merged["l2_add_buy_amount"].fillna(0.0)
-        - merged["l2_cancel_buy_amount"].fillna(0.0)
-        - merged["l2_add_sell_amount"].fillna(0.0)
-        + merged["l2_cancel_sell_amount"].fillna(0.0)
+    return build_history_5m_rows(
+        ticks,
+        order_events,
+        symbol=symbol,
+        trade_date=trade_date,
+        large_threshold=large_threshold,
+        super_threshold=super_threshold,
+        order_flow=order_flow,
     )
-    merged = merged.reset_index()
-
-    return [
-        (
-            symbol,
-            row["bucket"].strftime("%Y-%m-%d %H:%M:%S"),
-            trade_date,
-            float(row["open"]),
-            float(row["high"]),
-            float(row["low"]),
-            float(row["close"]),
-            float(row["total_amount"]),
-            float(row["total_volume"]),
-            float(row["l1_main_buy"]),
-            float(row["l1_main_sell"]),
-            float(row["l1_super_buy"]),
-            float(row["l1_super_sell"]),
-            float(row["l2_main_buy"]),
-            float(row["l2_main_sell"]),
-            float(row["l2_super_buy"]),
-            float(row["l2_super_sell"]),
-            float(row["l2_add_buy_amount"]) if pd.notna(row["l2_add_buy_amount"]) else None,
-            float(row["l2_add_sell_amount"]) if pd.notna(row["l2_add_sell_amount"]) else None,
-            float(row["l2_cancel_buy_amount"]) if pd.notna(row["l2_cancel_buy_amount"]) else None,
-            float(row["l2_cancel_sell_amount"]) if pd.notna(row["l2_cancel_sell_amount"]) else None,
-            float(row["l2_cvd_delta"]),
-            float(row["l2_oib_delta"]) if pd.notna(row["l2_oib_delta"]) else None,
-        )
-        for _, row in merged.iterrows()
-    ]
 
 
 def compute_daily_row(symbol: str, trade_date: str, rows_5m: Sequence[Tuple]) -> Optional[Tuple]:
@@ -432,7 +368,7 @@ def process_symbol_dir(
     if missing:
         raise ValueError(f"缺少文件: {', '.join(missing)}")
 
-    ticks, order_events, diagnostics = build_standardized_ticks(symbol_dir, trade_date)
+    ticks, order_events, order_flow, diagnostics = _load_standardized_inputs(symbol_dir, trade_date)
     quality_info = _build_quality_info(diagnostics)
     rows_5m = compute_5m_bars(
         ticks,
@@ -441,11 +377,9 @@ def process_symbol_dir(
         trade_date=trade_date,
         large_threshold=large_threshold,
         super_threshold=super_threshold,
+        order_flow=order_flow,
     )
-    if quality_info:
-        rows_5m = [tuple(list(row) + [quality_info]) for row in rows_5m]
-    else:
-        rows_5m = [tuple(list(row) + [None]) for row in rows_5m]
+    rows_5m = append_column(rows_5m, quality_info or None)
     daily_row = compute_daily_row(symbol, trade_date, rows_5m)
     diagnostics["bars_5m"] = len(rows_5m)
     diagnostics["has_daily"] = daily_row is not None
@@ -577,11 +511,14 @@ def main() -> None:
     parser.add_argument("--mode", default="manual", help="run mode，例如 manual/daily_auto")
     parser.add_argument("--db-path", default="", help="可选 DB 路径；默认使用环境变量 DB_PATH 或 data/market_data.db")
     parser.add_argument("--dry-run", action="store_true", help="只解析与统计，不写库")
+    parser.add_argument("--worker-memory-mb", type=float, default=0, help="内存上限（MB）；超大逐笔委托按此分块流式读取")
     parser.add_argument("--json", action="store_true", help="输出 JSON")
     args = parser.parse_args()
 
     if args.db_path:
         os.environ["DB_PATH"] = os.path.abspath(args.db_path)
+    if args.worker_memory_mb and args.worker_memory_mb > 0:
+        os.environ[WORKER_MEMORY_ENV] = str(float(args.worker_memory_mb))
 
     symbols = [s.strip().lower() for s in args.symbols.split(",") if s.strip()]
     if args.symbols_file:
@@ -0,0 +1,215 @@
+"""
+逐笔委托.csv 的分块流式读取：超大委托文件不再整表读入内存。
+
+活跃个股的委托文件动辄数百 MB，整表 read_csv 再标准化的峰值内存是文件大小的数倍，
+8~12 个进程 shard 并行时会把机器内存打满。流式模式只读 ORDER_USECOLS，按固定行数分块，两遍扫描：
+
+1. 第一遍：收集全量委托号（OrderID 对齐诊断用）、每个委托号最后一个正价（撤单零价回填用）、
+   每个委托号的最大委托额（l2_daily_backfill 的 L2 主力/超大单母单口径），以及 09:30 前的竞价原始行；
+2. 第二遍：用第一遍的价格表给每块事件定价，折叠进 5m 挂撤单累加器与诊断计数。
+
+常驻内存只有按委托号的几张表、竞价窗口的少量行和当前分块，与文件行数解耦；
+分块行数由每个 worker 的内存上限（L2_WORKER_MEMORY_MB）推出。
+跨块的"最后一个正价"按文件顺序取——原始文件按时间排序，结果与整表读取一致。
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backend.scripts.backfill_atomic_order_from_raw import (
+    _format_trade_time,
+    _known_price_by_order_id,
+    _order_event_diagnostics,
+    _price_order_events,
+    _standardize_order_frame,
+)
+from backend.scripts.l2_bar_builder import ORDER_FLOW_COLUMNS, aggregate_order_flow
+from backend.scripts.l2_raw_cache import ORDER_USECOLS
+
+WORKER_MEMORY_ENV = "L2_WORKER_MEMORY_MB"
+STREAM_MODE_ENV = "L2_ORDER_STREAM_MODE"
+DEFAULT_WORKER_MEMORY_MB = 2048.0
+
+# 整表读取 + 标准化后的峰值约为 CSV 字节数的 8 倍（字符串列解析 + events 中间列）
+CSV_EXPANSION_FACTOR = 8.0
+# 预计峰值超过上限的一半就走流式，另一半留给逐笔成交、行情与 builder 中间结果
+STREAM_THRESHOLD_FRACTION = 0.5
+# 每个分块最多占上限的 1/4；按每行约 400 字节（原始列 + 标准化列）估算行数
+CHUNK_BUDGET_FRACTION = 0.25
+BYTES_PER_CHUNK_ROW = 400
+MIN_CHUNK_ROWS = 50_000
+MAX_CHUNK_ROWS = 2_000_000
+
+AUCTION_END_TIME = "09:30:00"
+# 委托类型/委托代码按字符串读，避免不同分块各自推断成 int / float / object
+_CODE_DTYPES = {"委托类型": str, "委托代码": str}
+
+
+def worker_memory_limit_mb(value: Optional[float] = None) -> float:
+    if value is not None and float(value) > 0:
+        return float(value)
+    raw = (os.getenv(WORKER_MEMORY_ENV) or "").strip()
+    try:
+        parsed = float(raw) if raw else 0.0
+    except ValueError:
+        parsed = 0.0
+    return parsed if parsed > 0 else DEFAULT_WORKER_MEMORY_MB
+
+
+def chunk_rows_for_budget(memory_mb: Optional[float] = None) -> int:
+    budget_bytes = worker_memory_limit_mb(memory_mb) * 1024 * 1024 * CHUNK_BUDGET_FRACTION
+    return int(min(MAX_CHUNK_ROWS, max(MIN_CHUNK_ROWS, budget_bytes // BYTES_PER_CHUNK_ROW)))
+
+
+def should_stream_order_file(path: Path, memory_mb: Optional[float] = None) -> bool:
+    """auto：预计整表峰值超过上限一半时流式；always / never 强制开关（L2_ORDER_STREAM_MODE）。"""
+    mode = (os.getenv(STREAM_MODE_ENV) or "auto").strip().lower()
+    if mode == "never":
+        return False
+    if mode == "always":
+        return True
+    try:
+        size = path.stat().st_size
+    except OSError:
+        return False
+    limit_bytes = worker_memory_limit_mb(memory_mb) * 1024 * 1024
+    return size * CSV_EXPANSION_FACTOR > limit_bytes * STREAM_THRESHOLD_FRACTION
+
+
+def iter_csv_chunks(path: Path, usecols: Optional[Sequence[str]], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    wanted = {str(x).strip() for x in usecols} if usecols else None
+    reader = pd.read_csv(
+        path,
+        encoding="gb18030",
+        usecols=(lambda c: str(c).strip() in wanted) if wanted else None,
+        dtype=_CODE_DTYPES,
+        chunksize=max(1, int(chunk_rows)),
+        engine="c",
+    )
+    with reader:
+        for chunk in reader:
+            bad_cols = [c for c in chunk.columns if str(c).strip() == "" or str(c).startswith("Unnamed")]
+            if bad_cols:
+                chunk = chunk.drop(columns=bad_cols)
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            yield chunk
+
+
+def _fold_last(acc: Optional[pd.Series], part: pd.Series) -> pd.Series:
+    if acc is None or acc.empty:
+        return part
+    if part.empty:
+        return acc
+    merged = pd.concat([acc, part])
+    return merged[~merged.index.duplicated(keep="last")]
+
+
+def _fold_max(acc: Optional[pd.Series], part: pd.Series) -> pd.Series:
+    if acc is None or acc.empty:
+        return part
+    if part.empty:
+        return acc
+    return pd.concat([acc, part]).groupby(level=0, sort=False).max()
+
+
+def _chunk_parent_amounts(chunk: pd.DataFrame) -> pd.Series:
+    order_id = pd.to_numeric(chunk["交易所委托号"], errors="coerce")
+    amount = pd.to_numeric(chunk["委托价格"], errors="coerce") / 10000 * pd.to_numeric(chunk["委托数量"], errors="coerce")
+    valid = order_id.notna() & amount.notna() & (amount > 0)
+    if not valid.any():
+        return pd.Series(dtype="float64")
+    return amount[valid].groupby(order_id[valid].astype("int64"), sort=False).max()
+
+
+@dataclass
+class OrderStreamSummary:
+    order_flow: pd.DataFrame
+    diagnostics: Dict[str, object]
+    order_ids: pd.Index
+    order_rows: int
+    auction_raw: pd.DataFrame
+    auction_time: pd.Series
+    parent_amounts: Optional[pd.Series] = None
+    chunk_rows: int = 0
+    chunk_count: int = 0
+
+
+def stream_order_file(
+    path: Path,
+    trade_date: str,
+    chunk_rows: Optional[int] = None,
+    memory_mb: Optional[float] = None,
+    with_parent_amounts: bool = False,
+) -> OrderStreamSummary:
+    """两遍分块扫描逐笔委托，返回 5m 挂撤单聚合、诊断与按委托号的汇总表。"""
+    rows_per_chunk = int(chunk_rows) if chunk_rows else chunk_rows_for_budget(memory_mb)
+
+    order_ids = np.empty(0, dtype="int64")
+    known_price: Optional[pd.Series] = None
+    parent_amounts: Optional[pd.Series] = None
+    auction_parts: List[pd.DataFrame] = []
+    auction_times: List[pd.Series] = []
+    order_rows = 0
+    chunk_count = 0
+    for chunk in iter_csv_chunks(path, ORDER_USECOLS, rows_per_chunk):
+        chunk_count += 1
+        order_rows += len(chunk)
+        if "时间" not in chunk.columns:
+            # 集合竞价摘取和连续竞价过滤都依赖时间列，缺列时直接报出，而不是在比较时间时抛 TypeError
+            raise ValueError("逐笔委托缺列: 时间")
+        time_text = _format_trade_time(chunk["时间"])
+        events = _standardize_order_frame(chunk, trade_date, time_text=time_text)
+        known_price = _fold_last(known_price, _known_price_by_order_id(events))
+        chunk_ids = pd.to_numeric(chunk["交易所委托号"], errors="coerce").dropna().astype("int64").unique()
+        order_ids = np.union1d(order_ids, chunk_ids)
+        if with_parent_amounts:
+            parent_amounts = _fold_max(parent_amounts, _chunk_parent_amounts(chunk))
+        auction_mask = time_text <= AUCTION_END_TIME
+        if auction_mask.any():
+            auction_parts.append(chunk.loc[auction_mask])
+            auction_times.append(time_text.loc[auction_mask])
+        del events, chunk
+
+    known_price = known_price if known_price is not None else pd.Series(dtype="float64")
+    order_flow: Optional[pd.DataFrame] = None
+    counters: Dict[str, int] = {}
+    for chunk in iter_csv_chunks(path, ORDER_USECOLS, rows_per_chunk):
+        events = _price_order_events(_standardize_order_frame(chunk, trade_date), known_price)
+        for key, value in _order_event_diagnostics(events).items():
+            counters[key] = counters.get(key, 0) + value
+        part = aggregate_order_flow(events)
+        order_flow = part if order_flow is None else order_flow.add(part, fill_value=0.0)
+        del events, chunk
+
+    if order_flow is None:
+        order_flow = aggregate_order_flow(pd.DataFrame())
+    auction_raw = pd.concat(auction_parts, ignore_index=True) if auction_parts else pd.DataFrame(columns=ORDER_USECOLS)
+    auction_time = pd.concat(auction_times, ignore_index=True) if auction_times else pd.Series(dtype="str")
+    diagnostics: Dict[str, object] = {
+        "order_event_rows": 0,
+        "order_add_rows": 0,
+        "order_cancel_rows": 0,
+        "order_cancel_zero_price_rows": 0,
+        "order_cancel_repriced_rows": 0,
+    }
+    diagnostics.update(counters)
+    diagnostics["order_read_mode"] = "stream"
+    diagnostics["order_stream_chunks"] = chunk_count
+    return OrderStreamSummary(
+        order_flow=order_flow.sort_index()[ORDER_FLOW_COLUMNS],
+        diagnostics=diagnostics,
+        order_ids=pd.Index(order_ids),
+        order_rows=order_rows,
+        auction_raw=auction_raw,
+        auction_time=auction_time,
+        parent_amounts=parent_amounts,
+        chunk_rows=rows_per_chunk,
+        chunk_count=chunk_count,
+    )
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+L2 日包原始 CSV -> 列式缓存（每个 symbol-day 转换一次）。
+
+逐笔成交/逐笔委托/行情三个 gb18030 CSV 只保留各 builder 实际用到的列，
+时间列在转换时就解析成整数，数值列压成紧凑整型、低基数文本列转 category。
+l2_daily_backfill / backfill_atomic_*_from_raw / build_book_state_from_raw /
+build_open_auction_summaries 统一通过 read_raw_csv 读取：缓存有效时读缓存，
+缺失或源文件已变化（大小/mtime 不一致）时回退到 CSV。
+
+缓存格式：装了 pyarrow 时写 Parquet，否则退回 pandas pickle（同样保留 dtype）；
+可用 L2_RAW_CACHE_FORMAT=parquet|pickle 强制指定。
+缓存位置：默认写在 symbol 目录下的 _columnar/；设置 L2_RAW_CACHE_DIR 后写到
+<L2_RAW_CACHE_DIR>/<交易日目录>/<symbol 目录>/，便于解压目录清理后复用。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend.app.core.l2_package_layout import is_symbol_dir, normalize_month_day_root
+
+CACHE_VERSION = 1
+CACHE_SUBDIR = "_columnar"
+MANIFEST_NAME = "manifest.json"
+
+TRADE_USECOLS = ["时间", "成交价格", "成交数量", "BS标志", "叫卖序号", "叫买序号"]
+ORDER_USECOLS = ["时间", "交易所委托号", "委托类型", "委托代码", "委托价格", "委托数量"]
+QUOTE_USECOLS = (
+    ["时间", "叫买总量", "叫卖总量", "成交价", "最新价", "现价", "收盘价", "昨收", "昨收价", "前收盘", "前收盘价"]
+    + [f"申买价{i}" for i in range(1, 11)]
+    + [f"申卖价{i}" for i in range(1, 11)]
+    + [f"申买量{i}" for i in range(1, 11)]
+    + [f"申卖量{i}" for i in range(1, 11)]
+)
+RAW_FILE_COLUMNS: Dict[str, List[str]] = {
+    "逐笔成交.csv": TRADE_USECOLS,
+    "逐笔委托.csv": ORDER_USECOLS,
+    "行情.csv": QUOTE_USECOLS,
+}
+CATEGORY_MAX_UNIQUE = 64
+INT32_MIN, INT32_MAX = -(2**31), 2**31 - 1
+
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_cache_format(fmt: Optional[str] = None) -> str:
+    value = (fmt or os.getenv("L2_RAW_CACHE_FORMAT", "") or "auto").strip().lower()
+    if value == "auto":
+        return "parquet" if _parquet_available() else "pickle"
+    if value not in {"parquet", "pickle"}:
+        raise ValueError(f"不支持的 L2 缓存格式: {value}")
+    if value == "parquet" and not _parquet_available():
+        raise ValueError("L2_RAW_CACHE_FORMAT=parquet 需要安装 pyarrow")
+    return value
+
+
+def cache_dir_for(symbol_dir: Path, cache_root: Optional[Path] = None) -> Path:
+    root = cache_root or (Path(os.environ["L2_RAW_CACHE_DIR"]) if os.getenv("L2_RAW_CACHE_DIR") else None)
+    if root is None:
+        return symbol_dir / CACHE_SUBDIR
+    return Path(root) / symbol_dir.parent.name / symbol_dir.name
+
+
+def _source_signature(path: Path) -> Dict[str, int]:
+    stat = path.stat()
+    return {"size": int(stat.st_size), "mtime_ns": int(stat.st_mtime_ns)}
+
+
+def _read_csv_frame(path: Path, usecols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    csv_usecols = None
+    if usecols:
+        wanted = {str(x).strip() for x in usecols}
+        csv_usecols = lambda c: str(c).strip() in wanted
+    df = pd.read_csv(path, encoding="gb18030", low_memory=False, usecols=csv_usecols, engine="c", memory_map=True)
+    bad_cols = [c for c in df.columns if str(c).strip() == "" or str(c).startswith("Unnamed")]
+    if bad_cols:
+        df = df.drop(columns=bad_cols)
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def _read_csv_header(path: Path) -> List[str]:
+    header = pd.read_csv(path, encoding="gb18030", nrows=0).columns
+    return [str(c).strip() for c in header if str(c).strip() and not str(c).startswith("Unnamed")]
+
+
+def _compact_time(series: pd.Series) -> pd.Series:
+    """时间列形如 93000000 / 93000000.0 / "093000000"，统一解析成整数。"""
+    numeric = pd.to_numeric(series, errors="coerce")
+    if numeric.isna().any() or not (numeric == numeric.round()).all():
+        return series
+    return numeric.astype("int32")
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    out = pd.DataFrame(index=df.index)
+    for col in df.columns:
+        series = df[col]
+        if col == "时间":
+            out[col] = _compact_time(series)
+        elif pd.api.types.is_integer_dtype(series) and (series.empty or (series.min() >= INT32_MIN and series.max() <= INT32_MAX)):
+            # 只压到 int32：成交量等在下游还会参与乘法/求和，更小的整型有溢出风险
+            out[col] = series.astype("int32")
+        elif (series.dtype == object or pd.api.types.is_string_dtype(series)) and series.nunique(dropna=True) <= CATEGORY_MAX_UNIQUE:
+            out[col] = series.astype("category")
+        else:
+            out[col] = series
+    return out
+
+
+def _write_frame(df: pd.DataFrame, path: Path, fmt: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    if fmt == "parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        df.reset_index(drop=True).to_pickle(tmp)
+    os.replace(tmp, path)
+
+
+def _read_frame(path: Path, fmt: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    if fmt == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    df = pd.read_pickle(path)
+    return df[columns] if columns is not None else df
+
+
+def _load_manifest(cache_dir: Path) -> Optional[Dict[str, object]]:
+    path = cache_dir / MANIFEST_NAME
+    if not path.is_file():
+        return None
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != CACHE_VERSION:
+        return None
+    return manifest
+
+
+def convert_symbol_dir(
+    symbol_dir: Path,
+    cache_root: Optional[Path] = None,
+    fmt: Optional[str] = None,
+    force: bool = False,
+) -> Dict[str, object]:
+    """把一个 symbol-day 的三个原始 CSV 转成列式缓存；源文件未变化时跳过。"""
+    cache_format = resolve_cache_format(fmt)
+    cache_dir = cache_dir_for(symbol_dir, cache_root)
+    manifest = None if force else _load_manifest(cache_dir)
+    files: Dict[str, object] = dict(manifest.get("files", {})) if manifest and manifest.get("format") == cache_format else {}
+    report = {"symbol_dir": str(symbol_dir), "cache_dir": str(cache_dir), "format": cache_format, "converted": [], "skipped": []}
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for file_name, usecols in RAW_FILE_COLUMNS.items():
+        source = symbol_dir / file_name
+        if not source.is_file():
+            files.pop(file_name, None)
+            continue
+        signature = _source_signature(source)
+        entry = files.get(file_name)
+        if entry and entry.get("source") == signature and (cache_dir / entry["path"]).is_file():
+            report["skipped"].append(file_name)
+            continue
+        frame = compact_frame(_read_csv_frame(source, usecols=usecols))
+        target_name = f"{Path(file_name).stem}.{'parquet' if cache_format == 'parquet' else 'pkl'}"
+        _write_frame(frame, cache_dir / target_name, cache_format)
+        files[file_name] = {
+            "path": target_name,
+            "source": signature,
+            "source_columns": _read_csv_header(source),
+            "columns": list(frame.columns),
+            "rows": int(len(frame)),
+        }
+        report["converted"].append(file_name)
+
+    manifest_path = cache_dir / MANIFEST_NAME
+    tmp = manifest_path.with_name(MANIFEST_NAME + ".tmp")
+    tmp.write_text(
+        json.dumps({"version": CACHE_VERSION, "format": cache_format, "files": files}, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    os.replace(tmp, manifest_path)
+    return report
+
+
+def read_cached_frame(
+    path: Path,
+    usecols: Optional[Sequence[str]] = None,
+    cache_root: Optional[Path] = None,
+) -> Optional[pd.DataFrame]:
+    """命中有效缓存时返回 DataFrame，否则返回 None（由调用方回退 CSV）。"""
+    cache_dir = cache_dir_for(path.parent, cache_root)
+    manifest = _load_manifest(cache_dir)
+    if not manifest:
+        return None
+    entry = manifest.get("files", {}).get(path.name)
+    if not entry or not path.is_file() or entry.get("source") != _source_signature(path):
+        return None
+    cached_columns = list(entry.get("columns") or [])
+    columns = None
+    if usecols:
+        wanted = {str(c).strip() for c in usecols}
+        # 源 CSV 里有、但缓存没保留的列：缓存不完整，回退 CSV
+        if wanted & set(entry.get("source_columns") or []) - set(cached_columns):
+            return None
+        columns = [c for c in cached_columns if c in wanted]
+    try:
+        return _read_frame(cache_dir / entry["path"], str(manifest.get("format")), columns=columns)
+    except Exception:
+        return None
+
+
+def read_raw_csv(path: Path, usecols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """各 builder 的统一读取入口：优先列式缓存，回退 gb18030 CSV。"""
+    cached = read_cached_frame(path, usecols=usecols)
+    if cached is not None:
+        return cached
+    return _read_csv_frame(path, usecols=usecols)
+
+
+def _list_symbol_dirs(input_path: Path, symbols: Optional[Sequence[str]] = None) -> List[Path]:
+    if is_symbol_dir(input_path) or (input_path / "逐笔成交.csv").is_file():
+        return [input_path]
+    day_root, _ = normalize_month_day_root(input_path)
+    targets = {s.strip().lower() for s in symbols} if symbols else None
+    result: List[Path] = []
+    for child in sorted(day_root.iterdir()):
+        if not child.is_dir() or not is_symbol_dir(child):
+            continue
+        name = child.name.lower()
+        if targets and f"{name[7:]}{name[:6]}" not in targets:
+            continue
+        result.append(child)
+    return result
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="把 L2 日包原始 CSV 一次性转换成列式缓存")
+    parser.add_argument("input_path", help="日包目录（YYYYMM/YYYYMMDD）或单个 symbol 目录")
+    parser.add_argument("--symbols", default="", help="逗号分隔，如 sz000833,sh603629")
+    parser.add_argument("--cache-dir", default="", help="缓存根目录，默认写在 symbol 目录下的 _columnar/")
+    parser.add_argument("--format", default="", choices=["", "auto", "parquet", "pickle"])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--force", action="store_true", help="忽略已有缓存重新转换")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    symbols = [s for s in args.symbols.split(",") if s.strip()]
+    symbol_dirs = _list_symbol_dirs(Path(args.input_path), symbols or None)
+    cache_root = Path(args.cache_dir) if args.cache_dir else None
+    started = time.perf_counter()
+    results: List[Dict[str, object]] = []
+    failures: List[Dict[str, str]] = []
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {
+            pool.submit(convert_symbol_dir, symbol_dir, cache_root, args.format or None, args.force): symbol_dir
+            for symbol_dir in symbol_dirs
+        }
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                failures.append({"symbol_dir": str(futures[future]), "error": str(exc)})
+    print(
+        json.dumps(
+            {
+                "symbol_dirs": len(symbol_dirs),
+                "converted_files": sum(len(r["converted"]) for r in results),
+                "skipped_files": sum(len(r["skipped"]) for r in results),
+                "failures": failures,
+                "elapsed_seconds": round(time.perf_counter() - started, 3),
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
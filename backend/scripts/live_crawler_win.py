@@ -122,6 +122,11 @@ FINAL_SWEEP_RETRY_INTERVAL_SECONDS = int(os.getenv("FINAL_SWEEP_RETRY_INTERVAL_S
 FOCUS_SNAPSHOT_INTERVAL_SECONDS = int(os.getenv("FOCUS_SNAPSHOT_INTERVAL_SECONDS", "3"))
 WARM_SNAPSHOT_INTERVAL_SECONDS = int(os.getenv("WARM_SNAPSHOT_INTERVAL_SECONDS", "10"))
 AKSHARE_TICK_TIMEOUT_SECONDS = float(os.getenv("AKSHARE_TICK_TIMEOUT_SECONDS", "15"))
+# append: 只推送云端水位线之后的新增 tick；overwrite: 每次推送当日全量快照（旧行为）
+TICK_INGEST_MODE = os.getenv("TICK_INGEST_MODE", "append").strip().lower()
+
+# 云端确认过的逐笔水位线：symbol -> {date, last_time, last_seq, row_count}
+_TICK_WATERMARKS = {}
 
 
 def fetch_ticks_with_timeout(symbol, timeout_seconds=AKSHARE_TICK_TIMEOUT_SECONDS):
@@ -314,6 +319,79 @@ async def poll_snapshots_loop():
 # ==========================================
 # Task: 3-Minute Trade Ticks (AkShare JS TX)
 # ==========================================
+def _advance_watermark(base, ticks):
+    last_time = (base or {}).get("last_time", "")
+    last_seq = int((base or {}).get("last_seq", 0))
+    for tick in ticks:
+        if tick["time"] == last_time:
+            last_seq += 1
+        else:
+            last_time = tick["time"]
+            last_seq = 1
+    return {"last_time": last_time, "last_seq": last_seq, "row_count": int((base or {}).get("row_count", 0)) + len(ticks)}
+
+
+def _ticks_after_watermark(ticks_list, watermark):
+    """
+    按云端确认的水位线切出新增 tick。本地全量快照的前缀与水位线对不上时返回 None，
+    调用方需回退为全量覆盖推送。
+    """
+    row_count = int(watermark.get("row_count", 0))
+    if row_count <= 0 or row_count > len(ticks_list):
+        return None
+    prefix = _advance_watermark(None, ticks_list[:row_count])
+    if prefix["last_time"] != watermark.get("last_time") or prefix["last_seq"] != int(watermark.get("last_seq", 0)):
+        return None
+    return ticks_list[row_count:]
+
+
+def _post_ticks(payload):
+    res = requests.post(f"{CLOUD_URL}/api/internal/ingest/ticks", json=payload, timeout=10)
+    if res.status_code != 200:
+        raise RuntimeError(f"push failed: {res.status_code} {res.text}")
+    try:
+        return res.json().get("tick_watermarks") or []
+    except ValueError:
+        return []
+
+
+def push_ticks(sym, today_str, ticks_list, force_overwrite=False):
+    """推送单票当日 tick，返回实际上传的行数；优先走 append，水位线不连续时回退 overwrite。"""
+    watermark = _TICK_WATERMARKS.get(sym)
+    if (
+        TICK_INGEST_MODE == "append"
+        and not force_overwrite
+        and watermark
+        and watermark.get("date") == today_str
+    ):
+        delta = _ticks_after_watermark(ticks_list, watermark)
+        if delta is not None:
+            if not delta:
+                return 0
+            results = _post_ticks({
+                "token": INGEST_TOKEN,
+                "mode": "append",
+                "watermarks": [{"symbol": sym, **watermark}],
+                "ticks": delta,
+            })
+            result = next((r for r in results if r.get("symbol") == sym), None)
+            if result and result.get("status") == "appended":
+                _TICK_WATERMARKS[sym] = {"date": result.get("date", today_str), **(result.get("watermark") or {})}
+                return len(delta)
+            logger.info(f"[{sym}] watermark mismatch on cloud, falling back to full overwrite")
+
+    results = _post_ticks({
+        "token": INGEST_TOKEN,
+        "ticks": ticks_list,
+    })
+    result = next((r for r in results if r.get("symbol") == sym), None)
+    if result and result.get("watermark"):
+        _TICK_WATERMARKS[sym] = {"date": result.get("date", today_str), **result["watermark"]}
+    else:
+        _TICK_WATERMARKS.pop(sym, None)
+    return len(ticks_list)
+
+
 def get_trading_date(symbol="sh600000"):
     """Get the true latest trading date from a Tencent snapshot to avoid weekend mismatch."""
     try:
@@ -332,7 +410,7 @@ def get_trading_date(symbol="sh600000"):
         
     return now.strftime("%Y-%m-%d")
 
-def fetch_and_post_ticks(target_symbols=None, max_retries=1):
+def fetch_and_post_ticks(target_symbols=None, max_retries=1, force_overwrite=False):
     stats = {"attempted": 0, "succeeded": 0, "failed": [], "rows": 0}
 
     if target_symbols is None:
@@ -384,17 +462,11 @@ def fetch_and_post_ticks(target_symbols=None, max_retries=1):
                 if not ticks_list:
                     raise RuntimeError("no valid ticks after time filter")
 
-                payload = {
-                    "token": INGEST_TOKEN,
-                    "ticks": ticks_list
-                }
-                res = requests.post(f"{CLOUD_URL}/api/internal/ingest/ticks", json=payload, timeout=10)
-                if res.status_code != 200:
-                    raise RuntimeError(f"push failed: {res.status_code} {res.text}")
+                pushed_rows = push_ticks(sym, today_str, ticks_list, force_overwrite=force_overwrite)
 
-                logger.info(f" -> Pushed {len(ticks_list)} ticks to Cloud")
+                logger.info(f" -> Pushed {pushed_rows}/{len(ticks_list)} ticks to Cloud")
                 stats["succeeded"] += 1
-                stats["rows"] += len(ticks_list)
+                stats["rows"] += pushed_rows
                 pushed = True
                 break
 
@@ -436,7 +508,7 @@ async def poll_ticks_loop():
         if today_is_trade_day and "15:01:00" <= current_time <= "15:10:00":
             if (not has_done_final_sweep) and (now_ts - last_final_sweep_attempt_ts >= FINAL_SWEEP_RETRY_INTERVAL_SECONDS):
                 logger.info(">>> Executing FINAL SWEEP FOR ALL WATCHLIST STOCKS <<<")
-                stats = fetch_and_post_ticks(None, max_retries=2)
+                stats = fetch_and_post_ticks(None, max_retries=2, force_overwrite=True)
                 last_final_sweep_attempt_ts = now_ts
                 if stats["attempted"] > 0 and not stats["failed"]:
                     has_done_final_sweep = True
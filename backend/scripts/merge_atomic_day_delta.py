@@ -12,6 +12,7 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from backend.app.core.config import candidate_atomic_db_paths
+from backend.app.db.l2_history_db import bump_l2_history_cache_generation, refresh_atomic_coverage_bounds
 
 TABLE_SPECS: List[Tuple[str, str]] = [
     ("atomic_trade_5m", "trade_date"),
@@ -84,8 +85,18 @@ def merge_atomic_day_delta(trade_date: str, delta_db: str, target_db: str = "")
         sqlite3.connect(target_path).close()
 
     counts: Dict[str, int] = {}
+    touched_symbols = set()
     with sqlite3.connect(target_path) as conn:
         conn.execute(f"ATTACH DATABASE '{delta_literal}' AS delta")
+        for schema in ("main", "delta"):
+            if _table_exists(conn, "atomic_trade_daily", schema):
+                touched_symbols.update(
+                    str(row[0])
+                    for row in conn.execute(
+                        f"SELECT DISTINCT symbol FROM {schema}.atomic_trade_daily WHERE trade_date=?",
+                        (normalized_date,),
+                    )
+                )
         for table, date_col in TABLE_SPECS:
             if not _table_exists(conn, table, "delta"):
                 counts[table] = 0
@@ -107,6 +118,9 @@ def merge_atomic_day_delta(trade_date: str, delta_db: str, target_db: str = "")
             row = conn.execute("SELECT changes()").fetchone()
             counts[table] = int(row[0] or 0) if row else 0
         conn.commit()
+    # atomic 库与正式历史库分属两个文件，覆盖区间与 generation 统一记在正式库里
+    refresh_atomic_coverage_bounds(sorted(touched_symbols), atomic_db_path=str(target_path))
+    bump_l2_history_cache_generation("atomic")
 
     return {
         "trade_date": normalized_date,
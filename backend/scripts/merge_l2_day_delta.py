@@ -19,9 +19,11 @@ if ROOT_DIR not in sys.path:
 from backend.app.core.config import DB_FILE
 from backend.app.db.l2_history_db import (
     add_l2_daily_ingest_failures,
+    bump_l2_history_cache_generation,
     create_l2_daily_ingest_run,
     ensure_l2_history_schema,
     finish_l2_daily_ingest_run,
+    refresh_history_coverage_bounds,
 )
 
 
@@ -84,6 +86,10 @@ def merge_l2_day_delta(
     conn = sqlite3.connect(resolved_db_path)
     try:
         with conn:
+            touched_symbols = {
+                str(row[0])
+                for row in conn.execute("SELECT DISTINCT symbol FROM history_daily_l2 WHERE date=?", (trade_date,))
+            }
             conn.execute("DELETE FROM history_5m_l2 WHERE source_date=?", (trade_date,))
             conn.execute("DELETE FROM history_daily_l2 WHERE date=?", (trade_date,))
 
@@ -170,7 +176,13 @@ def merge_l2_day_delta(
                     (trade_date,),
                 ).fetchone()[0]
             )
+            touched_symbols.update(
+                str(row[0])
+                for row in conn.execute("SELECT DISTINCT symbol FROM history_daily_l2 WHERE date=?", (trade_date,))
+            )
+            refresh_history_coverage_bounds(conn, sorted(touched_symbols))
 
+        bump_l2_history_cache_generation("history")
         if failures:
             add_l2_daily_ingest_failures(run_id, failures)
 
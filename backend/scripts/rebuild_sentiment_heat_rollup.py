@@ -0,0 +1,42 @@
+"""
+重建散户舆情热度预聚合 sentiment_heat_rollup（10m / 1d）。
+
+日常由 SentimentCrawler.save_comments 写入后按天增量维护，首次读取某只股票时也会整股建一次；
+上线回填、调整多空关键词或直接改写 sentiment_events 后执行本脚本。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="重建 sentiment_heat_rollup")
+    parser.add_argument("--db-path", default="", help="正式库路径，默认取 DB_PATH")
+    parser.add_argument("--symbol", default="", help="只重建单只股票，默认全部有帖子的股票")
+    parser.add_argument("--start-date", default="", help="只重算该日期起的桶（YYYY-MM-DD），默认全部")
+    parser.add_argument("--end-date", default="", help="只重算到该日期的桶（YYYY-MM-DD），默认全部")
+    args = parser.parse_args()
+
+    if args.db_path:
+        os.environ["DB_PATH"] = args.db_path
+    from backend.app.services.retail_sentiment import rebuild_sentiment_heat_rollup
+
+    report = rebuild_sentiment_heat_rollup(
+        args.symbol or None,
+        start_date=args.start_date or None,
+        end_date=args.end_date or None,
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+全量重建正式库里的 symbol_coverage_bounds（复盘股票池的每股覆盖区间）。
+
+日常由 replace_history_daily_l2_row 与两个合并脚本增量维护；
+直接改写 history_daily_l2 / atomic_trade_daily 的回填脚本跑完后执行一次本脚本。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from backend.app.db.l2_history_db import rebuild_symbol_coverage_bounds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="重建 symbol_coverage_bounds")
+    parser.add_argument("--db-path", default="", help="正式库路径，默认取 DB_PATH")
+    parser.add_argument("--atomic-db", default="", help="atomic 库路径，默认按 candidate_atomic_db_paths 解析")
+    args = parser.parse_args()
+
+    if args.db_path:
+        os.environ["DB_PATH"] = args.db_path
+    report = rebuild_symbol_coverage_bounds(atomic_db_path=args.atomic_db or None)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+回填 / 重算 sentiment_events 的入库质量标记（股票错配、低价值、广告、同日重复）。
+
+日常由 SentimentCrawler.save_comments 写入时计算，读取某只股票前也会补齐缺标记的行；
+上线回填或递增 EVENT_QUALITY_CLASSIFIER_VERSION 后执行本脚本，只重算版本不一致的行，
+错配标记有变化的发帖日会同步刷新热度预聚合。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="重算 sentiment_events 质量标记")
+    parser.add_argument("--db-path", default="", help="正式库路径，默认取 DB_PATH")
+    parser.add_argument("--symbol", default="", help="只处理单只股票，默认全部存在旧版本标记的股票")
+    parser.add_argument("--force", action="store_true", help="无视分类器版本整股重算")
+    parser.add_argument("--batch-size", type=int, default=2000, help="每批读取的事件条数")
+    args = parser.parse_args()
+
+    if args.db_path:
+        os.environ["DB_PATH"] = args.db_path
+    from backend.app.services.retail_sentiment import reclassify_sentiment_event_quality
+
+    report = reclassify_sentiment_event_quality(
+        args.symbol or None,
+        force=args.force,
+        batch_size=args.batch_size,
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
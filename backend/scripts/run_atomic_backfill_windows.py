@@ -3,33 +3,34 @@ from __future__ import annotations
 
 import argparse
 import json
+import multiprocessing
 import os
+import queue
 import shutil
 import sqlite3
 import subprocess
 import sys
 import threading
+import time
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from backend.scripts.backfill_atomic_order_from_raw import _apply_support_ratios, _build_order_rows, _replace_rows as replace_order_rows, load_l2_symbol_bundle
-from backend.scripts.build_book_state_from_raw import build_book_rows, replace_book_rows
+from backend.scripts.atomic_day_pipeline import build_atomic_day_rows, symbol_savepoint, write_atomic_day_rows
+from backend.scripts.l2_order_stream import WORKER_MEMORY_ENV
 from backend.scripts.build_limit_state_from_atomic import build_limit_state, ensure_default_rules as ensure_limit_rules, ensure_schema as ensure_limit_schema, replace_rows as replace_limit_rows
-from backend.scripts.build_open_auction_summaries import _build_l1_summary_from_frames, _build_l2_summary_from_frames, _build_manifest, _build_phase_l1_summary_from_frames, _build_phase_l2_summary_from_frames, _prepare_order_auction_df, _prepare_quote_auction_df, _prepare_trade_auction_df, _upsert as upsert_auction
 from backend.scripts.run_symbol_atomic_validation import (
     ATOMIC_INIT_SCRIPT,
     BOOK_STATE_SCHEMA,
     OPEN_AUCTION_PHASE_SCHEMA,
     OPEN_AUCTION_SCHEMA,
     WIN_7Z,
-    _build_atomic_trade_5m_rows_from_l2,
     _build_atomic_trade_5m_rows_from_legacy,
     _build_atomic_trade_daily_row,
     _replace_trade_rows,
@@ -51,6 +52,13 @@ SHARD_MERGE_TABLES = [
     "atomic_open_auction_phase_l2_daily",
     "atomic_open_auction_manifest",
 ]
+# 单只 L2 股票的成本权重：三个原始文件的字节数之和
+L2_COST_FILES = ("逐笔成交.csv", "逐笔委托.csv", "行情.csv")
+# 本次并入行数 >= 目标表现有行数 * 该比例时，先删二级索引、追加完再一次性重建
+DEFER_INDEX_MIN_RATIO = 1.0
+# 合并前删掉的二级索引 DDL 记在目标库这张表里，与 DROP 同一事务提交；
+# 进程在重建前被杀时，下次启动（ensure_atomic_db / 下一次合并）据此补建
+DEFERRED_INDEX_TABLE = "atomic_merge_deferred_indexes"
 
 
 @dataclass(frozen=True)
@@ -98,6 +106,7 @@ def ensure_atomic_db(atomic_db: Path) -> None:
         ensure_limit_schema(conn)
         ensure_limit_rules(conn)
         conn.commit()
+        _restore_deferred_indexes(conn)
 
 
 def _configure_sqlite_for_shard(conn: sqlite3.Connection) -> None:
@@ -125,7 +134,8 @@ def _write_legacy_rows_to_conn(
         csv_path, symbol, trade_date, large_threshold, super_threshold
     )
     daily = _build_atomic_trade_daily_row(symbol, trade_date, rows_5m, "trade_only", quality_info, daily_feature)
-    stats = _replace_trade_rows(conn, rows_5m, daily) if daily else {"rows_5m": 0, "rows_daily": 0}
+    with symbol_savepoint(conn):
+        stats = _replace_trade_rows(conn, rows_5m, daily) if daily else {"rows_5m": 0, "rows_daily": 0}
     return {"symbol": symbol, "rows_5m": len(rows_5m), **stats}
 
 
@@ -136,40 +146,8 @@ def _write_l2_rows_to_conn(
     large_threshold: float,
     super_threshold: float,
 ) -> Dict[str, object]:
-    prepared = load_l2_symbol_bundle(symbol_dir, trade_date)
-    symbol = prepared.symbol
-    rows_5m_trade, quality_info, daily_feature = _build_atomic_trade_5m_rows_from_l2(
-        symbol_dir, trade_date, large_threshold, super_threshold, prepared=prepared
-    )
-    daily_trade = _build_atomic_trade_daily_row(symbol, trade_date, rows_5m_trade, "trade_order", quality_info, daily_feature)
-    _, rows_5m_order, daily_order, _ = _build_order_rows(symbol_dir, trade_date, prepared=prepared)
-    rows_5m_book, daily_book = build_book_rows(symbol_dir, trade_date, quote_df=prepared.quote_raw)
-    compact_trade_date = to_compact(trade_date)
-    auction_trade_df = _prepare_trade_auction_df(prepared.trade_raw)
-    auction_order_df = _prepare_order_auction_df(prepared.order_raw)
-    auction_quote_df = _prepare_quote_auction_df(prepared.quote_raw)
-    l1_row = _build_l1_summary_from_frames(symbol, compact_trade_date, auction_trade_df, auction_quote_df, prepared.quote_raw)
-    l2_row = _build_l2_summary_from_frames(symbol, compact_trade_date, auction_trade_df, auction_order_df)
-    phase_l1_row = _build_phase_l1_summary_from_frames(symbol, compact_trade_date, auction_trade_df, auction_quote_df)
-    phase_l2_row = _build_phase_l2_summary_from_frames(symbol, compact_trade_date, auction_trade_df, auction_order_df)
-    manifest = _build_manifest(l1_row, l2_row)
-    trade_stats = _replace_trade_rows(conn, rows_5m_trade, daily_trade) if daily_trade else {"rows_5m": 0, "rows_daily": 0}
-    total_amount = float(daily_trade[6]) if daily_trade else None
-    daily_order = _apply_support_ratios(daily_order, total_amount)
-    replace_order_rows(conn, rows_5m_order, daily_order)
-    replace_book_rows(conn, rows_5m_book, daily_book)
-    upsert_auction(conn, "atomic_open_auction_l1_daily", l1_row)
-    upsert_auction(conn, "atomic_open_auction_l2_daily", l2_row)
-    upsert_auction(conn, "atomic_open_auction_phase_l1_daily", phase_l1_row)
-    upsert_auction(conn, "atomic_open_auction_phase_l2_daily", phase_l2_row)
-    upsert_auction(conn, "atomic_open_auction_manifest", manifest)
-    return {
-        "symbol": symbol,
-        "rows_5m": len(rows_5m_trade),
-        "order_5m_rows": len(rows_5m_order),
-        "book_5m_rows": len(rows_5m_book),
-        **trade_stats,
-    }
+    rows = build_atomic_day_rows(symbol_dir, trade_date, large_threshold, super_threshold)
+    return write_atomic_day_rows(conn, rows)
 
 
 def load_config(path: Path) -> Dict[str, object]:
@@ -188,6 +166,8 @@ def load_config(path: Path) -> Dict[str, object]:
     data.setdefault("max_items_per_day", 0)
     data.setdefault("reuse_extracted_day_if_exists", False)
     data.setdefault("extractor", "auto")
+    # 每个 shard 进程的内存上限（MB）；超大逐笔委托据此切换分块流式读取，0 表示沿用环境变量/默认值
+    data.setdefault("worker_memory_mb", 0)
     data.setdefault("state_file", str(path.with_name(path.stem + "_state.json")))
     data.setdefault("report_file", str(path.with_name(path.stem + "_report.json")))
     return data
@@ -318,64 +298,318 @@ def process_l2_symbol(symbol_dir: Path, trade_date: str, atomic_db: Path, write_
     return stats
 
 
-def _run_process_shard(
+def estimate_item_cost(item: Path, kind: str) -> int:
+    """按原始文件字节数估算单只股票的处理成本。
+
+    atomic_data_manifest 只记月度数据集汇总，没有单只股票的历史耗时，
+    而解析耗时与逐笔文件大小基本线性，直接用字节数做权重。
+    """
+    paths = [item] if kind == "legacy" else [item / name for name in L2_COST_FILES]
+    total = 0
+    for path in paths:
+        try:
+            total += int(path.stat().st_size)
+        except OSError:
+            continue
+    return total
+
+
+def order_items_by_cost(items: Sequence[Path], kind: str) -> List[Tuple[Path, int]]:
+    """大票在前（LPT）：尾部只剩小票，空闲 worker 抢到的都是短任务。"""
+    costed = [(Path(item), estimate_item_cost(Path(item), kind)) for item in items]
+    costed.sort(key=lambda pair: pair[1], reverse=True)
+    return costed
+
+
+def _run_shard_items(
     kind: str,
     trade_date: str,
     atomic_db: str,
-    item_paths: Sequence[str],
+    item_paths: Iterable[str],
     large_threshold: float,
     super_threshold: float,
 ) -> Dict[str, object]:
+    started = time.perf_counter()
     shard_db = Path(atomic_db)
     if shard_db.exists():
         shard_db.unlink()
     ensure_atomic_db(shard_db)
     failures: List[Dict[str, str]] = []
     success_count = 0
+    item_count = 0
+    input_bytes = 0
+    item_sec = 0.0
     worker_fn = _write_legacy_rows_to_conn if kind == "legacy" else _write_l2_rows_to_conn
     with sqlite3.connect(shard_db) as conn:
         _configure_sqlite_for_shard(conn)
-        commit_every = 64
-        pending_since_commit = 0
+        # 整个 shard 一个事务；每只股票在 worker 内部各自一个 SAVEPOINT，失败只回滚自己
+        conn.execute("BEGIN")
         for raw_path in item_paths:
             item = Path(raw_path)
+            item_count += 1
+            input_bytes += estimate_item_cost(item, kind)
+            item_started = time.perf_counter()
             try:
                 worker_fn(conn, item, trade_date, large_threshold, super_threshold)
                 success_count += 1
-                pending_since_commit += 1
-                if pending_since_commit >= commit_every:
-                    conn.commit()
-                    pending_since_commit = 0
             except Exception as exc:
                 failures.append({"item": str(item), "error": repr(exc)})
-        if pending_since_commit > 0:
-            conn.commit()
+            item_sec += time.perf_counter() - item_started
+        conn.commit()
     return {
         "success_count": success_count,
         "failure_count": len(failures),
         "failures": failures[:10],
+        "item_count": item_count,
+        "input_bytes": input_bytes,
+        "item_sec": item_sec,
+        "busy_sec": time.perf_counter() - started,
+    }
+
+
+def _run_process_shard(
+    kind: str,
+    trade_date: str,
+    atomic_db: str,
+    item_paths: Sequence[str],
+    large_threshold: float,
+    super_threshold: float,
+) -> Dict[str, object]:
+    return _run_shard_items(kind, trade_date, atomic_db, item_paths, large_threshold, super_threshold)
+
+
+def _drain_queue(work_queue) -> Iterator[str]:
+    while True:
+        try:
+            raw_path = work_queue.get_nowait()
+        except queue.Empty:
+            return
+        yield raw_path
+
+
+def _run_queue_worker(
+    kind: str,
+    trade_date: str,
+    atomic_db: str,
+    work_queue,
+    large_threshold: float,
+    super_threshold: float,
+) -> Dict[str, object]:
+    return _run_shard_items(kind, trade_date, atomic_db, _drain_queue(work_queue), large_threshold, super_threshold)
+
+
+def _build_scheduler_report(worker_results: Sequence[Dict[str, object]], pool_elapsed: float) -> Dict[str, object]:
+    workers: List[Dict[str, object]] = []
+    for idx, result in enumerate(worker_results, start=1):
+        busy_sec = float(result.get("busy_sec", 0.0) or 0.0)
+        workers.append(
+            {
+                "worker": idx,
+                "items": int(result.get("item_count", 0) or 0),
+                "input_mb": round(int(result.get("input_bytes", 0) or 0) / 1024 / 1024, 2),
+                "busy_sec": round(busy_sec, 2),
+                "utilization": round(min(1.0, busy_sec / pool_elapsed), 3) if pool_elapsed > 0 else None,
+            }
+        )
+    utilizations = [w["utilization"] for w in workers if w["utilization"] is not None]
+    return {
+        "mode": "work_stealing",
+        "cost_basis": "raw_file_bytes",
+        "pool_elapsed_sec": round(pool_elapsed, 2),
+        "mean_utilization": round(sum(utilizations) / len(utilizations), 3) if utilizations else None,
+        "min_utilization": min(utilizations) if utilizations else None,
+        "workers": workers,
     }
 
 
-def _merge_shard_tables(target_db: Path, shard_dbs: Sequence[Path]) -> None:
+def run_work_stealing_shards(
+    kind: str,
+    trade_date: str,
+    items: Sequence[Path],
+    shard_dbs: Sequence[Path],
+    large_threshold: float,
+    super_threshold: float,
+    on_worker_done: Optional[Callable[[Dict[str, object]], None]] = None,
+) -> Tuple[List[Dict[str, object]], Dict[str, object]]:
+    """按成本从大到小入共享队列，每个 worker 进程各写一个 shard 库、做完一只就去队列取下一只。
+
+    返回 (每个 worker 的结果, 调度报告)；worker 数即 shard_dbs 的个数。
+    """
+    ordered = [str(item) for item, _ in order_items_by_cost(items, kind)]
+    results: List[Optional[Dict[str, object]]] = [None] * len(shard_dbs)
+    started = time.perf_counter()
+    if len(shard_dbs) == 1:
+        results[0] = _run_shard_items(kind, trade_date, str(shard_dbs[0]), ordered, large_threshold, super_threshold)
+        if on_worker_done:
+            on_worker_done(results[0])
+    elif shard_dbs:
+        with multiprocessing.Manager() as manager:
+            work_queue = manager.Queue()
+            for raw_path in ordered:
+                work_queue.put(raw_path)
+            with ProcessPoolExecutor(max_workers=len(shard_dbs)) as executor:
+                future_map = {
+                    executor.submit(
+                        _run_queue_worker,
+                        kind,
+                        trade_date,
+                        str(shard_db),
+                        work_queue,
+                        large_threshold,
+                        super_threshold,
+                    ): idx
+                    for idx, shard_db in enumerate(shard_dbs)
+                }
+                for future in as_completed(future_map):
+                    result = future.result()
+                    results[future_map[future]] = result
+                    if on_worker_done:
+                        on_worker_done(result)
+    pool_elapsed = time.perf_counter() - started
+    done = [r for r in results if r is not None]
+    return done, _build_scheduler_report(done, pool_elapsed)
+
+
+def _table_key_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    rows = conn.execute(f"PRAGMA main.table_info({table})").fetchall()
+    return [name for _, name in sorted((int(row[5]), str(row[1])) for row in rows if int(row[5]) > 0)]
+
+
+def _secondary_indexes(conn: sqlite3.Connection, table: str) -> List[Tuple[str, str]]:
+    return conn.execute(
+        "SELECT name, sql FROM main.sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,),
+    ).fetchall()
+
+
+def _restore_deferred_indexes(conn: sqlite3.Connection) -> Dict[str, float]:
+    """按标记表补建被延迟的二级索引并清空标记（同一事务），返回按表的重建耗时。"""
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {DEFERRED_INDEX_TABLE} (name TEXT PRIMARY KEY, tbl_name TEXT NOT NULL, sql TEXT NOT NULL)"
+    )
+    conn.commit()
+    rows = conn.execute(f"SELECT name, tbl_name, sql FROM {DEFERRED_INDEX_TABLE} ORDER BY rowid").fetchall()
+    elapsed: Dict[str, float] = {}
+    if not rows:
+        return elapsed
+    conn.execute("BEGIN")
+    try:
+        for name, table, sql in rows:
+            started = time.perf_counter()
+            exists = conn.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone()
+            if exists is None:
+                conn.execute(sql)
+            elapsed[table] = elapsed.get(table, 0.0) + time.perf_counter() - started
+        conn.execute(f"DELETE FROM {DEFERRED_INDEX_TABLE}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return elapsed
+
+
+def _shard_row_counts(shard_db: Path) -> Dict[str, int]:
+    with sqlite3.connect(shard_db) as conn:
+        return {table: int(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]) for table in SHARD_MERGE_TABLES}
+
+
+def _merge_shard_table(conn: sqlite3.Connection, alias: str, table: str, order_by: str) -> Tuple[int, int, int]:
+    """把一个 shard 表并进目标库，返回 (追加行数, 替换行数, 冲突 symbol-day 数)。
+
+    shard 的 (symbol, trade_date) 与目标库不相交时直接按主键顺序 INSERT 追加；
+    只有已存在的 symbol-day 才走 INSERT OR REPLACE。
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.merge_conflict_keys")
+    conn.execute(
+        f"""
+        CREATE TEMP TABLE merge_conflict_keys AS
+        SELECT k.symbol, k.trade_date
+        FROM (SELECT DISTINCT symbol, trade_date FROM {alias}.{table}) k
+        WHERE EXISTS (
+            SELECT 1 FROM main.{table} m WHERE m.symbol = k.symbol AND m.trade_date = k.trade_date
+        )
+        """
+    )
+    try:
+        conflict_keys = int(conn.execute("SELECT COUNT(*) FROM temp.merge_conflict_keys").fetchone()[0])
+        if conflict_keys == 0:
+            appended = conn.execute(f"INSERT INTO main.{table} SELECT * FROM {alias}.{table} ORDER BY {order_by}").rowcount
+            return int(appended), 0, 0
+        in_conflict = (
+            "EXISTS (SELECT 1 FROM temp.merge_conflict_keys k WHERE k.symbol = s.symbol AND k.trade_date = s.trade_date)"
+        )
+        appended = conn.execute(
+            f"INSERT INTO main.{table} SELECT s.* FROM {alias}.{table} s WHERE NOT {in_conflict} ORDER BY {order_by}"
+        ).rowcount
+        replaced = conn.execute(f"INSERT OR REPLACE INTO main.{table} SELECT s.* FROM {alias}.{table} s WHERE {in_conflict}").rowcount
+        return int(appended), int(replaced), conflict_keys
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.merge_conflict_keys")
+
+
+def _merge_shard_tables(target_db: Path, shard_dbs: Sequence[Path]) -> Dict[str, Dict[str, object]]:
+    """把各 worker 的 shard 库并进目标库，返回按表的合并统计（含 rows/sec）。
+
+    目标库单写者，shard 逐个 ATTACH 串行写入。本次待并入行数不少于目标表现有行数（rowid 上界估计）时，
+    先删掉该表二级索引、全部追加完再重建，避免逐行维护索引。删索引与在 DEFERRED_INDEX_TABLE 里登记其 DDL
+    在同一事务里提交，异常时 finally 里按登记重建；进程被直接杀掉时由下次启动补建。
+    """
+    shard_dbs = [Path(db) for db in shard_dbs if Path(db).exists()]
+    incoming = {table: 0 for table in SHARD_MERGE_TABLES}
+    for shard_db in shard_dbs:
+        for table, count in _shard_row_counts(shard_db).items():
+            incoming[table] += count
+    stats: Dict[str, Dict[str, object]] = {
+        table: {"rows": 0, "appended_rows": 0, "replaced_rows": 0, "conflict_keys": 0, "merge_sec": 0.0, "index_rebuild_sec": 0.0, "deferred_indexes": False}
+        for table in SHARD_MERGE_TABLES
+    }
     with sqlite3.connect(target_db) as conn:
         conn.execute("PRAGMA synchronous = OFF")
         conn.execute("PRAGMA journal_mode = WAL")
         conn.execute("PRAGMA busy_timeout = 30000")
-        for idx, shard_db in enumerate(shard_dbs, start=1):
-            if not shard_db.exists():
-                continue
-            alias = f"shard_{idx}"
-            shard_path = shard_db.resolve().as_posix().replace("'", "''")
-            print(f"[atomic-backfill] merge_shard_start target={target_db} shard={shard_path}", flush=True)
-            conn.execute(f"ATTACH DATABASE '{shard_path}' AS {alias}")
-            try:
-                for table in SHARD_MERGE_TABLES:
-                    conn.execute(f"INSERT OR REPLACE INTO {table} SELECT * FROM {alias}.{table}")
-                conn.commit()
-            finally:
-                conn.execute(f"DETACH DATABASE {alias}")
-            print(f"[atomic-backfill] merge_shard_done target={target_db} shard={shard_path}", flush=True)
+        key_columns = {table: _table_key_columns(conn, table) or ["symbol", "trade_date"] for table in SHARD_MERGE_TABLES}
+        _restore_deferred_indexes(conn)
+        conn.execute("BEGIN")
+        for table in SHARD_MERGE_TABLES:
+            existing = int(conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0])
+            if incoming[table] > 0 and incoming[table] >= existing * DEFER_INDEX_MIN_RATIO:
+                indexes = _secondary_indexes(conn, table)
+                for name, sql in indexes:
+                    conn.execute(f"INSERT INTO {DEFERRED_INDEX_TABLE} (name, tbl_name, sql) VALUES (?, ?, ?)", (name, table, sql))
+                    conn.execute(f"DROP INDEX IF EXISTS {name}")
+                stats[table]["deferred_indexes"] = bool(indexes)
+        conn.commit()
+        try:
+            for idx, shard_db in enumerate(shard_dbs, start=1):
+                alias = f"shard_{idx}"
+                shard_path = shard_db.resolve().as_posix().replace("'", "''")
+                print(f"[atomic-backfill] merge_shard_start target={target_db} shard={shard_path}", flush=True)
+                conn.execute(f"ATTACH DATABASE '{shard_path}' AS {alias}")
+                try:
+                    for table in SHARD_MERGE_TABLES:
+                        started = time.perf_counter()
+                        appended, replaced, conflict_keys = _merge_shard_table(conn, alias, table, ", ".join(key_columns[table]))
+                        table_stats = stats[table]
+                        table_stats["appended_rows"] += appended
+                        table_stats["replaced_rows"] += replaced
+                        table_stats["rows"] += appended + replaced
+                        table_stats["conflict_keys"] += conflict_keys
+                        table_stats["merge_sec"] += time.perf_counter() - started
+                    conn.commit()
+                finally:
+                    conn.execute(f"DETACH DATABASE {alias}")
+                print(f"[atomic-backfill] merge_shard_done target={target_db} shard={shard_path}", flush=True)
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            for table, elapsed in _restore_deferred_indexes(conn).items():
+                stats[table]["index_rebuild_sec"] = elapsed
+    for table_stats in stats.values():
+        total_sec = float(table_stats["merge_sec"]) + float(table_stats["index_rebuild_sec"])
+        table_stats["rows_per_sec"] = round(table_stats["rows"] / total_sec, 1) if total_sec > 0 else None
+        table_stats["merge_sec"] = round(float(table_stats["merge_sec"]), 3)
+        table_stats["index_rebuild_sec"] = round(float(table_stats["index_rebuild_sec"]), 3)
+    return stats
 
 
 def _prefetch_extract_root(batch_name: str, trade_date: str, config: Dict[str, object]) -> Path:
@@ -463,51 +697,45 @@ def run_day(
         shard_root = Path(str(config["extract_root"])) / ".worker_shards" / batch.name / to_compact(trade_date)
         shutil.rmtree(shard_root, ignore_errors=True)
         shard_root.mkdir(parents=True, exist_ok=True)
-        shards = [items[i::workers] for i in range(workers)]
-        shard_dbs = [shard_root / f"worker_{idx+1}.db" for idx in range(workers) if shards[idx]]
+        worker_count = min(workers, len(items))
+        shard_dbs = [shard_root / f"worker_{idx+1}.db" for idx in range(worker_count)]
         total_success = 0
-        if workers == 1:
-            print(f"[atomic-backfill] day={trade_date} batch={batch.name} shard_mode=single", flush=True)
-            shard_result = _run_process_shard(
-                batch.kind,
-                trade_date,
-                str(shard_dbs[0]),
-                [str(x) for x in shards[0]],
-                float(config["large_threshold"]),
-                float(config["super_threshold"]),
-            )
+
+        def on_worker_done(shard_result: Dict[str, object]) -> None:
+            nonlocal total_success
             total_success += int(shard_result["success_count"])
             failures.extend(shard_result["failures"])
-        else:
-            print(f"[atomic-backfill] day={trade_date} batch={batch.name} shard_mode=process workers={workers}", flush=True)
-            with ProcessPoolExecutor(max_workers=workers) as executor:
-                future_map = {}
-                shard_idx = 0
-                for shard in shards:
-                    if not shard:
-                        continue
-                    future_map[
-                        executor.submit(
-                            _run_process_shard,
-                            batch.kind,
-                            trade_date,
-                            str(shard_dbs[shard_idx]),
-                            [str(x) for x in shard],
-                            float(config["large_threshold"]),
-                            float(config["super_threshold"]),
-                        )
-                    ] = shard_idx
-                    shard_idx += 1
-                for future in as_completed(future_map):
-                    shard_result = future.result()
-                    total_success += int(shard_result["success_count"])
-                    failures.extend(shard_result["failures"])
-                    print(
-                        f"[atomic-backfill] day={trade_date} batch={batch.name} shard_done success={total_success}/{len(items)} failure={len(failures)}",
-                        flush=True,
-                    )
+            print(
+                f"[atomic-backfill] day={trade_date} batch={batch.name} shard_done success={total_success}/{len(items)} failure={len(failures)}",
+                flush=True,
+            )
+
+        shard_mode = "single" if worker_count == 1 else f"work_stealing workers={worker_count}"
+        print(f"[atomic-backfill] day={trade_date} batch={batch.name} shard_mode={shard_mode}", flush=True)
+        _, scheduler_report = run_work_stealing_shards(
+            batch.kind,
+            trade_date,
+            items,
+            shard_dbs,
+            float(config["large_threshold"]),
+            float(config["super_threshold"]),
+            on_worker_done=on_worker_done,
+        )
+        print(
+            f"[atomic-backfill] day={trade_date} batch={batch.name} scheduler pool_elapsed={scheduler_report['pool_elapsed_sec']}s "
+            f"mean_utilization={scheduler_report['mean_utilization']} min_utilization={scheduler_report['min_utilization']}",
+            flush=True,
+        )
         print(f"[atomic-backfill] day={trade_date} batch={batch.name} merge_start shard_db_count={len(shard_dbs)}", flush=True)
-        _merge_shard_tables(atomic_db, shard_dbs)
+        merge_stats = _merge_shard_tables(atomic_db, shard_dbs)
+        for table, table_stats in merge_stats.items():
+            if not table_stats["rows"]:
+                continue
+            print(
+                f"[atomic-backfill] day={trade_date} batch={batch.name} merge_table={table} rows={table_stats['rows']} "
+                f"appended={table_stats['appended_rows']} replaced={table_stats['replaced_rows']} rows_per_sec={table_stats['rows_per_sec']}",
+                flush=True,
+            )
         print(f"[atomic-backfill] day={trade_date} batch={batch.name} merge_done", flush=True)
         print(f"[atomic-backfill] day={trade_date} batch={batch.name} worker_done success={total_success} failure={len(failures)}", flush=True)
         report = {
@@ -519,6 +747,8 @@ def run_day(
             "success_count": total_success,
             "failure_count": len(failures),
             "failures": failures[:20],
+            "scheduler": scheduler_report,
+            "merge": merge_stats,
         }
         if failures and bool(config.get("stop_on_failure", True)):
             raise RuntimeError(json.dumps(report, ensure_ascii=False))
@@ -547,6 +777,9 @@ def main() -> None:
 
     atomic_db = Path(str(config["atomic_db"]))
     ensure_atomic_db(atomic_db)
+    if float(config.get("worker_memory_mb") or 0) > 0:
+        # 子进程继承环境变量，shard worker 里的 l2_order_stream 按此推分块行数
+        os.environ[WORKER_MEMORY_ENV] = str(float(config["worker_memory_mb"]))
     print(f"[atomic-backfill] config={config_path} atomic_db={atomic_db} workers={config['workers']}", flush=True)
 
     state_path = Path(str(config["state_file"]))
@@ -24,6 +24,7 @@ def main() -> None:
     refresh_parser = subparsers.add_parser("refresh", help="生成/刷新特征与信号")
     refresh_parser.add_argument("--start-date", default=None)
     refresh_parser.add_argument("--end-date", default=None)
+    refresh_parser.add_argument("--full", action="store_true", help="忽略输入指纹，全量重算目标区间")
 
     candidates_parser = subparsers.add_parser("candidates", help="查看某日候选")
     candidates_parser.add_argument("--date", default=None)
@@ -42,7 +43,7 @@ def main() -> None:
     args = parser.parse_args()
 
     if args.command == "refresh":
-        result = refresh_selection_research(start_date=args.start_date, end_date=args.end_date)
+        result = refresh_selection_research(start_date=args.start_date, end_date=args.end_date, incremental=not args.full)
         print(json.dumps(result.__dict__, ensure_ascii=False, indent=2))
         return
 
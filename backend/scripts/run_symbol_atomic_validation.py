@@ -21,32 +21,24 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from backend.scripts.backfill_atomic_order_from_raw import (
-    _apply_support_ratios,
-    _build_order_rows,
-    _replace_rows as replace_order_rows,
     build_standardized_ticks,
     L2SymbolBundle,
     normalize_symbol_dir_name,
 )
 from backend.scripts.backfill_atomic_order_from_raw import _build_quality_info
-from backend.scripts.build_open_auction_summaries import (
-    _build_l1_summary,
-    _build_l2_summary,
-    _build_phase_l1_summary,
-    _build_phase_l2_summary,
-    _build_manifest,
-    _upsert as upsert_auction,
-)
-from backend.scripts.build_book_state_from_raw import (
-    build_book_rows,
-    replace_book_rows,
-)
 from backend.scripts.build_limit_state_from_atomic import (
     ensure_default_rules as ensure_limit_rules,
     ensure_schema as ensure_limit_schema,
     build_limit_state,
     replace_rows as replace_limit_rows,
 )
+from backend.scripts.l2_bar_builder import (
+    bucket_labels,
+    build_history_5m_rows,
+    float_column,
+    int_column,
+    optional_float_column,
+)
 from backend.scripts.sandbox_review_etl import standardize_tick_dataframe
 
 WIN_7Z = os.getenv("WIN_7Z_PATH", r"C:\Program Files\NVIDIA Corporation\NVIDIA App\7z.exe")
@@ -424,50 +416,53 @@ def _build_atomic_trade_5m_rows_from_ticks(
         df, large_threshold, super_threshold
     )
 
-    rows: List[Tuple] = []
-    for _, row in bucket_df.iterrows():
-        bucket_key = row["bucket_start"].strftime("%Y-%m-%d %H:%M:%S")
-        parent_feat = bucket_parent_features.get(bucket_key, {})
-        rows.append(
-            (
-                symbol,
-                trade_date,
-                bucket_key,
-                float(row["open"]),
-                float(row["high"]),
-                float(row["low"]),
-                float(row["close"]),
-                float(row["total_amount"]),
-                float(row["total_volume"]),
-                int(row["trade_count"]),
-                int(row["l1_main_buy_count"]),
-                int(row["l1_main_sell_count"]),
-                int(row["l1_super_buy_count"]),
-                int(row["l1_super_sell_count"]),
-                int(parent_feat.get("l2_main_buy_count", 0) or 0),
-                int(parent_feat.get("l2_main_sell_count", 0) or 0),
-                int(parent_feat.get("l2_super_buy_count", 0) or 0),
-                int(parent_feat.get("l2_super_sell_count", 0) or 0),
-                float(row["l1_main_buy"]),
-                float(row["l1_main_sell"]),
-                float(row["l1_main_buy"] - row["l1_main_sell"]),
-                float(row["l1_super_buy"]),
-                float(row["l1_super_sell"]),
-                float(row["l1_super_buy"] - row["l1_super_sell"]),
-                float(parent_feat.get("l2_main_buy", 0.0) or 0.0),
-                float(parent_feat.get("l2_main_sell", 0.0) or 0.0),
-                float((parent_feat.get("l2_main_buy", 0.0) or 0.0) - (parent_feat.get("l2_main_sell", 0.0) or 0.0)),
-                float(parent_feat.get("l2_super_buy", 0.0) or 0.0),
-                float(parent_feat.get("l2_super_sell", 0.0) or 0.0),
-                float((parent_feat.get("l2_super_buy", 0.0) or 0.0) - (parent_feat.get("l2_super_sell", 0.0) or 0.0)),
-                float(row["max_trade_amount"]) if pd.notna(row["max_trade_amount"]) else None,
-                float(row["avg_trade_amount"]) if pd.notna(row["avg_trade_amount"]) else None,
-                float(parent_feat["max_parent_order_amount"]) if parent_feat.get("max_parent_order_amount") is not None else None,
-                float(parent_feat["top5_parent_concentration_ratio"]) if parent_feat.get("top5_parent_concentration_ratio") is not None else None,
-                source_type,
-                quality_info,
-            )
+    bucket_keys = bucket_labels(bucket_df["bucket_start"])
+    parent_feats = [bucket_parent_features.get(key, {}) for key in bucket_keys]
+
+    def parent_float(name: str) -> List[float]:
+        return [float(feat.get(name, 0.0) or 0.0) for feat in parent_feats]
+
+    def parent_int(name: str) -> List[int]:
+        return [int(feat.get(name, 0) or 0) for feat in parent_feats]
+
+    def parent_optional(name: str) -> List[Optional[float]]:
+        return [float(feat[name]) if feat.get(name) is not None else None for feat in parent_feats]
+
+    l1_main_buy, l1_main_sell = float_column(bucket_df, "l1_main_buy"), float_column(bucket_df, "l1_main_sell")
+    l1_super_buy, l1_super_sell = float_column(bucket_df, "l1_super_buy"), float_column(bucket_df, "l1_super_sell")
+    l2_main_buy, l2_main_sell = parent_float("l2_main_buy"), parent_float("l2_main_sell")
+    l2_super_buy, l2_super_sell = parent_float("l2_super_buy"), parent_float("l2_super_sell")
+    n = len(bucket_keys)
+    rows: List[Tuple] = list(
+        zip(
+            [symbol] * n,
+            [trade_date] * n,
+            bucket_keys,
+            *(float_column(bucket_df, c) for c in ("open", "high", "low", "close", "total_amount", "total_volume")),
+            *(int_column(bucket_df, c) for c in (
+                "trade_count", "l1_main_buy_count", "l1_main_sell_count", "l1_super_buy_count", "l1_super_sell_count",
+            )),
+            *(parent_int(c) for c in ("l2_main_buy_count", "l2_main_sell_count", "l2_super_buy_count", "l2_super_sell_count")),
+            l1_main_buy,
+            l1_main_sell,
+            [buy - sell for buy, sell in zip(l1_main_buy, l1_main_sell)],
+            l1_super_buy,
+            l1_super_sell,
+            [buy - sell for buy, sell in zip(l1_super_buy, l1_super_sell)],
+            l2_main_buy,
+            l2_main_sell,
+            [buy - sell for buy, sell in zip(l2_main_buy, l2_main_sell)],
+            l2_super_buy,
+            l2_super_sell,
+            [buy - sell for buy, sell in zip(l2_super_buy, l2_super_sell)],
+            optional_float_column(bucket_df, "max_trade_amount"),
+            optional_float_column(bucket_df, "avg_trade_amount"),
+            parent_optional("max_parent_order_amount"),
+            parent_optional("top5_parent_concentration_ratio"),
+            [source_type] * n,
+            [quality_info] * n,
         )
+    )
     daily_feature = {
         "l1_main_buy_count": int(df["l1_main_buy_count"].sum()),
         "l1_main_sell_count": int(df["l1_main_sell_count"].sum()),
@@ -493,99 +488,7 @@ def _compute_l2_trade_5m_bars(
     large_threshold: float,
     super_threshold: float,
 ) -> List[Tuple]:
-    if ticks.empty:
-        return []
-
-    df = ticks.copy()
-    df["bucket"] = df["datetime"].dt.floor("5min")
-
-    if "buy_parent_total" not in df.columns:
-        buy_parent_totals = df[df["buy_order_id"] > 0].groupby("buy_order_id", sort=False)["amount"].sum().to_dict()
-        df["buy_parent_total"] = df["buy_order_id"].map(buy_parent_totals).fillna(0.0)
-    if "sell_parent_total" not in df.columns:
-        sell_parent_totals = df[df["sell_order_id"] > 0].groupby("sell_order_id", sort=False)["amount"].sum().to_dict()
-        df["sell_parent_total"] = df["sell_order_id"].map(sell_parent_totals).fillna(0.0)
-
-    df["l1_main_buy_amt"] = ((df["side"] == "buy") & (df["amount"] >= large_threshold)) * df["amount"]
-    df["l1_main_sell_amt"] = ((df["side"] == "sell") & (df["amount"] >= large_threshold)) * df["amount"]
-    df["l1_super_buy_amt"] = ((df["side"] == "buy") & (df["amount"] >= super_threshold)) * df["amount"]
-    df["l1_super_sell_amt"] = ((df["side"] == "sell") & (df["amount"] >= super_threshold)) * df["amount"]
-
-    df["l2_main_buy_amt"] = (df["buy_parent_total"] >= large_threshold) * df["amount"]
-    df["l2_main_sell_amt"] = (df["sell_parent_total"] >= large_threshold) * df["amount"]
-    df["l2_super_buy_amt"] = (df["buy_parent_total"] >= super_threshold) * df["amount"]
-    df["l2_super_sell_amt"] = (df["sell_parent_total"] >= super_threshold) * df["amount"]
-
-    ohlc = df.groupby("bucket", sort=False)["price"].agg(open="first", high="max", low="min", close="last")
-    flow = df.groupby("bucket", sort=False).agg(
-        total_amount=("amount", "sum"),
-        total_volume=("volume", "sum"),
-        l1_main_buy=("l1_main_buy_amt", "sum"),
-        l1_main_sell=("l1_main_sell_amt", "sum"),
-        l1_super_buy=("l1_super_buy_amt", "sum"),
-        l1_super_sell=("l1_super_sell_amt", "sum"),
-        l2_main_buy=("l2_main_buy_amt", "sum"),
-        l2_main_sell=("l2_main_sell_amt", "sum"),
-        l2_super_buy=("l2_super_buy_amt", "sum"),
-        l2_super_sell=("l2_super_sell_amt", "sum"),
-        l2_cvd_buy=("amount", lambda s: float(s[df.loc[s.index, "side"] == "buy"].sum())),
-        l2_cvd_sell=("amount", lambda s: float(s[df.loc[s.index, "side"] == "sell"].sum())),
-    )
-    merged = ohlc.join(flow, how="inner")
-
-    if not order_events.empty:
-        events = order_events.copy()
-        events["bucket"] = events["datetime"].dt.floor("5min")
-        event_agg = events.groupby("bucket", sort=False).agg(
-            l2_add_buy_amount=("amount", lambda s: float(s[(events.loc[s.index, "event_type"] == "add") & (events.loc[s.index, "side"] == "buy")].sum())),
-            l2_add_sell_amount=("amount", lambda s: float(s[(events.loc[s.index, "event_type"] == "add") & (events.loc[s.index, "side"] == "sell")].sum())),
-            l2_cancel_buy_amount=("amount", lambda s: float(s[(events.loc[s.index, "event_type"] == "cancel") & (events.loc[s.index, "side"] == "buy")].sum())),
-            l2_cancel_sell_amount=("amount", lambda s: float(s[(events.loc[s.index, "event_type"] == "cancel") & (events.loc[s.index, "side"] == "sell")].sum())),
-        )
-        merged = merged.join(event_agg, how="left")
-    else:
-        merged["l2_add_buy_amount"] = None
-        merged["l2_add_sell_amount"] = None
-        merged["l2_cancel_buy_amount"] = None
-        merged["l2_cancel_sell_amount"] = None
-
-    merged["l2_cvd_delta"] = merged["l2_cvd_buy"] - merged["l2_cvd_sell"]
-    merged["l2_oib_delta"] = (
-        merged["l2_add_buy_amount"].fillna(0.0)
-        - merged["l2_cancel_buy_amount"].fillna(0.0)
-        - merged["l2_add_sell_amount"].fillna(0.0)
-        + merged["l2_cancel_sell_amount"].fillna(0.0)
-    )
-    merged = merged.reset_index()
-
-    return [
-        (
-            symbol,
-            row["bucket"].strftime("%Y-%m-%d %H:%M:%S"),
-            trade_date,
-            float(row["open"]),
-            float(row["high"]),
-            float(row["low"]),
-            float(row["close"]),
-            float(row["total_amount"]),
-            float(row["total_volume"]),
-            float(row["l1_main_buy"]),
-            float(row["l1_main_sell"]),
-            float(row["l1_super_buy"]),
-            float(row["l1_super_sell"]),
-            float(row["l2_main_buy"]),
-            float(row["l2_main_sell"]),
-            float(row["l2_super_buy"]),
-            float(row["l2_super_sell"]),
-            float(row["l2_add_buy_amount"]) if pd.notna(row["l2_add_buy_amount"]) else None,
-            float(row["l2_add_sell_amount"]) if pd.notna(row["l2_add_sell_amount"]) else None,
-            float(row["l2_cancel_buy_amount"]) if pd.notna(row["l2_cancel_buy_amount"]) else None,
-            float(row["l2_cancel_sell_amount"]) if pd.notna(row["l2_cancel_sell_amount"]) else None,
-            float(row["l2_cvd_delta"]),
-            float(row["l2_oib_delta"]) if pd.notna(row["l2_oib_delta"]) else None,
-        )
-        for _, row in merged.iterrows()
-    ]
+    return build_history_5m_rows(ticks, order_events, symbol, trade_date, large_threshold, super_threshold)
 
 
 def _build_atomic_trade_5m_rows_from_legacy(csv_path: Path, symbol: str, trade_date: str, large_threshold: float, super_threshold: float) -> Tuple[List[Tuple], Optional[str], Dict[str, Optional[float]]]:
@@ -787,34 +690,20 @@ def process_l2_task(task: DayTask, symbol: str, temp_root: Path, atomic_db: Path
     workdir = temp_root / "l2" / to_compact(task.trade_date)
     symbol_dir = extract_l2_symbol(task.archive_path, symbol, task.trade_date, workdir)
     try:
-        rows_5m_trade, quality_info, daily_feature = _build_atomic_trade_5m_rows_from_l2(symbol_dir, task.trade_date, large_threshold, super_threshold)
-        daily_trade = _build_atomic_trade_daily_row(symbol, task.trade_date, rows_5m_trade, "trade_order", quality_info, daily_feature)
-        _, rows_5m_order, daily_order, _ = _build_order_rows(symbol_dir, task.trade_date)
-        l1_row = _build_l1_summary(symbol_dir, to_compact(task.trade_date))
-        l2_row = _build_l2_summary(symbol_dir, to_compact(task.trade_date))
-        phase_l1_row = _build_phase_l1_summary(symbol_dir, to_compact(task.trade_date))
-        phase_l2_row = _build_phase_l2_summary(symbol_dir, to_compact(task.trade_date))
-        rows_5m_book, daily_book = build_book_rows(symbol_dir, task.trade_date)
-        manifest = _build_manifest(l1_row, l2_row)
+        from backend.scripts.atomic_day_pipeline import build_atomic_day_rows, write_atomic_day_rows
+
+        rows = build_atomic_day_rows(symbol_dir, task.trade_date, large_threshold, super_threshold)
         with write_lock, sqlite3.connect(atomic_db) as conn:
-            trade_stats = _replace_trade_rows(conn, rows_5m_trade, daily_trade) if daily_trade else {"rows_5m": 0, "rows_daily": 0}
-            total_amount = float(daily_trade[6]) if daily_trade else None
-            daily_order = _apply_support_ratios(daily_order, total_amount)
-            replace_order_rows(conn, rows_5m_order, daily_order)
-            replace_book_rows(conn, rows_5m_book, daily_book)
-            upsert_auction(conn, "atomic_open_auction_l1_daily", l1_row)
-            upsert_auction(conn, "atomic_open_auction_l2_daily", l2_row)
-            upsert_auction(conn, "atomic_open_auction_phase_l1_daily", phase_l1_row)
-            upsert_auction(conn, "atomic_open_auction_phase_l2_daily", phase_l2_row)
-            upsert_auction(conn, "atomic_open_auction_manifest", manifest)
+            stats = write_atomic_day_rows(conn, rows)
             conn.commit()
         return {
             "trade_date": task.trade_date,
             "kind": task.kind,
-            "raw_5m_rows": len(rows_5m_trade),
-            "order_5m_rows": len(rows_5m_order),
-            "book_5m_rows": len(rows_5m_book),
-            **trade_stats,
+            "raw_5m_rows": len(rows.trade_5m),
+            "order_5m_rows": stats["order_5m_rows"],
+            "book_5m_rows": stats["book_5m_rows"],
+            "rows_5m": stats["rows_5m"],
+            "rows_daily": stats["rows_daily"],
         }
     finally:
         shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,16 @@
+"""L2 单日样本（000833.SZ / 2026-03-11）及其 golden 输出，供各 L2 构建/缓存/合并测试共用。"""
+import json
+from pathlib import Path
+
+FIXTURE_ROOT = Path(__file__).parent / "fixtures"
+SYMBOL_DIR = FIXTURE_ROOT / "l2_day" / "202603" / "20260311" / "000833.SZ"
+TRADE_DATE = "2026-03-11"
+
+
+def load_golden():
+    return json.loads((FIXTURE_ROOT / "l2_day_000833_20260311_golden.json").read_text(encoding="utf-8"))
+
+
+def as_json(value):
+    """经一次 JSON 往返，把 tuple/numpy 标量等归一成与 golden 文件可比的形态。"""
+    return json.loads(json.dumps(value, ensure_ascii=False))
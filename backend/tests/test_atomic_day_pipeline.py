@@ -0,0 +1,114 @@
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from backend.scripts import atomic_day_pipeline
+from backend.scripts import l2_raw_cache
+from backend.scripts import run_atomic_backfill_windows as windows
+from backend.scripts.backfill_atomic_order_from_raw import _apply_support_ratios, _build_order_rows
+from backend.scripts.build_book_state_from_raw import build_book_rows
+from backend.scripts.build_open_auction_summaries import (
+    _build_l1_summary,
+    _build_l2_summary,
+    _build_phase_l1_summary,
+    _build_phase_l2_summary,
+)
+from backend.scripts.run_symbol_atomic_validation import _build_atomic_trade_5m_rows_from_l2, _build_atomic_trade_daily_row
+from backend.tests._l2_fixtures import SYMBOL_DIR, TRADE_DATE
+
+LARGE, SUPER = 200000.0, 1000000.0
+
+
+def _count_csv_reads(monkeypatch):
+    reads = []
+    original = l2_raw_cache._read_csv_frame
+
+    def counting(path, usecols=None):
+        reads.append(Path(path).name)
+        return original(path, usecols=usecols)
+
+    monkeypatch.setattr(l2_raw_cache, "_read_csv_frame", counting)
+    return reads
+
+
+def test_day_rows_match_per_table_builders_with_single_read(monkeypatch):
+    reads = _count_csv_reads(monkeypatch)
+    rows = atomic_day_pipeline.build_atomic_day_rows(SYMBOL_DIR, TRADE_DATE, LARGE, SUPER)
+    assert sorted(reads) == sorted(l2_raw_cache.RAW_FILE_COLUMNS)
+
+    trade_5m, quality_info, feature = _build_atomic_trade_5m_rows_from_l2(SYMBOL_DIR, TRADE_DATE, LARGE, SUPER)
+    trade_daily = _build_atomic_trade_daily_row("sz000833", TRADE_DATE, trade_5m, "trade_order", quality_info, feature)
+    _, order_5m, order_daily, _ = _build_order_rows(SYMBOL_DIR, TRADE_DATE)
+    book_5m, book_daily = build_book_rows(SYMBOL_DIR, TRADE_DATE)
+    assert rows.trade_5m == trade_5m and rows.trade_daily == trade_daily
+    assert rows.order_5m == order_5m
+    assert rows.order_daily == _apply_support_ratios(order_daily, float(trade_daily[6]))
+    assert rows.book_5m == book_5m and rows.book_daily == book_daily
+    assert rows.auction_rows["atomic_open_auction_l1_daily"] == _build_l1_summary(SYMBOL_DIR, "20260311")
+    assert rows.auction_rows["atomic_open_auction_l2_daily"] == _build_l2_summary(SYMBOL_DIR, "20260311")
+    assert rows.auction_rows["atomic_open_auction_phase_l1_daily"] == _build_phase_l1_summary(SYMBOL_DIR, "20260311")
+    assert rows.auction_rows["atomic_open_auction_phase_l2_daily"] == _build_phase_l2_summary(SYMBOL_DIR, "20260311")
+    assert book_5m and rows.auction_rows["atomic_open_auction_l2_daily"]["auction_has_exact_0925_trade"] == 1
+
+
+def test_shard_writes_in_one_transaction_and_isolates_failures(monkeypatch, tmp_path):
+    day_root = tmp_path / "202603" / "20260311"
+    good = day_root / SYMBOL_DIR.name
+    shutil.copytree(SYMBOL_DIR, good)
+    broken = day_root / "600000.SH"
+    shutil.copytree(SYMBOL_DIR, broken)
+    (broken / "行情.csv").unlink()
+
+    commits = []
+    real_connect = sqlite3.connect
+
+    class CountingConnection(sqlite3.Connection):
+        def commit(self):
+            commits.append(self.in_transaction)
+            super().commit()
+
+    real_ensure = windows.ensure_atomic_db
+
+    def ensure_then_reset(path):
+        real_ensure(path)
+        commits.clear()
+
+    monkeypatch.setattr(windows.sqlite3, "connect", lambda *a, **k: real_connect(*a, factory=CountingConnection, **k))
+    monkeypatch.setattr(windows, "ensure_atomic_db", ensure_then_reset)
+    shard_db = tmp_path / "shard.db"
+    result = windows._run_process_shard("l2", TRADE_DATE, str(shard_db), [str(broken), str(good)], LARGE, SUPER)
+
+    assert result["success_count"] == 1 and result["failure_count"] == 1
+    assert commits == [True]
+    conn = real_connect(shard_db)
+    try:
+        for table in ("atomic_trade_5m", "atomic_order_daily", "atomic_book_state_5m", "atomic_open_auction_manifest"):
+            symbols = {row[0] for row in conn.execute(f"SELECT symbol FROM {table}")}
+            assert symbols == {"sz000833"}, table
+    finally:
+        conn.close()
+
+
+def test_write_failure_rolls_back_only_that_symbol(monkeypatch, tmp_path):
+    shard_db = tmp_path / "shard.db"
+    windows.ensure_atomic_db(shard_db)
+    rows = atomic_day_pipeline.build_atomic_day_rows(SYMBOL_DIR, TRADE_DATE, LARGE, SUPER)
+    conn = sqlite3.connect(shard_db)
+    try:
+        conn.execute("BEGIN")
+        atomic_day_pipeline.write_atomic_day_rows(conn, rows)
+
+        other = atomic_day_pipeline.AtomicDayRows(
+            **{**rows.__dict__, "symbol": "sz000001", "trade_5m": [("sz000001",) + r[1:] for r in rows.trade_5m],
+               "trade_daily": ("sz000001",) + rows.trade_daily[1:]}
+        )
+        monkeypatch.setattr(atomic_day_pipeline, "replace_order_rows", lambda *a: (_ for _ in ()).throw(RuntimeError("boom")))
+        with pytest.raises(RuntimeError):
+            atomic_day_pipeline.write_atomic_day_rows(conn, other)
+        conn.commit()
+        symbols = {row[0] for row in conn.execute("SELECT symbol FROM atomic_trade_daily")}
+    finally:
+        conn.close()
+    assert symbols == {"sz000833"}
@@ -0,0 +1,106 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from backend.scripts import run_atomic_backfill_windows as windows
+from backend.tests._l2_fixtures import SYMBOL_DIR, TRADE_DATE
+
+LARGE, SUPER = 200000.0, 1000000.0
+
+
+@pytest.fixture(scope="module")
+def shard_dbs(tmp_path_factory):
+    root = tmp_path_factory.mktemp("shards")
+    day_root = root / "20260311"
+    dbs = []
+    for idx, name in enumerate(("000833.SZ", "000834.SZ"), start=1):
+        shutil.copytree(SYMBOL_DIR, day_root / name)
+        db = root / f"worker_{idx}.db"
+        result = windows._run_process_shard("l2", TRADE_DATE, str(db), [str(day_root / name)], LARGE, SUPER)
+        assert result["success_count"] == 1
+        dbs.append(db)
+    return dbs
+
+
+def _legacy_merge(target_db, shard_dbs):
+    with sqlite3.connect(target_db) as conn:
+        for idx, shard_db in enumerate(shard_dbs, start=1):
+            conn.execute(f"ATTACH DATABASE '{shard_db.as_posix()}' AS shard_{idx}")
+            for table in windows.SHARD_MERGE_TABLES:
+                conn.execute(f"INSERT OR REPLACE INTO {table} SELECT * FROM shard_{idx}.{table}")
+            conn.commit()
+            conn.execute(f"DETACH DATABASE shard_{idx}")
+
+
+def _dump(db):
+    with sqlite3.connect(db) as conn:
+        return {table: sorted(conn.execute(f"SELECT * FROM {table}").fetchall(), key=repr) for table in windows.SHARD_MERGE_TABLES}
+
+
+def _index_names(db):
+    with sqlite3.connect(db) as conn:
+        return sorted(row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"))
+
+
+def test_disjoint_shards_are_appended_with_deferred_indexes(tmp_path, shard_dbs):
+    target = tmp_path / "target.db"
+    windows.ensure_atomic_db(target)
+    indexes_before = _index_names(target)
+
+    stats = windows._merge_shard_tables(target, shard_dbs)
+
+    legacy = tmp_path / "legacy.db"
+    windows.ensure_atomic_db(legacy)
+    _legacy_merge(legacy, shard_dbs)
+    assert _dump(target) == _dump(legacy)
+    assert _index_names(target) == indexes_before
+
+    trade_5m = stats["atomic_trade_5m"]
+    assert trade_5m["rows"] == trade_5m["appended_rows"] > 0
+    assert trade_5m["replaced_rows"] == 0 and trade_5m["conflict_keys"] == 0
+    assert trade_5m["deferred_indexes"] is True
+    assert trade_5m["rows_per_sec"] > 0
+
+
+def test_conflicting_symbol_days_fall_back_to_replace(tmp_path, shard_dbs):
+    target = tmp_path / "target.db"
+    windows.ensure_atomic_db(target)
+    windows._merge_shard_tables(target, shard_dbs[:1])
+    with sqlite3.connect(target) as conn:
+        conn.execute("UPDATE atomic_trade_daily SET total_amount = -1 WHERE symbol = 'sz000833'")
+        conn.commit()
+    legacy = tmp_path / "legacy.db"
+    with sqlite3.connect(target) as src, sqlite3.connect(legacy) as dst:
+        src.backup(dst)
+
+    stats = windows._merge_shard_tables(target, shard_dbs)
+    _legacy_merge(legacy, shard_dbs)
+
+    assert _dump(target) == _dump(legacy)
+    daily = stats["atomic_trade_daily"]
+    assert daily["replaced_rows"] == 1 and daily["appended_rows"] == 1 and daily["conflict_keys"] == 1
+    with sqlite3.connect(target) as conn:
+        assert conn.execute("SELECT total_amount FROM atomic_trade_daily WHERE symbol = 'sz000833'").fetchone()[0] > 0
+
+
+def test_indexes_dropped_by_killed_merge_are_rebuilt_on_next_start(tmp_path, shard_dbs, monkeypatch):
+    target = tmp_path / "target.db"
+    windows.ensure_atomic_db(target)
+    indexes_before = _index_names(target)
+
+    def killed(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    # 模拟进程在合并途中被杀：finally 里的重建也来不及执行
+    monkeypatch.setattr(windows, "_merge_shard_table", killed)
+    monkeypatch.setattr(windows, "_restore_deferred_indexes", lambda conn: {})
+    with pytest.raises(KeyboardInterrupt):
+        windows._merge_shard_tables(target, shard_dbs)
+    assert _index_names(target) != indexes_before
+    monkeypatch.undo()
+
+    windows.ensure_atomic_db(target)
+    assert _index_names(target) == indexes_before
+    with sqlite3.connect(target) as conn:
+        assert conn.execute(f"SELECT COUNT(*) FROM {windows.DEFERRED_INDEX_TABLE}").fetchone()[0] == 0
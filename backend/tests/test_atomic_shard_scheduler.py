@@ -0,0 +1,63 @@
+import shutil
+import sqlite3
+
+from backend.scripts import run_atomic_backfill_windows as windows
+from backend.tests._l2_fixtures import SYMBOL_DIR, TRADE_DATE
+
+LARGE, SUPER = 200000.0, 1000000.0
+
+
+def _write_sized_symbol(root, name, size):
+    symbol_dir = root / name
+    symbol_dir.mkdir(parents=True)
+    for filename in windows.L2_COST_FILES:
+        (symbol_dir / filename).write_bytes(b"x" * size)
+    return symbol_dir
+
+
+def test_items_are_ordered_largest_first_by_raw_bytes(tmp_path):
+    small = _write_sized_symbol(tmp_path, "000001.SZ", 10)
+    big = _write_sized_symbol(tmp_path, "600519.SH", 1000)
+    mid = _write_sized_symbol(tmp_path, "000002.SZ", 100)
+
+    ordered = windows.order_items_by_cost([small, big, mid], "l2")
+
+    assert [item for item, _ in ordered] == [big, mid, small]
+    assert [cost for _, cost in ordered] == [3000, 300, 30]
+    assert windows.estimate_item_cost(tmp_path / "missing.SZ", "l2") == 0
+
+
+def test_work_stealing_processes_each_item_once_and_reports_utilization(tmp_path):
+    day_root = tmp_path / "20260311"
+    items = []
+    for name in ("000833.SZ", "000834.SZ", "000835.SZ"):
+        shutil.copytree(SYMBOL_DIR, day_root / name)
+        items.append(day_root / name)
+    broken = day_root / "000836.SZ"
+    shutil.copytree(SYMBOL_DIR, broken)
+    (broken / "行情.csv").unlink()
+    items.append(broken)
+
+    shard_dbs = [tmp_path / "worker_1.db", tmp_path / "worker_2.db"]
+    done = []
+    results, report = windows.run_work_stealing_shards(
+        "l2", TRADE_DATE, items, shard_dbs, LARGE, SUPER, on_worker_done=done.append
+    )
+
+    assert len(results) == len(done) == 2
+    assert sum(r["item_count"] for r in results) == 4
+    assert sum(r["success_count"] for r in results) == 3
+    assert sum(r["failure_count"] for r in results) == 1
+    symbols = set()
+    for shard_db in shard_dbs:
+        with sqlite3.connect(shard_db) as conn:
+            symbols.update(row[0] for row in conn.execute("SELECT symbol FROM atomic_trade_daily"))
+    assert symbols == {"sz000833", "sz000834", "sz000835"}
+
+    assert report["mode"] == "work_stealing"
+    assert report["cost_basis"] == "raw_file_bytes"
+    assert [w["worker"] for w in report["workers"]] == [1, 2]
+    assert sum(w["items"] for w in report["workers"]) == 4
+    for worker in report["workers"]:
+        assert 0 <= worker["utilization"] <= 1
+    assert report["min_utilization"] <= report["mean_utilization"]
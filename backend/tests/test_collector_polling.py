@@ -0,0 +1,145 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import backend.app.services.collector as collector_module
+from backend.app.core.rate_limiter import TokenBucket
+from backend.app.services.tencent_ticks import extract_detail_rows, parse_detail_payload
+
+FIXTURE_FILE = Path(__file__).resolve().parent / "fixtures" / "tencent_detail_pages.json"
+
+
+def _page_rows(page, count, start=0):
+    return [
+        f"{page * 10 + start + idx}/09:{30 + page:02d}:{start + idx:02d}/10.00/0.00/100/100000/B"
+        for idx in range(count)
+    ]
+
+
+def _make_collector(monkeypatch, pages_by_symbol, symbols):
+    monkeypatch.setenv("ENABLE_CLOUD_COLLECTOR", "true")
+    monkeypatch.setattr(collector_module.MarketClock, "is_trading_time", staticmethod(lambda: True))
+    monkeypatch.setattr(collector_module.MarketClock, "get_display_date", staticmethod(lambda: "2026-03-12"))
+    monkeypatch.setattr(collector_module, "get_all_symbols", lambda: list(symbols))
+
+    collector = collector_module.DataCollector()
+    requested = []
+    saved = {}
+    in_flight = {"now": 0, "peak": 0}
+
+    async def fake_fetch_page(symbol, page):
+        requested.append((symbol, page))
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        pages = pages_by_symbol[symbol]
+        return list(pages[page]) if page < len(pages) else None
+
+    def fake_save(symbol, ticks, date_str):
+        saved[symbol] = [tick[1] for tick in ticks]
+
+    monkeypatch.setattr(collector, "_fetch_tencent_page", fake_fetch_page)
+    monkeypatch.setattr(collector, "_save_ticks", fake_save)
+    return collector, requested, saved, in_flight
+
+
+def test_poll_resumes_from_last_incomplete_page(monkeypatch):
+    pages = {"sz000833": [_page_rows(0, 10), _page_rows(1, 10), _page_rows(2, 3)]}
+    collector, requested, saved, _ = _make_collector(monkeypatch, pages, ["sz000833"])
+
+    first = collector._poll_watchlist()
+    assert requested == [("sz000833", 0), ("sz000833", 1), ("sz000833", 2), ("sz000833", 3)]
+    assert len(saved["sz000833"]) == 23
+    assert first["pages_fetched"] == 3 and first["pages_resumed"] == 0
+
+    # 第 2 页继续增长并出现新页：只从第 2 页开始重拉
+    pages["sz000833"][2] = _page_rows(2, 10)
+    pages["sz000833"].append(_page_rows(3, 4))
+    requested.clear()
+    second = collector._poll_watchlist()
+    assert requested == [("sz000833", 2), ("sz000833", 3), ("sz000833", 4)]
+    assert len(saved["sz000833"]) == 34
+    assert saved["sz000833"][:20] == [row.split("/")[1] for page in pages["sz000833"][:2] for row in page]
+    assert second["pages_resumed"] == 2
+
+    requested.clear()
+    collector._poll_watchlist(full_refresh=True)
+    assert requested[0] == ("sz000833", 0)
+
+    metrics = collector.get_metrics()
+    assert metrics["cycles"] == 3
+    assert metrics["recent_cycle_ms"]["count"] == 3
+    assert metrics["last_cycle"]["succeeded"] == 1
+
+
+def test_poll_fetches_symbols_concurrently(monkeypatch):
+    symbols = [f"sz0008{idx:02d}" for idx in range(6)]
+    pages = {symbol: [_page_rows(0, 5)] for symbol in symbols}
+    monkeypatch.setattr(collector_module, "COLLECTOR_CONCURRENCY", 3)
+    collector, requested, saved, in_flight = _make_collector(monkeypatch, pages, symbols)
+
+    cycle = collector._poll_watchlist()
+
+    assert sorted(saved) == symbols
+    assert cycle["succeeded"] == 6
+    assert 1 < in_flight["peak"] <= 3
+
+
+def test_token_bucket_spaces_requests_after_burst():
+    bucket = TokenBucket(rate=50.0, capacity=2.0)
+
+    async def take(n):
+        started = time.perf_counter()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(take(7))
+    # 2 tokens burst, the remaining 5 are paced at 50/s
+    assert elapsed >= 0.09
+    assert bucket.waited_seconds > 0
+
+
+def _legacy_ticks(payloads, symbol, date_str):
+    import pandas as pd
+
+    big_df = pd.DataFrame()
+    for text_data in payloads:
+        parsed_data = json.loads(text_data[text_data.find("["):])
+        temp_df = pd.DataFrame(parsed_data[1].split("|")).iloc[:, 0].str.split("/", expand=True)
+        big_df = pd.concat([big_df, temp_df], ignore_index=True)
+    big_df = big_df.iloc[:, 1:].copy()
+    big_df.columns = ["成交时间", "成交价格", "价格变动", "成交量", "成交额", "性质"]
+    out = []
+    for _, row in big_df.iterrows():
+        if row["成交时间"] > "15:00:05":
+            continue
+        raw_type = str(row["性质"]).upper()
+        t_type = "buy" if raw_type in ["B", "买盘", "BUY", "UP"] else "sell" if raw_type in ["S", "卖盘", "SELL", "DOWN"] else raw_type
+        out.append((symbol, row["成交时间"], float(row["成交价格"]), int(row["成交量"]), float(row["成交额"]), t_type, date_str))
+    return out
+
+
+def test_streaming_parser_matches_legacy_dataframe_path():
+    fixture = json.loads(FIXTURE_FILE.read_text(encoding="utf-8"))
+    symbol, date_str, payloads = fixture["symbol"], fixture["date"], fixture["pages"]
+
+    streamed = [tick for payload in payloads for tick in parse_detail_payload(symbol, payload, date_str)]
+
+    assert streamed == _legacy_ticks(payloads, symbol, date_str)
+    assert streamed[-1][1] == "15:00:00"
+    assert {tick[5] for tick in streamed} == {"buy", "sell", "M"}
+
+
+def test_extract_detail_rows_rejects_code_and_handles_end_of_pages():
+    assert extract_detail_rows('v_detail_data_sz000833=[5,""]') == []
+    assert extract_detail_rows("v_detail_data_sz000833=[5,__import__('os').getcwd()]") == []
+    assert extract_detail_rows("") == []
+    assert extract_detail_rows('v_detail_data_sz000833=[0,"1/09:30:00/10.00/0.00/1/1000/B"];') == [
+        "1/09:30:00/10.00/0.00/1/1000/B"
+    ]
+    assert parse_detail_payload("sz000833", 'x=[0,"1/09:30:00/10.00/0.00/1/1000/B|bad|2/15:00:06/10.00/0.00/1/1000/S"]', "2026-03-12") == [
+        ("sz000833", "09:30:00", 10.0, 1, 1000.0, "buy", "2026-03-12")
+    ]
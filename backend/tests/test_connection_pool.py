@@ -0,0 +1,129 @@
+import importlib
+import os
+import sqlite3
+import threading
+
+import pytest
+
+
+def _reload_pool():
+    import backend.app.db.connection_pool as connection_pool
+
+    connection_pool.close_all_connections()
+    return connection_pool
+
+
+def test_reader_is_reused_per_thread_and_query_only(tmp_path):
+    pool = _reload_pool()
+    db_file = str(tmp_path / "pool.db")
+    with pool.write_connection(db_file) as conn:
+        conn.execute("CREATE TABLE t (v INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+
+    with pool.read_connection(db_file) as first:
+        assert first.execute("SELECT v FROM t").fetchall() == [(1,)]
+        assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        with pytest.raises(sqlite3.OperationalError):
+            first.execute("INSERT INTO t VALUES (2)")
+    with pool.read_connection(db_file, row_factory=sqlite3.Row) as second:
+        assert second is first
+        assert second.execute("SELECT v FROM t").fetchone()["v"] == 1
+    assert first.row_factory is None
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool._acquire_reader(os.path.abspath(db_file))))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+
+def test_writer_rolls_back_on_error_and_readers_see_commits(tmp_path):
+    pool = _reload_pool()
+    db_file = str(tmp_path / "pool.db")
+    with pool.write_connection(db_file) as conn:
+        conn.execute("CREATE TABLE t (v INTEGER)")
+
+    with pool.read_connection(db_file) as reader:
+        assert reader.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        with pytest.raises(RuntimeError):
+            with pool.write_connection(db_file) as conn:
+                conn.execute("INSERT INTO t VALUES (1)")
+                raise RuntimeError("boom")
+        assert reader.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        with pool.write_connection(db_file) as conn:
+            conn.execute("INSERT INTO t VALUES (2)")
+        assert reader.execute("SELECT v FROM t").fetchall() == [(2,)]
+
+
+def test_schema_builder_runs_once_until_file_is_replaced(tmp_path):
+    pool = _reload_pool()
+    db_file = str(tmp_path / "pool.db")
+    calls = []
+
+    def builder(conn):
+        calls.append(1)
+        conn.execute("CREATE TABLE IF NOT EXISTS t (v INTEGER)")
+
+    pool.ensure_schema_once(db_file, "demo", builder)
+    pool.ensure_schema_once(db_file, "demo", builder)
+    assert len(calls) == 1
+
+    with pool.read_connection(db_file) as stale:
+        stale.execute("SELECT COUNT(*) FROM t").fetchone()
+    os.replace(str(tmp_path / "pool.db"), str(tmp_path / "moved.db"))
+    pool.ensure_schema_once(db_file, "demo", builder)
+    assert len(calls) == 2
+    with pool.read_connection(db_file) as fresh:
+        assert fresh is not stale
+        assert fresh.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_attached_database_follows_file_replacement(tmp_path):
+    pool = _reload_pool()
+    main_db = str(tmp_path / "main.db")
+    side_db = str(tmp_path / "side.db")
+    sqlite3.connect(main_db).close()
+    for path, value in ((side_db, 1), (str(tmp_path / "side_v2.db"), 2)):
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE s (v INTEGER)")
+        conn.execute("INSERT INTO s VALUES (?)", (value,))
+        conn.commit()
+        conn.close()
+
+    with pool.read_connection(main_db, attach={"side": side_db}) as conn:
+        assert conn.execute("SELECT v FROM side.s").fetchone()[0] == 1
+    with pool.read_connection(main_db, attach={"side": side_db}) as conn:
+        assert conn.execute("SELECT v FROM side.s").fetchone()[0] == 1
+
+    os.replace(str(tmp_path / "side_v2.db"), side_db)
+    with pool.read_connection(main_db, attach={"side": side_db}) as conn:
+        assert conn.execute("SELECT v FROM side.s").fetchone()[0] == 2
+    with pool.read_connection(main_db, attach={"side": None}) as conn:
+        databases = {row[1] for row in conn.execute("PRAGMA database_list").fetchall()}
+        assert "side" not in databases
+
+
+def test_l2_history_schema_is_not_rerun_per_query(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "market_data.db"))
+    monkeypatch.setenv("USER_DB_PATH", str(tmp_path / "user_data.db"))
+    monkeypatch.setenv("ATOMIC_DB_PATH", str(tmp_path / "missing_atomic.db"))
+    monkeypatch.setenv("ATOMIC_MAINBOARD_DB_PATH", str(tmp_path / "missing_atomic.db"))
+
+    import backend.app.core.config as config
+    import backend.app.db.l2_history_db as l2_history_db
+
+    importlib.reload(config)
+    importlib.reload(l2_history_db)
+    _reload_pool()
+
+    calls = []
+    original = l2_history_db._create_l2_history_schema
+
+    def tracking(conn):
+        calls.append(1)
+        original(conn)
+
+    monkeypatch.setattr(l2_history_db, "_create_l2_history_schema", tracking)
+    for _ in range(3):
+        assert l2_history_db.query_l2_history_5m_rows("sh600000") == []
+    assert len(calls) == 1
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.app.core.http_client import HTTPClient, RetryPolicy
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+            fail = self.server.fail_remaining > 0
+            if fail:
+                self.server.fail_remaining -= 1
+        status = 503 if fail else 200
+        body = b'v_detail_data="1/09:30:00/10.00/0.00/100/100000/B"'
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_stub_server(fail_first=0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = 0
+    server.fail_remaining = fail_first
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/data/index.php"
+
+
+def test_sequential_pages_reuse_one_keep_alive_connection():
+    server, url = _start_stub_server()
+
+    async def fetch_pages():
+        try:
+            return [await HTTPClient.get(url, params={"p": page}) for page in range(20)]
+        finally:
+            await HTTPClient.aclose()
+
+    try:
+        responses = asyncio.run(fetch_pages())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert all(response is not None and response.status_code == 200 for response in responses)
+    assert server.requests == 20
+    assert server.connections == 1
+
+
+def test_concurrent_requests_respect_per_host_limit(monkeypatch):
+    server, url = _start_stub_server()
+    monkeypatch.setattr(HTTPClient, "per_host_limit", 2)
+
+    async def fetch_concurrently():
+        try:
+            return await asyncio.gather(*(HTTPClient.get(url, params={"p": page}) for page in range(12)))
+        finally:
+            await HTTPClient.aclose()
+
+    try:
+        responses = asyncio.run(fetch_concurrently())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len([response for response in responses if response is not None]) == 12
+    assert server.connections <= 2
+
+
+def test_retry_policy_backs_off_on_retryable_status():
+    server, url = _start_stub_server(fail_first=2)
+    policy = RetryPolicy(attempts=3, backoff_base=0.01, backoff_max=0.02)
+
+    async def fetch_once(retry_policy):
+        try:
+            return await HTTPClient.get(url, retry_policy=retry_policy)
+        finally:
+            await HTTPClient.aclose()
+
+    try:
+        response = asyncio.run(fetch_once(policy))
+        assert response is not None and response.status_code == 200
+        assert server.requests == 3
+
+        server.fail_remaining = 1
+        assert asyncio.run(fetch_once(RetryPolicy(attempts=1))) is None
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,53 @@
+from backend.scripts import backfill_atomic_order_from_raw as atomic_order
+from backend.scripts import l2_daily_backfill
+from backend.scripts import run_symbol_atomic_validation as validation
+from backend.scripts.l2_bar_builder import build_atomic_order_5m_rows, build_history_5m_rows
+from backend.tests._l2_fixtures import SYMBOL_DIR, TRADE_DATE, as_json, load_golden
+
+
+def test_history_5m_rows_match_golden():
+    golden = load_golden()
+    large, super_ = golden["large_threshold"], golden["super_threshold"]
+
+    symbol, rows_5m, daily_row, _ = l2_daily_backfill.process_symbol_dir(SYMBOL_DIR, TRADE_DATE, large, super_)
+    assert as_json(rows_5m) == golden["history_5m_l2"]
+    assert as_json(daily_row) == golden["history_daily_l2"]
+
+    ticks, order_events, _ = l2_daily_backfill.build_standardized_ticks(SYMBOL_DIR, TRADE_DATE)
+    without_orders = l2_daily_backfill.compute_5m_bars(ticks, order_events.iloc[0:0], symbol, TRADE_DATE, large, super_)
+    assert as_json(without_orders) == golden["history_5m_l2_without_orders"]
+    assert all(row[17] is None and row[22] == 0.0 for row in without_orders)
+    # 有成交无委托的尾盘桶：挂撤金额为 None 而不是 0
+    assert rows_5m[-1][1] == "2026-03-11 15:00:00"
+    assert rows_5m[-1][17:21] == (None, None, None, None)
+
+
+def test_atomic_rows_match_golden():
+    golden = load_golden()
+    large, super_ = golden["large_threshold"], golden["super_threshold"]
+    bundle = atomic_order.load_l2_symbol_bundle(SYMBOL_DIR, TRADE_DATE)
+
+    _, order_5m, order_daily, _ = atomic_order._build_order_rows(SYMBOL_DIR, TRADE_DATE, prepared=bundle)
+    assert as_json(order_5m) == golden["atomic_order_5m"]
+    assert as_json(order_daily) == golden["atomic_order_daily"]
+    assert all(isinstance(value, int) for row in order_5m for value in row[9:13])
+
+    trade_5m, quality_info, feature = validation._build_atomic_trade_5m_rows_from_l2(
+        SYMBOL_DIR, TRADE_DATE, large, super_, prepared=bundle
+    )
+    assert as_json(trade_5m) == golden["atomic_trade_5m"]
+    daily = validation._build_atomic_trade_daily_row(bundle.symbol, TRADE_DATE, trade_5m, "trade_order", quality_info, feature)
+    assert as_json(daily) == golden["atomic_trade_daily"]
+
+    bars = validation._compute_l2_trade_5m_bars(bundle.ticks, bundle.order_events, bundle.symbol, TRADE_DATE, large, super_)
+    assert as_json(bars) == golden["atomic_l2_trade_5m_bars"]
+
+
+def test_builders_handle_empty_frames():
+    bundle = atomic_order.load_l2_symbol_bundle(SYMBOL_DIR, TRADE_DATE)
+    empty_ticks, empty_events = bundle.ticks.iloc[0:0], bundle.order_events.iloc[0:0]
+
+    assert build_history_5m_rows(empty_ticks, bundle.order_events, "sz000833", TRADE_DATE, 1.0, 2.0) == []
+    assert build_atomic_order_5m_rows(empty_ticks, empty_events, "sz000833", TRADE_DATE, None) == []
+    event_only = build_atomic_order_5m_rows(empty_ticks, bundle.order_events, "sz000833", TRADE_DATE, None)
+    assert event_only and all(row[7] == 0.0 for row in event_only)
@@ -0,0 +1,265 @@
+import random
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+import pytest
+
+import backend.app.db.l2_history_db as l2_history_db
+
+VALUE_FIELDS = [
+    "total_amount", "total_volume",
+    "l1_main_buy", "l1_main_sell", "l1_super_buy", "l1_super_sell",
+    "l2_main_buy", "l2_main_sell", "l2_super_buy", "l2_super_sell",
+    "l2_add_buy_amount", "l2_add_sell_amount", "l2_cancel_buy_amount", "l2_cancel_sell_amount",
+    "l2_cvd_delta", "l2_oib_delta",
+]
+EDGE_TIMES = ["09:25:00", "09:30:00", "11:25:00", "11:30:00", "12:00:00", "13:00:00", "14:55:00", "15:00:00", "15:00:30", "15:05:00"]
+
+
+def _legacy_aggregate(
+    rows_5m: Sequence[Dict[str, object]],
+    granularity: str = "30m",
+) -> List[Dict[str, object]]:
+    if granularity not in l2_history_db.ALLOWED_L2_HISTORY_GRANULARITIES:
+        raise ValueError(f"granularity 仅支持: {', '.join(sorted(l2_history_db.ALLOWED_L2_HISTORY_GRANULARITIES))}")
+    if not rows_5m:
+        return []
+    if granularity == "5m":
+        return [dict(row) for row in rows_5m]
+
+    aggregated: Dict[str, Dict[str, object]] = {}
+    bucket_order: List[str] = []
+    for row in rows_5m:
+        dt = datetime.strptime(str(row["datetime"]), "%Y-%m-%d %H:%M:%S")
+        bucket_dt = l2_history_db._bucket_start(dt, granularity)
+        if bucket_dt is None:
+            continue
+        bucket_key = bucket_dt.strftime("%Y-%m-%d %H:%M:%S")
+        if bucket_key not in aggregated:
+            aggregated[bucket_key] = {
+                "symbol": row["symbol"],
+                "datetime": bucket_key,
+                "source_date": row["source_date"],
+                "open": None,
+                "high": None,
+                "low": None,
+                "close": None,
+                "total_amount": 0.0,
+                "total_volume": 0.0,
+                "l1_main_buy": 0.0,
+                "l1_main_sell": 0.0,
+                "l1_super_buy": 0.0,
+                "l1_super_sell": 0.0,
+                "l2_main_buy": 0.0,
+                "l2_main_sell": 0.0,
+                "l2_super_buy": 0.0,
+                "l2_super_sell": 0.0,
+                "l2_add_buy_amount": None,
+                "l2_add_sell_amount": None,
+                "l2_cancel_buy_amount": None,
+                "l2_cancel_sell_amount": None,
+                "l2_cvd_delta": None,
+                "l2_oib_delta": None,
+                "quality_info": None,
+                "is_placeholder": False,
+                "_quality_messages": [],
+                "_placeholder_count": 0,
+                "_numeric_count": 0,
+                "_extra_numeric_count": {
+                    "total_volume": 0,
+                    "l2_add_buy_amount": 0,
+                    "l2_add_sell_amount": 0,
+                    "l2_cancel_buy_amount": 0,
+                    "l2_cancel_sell_amount": 0,
+                    "l2_cvd_delta": 0,
+                    "l2_oib_delta": 0,
+                },
+            }
+            bucket_order.append(bucket_key)
+        item = aggregated[bucket_key]
+        item["source_date"] = str(row["source_date"])
+        quality_info = str(row.get("quality_info") or "").strip()
+        if quality_info:
+            item["_quality_messages"].append(quality_info)
+        if bool(row.get("is_placeholder")):
+            item["_placeholder_count"] += 1
+
+        open_value = l2_history_db._to_optional_float(row.get("open"))
+        high_value = l2_history_db._to_optional_float(row.get("high"))
+        low_value = l2_history_db._to_optional_float(row.get("low"))
+        close_value = l2_history_db._to_optional_float(row.get("close"))
+        if open_value is None or high_value is None or low_value is None or close_value is None:
+            continue
+
+        if int(item["_numeric_count"]) == 0:
+            item["open"] = open_value
+            item["high"] = high_value
+            item["low"] = low_value
+            item["close"] = close_value
+            item["total_amount"] = float(l2_history_db._to_optional_float(row.get("total_amount")) or 0.0)
+            total_volume_value = l2_history_db._to_optional_float(row.get("total_volume"))
+            item["total_volume"] = total_volume_value
+            item["_extra_numeric_count"]["total_volume"] = 1 if total_volume_value is not None else 0
+            item["l1_main_buy"] = float(l2_history_db._to_optional_float(row.get("l1_main_buy")) or 0.0)
+            item["l1_main_sell"] = float(l2_history_db._to_optional_float(row.get("l1_main_sell")) or 0.0)
+            item["l1_super_buy"] = float(l2_history_db._to_optional_float(row.get("l1_super_buy")) or 0.0)
+            item["l1_super_sell"] = float(l2_history_db._to_optional_float(row.get("l1_super_sell")) or 0.0)
+            item["l2_main_buy"] = float(l2_history_db._to_optional_float(row.get("l2_main_buy")) or 0.0)
+            item["l2_main_sell"] = float(l2_history_db._to_optional_float(row.get("l2_main_sell")) or 0.0)
+            item["l2_super_buy"] = float(l2_history_db._to_optional_float(row.get("l2_super_buy")) or 0.0)
+            item["l2_super_sell"] = float(l2_history_db._to_optional_float(row.get("l2_super_sell")) or 0.0)
+            for key in [
+                "l2_add_buy_amount",
+                "l2_add_sell_amount",
+                "l2_cancel_buy_amount",
+                "l2_cancel_sell_amount",
+                "l2_cvd_delta",
+                "l2_oib_delta",
+            ]:
+                value = l2_history_db._to_optional_float(row.get(key))
+                item[key] = value
+                item["_extra_numeric_count"][key] = 1 if value is not None else 0
+            item["_numeric_count"] = 1
+            continue
+
+        item["high"] = max(float(item["high"]), high_value)
+        item["low"] = min(float(item["low"]), low_value)
+        item["close"] = close_value
+        item["total_amount"] = float(item["total_amount"]) + float(l2_history_db._to_optional_float(row.get("total_amount")) or 0.0)
+        total_volume_value = l2_history_db._to_optional_float(row.get("total_volume"))
+        if total_volume_value is not None:
+            item["total_volume"] = float(item["total_volume"] or 0.0) + total_volume_value
+            item["_extra_numeric_count"]["total_volume"] = int(item["_extra_numeric_count"]["total_volume"]) + 1
+        item["l1_main_buy"] = float(item["l1_main_buy"]) + float(l2_history_db._to_optional_float(row.get("l1_main_buy")) or 0.0)
+        item["l1_main_sell"] = float(item["l1_main_sell"]) + float(l2_history_db._to_optional_float(row.get("l1_main_sell")) or 0.0)
+        item["l1_super_buy"] = float(item["l1_super_buy"]) + float(l2_history_db._to_optional_float(row.get("l1_super_buy")) or 0.0)
+        item["l1_super_sell"] = float(item["l1_super_sell"]) + float(l2_history_db._to_optional_float(row.get("l1_super_sell")) or 0.0)
+        item["l2_main_buy"] = float(item["l2_main_buy"]) + float(l2_history_db._to_optional_float(row.get("l2_main_buy")) or 0.0)
+        item["l2_main_sell"] = float(item["l2_main_sell"]) + float(l2_history_db._to_optional_float(row.get("l2_main_sell")) or 0.0)
+        item["l2_super_buy"] = float(item["l2_super_buy"]) + float(l2_history_db._to_optional_float(row.get("l2_super_buy")) or 0.0)
+        item["l2_super_sell"] = float(item["l2_super_sell"]) + float(l2_history_db._to_optional_float(row.get("l2_super_sell")) or 0.0)
+        for key in [
+            "l2_add_buy_amount",
+            "l2_add_sell_amount",
+            "l2_cancel_buy_amount",
+            "l2_cancel_sell_amount",
+            "l2_cvd_delta",
+            "l2_oib_delta",
+        ]:
+            value = l2_history_db._to_optional_float(row.get(key))
+            if value is not None:
+                item[key] = float(item[key] or 0.0) + value
+                item["_extra_numeric_count"][key] = int(item["_extra_numeric_count"][key]) + 1
+        item["_numeric_count"] = int(item["_numeric_count"]) + 1
+
+    result: List[Dict[str, object]] = []
+    for key in sorted(bucket_order):
+        item = aggregated[key]
+        numeric_count = int(item.pop("_numeric_count"))
+        placeholder_count = int(item.pop("_placeholder_count"))
+        extra_numeric_count = dict(item.pop("_extra_numeric_count"))
+        quality_messages = [msg for msg in item.pop("_quality_messages") if msg]
+        unique_messages = list(dict.fromkeys(quality_messages))
+        if placeholder_count > 0:
+            item["quality_info"] = (
+                "该区间包含缺失 5m，聚合值可能偏小"
+                if numeric_count > 0
+                else "该区间缺失正式 5m 数据"
+            )
+        elif unique_messages:
+            item["quality_info"] = (
+                unique_messages[0]
+                if numeric_count <= 1 and len(unique_messages) == 1
+                else "该区间包含异常 5m，聚合值可能偏小"
+            )
+        else:
+            item["quality_info"] = None
+
+        if numeric_count <= 0:
+            item["open"] = None
+            item["high"] = None
+            item["low"] = None
+            item["close"] = None
+            item["total_amount"] = None
+            item["total_volume"] = None
+            item["l1_main_buy"] = None
+            item["l1_main_sell"] = None
+            item["l1_super_buy"] = None
+            item["l1_super_sell"] = None
+            item["l2_main_buy"] = None
+            item["l2_main_sell"] = None
+            item["l2_super_buy"] = None
+            item["l2_super_sell"] = None
+            item["l2_add_buy_amount"] = None
+            item["l2_add_sell_amount"] = None
+            item["l2_cancel_buy_amount"] = None
+            item["l2_cancel_sell_amount"] = None
+            item["l2_cvd_delta"] = None
+            item["l2_oib_delta"] = None
+            item["is_placeholder"] = True
+        else:
+            for field, count in extra_numeric_count.items():
+                if int(count) <= 0:
+                    item[field] = None
+            item["is_placeholder"] = False
+        result.append(item)
+
+    return result
+
+
+def _random_value(rng: random.Random, allow_missing: bool = True):
+    roll = rng.random()
+    if allow_missing and roll < 0.12:
+        return None
+    if roll < 0.18:
+        return str(round(rng.uniform(-500, 5000), 2))
+    if roll < 0.22:
+        return rng.randint(0, 100)
+    return rng.uniform(-500.0, 5000.0)
+
+
+def _random_rows(rng: random.Random) -> List[Dict[str, object]]:
+    dates = sorted(rng.sample(["2026-03-09", "2026-03-10", "2026-03-11", "2026-03-12"], rng.randint(1, 3)))
+    rows: List[Dict[str, object]] = []
+    for trade_date in dates:
+        times = set(rng.sample(EDGE_TIMES, rng.randint(0, 4)))
+        for _ in range(rng.randint(0, 60)):
+            hour = rng.choice([9, 10, 11, 13, 14, 15])
+            times.add(f"{hour:02d}:{rng.randrange(0, 60, 5):02d}:{rng.choice([0, 0, 0, 59]):02d}")
+        for clock in sorted(times):
+            row: Dict[str, object] = {
+                "symbol": "sz000833",
+                "datetime": f"{trade_date} {clock}",
+                "source_date": trade_date,
+                "quality_info": rng.choice([None, None, None, "", "  ", "成交缺失", "委托缺失"]),
+            }
+            for field in ("open", "high", "low", "close"):
+                row[field] = _random_value(rng, allow_missing=rng.random() < 0.3)
+            for field in VALUE_FIELDS:
+                row[field] = _random_value(rng)
+            if rng.random() < 0.08:
+                row["is_placeholder"] = True
+            rows.append(row)
+    if rng.random() < 0.2:
+        rng.shuffle(rows)
+    return rows
+
+
+@pytest.mark.parametrize("granularity", ["15m", "30m", "1h", "1d"])
+def test_columnar_aggregation_matches_row_by_row_reference(granularity):
+    for seed in range(150):
+        rng = random.Random(f"{granularity}-{seed}")
+        rows = _random_rows(rng)
+        assert l2_history_db.aggregate_l2_history_5m_rows(rows, granularity) == _legacy_aggregate(rows, granularity), seed
+
+
+def test_columnar_aggregation_handles_non_canonical_datetimes():
+    rows = [
+        {"symbol": "sz000833", "datetime": "2026-3-9 9:31:00", "source_date": "2026-03-09", "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "total_amount": 10.0},
+        {"symbol": "sz000833", "datetime": "2026-03-09 09:45:00", "source_date": "2026-03-09", "open": 1.5, "high": 3.0, "low": 1.0, "close": 2.5, "total_amount": 5.0},
+    ]
+    assert l2_history_db.aggregate_l2_history_5m_rows(rows, "30m") == _legacy_aggregate(rows, "30m")
+    with pytest.raises(ValueError):
+        l2_history_db.aggregate_l2_history_5m_rows([dict(rows[0], datetime="2026-02-30 09:30:00")], "30m")
+    with pytest.raises(ValueError):
+        l2_history_db.aggregate_l2_history_5m_rows(rows, "2h")
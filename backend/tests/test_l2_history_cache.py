@@ -0,0 +1,94 @@
+import importlib
+import sqlite3
+
+
+def _reload_modules(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "market_data.db"))
+    monkeypatch.setenv("USER_DB_PATH", str(tmp_path / "user_data.db"))
+    monkeypatch.setenv("ATOMIC_DB_PATH", str(tmp_path / "missing_atomic.db"))
+    import backend.app.core.config as config
+    import backend.app.db.l2_history_db as l2_history_db
+
+    importlib.reload(config)
+    importlib.reload(l2_history_db)
+    l2_history_db.ensure_l2_history_schema()
+    return l2_history_db
+
+
+def _rows_5m(trade_date, close):
+    return [
+        (
+            "sz000833", f"{trade_date} {clock}", trade_date,
+            10.0, close + 0.1, 9.9, close,
+            100000.0, 1000.0,
+            300.0, 200.0, 100.0, 50.0,
+            400.0, 250.0, 120.0, 60.0,
+            None, None, None, None, None, None, None,
+        )
+        for clock in ("09:30:00", "09:35:00", "10:00:00")
+    ]
+
+
+def _daily_row(trade_date, close):
+    return (
+        "sz000833", trade_date, 10.0, close + 0.1, 9.9, close, 300000.0,
+        900.0, 600.0, 300.0, 300.0, 150.0, 150.0,
+        1200.0, 750.0, 450.0, 360.0, 180.0, 180.0,
+        1.0, 0.15, 1.0, 0.18, 0.3, 0.2, 0.4, 0.25, None,
+    )
+
+
+def test_finalized_history_served_from_cache_until_replaced(monkeypatch, tmp_path):
+    l2_history_db = _reload_modules(monkeypatch, tmp_path)
+    l2_history_db.replace_history_5m_l2_rows("sz000833", "2026-03-11", _rows_5m("2026-03-11", 10.1))
+    l2_history_db.replace_history_daily_l2_row("sz000833", "2026-03-11", _daily_row("2026-03-11", 10.1))
+
+    first = l2_history_db.query_l2_history_5m_rows("sz000833", start_date="2026-03-11", end_date="2026-03-11")
+    first[0]["close"] = -1.0  # 调用方修改返回值不应污染缓存
+    second = l2_history_db.query_l2_history_5m_rows("sz000833", start_date="2026-03-11", end_date="2026-03-11")
+    assert second[0]["close"] == 10.1
+    assert l2_history_db.get_l2_history_cache_stats()["hits"] == 1
+
+    bars = l2_history_db.query_l2_history_bars("sz000833", limit_days=5, granularity="30m")
+    assert l2_history_db.query_l2_history_bars("sz000833", limit_days=5, granularity="30m") == bars
+    assert [row["datetime"] for row in bars] == ["2026-03-11 09:30:00", "2026-03-11 10:00:00"]
+    assert l2_history_db.query_l2_history_daily_rows("sz000833", limit_days=5)[0]["close"] == 10.1
+
+    l2_history_db.replace_history_5m_l2_rows("sz000833", "2026-03-11", _rows_5m("2026-03-11", 11.5))
+    l2_history_db.replace_history_daily_l2_row("sz000833", "2026-03-11", _daily_row("2026-03-11", 11.5))
+
+    assert l2_history_db.query_l2_history_5m_rows("sz000833", start_date="2026-03-11", end_date="2026-03-11")[0]["close"] == 11.5
+    assert l2_history_db.query_l2_history_bars("sz000833", limit_days=5, granularity="30m")[-1]["close"] == 11.5
+    assert l2_history_db.query_l2_history_daily_row("sz000833", "2026-03-11")["close"] == 11.5
+
+
+def test_manifest_generation_invalidates_out_of_process_writes(monkeypatch, tmp_path):
+    l2_history_db = _reload_modules(monkeypatch, tmp_path)
+    l2_history_db.replace_history_5m_l2_rows("sz000833", "2026-03-11", _rows_5m("2026-03-11", 10.1))
+    assert l2_history_db.query_l2_history_5m_rows("sz000833", limit_days=1)[0]["close"] == 10.1
+
+    # 模拟合并脚本在另一个进程里直接改库
+    conn = sqlite3.connect(tmp_path / "market_data.db")
+    with conn:
+        conn.execute("UPDATE history_5m_l2 SET close=12.0 WHERE symbol='sz000833'")
+    conn.close()
+    assert l2_history_db.query_l2_history_5m_rows("sz000833", limit_days=1)[0]["close"] == 10.1
+
+    conn = sqlite3.connect(tmp_path / "market_data.db")
+    with conn:
+        l2_history_db._bump_cache_generation(conn, "atomic")
+    conn.close()
+    assert l2_history_db.query_l2_history_5m_rows("sz000833", limit_days=1)[0]["close"] == 12.0
+
+
+def test_current_trading_day_is_not_cached(monkeypatch, tmp_path):
+    l2_history_db = _reload_modules(monkeypatch, tmp_path)
+    monkeypatch.setattr(l2_history_db, "_china_today", lambda: "2026-03-11")
+    l2_history_db.replace_history_5m_l2_rows("sz000833", "2026-03-11", _rows_5m("2026-03-11", 10.1))
+
+    l2_history_db.query_l2_history_5m_rows("sz000833", limit_days=1)
+    l2_history_db.query_l2_history_5m_rows("sz000833", limit_days=1)
+
+    stats = l2_history_db.get_l2_history_cache_stats()
+    assert stats["hits"] == 0
+    assert stats["entries"] == 0
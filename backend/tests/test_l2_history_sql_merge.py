@@ -0,0 +1,92 @@
+import importlib
+import sqlite3
+
+from backend.tests.test_atomic_review_fallback import _init_atomic_db
+
+
+def _reload_modules(monkeypatch, tmp_path, atomic_name="atomic_mainboard.db"):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "market_data.db"))
+    monkeypatch.setenv("USER_DB_PATH", str(tmp_path / "user_data.db"))
+    monkeypatch.setenv("ATOMIC_DB_PATH", str(tmp_path / atomic_name))
+    import backend.app.core.config as config
+    import backend.app.db.l2_history_db as l2_history_db
+
+    importlib.reload(config)
+    importlib.reload(l2_history_db)
+    l2_history_db.ensure_l2_history_schema()
+    return l2_history_db
+
+
+def _seed_legacy_rows(l2_history_db):
+    for trade_date, close in (("2026-04-08", 9.6), ("2026-04-10", 99.0)):
+        l2_history_db.replace_history_5m_l2_rows(
+            "sh603629",
+            trade_date,
+            [
+                (
+                    "sh603629", f"{trade_date} {clock}", trade_date,
+                    10.0, close + 0.1, 9.5, close, 500_000.0, 500.0,
+                    100.0, 50.0, 20.0, 10.0, 120.0, 60.0, 30.0, 15.0,
+                    None, None, None, None, None, None, "legacy",
+                )
+                for clock in ("09:30:00", "09:40:00")
+            ],
+        )
+        l2_history_db.replace_history_daily_l2_row(
+            "sh603629",
+            trade_date,
+            (
+                "sh603629", trade_date, 10.0, close + 0.1, 9.5, close, 1_000_000.0,
+                200.0, 100.0, 100.0, 40.0, 20.0, 20.0,
+                240.0, 120.0, 120.0, 60.0, 30.0, 30.0,
+                1.0, 0.2, 1.0, 0.3, 0.4, 0.3, 0.5, 0.4, "legacy",
+            ),
+        )
+
+
+QUERY_ARGS = [
+    {},
+    {"limit_days": 1},
+    {"limit_days": 2},
+    {"start_date": "2026-04-09"},
+    {"start_date": "2026-04-08", "end_date": "2026-04-09"},
+    {"end_date": "2026-04-10", "limit_days": 5},
+]
+
+
+def _both_modes(monkeypatch, l2_history_db, loader_name, kwargs):
+    monkeypatch.setattr(l2_history_db, "L2_HISTORY_MERGE_MODE", "python")
+    expected = getattr(l2_history_db, loader_name)("sh603629", **kwargs)
+    monkeypatch.setattr(l2_history_db, "L2_HISTORY_MERGE_MODE", "sql")
+    actual = getattr(l2_history_db, loader_name)("sh603629", **kwargs)
+    return expected, actual
+
+
+def test_sql_merge_matches_python_merge(monkeypatch, tmp_path):
+    _init_atomic_db(tmp_path)
+    l2_history_db = _reload_modules(monkeypatch, tmp_path)
+    _seed_legacy_rows(l2_history_db)
+
+    for kwargs in QUERY_ARGS:
+        for loader_name in ("_load_l2_history_5m_rows", "_load_l2_history_daily_rows"):
+            expected, actual = _both_modes(monkeypatch, l2_history_db, loader_name, kwargs)
+            assert actual == expected, (loader_name, kwargs)
+
+    rows_5m = l2_history_db._load_l2_history_5m_rows_sql("sh603629")
+    by_time = {row["datetime"]: row for row in rows_5m}
+    # atomic 优先：09:30 被 atomic 覆盖，09:40 只有 legacy
+    assert by_time["2026-04-10 09:30:00"]["close"] == 10.1
+    assert by_time["2026-04-10 09:40:00"]["close"] == 99.0
+    assert by_time["2026-04-10 09:30:00"]["l2_add_buy_amount"] == 100_000.0
+
+
+def test_sql_merge_without_atomic_tables_uses_legacy_only(monkeypatch, tmp_path):
+    sqlite3.connect(tmp_path / "empty_atomic.db").close()
+    l2_history_db = _reload_modules(monkeypatch, tmp_path, atomic_name="empty_atomic.db")
+    _seed_legacy_rows(l2_history_db)
+
+    rows = l2_history_db._load_l2_history_daily_rows_sql("sh603629", limit_days=1)
+
+    assert [row["date"] for row in rows] == ["2026-04-10"]
+    assert rows[0]["quality_info"] == "legacy"
+    assert len(l2_history_db._load_l2_history_5m_rows_sql("sh603629")) == 4
@@ -0,0 +1,103 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.scripts import atomic_day_pipeline
+from backend.scripts import l2_daily_backfill
+from backend.scripts import l2_order_stream
+from backend.scripts.backfill_atomic_order_from_raw import _build_standardized_order_events, _read_csv
+from backend.scripts.l2_bar_builder import ORDER_FLOW_COLUMNS, aggregate_order_flow
+from backend.scripts.l2_raw_cache import ORDER_USECOLS
+from backend.tests._l2_fixtures import SYMBOL_DIR, TRADE_DATE
+
+LARGE, SUPER = 200000.0, 1000000.0
+ORDER_PATH = SYMBOL_DIR / "逐笔委托.csv"
+
+
+def _assert_rows_close(left, right):
+    assert len(left) == len(right)
+    for row_a, row_b in zip(left, right):
+        assert len(row_a) == len(row_b)
+        for a, b in zip(row_a, row_b):
+            if isinstance(a, float) and isinstance(b, float):
+                assert math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+            else:
+                assert a == b
+
+
+def _force_stream(monkeypatch, chunk_rows=7):
+    monkeypatch.setenv(l2_order_stream.STREAM_MODE_ENV, "always")
+    monkeypatch.setattr(l2_order_stream, "chunk_rows_for_budget", lambda memory_mb=None: chunk_rows)
+
+
+def test_stream_summary_matches_full_read():
+    order = _read_csv(ORDER_PATH, usecols=ORDER_USECOLS)
+    events, diagnostics = _build_standardized_order_events(order, TRADE_DATE)
+
+    summary = l2_order_stream.stream_order_file(ORDER_PATH, TRADE_DATE, chunk_rows=9, with_parent_amounts=True)
+
+    assert summary.chunk_count > 10
+    assert summary.order_rows == len(order)
+    expected_flow = aggregate_order_flow(events)
+    assert list(summary.order_flow.index) == list(expected_flow.index)
+    np.testing.assert_allclose(
+        summary.order_flow[ORDER_FLOW_COLUMNS].to_numpy(dtype="float64"),
+        expected_flow[ORDER_FLOW_COLUMNS].to_numpy(dtype="float64"),
+    )
+    for key, value in diagnostics.items():
+        assert summary.diagnostics[key] == value
+    expected_ids = set(pd.to_numeric(order["交易所委托号"], errors="coerce").dropna().astype("int64"))
+    assert set(summary.order_ids.tolist()) == expected_ids
+    assert summary.parent_amounts.to_dict() == pytest.approx(l2_daily_backfill._order_parent_totals(order))
+    assert (summary.auction_time <= "09:30:00").all() and len(summary.auction_raw) == len(summary.auction_time)
+
+
+def test_streamed_bundle_produces_same_atomic_rows(monkeypatch):
+    expected = atomic_day_pipeline.build_atomic_day_rows(SYMBOL_DIR, TRADE_DATE, LARGE, SUPER)
+    _force_stream(monkeypatch)
+    streamed = atomic_day_pipeline.build_atomic_day_rows(SYMBOL_DIR, TRADE_DATE, LARGE, SUPER)
+
+    assert streamed.diagnostics["order_read_mode"] == "stream"
+    assert streamed.trade_5m == expected.trade_5m and streamed.trade_daily == expected.trade_daily
+    _assert_rows_close(streamed.order_5m, expected.order_5m)
+    _assert_rows_close([streamed.order_daily], [expected.order_daily])
+    assert streamed.book_5m == expected.book_5m
+    for table, row in expected.auction_rows.items():
+        assert {k: v for k, v in streamed.auction_rows[table].items() if k != "generated_at"} == {
+            k: v for k, v in row.items() if k != "generated_at"
+        }
+
+
+def test_streamed_l2_daily_backfill_matches_full_read(monkeypatch):
+    expected = l2_daily_backfill.process_symbol_dir(SYMBOL_DIR, TRADE_DATE, LARGE, SUPER)
+    _force_stream(monkeypatch)
+    streamed = l2_daily_backfill.process_symbol_dir(SYMBOL_DIR, TRADE_DATE, LARGE, SUPER)
+
+    _assert_rows_close(streamed[1], expected[1])
+    _assert_rows_close([streamed[2]], [expected[2]])
+
+
+def test_stream_mode_follows_worker_memory_ceiling(monkeypatch, tmp_path):
+    path = tmp_path / "逐笔委托.csv"
+    path.write_bytes(b"x" * (2 * 1024 * 1024))
+    monkeypatch.delenv(l2_order_stream.STREAM_MODE_ENV, raising=False)
+    monkeypatch.setenv(l2_order_stream.WORKER_MEMORY_ENV, "4096")
+    assert not l2_order_stream.should_stream_order_file(path)
+    monkeypatch.setenv(l2_order_stream.WORKER_MEMORY_ENV, "16")
+    assert l2_order_stream.should_stream_order_file(path)
+    monkeypatch.setenv(l2_order_stream.STREAM_MODE_ENV, "never")
+    assert not l2_order_stream.should_stream_order_file(path)
+
+    assert l2_order_stream.chunk_rows_for_budget(1) == l2_order_stream.MIN_CHUNK_ROWS
+    assert l2_order_stream.chunk_rows_for_budget(1024) == 1024 * 1024 * 1024 // 4 // l2_order_stream.BYTES_PER_CHUNK_ROW
+
+
+def test_stream_requires_time_column(tmp_path):
+    order = _read_csv(ORDER_PATH, usecols=ORDER_USECOLS).drop(columns=["时间"])
+    path = tmp_path / "逐笔委托.csv"
+    order.to_csv(path, index=False, encoding="gb18030")
+
+    with pytest.raises(ValueError, match="逐笔委托缺列: 时间"):
+        l2_order_stream.stream_order_file(path, TRADE_DATE, chunk_rows=9)
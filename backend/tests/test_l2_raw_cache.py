@@ -0,0 +1,89 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from backend.scripts import backfill_atomic_trade_from_raw as atomic_trade
+from backend.scripts import build_open_auction_summaries as auction
+from backend.scripts import l2_raw_cache
+from backend.tests._l2_fixtures import SYMBOL_DIR, TRADE_DATE, as_json, load_golden
+
+
+def _copy_fixture(tmp_path: Path) -> Path:
+    target = tmp_path / "202603" / "20260311" / SYMBOL_DIR.name
+    shutil.copytree(SYMBOL_DIR, target)
+    return target
+
+
+def _builder_outputs(symbol_dir: Path):
+    from backend.scripts import backfill_atomic_order_from_raw as atomic_order
+    from backend.scripts import l2_daily_backfill
+
+    golden = load_golden()
+    _, rows_5m, daily_row, _ = l2_daily_backfill.process_symbol_dir(
+        symbol_dir, TRADE_DATE, golden["large_threshold"], golden["super_threshold"]
+    )
+    _, order_5m, order_daily, _ = atomic_order._build_order_rows(symbol_dir, TRADE_DATE)
+    return {
+        "history_5m_l2": as_json(rows_5m),
+        "history_daily_l2": as_json(daily_row),
+        "atomic_order_5m": as_json(order_5m),
+        "atomic_order_daily": as_json(order_daily),
+        "trade_metrics": as_json(atomic_trade._build_trade_metrics(symbol_dir, TRADE_DATE)),
+        "auction_l1": as_json(auction._build_l1_summary(symbol_dir, "20260311")),
+        "auction_l2": as_json(auction._build_phase_l2_summary(symbol_dir, "20260311")),
+    }
+
+
+def test_builders_read_cache_with_identical_results(monkeypatch, tmp_path):
+    monkeypatch.delenv("L2_RAW_CACHE_DIR", raising=False)
+    symbol_dir = _copy_fixture(tmp_path)
+    from_csv = _builder_outputs(symbol_dir)
+
+    report = l2_raw_cache.convert_symbol_dir(symbol_dir)
+    assert sorted(report["converted"]) == sorted(l2_raw_cache.RAW_FILE_COLUMNS)
+    assert l2_raw_cache.convert_symbol_dir(symbol_dir)["converted"] == []
+
+    trade = l2_raw_cache.read_cached_frame(symbol_dir / "逐笔成交.csv")
+    assert set(trade.columns) == set(l2_raw_cache.TRADE_USECOLS)
+    assert trade["时间"].dtype == "int32"
+    assert isinstance(trade["BS标志"].dtype, pd.CategoricalDtype)
+
+    # 缓存命中后即使 CSV 读取不可用也能出同样结果
+    monkeypatch.setattr(l2_raw_cache, "_read_csv_frame", lambda *a, **k: (_ for _ in ()).throw(AssertionError("csv read")))
+    from_cache = _builder_outputs(symbol_dir)
+    assert from_cache == from_csv
+    golden = load_golden()
+    assert from_cache["history_5m_l2"] == golden["history_5m_l2"]
+    assert from_cache["atomic_order_5m"] == golden["atomic_order_5m"]
+
+
+def test_stale_or_missing_cache_falls_back_to_csv(monkeypatch, tmp_path):
+    cache_root = tmp_path / "cache"
+    monkeypatch.setenv("L2_RAW_CACHE_DIR", str(cache_root))
+    symbol_dir = _copy_fixture(tmp_path / "raw")
+    trade_csv = symbol_dir / "逐笔成交.csv"
+
+    assert l2_raw_cache.read_cached_frame(trade_csv) is None
+    l2_raw_cache.convert_symbol_dir(symbol_dir)
+    assert (cache_root / "20260311" / SYMBOL_DIR.name / l2_raw_cache.MANIFEST_NAME).is_file()
+    assert not (symbol_dir / l2_raw_cache.CACHE_SUBDIR).exists()
+    assert len(l2_raw_cache.read_cached_frame(trade_csv, usecols=["时间", "成交价格"]).columns) == 2
+
+    # 请求了源 CSV 有而缓存没保留的列：回退 CSV
+    assert l2_raw_cache.read_cached_frame(trade_csv, usecols=["时间", "成交编号"]) is None
+    assert "成交编号" in l2_raw_cache.read_raw_csv(trade_csv, usecols=["时间", "成交编号"]).columns
+
+    lines = trade_csv.read_text(encoding="gb18030").splitlines()
+    trade_csv.write_text("\n".join(lines[:-5]) + "\n", encoding="gb18030")
+    stat = trade_csv.stat()
+    os.utime(trade_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert l2_raw_cache.read_cached_frame(trade_csv) is None
+    assert len(l2_raw_cache.read_raw_csv(trade_csv)) == len(lines) - 6
+
+    report = l2_raw_cache.convert_symbol_dir(symbol_dir)
+    assert report["converted"] == ["逐笔成交.csv"]
+    manifest = json.loads((cache_root / "20260311" / SYMBOL_DIR.name / l2_raw_cache.MANIFEST_NAME).read_text(encoding="utf-8"))
+    assert manifest["files"]["逐笔成交.csv"]["rows"] == len(lines) - 6
@@ -0,0 +1,299 @@
+"""
+热点查询的执行计划回归：灌入合成数据后真实调用各热点函数，截获其发出的 SQL（已代入参数），
+逐条 EXPLAIN QUERY PLAN，断言热点表上没有整表扫描（`SCAN <table>`），
+并且登记的过滤列（日期区间、symbol）确实出现在索引查找约束里，而不是命中前缀后逐行过滤。
+
+新增热点查询时在 HOT_QUERIES 里登记 (名称, 必须出现在索引约束里的 列+运算符, 调用) 即可；谓词写成 substr()/date()/lower()/LIKE 等让索引失效的形式时，
+这里会直接报出是哪个函数、哪条 SQL、哪一行计划。
+"""
+import importlib
+import re
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from backend.tests.test_selection_strategy_v2 import _init_atomic_db, _seed_symbol_series
+
+SYMBOLS = [f"sh6000{index:02d}" for index in range(20)]
+DAYS = [f"2026-03-{day:02d}" for day in range(1, 29)]
+
+HOT_TABLES = {
+    "history_1m",
+    "history_30m",
+    "sentiment_events",
+    "sentiment_daily_scores",
+    "sentiment_heat_rollup",
+    "stock_events",
+    "stock_event_daily_rollup",
+    "stock_symbol_aliases",
+    "stock_universe_meta",
+    "watchlist",
+    "atomic_trade_daily",
+    "atomic_order_daily",
+}
+
+_SCAN_PATTERN = re.compile(r"^SCAN (\w+)")
+_SEARCH_CONSTRAINT_PATTERN = re.compile(r"^SEARCH \w+ USING .*?\((.*)\)$")
+_TABLE_ALIAS_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+AS)?\s+(\w+)", re.IGNORECASE)
+
+
+def _load_modules(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "market_data.db"))
+    monkeypatch.setenv("USER_DB_PATH", str(tmp_path / "user_data.db"))
+    monkeypatch.setenv("SELECTION_DB_PATH", str(tmp_path / "selection_research.db"))
+    import backend.app.core.config as config
+    import backend.app.db.connection_pool as connection_pool
+    import backend.app.db.crud as crud
+    import backend.app.db.database as database
+    import backend.app.services.retail_sentiment as retail_sentiment
+    import backend.app.services.selection_research as selection_research
+    import backend.app.services.selection_strategy_v2 as selection_strategy_v2
+    import backend.app.services.stock_events as stock_events
+
+    importlib.reload(config)
+    importlib.reload(database)
+    importlib.reload(crud)
+    importlib.reload(retail_sentiment)
+    importlib.reload(stock_events)
+    connection_pool.close_all_connections()
+    database.init_db()
+    return {
+        "config": config,
+        "connection_pool": connection_pool,
+        "crud": crud,
+        "retail_sentiment": retail_sentiment,
+        "selection_research": selection_research,
+        "selection_strategy_v2": selection_strategy_v2,
+        "stock_events": stock_events,
+    }
+
+
+def _seed_main_db(db_path: str) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        minute_rows, bucket_rows, sentiment_rows, stock_rows, score_rows, meta_rows = [], [], [], [], [], []
+        for symbol in SYMBOLS:
+            meta_rows.append((symbol, f"名称{symbol}", 1e10, DAYS[-1], "unit-test"))
+            for day in DAYS:
+                for minute in range(0, 60, 5):
+                    minute_rows.append((symbol, f"{day} 10:{minute:02d}:00", 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 10.0))
+                for start in ("09:30:00", "10:00:00", "10:30:00", "11:00:00"):
+                    bucket_rows.append((symbol, f"{day} {start}", 1.0, 1.0, 1.0, 10.0))
+                for index in range(4):
+                    pub_time = f"{day} 1{index}:15:00"
+                    sentiment_rows.append(
+                        (f"se-{symbol}-{day}-{index}", "guba", symbol, "post", f"帖子{index} 看多", pub_time, f"{symbol}-{day}-{index}")
+                    )
+                    stock_rows.append(
+                        (f"ev-{symbol}-{day}-{index}", "cninfo", "announcement", symbol, f"公告{index}", pub_time, f"{symbol}-{day}-{index}")
+                    )
+                score_rows.append((symbol, day, 4, 0.5))
+        conn.executemany(
+            "INSERT INTO history_1m (symbol, time, total_amount, net_inflow, main_buy, main_sell, super_net, super_buy, super_sell, close) VALUES (?,?,?,?,?,?,?,?,?,?)",
+            minute_rows,
+        )
+        conn.executemany(
+            "INSERT INTO history_30m (symbol, start_time, net_inflow, main_buy, main_sell, close) VALUES (?,?,?,?,?,?)",
+            bucket_rows,
+        )
+        conn.executemany(
+            "INSERT INTO sentiment_events (event_id, source, symbol, event_type, content, pub_time, source_event_id) VALUES (?,?,?,?,?,?,?)",
+            sentiment_rows,
+        )
+        conn.executemany(
+            "INSERT INTO stock_events (event_id, source, source_type, symbol, title, published_at, source_event_id) VALUES (?,?,?,?,?,?,?)",
+            stock_rows,
+        )
+        conn.executemany(
+            "INSERT INTO sentiment_daily_scores (symbol, trade_date, sample_count, sentiment_score) VALUES (?,?,?,?)",
+            score_rows,
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO stock_universe_meta (symbol, name, market_cap, as_of_date, source) VALUES (?,?,?,?,?)",
+            meta_rows,
+        )
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _seed_atomic_db(tmp_path: Path) -> str:
+    atomic_db = _init_atomic_db(tmp_path)
+    for symbol in SYMBOLS:
+        _seed_symbol_series(atomic_db, symbol, periods=25)
+    conn = sqlite3.connect(str(atomic_db))
+    try:
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    return str(atomic_db)
+
+
+HOT_QUERIES = [
+    ("crud.get_history_1m", ("time>", "time<"), lambda m, paths: m["crud"].get_history_1m("sh600003", "2026-03-10")),
+    ("crud.get_history_30m", ("start_time>",), lambda m, paths: m["crud"].get_history_30m("sh600003", limit_days=5)),
+    (
+        "retail_sentiment._event_daily_aggregate",
+        ("pub_time<",),
+        lambda m, paths: m["retail_sentiment"]._event_daily_aggregate("sh600003", "2026-03-02", "2026-03-20"),
+    ),
+    (
+        "retail_sentiment._event_daily_aggregate(source)",
+        ("source=", "pub_time<"),
+        lambda m, paths: m["retail_sentiment"]._event_daily_aggregate("sh600003", "2026-03-02", "2026-03-20", source="guba"),
+    ),
+    (
+        "retail_sentiment._load_sentiment_posts_df",
+        ("pub_time<",),
+        lambda m, paths: m["retail_sentiment"]._load_sentiment_posts_df("sh600003", "2026-03-02", "2026-03-20"),
+    ),
+    (
+        "retail_sentiment._load_heat_rollup",
+        ("granularity=", "bucket_start<"),
+        lambda m, paths: m["retail_sentiment"]._load_heat_rollup("sh600003", "10m", "2026-03-02", "2026-03-20"),
+    ),
+    (
+        "retail_sentiment._ensure_sentiment_events_backfill(quality)",
+        ("quality_version<", "quality_version>", "content_hash=", "pub_time<"),
+        lambda m, paths: m["retail_sentiment"]._ensure_sentiment_events_backfill("sh600003"),
+    ),
+    (
+        "stock_events.list_stock_event_feed",
+        ("published_at<",),
+        lambda m, paths: m["stock_events"].list_stock_event_feed("sh600003", start_date="2026-03-02", end_date="2026-03-20"),
+    ),
+    (
+        "stock_events.get_stock_event_coverage",
+        ("published_at<",),
+        lambda m, paths: m["stock_events"].get_stock_event_coverage("sh600003"),
+    ),
+    (
+        "stock_events.rebuild_stock_event_daily_rollup",
+        ("trade_date<", "published_at<"),
+        lambda m, paths: m["stock_events"].rebuild_stock_event_daily_rollup("sh600003", "2026-03-02", "2026-03-20"),
+    ),
+    (
+        "selection_research._load_sentiment_events",
+        ("pub_time>", "pub_time<"),
+        lambda m, paths: _with_connection(
+            paths["main"], lambda conn: m["selection_research"]._load_sentiment_events(conn, "2026-03-10", "2026-03-12")
+        ),
+    ),
+    (
+        "selection_strategy_v2.load_atomic_daily_window(symbols)",
+        ("symbol=", "trade_date<"),
+        lambda m, paths: m["selection_strategy_v2"].load_atomic_daily_window(
+            "2026-02-16", "2026-03-06", symbols=["SH600003", "sh600004"], db_path=paths["atomic"]
+        ),
+    ),
+    (
+        "selection_strategy_v2.load_atomic_daily_window",
+        ("trade_date>", "trade_date<"),
+        lambda m, paths: m["selection_strategy_v2"].load_atomic_daily_window("2026-03-04", "2026-03-06", db_path=paths["atomic"]),
+    ),
+    (
+        "selection_strategy_v2._load_company_basics_batch",
+        ("symbol=",),
+        lambda m, paths: m["selection_strategy_v2"]._load_company_basics_batch(
+            ["sh600003", "sh600004"], "2026-03-20", main_db_path=paths["main"], user_db_path=paths["user"]
+        ),
+    ),
+    (
+        "selection_strategy_v2._load_event_timeline_batch",
+        ("symbol=", "published_at<", "pub_time<"),
+        lambda m, paths: m["selection_strategy_v2"]._load_event_timeline_batch(
+            ["sh600003", "sh600004"], "2026-03-20", main_db_path=paths["main"]
+        ),
+    ),
+    (
+        "selection_strategy_v2._load_sentiment_snapshot_batch",
+        ("symbol=", "trade_date<"),
+        lambda m, paths: m["selection_strategy_v2"]._load_sentiment_snapshot_batch(
+            ["sh600003", "sh600004"], "2026-03-20", main_db_path=paths["main"]
+        ),
+    ),
+]
+
+
+def _with_connection(db_path, fn):
+    conn = sqlite3.connect(db_path)
+    try:
+        return fn(conn)
+    finally:
+        conn.close()
+
+
+def _capture_statements(monkeypatch, fn):
+    """调用 fn，收集期间所有新开连接上执行的 (db_path, 已代入参数的 SQL)。"""
+    captured = []
+    real_connect = sqlite3.connect
+
+    def tracing_connect(database, *args, **kwargs):
+        conn = real_connect(database, *args, **kwargs)
+        conn.set_trace_callback(lambda statement: captured.append((str(database), statement)))
+        return conn
+
+    monkeypatch.setattr(sqlite3, "connect", tracing_connect)
+    try:
+        fn()
+    finally:
+        monkeypatch.setattr(sqlite3, "connect", real_connect)
+    return captured
+
+
+def _explain(db_path, statement):
+    """-> (热点表上的整表扫描行, 索引查找约束集合，如 {'symbol=', 'pub_time>', 'pub_time<'})。"""
+    aliases = {alias.lower(): table.lower() for table, alias in _TABLE_ALIAS_PATTERN.findall(statement)}
+    conn = sqlite3.connect(db_path)
+    try:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+    finally:
+        conn.close()
+    scans, constrained = [], set()
+    for row in plan:
+        detail = str(row[-1])
+        match = _SCAN_PATTERN.match(detail)
+        if match:
+            table = match.group(1).lower()
+            if aliases.get(table, table) in HOT_TABLES:
+                scans.append(detail)
+            continue
+        constraint = _SEARCH_CONSTRAINT_PATTERN.match(detail)
+        if constraint:
+            constrained.update(column + op for column, op in re.findall(r"(\w+)([=<>])", constraint.group(1)))
+    return scans, constrained
+
+
+@pytest.mark.parametrize("name,columns,call", HOT_QUERIES, ids=[entry[0] for entry in HOT_QUERIES])
+def test_hot_query_uses_index(monkeypatch, tmp_path, name, columns, call):
+    modules = _load_modules(monkeypatch, tmp_path)
+    paths = {
+        "main": modules["config"].DB_FILE,
+        "user": modules["config"].USER_DB_FILE,
+        "atomic": _seed_atomic_db(tmp_path),
+    }
+    _seed_main_db(paths["main"])
+    modules["connection_pool"].close_all_connections()
+
+    captured = _capture_statements(monkeypatch, lambda: call(modules, paths))
+    modules["connection_pool"].close_all_connections()
+
+    checked = 0
+    constrained = set()
+    for db_path, statement in captured:
+        if not re.match(r"\s*(SELECT|WITH|DELETE|UPDATE)\b", statement, re.IGNORECASE):
+            continue
+        if not any(re.search(rf"\b{table}\b", statement) for table in HOT_TABLES):
+            continue
+        checked += 1
+        scans, statement_columns = _explain(db_path, statement)
+        assert not scans, f"{name} 整表扫描 {scans}:\n{statement}"
+        constrained |= statement_columns
+    assert checked, f"{name} 没有截获到任何热点表查询"
+    # symbol 命中索引、日期谓词却只能逐行过滤时计划仍是 SEARCH，所以还要求日期列出现在索引约束里；
+    # `col IS NOT NULL` 在计划里也显示为 `col>?`，日期区间因此以上界 `col<` 为准
+    missing = set(columns) - constrained
+    assert not missing, f"{name} 的索引查找没有用上 {sorted(missing)}（实际约束列 {sorted(constrained)}）"
@@ -0,0 +1,247 @@
+import importlib
+import sqlite3
+
+
+def _reload_runtime_modules(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "market_data.db"))
+    monkeypatch.setenv("USER_DB_PATH", str(tmp_path / "user_data.db"))
+
+    import backend.app.core.config as config
+    import backend.app.db.crud as crud
+    import backend.app.db.database as database
+    import backend.app.db.realtime_preview_db as realtime_preview_db
+    import backend.app.services.realtime_aggregator as realtime_aggregator
+    import backend.app.services.analysis as analysis
+
+    importlib.reload(config)
+    importlib.reload(realtime_preview_db)
+    importlib.reload(database)
+    importlib.reload(crud)
+    importlib.reload(realtime_aggregator)
+    importlib.reload(analysis)
+    database.init_db()
+    return config, crud, realtime_preview_db, realtime_aggregator, analysis
+
+
+def _insert_ticks(db_file, rows, date_str="2026-03-12", symbol="sz000833"):
+    conn = sqlite3.connect(db_file)
+    conn.executemany(
+        """
+        INSERT INTO trade_ticks (symbol, time, price, volume, amount, type, date)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        [(symbol, *row, date_str) for row in rows],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _overwrite_ticks(db_file, rows, date_str="2026-03-12", symbol="sz000833"):
+    conn = sqlite3.connect(db_file)
+    conn.execute("DELETE FROM trade_ticks WHERE symbol=? AND date=?", (symbol, date_str))
+    conn.commit()
+    conn.close()
+    _insert_ticks(db_file, rows, date_str=date_str, symbol=symbol)
+
+
+FIRST_BATCH = [
+    ("09:30:01", 25.00, 100, 250000.0, "buy"),
+    ("09:30:30", 25.10, 100, 1200000.0, "sell"),
+    ("09:31:05", 25.20, 100, 80000.0, "买盘"),
+    ("09:31:05", 25.15, 100, 600000.0, "B"),
+]
+SECOND_BATCH = [
+    ("09:31:05", 25.25, 100, 300000.0, "S"),
+    ("09:32:10", 25.30, 100, 1500000.0, "buy"),
+    ("15:06:00", 25.40, 100, 999999.0, "buy"),
+]
+
+
+def test_incremental_sync_matches_fresh_rebuild(monkeypatch, tmp_path):
+    config, crud, _, realtime_aggregator, analysis = _reload_runtime_modules(monkeypatch, tmp_path)
+    _insert_ticks(config.DB_FILE, FIRST_BATCH)
+
+    first = analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+    assert [row["time"] for row in first["chart_data"]] == ["09:30", "09:31"]
+    assert first["chart_data"][1]["mainBuyAmount"] == 600000.0
+
+    _insert_ticks(config.DB_FILE, SECOND_BATCH)
+    incremental = analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+
+    realtime_aggregator.reset_tick_aggregators()
+    fresh = analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+
+    assert incremental == fresh
+    assert [row["time"] for row in incremental["chart_data"]] == ["09:30", "09:31", "09:32"]
+    assert incremental["chart_data"][1]["mainSellAmount"] == 300000.0
+    assert incremental["chart_data"][0]["mainSellRatio"] == round(1200000.0 / 1450000.0 * 100, 1)
+    assert incremental["cumulative_data"][-1]["cumMainBuy"] == 250000.0 + 600000.0 + 1500000.0
+    assert incremental["cumulative_data"][-1]["cumSuperNetInflow"] == 1500000.0 - 1200000.0
+    assert incremental["latest_ticks"][0]["time"] == "09:32:10"
+    assert len(incremental["latest_ticks"]) == 6
+
+
+def test_incremental_sync_only_reads_ticks_after_watermark(monkeypatch, tmp_path):
+    config, crud, _, realtime_aggregator, analysis = _reload_runtime_modules(monkeypatch, tmp_path)
+    _insert_ticks(config.DB_FILE, FIRST_BATCH)
+    analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+
+    calls = []
+    original = realtime_aggregator.get_ticks_since
+
+    def tracking_get_ticks_since(symbol, date_str, start_time, end_time):
+        rows = original(symbol, date_str, start_time, end_time)
+        calls.append((start_time, len(rows)))
+        return rows
+
+    monkeypatch.setattr(realtime_aggregator, "get_ticks_since", tracking_get_ticks_since)
+    _insert_ticks(config.DB_FILE, SECOND_BATCH)
+    analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+
+    # watermark second (09:31:05) is re-read as overlay, everything before it is sealed.
+    assert calls == [("09:31:05", 4)]
+
+
+def test_overwrite_with_revised_history_triggers_rebuild(monkeypatch, tmp_path):
+    config, crud, realtime_preview_db, realtime_aggregator, analysis = _reload_runtime_modules(monkeypatch, tmp_path)
+    _insert_ticks(config.DB_FILE, FIRST_BATCH + SECOND_BATCH)
+    analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+
+    revised = [("09:30:01", 25.00, 100, 2000000.0, "buy")] + FIRST_BATCH[1:] + SECOND_BATCH
+    _overwrite_ticks(config.DB_FILE, revised)
+    data = analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+
+    assert data["chart_data"][0]["superBuyAmount"] == 2000000.0
+    rows_5m = realtime_preview_db.query_realtime_5m_preview_rows("sz000833", "2026-03-12", "2026-03-12")
+    assert len(rows_5m) == 1
+    assert rows_5m[0]["l1_super_buy"] == 2000000.0 + 1500000.0
+    assert rows_5m[0]["close"] == 25.30
+
+
+def test_aggregator_preview_rows_match_dataframe_builder(monkeypatch, tmp_path):
+    config, crud, realtime_preview_db, realtime_aggregator, analysis = _reload_runtime_modules(monkeypatch, tmp_path)
+    ticks = [
+        ("09:31:00", 25.10, 100, 250000.0, "buy"),
+        ("09:34:00", 25.30, 100, 1200000.0, "sell"),
+        ("09:36:00", 25.20, 100, 400000.0, "buy"),
+        ("09:37:30", 25.25, 200, 600000.0, "sell"),
+    ]
+    _insert_ticks(config.DB_FILE, ticks)
+
+    aggregator = realtime_aggregator.get_tick_aggregator("sz000833", "2026-03-12", 200000.0, 1000000.0)
+    with aggregator.lock:
+        aggregator.sync()
+        rows_5m, daily_row = aggregator.build_preview_rows()
+    expected_5m, expected_daily = analysis._build_realtime_preview_rows(
+        "sz000833",
+        "2026-03-12",
+        crud.get_ticks_by_date("sz000833", "2026-03-12"),
+        200000.0,
+        1000000.0,
+    )
+
+    assert [row[:-1] for row in rows_5m] == [row[:-1] for row in expected_5m]
+    assert daily_row[:-1] == expected_daily[:-1]
+
+
+def test_bucket_kernel_matches_pandas_groupby():
+    import random
+
+    import pandas as pd
+
+    from backend.app.core.trade_side import is_buy_series, is_sell_series
+    from backend.app.services.realtime_aggregator import aggregate_tick_buckets, five_minute_key
+
+    rng = random.Random(7)
+    rows = []
+    for idx in range(2000):
+        sec = 9 * 3600 + 30 * 60 + idx * 3
+        rows.append((
+            f"{sec // 3600:02d}:{sec % 3600 // 60:02d}:{sec % 60:02d}",
+            round(rng.uniform(20, 30), 2),
+            rng.choice((100, 1000, 50000)),
+            rng.choice((5000.0, 250000.0, 1500000.0)),
+            rng.choice(("buy", " sell", "中性盘", "B", "卖盘")),
+        ))
+    keys = [five_minute_key(row[0]) for row in rows]
+    buckets = dict(aggregate_tick_buckets(rows, keys, 200000.0, 1000000.0))
+
+    df = pd.DataFrame(rows, columns=["time", "price", "volume", "amount", "type"])
+    df["bucket"] = keys
+    is_buy = is_buy_series(df["type"])
+    is_sell = is_sell_series(df["type"])
+    for key, group in df.groupby("bucket"):
+        bucket = buckets[key]
+        main = group["amount"] >= 200000.0
+        sup = group["amount"] >= 1000000.0
+        assert bucket["open"] == group["price"].iloc[0]
+        assert bucket["close"] == group["price"].iloc[-1]
+        assert bucket["high"] == group["price"].max()
+        assert bucket["low"] == group["price"].min()
+        assert bucket["total_volume"] == float(group["volume"].sum())
+        assert bucket["main_buy"] == float(group[main & is_buy[group.index]]["amount"].sum())
+        assert bucket["main_sell"] == float(group[main & is_sell[group.index]]["amount"].sum())
+        assert bucket["super_buy"] == float(group[sup & is_buy[group.index]]["amount"].sum())
+        assert bucket["super_sell"] == float(group[sup & is_sell[group.index]]["amount"].sum())
+    assert len(buckets) == df["bucket"].nunique()
+
+
+def test_prefix_check_uses_anchor_lookups(monkeypatch, tmp_path):
+    config, crud, _, realtime_aggregator, analysis = _reload_runtime_modules(monkeypatch, tmp_path)
+    _insert_ticks(config.DB_FILE, FIRST_BATCH + SECOND_BATCH)
+    analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+
+    lookups = []
+    original = realtime_aggregator.get_tick_anchor_rows
+
+    def tracking_anchor_rows(symbol, date_str, rowids):
+        lookups.append(sorted(rowids))
+        return original(symbol, date_str, rowids)
+
+    monkeypatch.setattr(realtime_aggregator, "get_tick_anchor_rows", tracking_anchor_rows)
+    aggregator = realtime_aggregator.get_tick_aggregator("sz000833", "2026-03-12", 200000.0, 1000000.0)
+    for _ in range(3):
+        analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+
+    # 已折叠 09:30:01 ~ 09:31:05 共 5 笔（rowid 1..5），09:32:10 那一秒仍是 overlay；每次轮询只点查首末两笔
+    assert lookups == [[1, 5]] * 3
+    assert aggregator.rebuild_count == 0
+
+
+def test_revised_middle_tick_with_unchanged_anchors_triggers_rebuild(monkeypatch, tmp_path):
+    config, crud, _, realtime_aggregator, analysis = _reload_runtime_modules(monkeypatch, tmp_path)
+    _insert_ticks(config.DB_FILE, FIRST_BATCH + SECOND_BATCH)
+    analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+    aggregator = realtime_aggregator.get_tick_aggregator("sz000833", "2026-03-12", 200000.0, 1000000.0)
+
+    # 原地修订已折叠前缀中间的一笔（rowid 2），首末锚点 rowid 1 / 5 不变
+    conn = sqlite3.connect(config.DB_FILE)
+    conn.execute("UPDATE trade_ticks SET amount = 50000.0 WHERE rowid = 2")
+    conn.commit()
+    conn.close()
+    incremental = analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+
+    realtime_aggregator.reset_tick_aggregators()
+    fresh = analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+
+    assert aggregator.rebuild_count == 1
+    assert incremental == fresh
+    assert incremental["chart_data"][0]["superSellAmount"] == 0.0
+
+
+def test_day_ticks_removed_resets_state_and_clears_preview(monkeypatch, tmp_path):
+    config, crud, realtime_preview_db, realtime_aggregator, analysis = _reload_runtime_modules(monkeypatch, tmp_path)
+    _insert_ticks(config.DB_FILE, FIRST_BATCH + SECOND_BATCH)
+    analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+    assert realtime_preview_db.query_realtime_5m_preview_rows("sz000833", "2026-03-12", "2026-03-12")
+
+    _overwrite_ticks(config.DB_FILE, [])
+    data = analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+
+    assert data == {"chart_data": [], "cumulative_data": [], "latest_ticks": []}
+    assert realtime_preview_db.query_realtime_5m_preview_rows("sz000833", "2026-03-12", "2026-03-12") == []
+    assert realtime_preview_db.query_realtime_daily_preview_row("sz000833", "2026-03-12") is None
+
+    _insert_ticks(config.DB_FILE, FIRST_BATCH)
+    refilled = analysis.calculate_realtime_aggregation("sz000833", "2026-03-12")
+    assert [row["time"] for row in refilled["chart_data"]] == ["09:30", "09:31"]
@@ -0,0 +1,233 @@
+import asyncio
+import json
+
+from backend.tests.test_realtime_aggregator import (
+    FIRST_BATCH,
+    SECOND_BATCH,
+    _insert_ticks,
+    _overwrite_ticks,
+    _reload_runtime_modules,
+)
+
+SYMBOL, DATE = "sz000833", "2026-03-12"
+
+
+def _parse_sse(message):
+    fields = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+
+def _apply_delta(state, delta):
+    chart = {row["time"]: row for row in state["chart_data"]}
+    chart.update({row["time"]: row for row in delta["chart_data"]})
+    cumulative = {row["time"]: row for row in state["cumulative_data"]}
+    cumulative.update({row["time"]: row for row in delta["cumulative_data"]})
+    bars = {bar["datetime"]: bar for bar in state["bars"]}
+    bars.update({bar["datetime"]: bar for bar in delta["bars"]})
+    return {
+        "chart_data": [chart[key] for key in sorted(chart)],
+        "cumulative_data": [cumulative[key] for key in sorted(cumulative)],
+        "latest_ticks": (delta["latest_ticks"] + state["latest_ticks"])[:50],
+        "bars": [bars[key] for key in sorted(bars)],
+    }
+
+
+def test_stream_pushes_one_coalesced_delta_to_all_subscribers(monkeypatch, tmp_path):
+    config, _, _, realtime_aggregator, _ = _reload_runtime_modules(monkeypatch, tmp_path)
+    from backend.app.services.realtime_stream import RealtimeStreamHub, StreamChannel
+
+    _insert_ticks(config.DB_FILE, FIRST_BATCH)
+    hub = RealtimeStreamHub()
+
+    async def scenario():
+        assert hub.notify(SYMBOL, DATE) is False
+        first, snapshot = await hub.subscribe(SYMBOL, DATE)
+        second, snapshot_again = await hub.subscribe(SYMBOL, DATE)
+        assert snapshot == snapshot_again
+        assert [row["time"] for row in snapshot["chart_data"]] == ["09:30", "09:31"]
+        assert [bar["datetime"] for bar in snapshot["bars"]] == [f"{DATE} 09:30:00"]
+
+        _insert_ticks(config.DB_FILE, SECOND_BATCH)
+        assert all(hub.notify(SYMBOL, DATE) for _ in range(3))
+        message = await asyncio.wait_for(first.queue.get(), timeout=5)
+        assert await asyncio.wait_for(second.queue.get(), timeout=5) is message
+        await asyncio.sleep(0.05)
+        assert first.queue.empty() and second.queue.empty()
+        assert hub.stats["pumps"] == 1 and hub.stats["events"] == 1 and hub.stats["coalesced"] == 2
+
+        _overwrite_ticks(config.DB_FILE, FIRST_BATCH[:2])
+        hub.notify(SYMBOL, DATE)
+        reset_message = await asyncio.wait_for(first.queue.get(), timeout=5)
+
+        hub.unsubscribe(first)
+        hub.unsubscribe(second)
+        assert hub.subscriber_count(SYMBOL, DATE) == 0
+        assert hub.notify(SYMBOL, DATE) is False
+        return snapshot, message, reset_message
+
+    snapshot, message, reset_message = asyncio.run(scenario())
+
+    event, delta = _parse_sse(message)
+    assert event == "delta" and delta["seq"] == snapshot["seq"] + 1
+    assert [row["time"] for row in delta["chart_data"]] == ["09:31", "09:32"]
+    assert [row["time"] for row in delta["cumulative_data"]] == ["09:31", "09:32"]
+    assert [tick["time"] for tick in delta["latest_ticks"]] == ["09:32:10", "09:31:05"]
+
+    # 首帧 + 增量 == 同一份 tick 的全量重建
+    _overwrite_ticks(config.DB_FILE, FIRST_BATCH + SECOND_BATCH)
+    realtime_aggregator.reset_tick_aggregators()
+    fresh = StreamChannel(SYMBOL, DATE, None)
+    fresh.advance()
+    expected = fresh.state_payload()
+    merged = _apply_delta(snapshot, delta)
+    for field in ("chart_data", "cumulative_data", "latest_ticks", "bars"):
+        assert merged[field] == expected[field]
+
+    event, reset_state = _parse_sse(reset_message)
+    assert event == "reset"
+    assert [row["time"] for row in reset_state["chart_data"]] == ["09:30"]
+    assert len(reset_state["latest_ticks"]) == 2
+
+
+def test_subscribe_during_pump_gets_no_delta_already_in_snapshot(monkeypatch, tmp_path):
+    config, _, _, _, _ = _reload_runtime_modules(monkeypatch, tmp_path)
+    import threading
+
+    from backend.app.services.realtime_stream import RealtimeStreamHub, StreamChannel, sse_event_id
+
+    _insert_ticks(config.DB_FILE, FIRST_BATCH)
+    hub = RealtimeStreamHub()
+    entered, release = threading.Event(), threading.Event()
+    release.set()
+    original_advance = StreamChannel.advance
+
+    def gated_advance(channel):
+        entered.set()
+        release.wait(5)
+        return original_advance(channel)
+
+    monkeypatch.setattr(StreamChannel, "advance", gated_advance)
+
+    async def scenario():
+        first, _ = await hub.subscribe(SYMBOL, DATE)
+        _insert_ticks(config.DB_FILE, SECOND_BATCH)
+        entered.clear()
+        release.clear()
+        hub.notify(SYMBOL, DATE)
+        # pump 正在推进基线时新连接订阅
+        await asyncio.to_thread(entered.wait, 5)
+        late = asyncio.create_task(hub.subscribe(SYMBOL, DATE))
+        await asyncio.sleep(0.05)
+        release.set()
+        second, snapshot = await asyncio.wait_for(late, timeout=5)
+        message = await asyncio.wait_for(first.queue.get(), timeout=5)
+        await asyncio.sleep(0.05)
+        return snapshot, message, second.queue.empty()
+
+    snapshot, message, second_empty = asyncio.run(scenario())
+    _, delta = _parse_sse(message)
+    assert snapshot["seq"] == delta["seq"] == sse_event_id(message)
+    assert [tick["time"] for tick in snapshot["latest_ticks"][:2]] == ["09:32:10", "09:31:05"]
+    # 首帧已含本轮增量，晚到的订阅者不应再收到同一 seq 的 delta
+    assert second_empty
+
+
+def test_stream_endpoint_sends_snapshot_then_end_for_historical_date(monkeypatch):
+    import backend.app.routers.market as market_router
+
+    monkeypatch.setattr(market_router, "MOCK_DATA_DATE", None)
+    monkeypatch.setattr(
+        market_router.MarketClock,
+        "get_market_context",
+        lambda: {
+            "natural_today": "2026-03-14",
+            "is_trade_day": False,
+            "market_status": "closed_day",
+            "market_status_label": "休盘日",
+            "default_display_date": "2026-03-13",
+            "default_display_scope": "previous_trade_day",
+            "default_display_scope_label": "默认展示上一交易日数据",
+            "should_use_realtime_path": False,
+        },
+    )
+    monkeypatch.setattr(
+        "backend.app.services.analysis.get_history_1m_dashboard",
+        lambda symbol, date_str: {"chart_data": [{"time": "09:30"}], "cumulative_data": [], "latest_ticks": []},
+    )
+    monkeypatch.setattr(market_router, "query_l2_history_5m_rows", lambda *args: [])
+    monkeypatch.setattr("backend.app.services.analysis.refresh_realtime_preview", lambda *args: None)
+    monkeypatch.setattr(market_router, "query_realtime_5m_preview_rows", lambda *args: [])
+
+    async def scenario():
+        response = await market_router.stream_realtime(request=None, symbol="sh600519", date="2026-03-13")
+        return [chunk async for chunk in response.body_iterator]
+
+    chunks = asyncio.run(scenario())
+
+    assert [_parse_sse(chunk)[0] for chunk in chunks] == ["snapshot", "end"]
+    snapshot = _parse_sse(chunks[0])[1]
+    assert snapshot["live"] is False
+    assert snapshot["dashboard"]["display_date"] == "2026-03-13"
+    assert snapshot["fusion"]["trade_date"] == "2026-03-13"
+
+
+def test_live_snapshot_does_not_mutate_shared_payloads(monkeypatch):
+    import copy
+
+    import backend.app.routers.market as market_router
+    from backend.app.models.schemas import APIResponse
+
+    # realtime_flight 会把同一个 APIResponse 分发给所有并发等待方，推送流只能改自己的拷贝
+    shared_dashboard = APIResponse(
+        code=200,
+        data={
+            "chart_data": [{"time": "09:30"}],
+            "cumulative_data": [],
+            "latest_ticks": [],
+            "is_realtime_session": True,
+            "display_date": DATE,
+            "natural_today": DATE,
+        },
+    )
+    shared_fusion = APIResponse(code=200, data={"trade_date": DATE, "mode": "intraday_l1_only", "bars": []})
+    before = (copy.deepcopy(shared_dashboard.data), copy.deepcopy(shared_fusion.data))
+
+    async def fake_dashboard(symbol, date=None):
+        return shared_dashboard
+
+    async def fake_fusion(symbol, date=None, include_today_preview=True):
+        return shared_fusion
+
+    class FakeHub:
+        async def subscribe(self, symbol, trade_date):
+            state = {
+                "seq": 3,
+                "chart_data": [{"time": "09:30"}, {"time": "09:31"}],
+                "cumulative_data": [{"time": "09:31"}],
+                "latest_ticks": [{"time": "09:31:05"}],
+                "bars": [{"datetime": f"{DATE} 09:30:00"}],
+            }
+            return object(), state
+
+        def unsubscribe(self, subscription):
+            pass
+
+    class DisconnectedRequest:
+        async def is_disconnected(self):
+            return True
+
+    monkeypatch.setattr(market_router, "get_realtime_dashboard", fake_dashboard)
+    monkeypatch.setattr(market_router, "get_intraday_fusion", fake_fusion)
+    monkeypatch.setattr(market_router, "stream_hub", FakeHub())
+
+    async def scenario():
+        response = await market_router.stream_realtime(request=DisconnectedRequest(), symbol=SYMBOL, date=DATE)
+        return [chunk async for chunk in response.body_iterator]
+
+    chunks = asyncio.run(scenario())
+
+    event, snapshot = _parse_sse(chunks[0])
+    assert event == "snapshot" and snapshot["live"] is True
+    assert [row["time"] for row in snapshot["dashboard"]["chart_data"]] == ["09:30", "09:31"]
+    assert snapshot["fusion"]["bars"] == [{"datetime": f"{DATE} 09:30:00"}]
+    assert (shared_dashboard.data, shared_fusion.data) == before
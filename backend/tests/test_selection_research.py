@@ -347,6 +347,69 @@ def test_selection_backtest_run_and_detail(monkeypatch, tmp_path):
     assert all(item['holding_days'] in {5, 10} for item in detail.data['summaries'])
 
 
+def _dump_selection_rows(selection_db_path: Path):
+    conn = sqlite3.connect(str(selection_db_path))
+    try:
+        features = conn.execute("SELECT * FROM selection_feature_daily ORDER BY symbol, trade_date").fetchall()
+        feature_cols = [d[0] for d in conn.execute("SELECT * FROM selection_feature_daily LIMIT 0").description]
+        signals = conn.execute("SELECT * FROM selection_signal_daily ORDER BY symbol, trade_date").fetchall()
+        signal_cols = [d[0] for d in conn.execute("SELECT * FROM selection_signal_daily LIMIT 0").description]
+    finally:
+        conn.close()
+    skip = {'created_at', 'source_snapshot'}
+    return (
+        [tuple(v for c, v in zip(feature_cols, row) if c not in skip) for row in features],
+        [tuple(v for c, v in zip(signal_cols, row) if c not in skip) for row in signals],
+    )
+
+
+def test_selection_incremental_refresh_recomputes_only_changed_horizon(monkeypatch, tmp_path):
+    db_path = tmp_path / 'market_data.db'
+    user_db_path = tmp_path / 'user_data.db'
+    selection_db_path = tmp_path / 'selection_research.db'
+    monkeypatch.setenv('DB_PATH', str(db_path))
+    monkeypatch.setenv('USER_DB_PATH', str(user_db_path))
+    monkeypatch.setenv('SELECTION_DB_PATH', str(selection_db_path))
+    database_module.DB_FILE = str(db_path)
+    database_module.USER_DB_FILE = str(user_db_path)
+    selection_db_module.SELECTION_DB_FILE = str(selection_db_path)
+    init_db()
+
+    _seed_local_history(db_path, 'sz000833', 10.0, 0.08, 2_500_000.0)
+    _seed_local_history(db_path, 'sh603629', 8.0, 0.02, 500_000.0)
+    _seed_sentiment_events(db_path, 'sz000833', '2025-03-27', 15)
+
+    first = refresh_selection_research(start_date='2025-01-15', end_date='2025-03-27')
+    assert first.feature_rows == first.target_rows > 0
+
+    again = refresh_selection_research(start_date='2025-01-15', end_date='2025-03-27')
+    assert again.mode == 'reused'
+    assert again.feature_rows == 0 and again.reused_rows == first.target_rows
+    assert again.source_snapshot == first.source_snapshot
+
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("UPDATE local_history SET close = close + 0.5 WHERE symbol = 'sz000833' AND date = '2025-02-20'")
+    conn.commit()
+    conn.close()
+
+    changed = refresh_selection_research(start_date='2025-01-15', end_date='2025-03-27')
+    assert changed.mode == 'incremental'
+    # 2025-02-20 起 60 行回看窗口内、目标区间内的 sz000833 行：02-20..02-28 + 03-01..03-27
+    assert changed.feature_rows == changed.signal_rows == 36
+    assert changed.source_snapshot != first.source_snapshot
+    incremental_rows = _dump_selection_rows(selection_db_path)
+
+    full = refresh_selection_research(start_date='2025-01-15', end_date='2025-03-27', incremental=False)
+    assert full.feature_rows == full.target_rows
+    assert full.source_snapshot == changed.source_snapshot
+    assert _dump_selection_rows(selection_db_path) == incremental_rows
+
+    conn = sqlite3.connect(str(selection_db_path))
+    snapshots = {row[0] for row in conn.execute("SELECT DISTINCT source_snapshot FROM selection_feature_daily")}
+    conn.close()
+    assert snapshots == {changed.source_snapshot}
+
+
 def test_selection_profile_falls_back_to_latest_available_feature_date(monkeypatch, tmp_path):
     db_path = tmp_path / 'market_data.db'
     user_db_path = tmp_path / 'user_data.db'
@@ -1,4 +1,5 @@
 import importlib
+import json
 import sqlite3
 from pathlib import Path
 
@@ -102,8 +103,10 @@ def _seed_symbol_series(
     launch_index: int = -1,
     event_index: int = -1,
     periods: int = 25,
+    start: str = "2026-02-02",
+    missing: range = range(0),
 ) -> None:
-    dates = pd.bdate_range("2026-02-02", periods=periods)
+    dates = pd.bdate_range(start, periods=periods)
     conn = sqlite3.connect(str(atomic_db))
     try:
         trade_rows = []
@@ -112,6 +115,8 @@ def _seed_symbol_series(
         for idx, dt in enumerate(dates):
             trade_date = dt.strftime("%Y-%m-%d")
             close_price += 0.08 if symbol == "sh600001" else 0.02
+            if idx in missing:
+                continue
             total_amount = 350_000_000.0 if symbol == "sh600001" else 180_000_000.0
             trade_count = 30_000 + idx * 200
             l2_main_net = 8_000_000.0 if symbol == "sh600001" else 500_000.0
@@ -511,3 +516,229 @@ def test_build_research_card_v2_uses_historical_company_and_event_context(monkey
     assert "算力" in research["theme_tags"]
     assert len(research["event_timeline"]) == 2
     assert all("未来事件" not in item["title"] for item in research["event_timeline"])
+    # 带空白、大写的代码与批量读取用同一套归一化
+    padded = strategy_v2.build_research_card_v2(" SH600001 ", "2026-03-02", first)
+    assert padded["name"] == "测试股份"
+    assert padded["event_timeline"] == research["event_timeline"]
+
+
+def test_research_batch_loaders_match_mixed_case_stored_symbols(monkeypatch, tmp_path):
+    main_db = _init_main_db(tmp_path)
+    user_db = tmp_path / "user_data.db"
+    main_conn = sqlite3.connect(str(main_db))
+    try:
+        main_conn.execute(
+            "INSERT INTO stock_universe_meta (symbol, name, market_cap, as_of_date, source) VALUES ('Sh600001', '混写股份', 1e10, '2026-03-01', 'unit-test')"
+        )
+        main_conn.execute(
+            "INSERT INTO stock_events (event_id, source, source_type, symbol, title, published_at, importance, is_official) "
+            "VALUES ('evt-1', 'exchange', 'announcement', 'Sh600001', '混写公告', '2026-03-02 18:00:00', 5, 1)"
+        )
+        main_conn.execute(
+            "INSERT INTO sentiment_events (event_id, source, symbol, event_type, content, pub_time) "
+            "VALUES ('sent-1', 'guba', 'sH600001', 'post', '混写帖子', '2026-03-02 15:30:00')"
+        )
+        main_conn.execute(
+            "INSERT INTO sentiment_daily_scores (symbol, trade_date, sample_count, sentiment_score) VALUES ('Sh600001', '2026-03-02', 3, 40)"
+        )
+        main_conn.commit()
+    finally:
+        main_conn.close()
+    user_conn = sqlite3.connect(str(user_db))
+    try:
+        user_conn.execute("CREATE TABLE watchlist (symbol TEXT PRIMARY KEY, name TEXT)")
+        user_conn.execute("INSERT INTO watchlist (symbol, name) VALUES ('Sz000001', '自选混写')")
+        user_conn.commit()
+    finally:
+        user_conn.close()
+
+    import backend.app.services.selection_strategy_v2 as strategy_v2
+    importlib.reload(strategy_v2)
+
+    basics = strategy_v2._load_company_basics_batch(
+        ["SH600001", "sz000001"], "2026-03-02", main_db_path=str(main_db), user_db_path=str(user_db)
+    )
+    timeline = strategy_v2._load_event_timeline_batch(["sh600001"], "2026-03-02", main_db_path=str(main_db))
+    snapshot = strategy_v2._load_sentiment_snapshot_batch(["sh600001"], "2026-03-02", main_db_path=str(main_db))
+
+    assert basics["sh600001"]["name"] == "混写股份"
+    assert basics["sz000001"]["name"] == "自选混写"
+    assert basics["sz000001"]["source"] == "watchlist"
+    assert timeline["sh600001"]["official_event_count"] == 1
+    assert timeline["sh600001"]["sentiment_event_count"] == 1
+    assert snapshot["sh600001"]["available"] is True
+
+
+def _reference_metrics(raw_df: pd.DataFrame) -> pd.DataFrame:
+    frames = []
+    for _, group in raw_df.groupby("symbol", sort=False):
+        g = group.sort_values("trade_date").copy()
+        g["prev_close"] = g["close"].shift(1)
+        g["return_20d_pct"] = ((g["close"] / g["close"].shift(20)) - 1.0) * 100.0
+        g["amount_ma20"] = g["total_amount"].rolling(20, min_periods=5).mean()
+        g["breakout_vs_prev20_high_pct"] = ((g["close"] / g["close"].shift(1).rolling(20, min_periods=5).max()) - 1.0) * 100.0
+        low60 = g["close"].rolling(60, min_periods=10).min()
+        high60 = g["close"].rolling(60, min_periods=10).max()
+        g["price_position_60d"] = ((g["close"] - low60) / (high60 - low60).replace(0, float("nan"))).fillna(0.0)
+        g["main_net_5d"] = g["l2_main_net_amount"].rolling(5, min_periods=1).sum()
+        return_1d = ((g["close"] / g["prev_close"]) - 1.0) * 100.0
+        g["prior_3d_min_return_1d_pct"] = return_1d.shift(1).rolling(3, min_periods=1).min()
+        frames.append(g)
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_compute_v2_metrics_panel_matches_per_symbol_rolling():
+    import numpy as np
+    from backend.app.services.selection_strategy_v2 import compute_v2_metrics
+
+    rng = np.random.default_rng(7)
+    dates = pd.bdate_range("2026-01-02", periods=80).strftime("%Y-%m-%d")
+    frames = []
+    for symbol, length in (("sz000003", 80), ("sh600001", 12), ("sz000001", 65)):
+        frame = pd.DataFrame({"symbol": symbol, "trade_date": dates[-length:]})
+        for col in (
+            "open", "high", "low", "close", "total_amount", "total_volume", "trade_count",
+            "l1_main_net_amount", "l2_main_net_amount", "l1_super_net_amount", "l2_super_net_amount",
+            "l2_buy_ratio", "l2_sell_ratio", "positive_l2_net_bar_count", "negative_l2_net_bar_count",
+            "add_buy_amount", "add_sell_amount", "cancel_buy_amount", "cancel_sell_amount",
+            "cvd_delta_amount", "oib_delta_amount", "buy_support_ratio", "sell_pressure_ratio",
+        ):
+            frame[col] = rng.random(length) * 100.0 + 1.0
+        frames.append(frame.drop(index=frame.index[5::17]))
+    raw = pd.concat(frames, ignore_index=True).sample(frac=1.0, random_state=3).reset_index(drop=True)
+
+    metrics = compute_v2_metrics(raw)
+    expected = _reference_metrics(raw)
+
+    assert metrics["symbol"].drop_duplicates().tolist() == raw["symbol"].drop_duplicates().tolist()
+    assert metrics[["symbol", "trade_date"]].values.tolist() == expected[["symbol", "trade_date"]].values.tolist()
+    for col in ("prev_close", "return_20d_pct", "amount_ma20", "breakout_vs_prev20_high_pct",
+                "price_position_60d", "main_net_5d", "prior_3d_min_return_1d_pct"):
+        pd.testing.assert_series_equal(metrics[col], expected[col], check_dtype=False, check_names=False, rtol=1e-12)
+
+
+def test_v2_metrics_panel_cache_invalidates_on_db_write(monkeypatch, tmp_path):
+    atomic_db = _init_atomic_db(tmp_path)
+    _seed_symbol_series(atomic_db, "sh600001", periods=25)
+    monkeypatch.setenv("SELECTION_V2_ATOMIC_DB_PATH", str(atomic_db))
+    import backend.app.services.selection_strategy_v2 as strategy_v2
+    importlib.reload(strategy_v2)
+
+    first = strategy_v2.load_v2_metrics_panel("2026-02-01", "2026-03-06")
+    second = strategy_v2.load_v2_metrics_panel("2026-02-01", "2026-03-06")
+    assert second is first
+    assert strategy_v2.get_v2_metrics_cache_stats()["hits"] == 1
+
+    _seed_symbol_series(atomic_db, "sh600002", periods=25)
+    refreshed = strategy_v2.load_v2_metrics_panel("2026-02-01", "2026-03-06")
+    assert refreshed is not first
+    assert set(refreshed["symbol"]) == {"sh600001", "sh600002"}
+
+
+def test_backtest_context_loads_window_once_and_matches_per_call_replay(monkeypatch, tmp_path):
+    atomic_db = _init_atomic_db(tmp_path)
+    main_db = _init_main_db(tmp_path)
+    _seed_symbol_series(atomic_db, "sh600001", launch_index=20, periods=30)
+    _seed_symbol_series(atomic_db, "sh600002", event_index=21, periods=30)
+    monkeypatch.setenv("SELECTION_V2_ATOMIC_DB_PATH", str(atomic_db))
+    monkeypatch.setenv("SELECTION_V2_MAIN_DB_PATH", str(main_db))
+    import backend.app.services.selection_strategy_v2 as strategy_v2
+    importlib.reload(strategy_v2)
+
+    params = strategy_v2.SelectionV2Params()
+    replay_end = "2026-03-20"
+    days = ["2026-03-02", "2026-03-03", "2026-03-04"]
+    context = strategy_v2.SelectionV2ReplayContext(days[0], replay_end, params=params)
+    for day in days:
+        payload = context.replay_trade_date(day, limit=5, replay_end_date=replay_end)
+        expected_items = strategy_v2.screen_candidates_v2(day, limit=5, params=params)["items"]
+        assert [c["symbol"] for c in payload["candidates"]] == [item["symbol"] for item in expected_items]
+        for candidate, item in zip(payload["candidates"], expected_items):
+            raw = strategy_v2.load_atomic_daily_window(
+                strategy_v2._screen_lookback_start(day), replay_end, symbols=[item["symbol"]]
+            )
+            metrics = strategy_v2.compute_v2_metrics(raw)
+            expected_replay = strategy_v2._replay_symbol_metrics(item["symbol"], metrics[metrics["trade_date"] >= day], params)
+            expected_trade = next((t for t in expected_replay["trades"] if t["signal_date"] == day), None)
+            assert candidate["trade"] == expected_trade
+            assert candidate["daily_state_count"] == len(expected_replay["daily_states"])
+            assert candidate["research"] == strategy_v2.build_research_card_v2(item["symbol"], day, item)
+    assert context.stats["db_loads"] == 1
+    assert context.stats["metrics_builds"] == 1
+    assert context.stats["research_batches"] <= len(days)
+
+    builds = []
+    original_compute = strategy_v2.compute_v2_metrics
+    monkeypatch.setattr(
+        strategy_v2,
+        "compute_v2_metrics",
+        lambda *args, **kwargs: builds.append(args) or original_compute(*args, **kwargs),
+    )
+    loads = []
+    original_loader = strategy_v2.load_atomic_daily_window
+    monkeypatch.setattr(
+        strategy_v2,
+        "load_atomic_daily_window",
+        lambda *args, **kwargs: loads.append(args) or original_loader(*args, **kwargs),
+    )
+    result = strategy_v2.backtest_range_v2("2026-03-02", "2026-03-06", limit=5, replay_end_date=replay_end)
+    assert result["summary"]["trade_count"] >= 1
+    assert len(loads) == 1
+    assert len(builds) == 1
+
+
+def test_backtest_context_reuses_replays_across_signal_days(monkeypatch, tmp_path):
+    atomic_db = _init_atomic_db(tmp_path)
+    _seed_symbol_series(atomic_db, "sh600001", launch_index=20, periods=30)
+    _seed_symbol_series(atomic_db, "sh600002", event_index=21, periods=30)
+    monkeypatch.setenv("SELECTION_V2_ATOMIC_DB_PATH", str(atomic_db))
+    import backend.app.services.selection_strategy_v2 as strategy_v2
+    importlib.reload(strategy_v2)
+
+    # 持仓两天即平仓，让后续起点能在平仓后的空仓日接上已有回放
+    params = strategy_v2.SelectionV2Params(max_holding_days=2)
+    replay_end = "2026-03-13"
+    days = pd.bdate_range("2026-03-02", "2026-03-12").strftime("%Y-%m-%d").tolist()
+    context = strategy_v2.SelectionV2ReplayContext(days[0], replay_end, params=params)
+    panel = context.metrics_panel()
+    for symbol in ("sh600001", " SH600002 "):
+        rows = panel[panel["symbol"] == symbol.strip().lower()]
+        for day in days:
+            expected = strategy_v2._replay_symbol_metrics(symbol, rows[rows["trade_date"] >= day].reset_index(drop=True), params)
+            assert context.replay_symbol(symbol, day, replay_end) == expected
+    # 每只股票只有首个起点整段逐行回放，其余起点切片复用或回放到空仓日后拼接
+    assert context.stats["replay_misses"] == 2
+    assert context.stats["replay_splices"] >= 1
+    assert context.stats["replay_hits"] + context.stats["replay_splices"] == 2 * len(days) - 2
+    assert context.stats["metrics_builds"] == 1
+
+
+def test_backtest_context_matches_per_call_lookback_when_history_is_sparse(monkeypatch, tmp_path):
+    atomic_db = _init_atomic_db(tmp_path)
+    # sh600001 停牌近三个月：复牌后信号日前 90 天内只有寥寥几行，而回测上下文里还有更早的行
+    _seed_symbol_series(atomic_db, "sh600001", launch_index=118, periods=140, start="2025-10-01", missing=range(45, 112))
+    _seed_symbol_series(atomic_db, "sh600002", event_index=121, periods=140, start="2025-10-01")
+    monkeypatch.setenv("SELECTION_V2_ATOMIC_DB_PATH", str(atomic_db))
+    import backend.app.services.selection_strategy_v2 as strategy_v2
+    importlib.reload(strategy_v2)
+
+    params = strategy_v2.SelectionV2Params(max_holding_days=3)
+    replay_end = "2026-04-10"
+    days = pd.bdate_range("2026-03-09", "2026-03-27").strftime("%Y-%m-%d").tolist()
+    context = strategy_v2.SelectionV2ReplayContext("2026-01-05", replay_end, params=params)
+    # 窗口前段 return_20d_pct 为 NaN，按 JSON 文本比较（NaN 序列化一致）
+    def same(left, right):
+        return json.dumps(left, sort_keys=True, ensure_ascii=False) == json.dumps(right, sort_keys=True, ensure_ascii=False)
+
+    screened = set()
+    for day in days:
+        payload = context.screen(day, limit=5)
+        assert same(payload, strategy_v2.screen_candidates_v2(day, limit=5, params=params))
+        screened.update(item["symbol"] for item in payload["items"])
+    assert "sh600001" in screened
+    for day in days[::3]:
+        for symbol in ("sh600001", "sh600002"):
+            expected = strategy_v2.replay_symbol_v2(symbol, day, replay_end, params=params)
+            assert same(context.replay_symbol(symbol, day, replay_end), expected)
+    assert context.stats["metrics_builds"] == 1
+    assert context.stats["window_recomputes"] > 0
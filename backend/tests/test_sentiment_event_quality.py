@@ -0,0 +1,171 @@
+import importlib
+import sqlite3
+
+SYMBOL = "sh600519"
+
+
+def _reload_modules(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "market_data.db"))
+    monkeypatch.setenv("USER_DB_PATH", str(tmp_path / "user_data.db"))
+    import backend.app.core.config as config
+    import backend.app.db.database as database
+    import backend.app.services.retail_sentiment as retail_sentiment
+    import backend.app.services.sentiment_crawler as sentiment_crawler
+
+    importlib.reload(config)
+    importlib.reload(database)
+    importlib.reload(retail_sentiment)
+    importlib.reload(sentiment_crawler)
+    database.init_db()
+    return config, retail_sentiment, sentiment_crawler
+
+
+def _comment(event_id, content, pub_time, raw_url=None, reply_count=1):
+    return {
+        "id": event_id,
+        "event_id": event_id,
+        "stock_code": SYMBOL,
+        "content": content,
+        "pub_time": pub_time,
+        "crawl_time": pub_time,
+        "read_count": 100,
+        "reply_count": reply_count,
+        "source": "guba",
+        "event_type": "post",
+        "raw_url": raw_url,
+        "extra_json": {"list_crawl": True},
+    }
+
+
+COMMENTS = [
+    _comment("p1", "业绩超预期 明天继续看多", "2026-03-10 09:35:00"),
+    _comment("p2", "业绩超预期  明天继续看多", "2026-03-10 10:05:00"),
+    _comment("p3", "荐股老师带你飞 私信我", "2026-03-10 10:20:00"),
+    _comment("p4", "来了", "2026-03-10 11:00:00"),
+    _comment("p5", "平安银行今天放量", "2026-03-10 13:10:00", raw_url="https://guba.eastmoney.com/news,000001,123.html"),
+    _comment("p6", "业绩超预期 明天继续看多", "2026-03-11 09:40:00"),
+]
+
+
+def _flags(db_file):
+    conn = sqlite3.connect(db_file)
+    try:
+        return {
+            row[0]: row[1:]
+            for row in conn.execute(
+                """
+                SELECT event_id, is_symbol_mismatch, is_low_value, is_spam, is_duplicate, quality_version
+                FROM sentiment_events
+                """
+            )
+        }
+    finally:
+        conn.close()
+
+
+def test_save_comments_stores_quality_flags_used_by_read_paths(monkeypatch, tmp_path):
+    config, retail_sentiment, sentiment_crawler = _reload_modules(monkeypatch, tmp_path)
+    sentiment_crawler.SentimentCrawler().save_comments(COMMENTS)
+
+    version = retail_sentiment.EVENT_QUALITY_CLASSIFIER_VERSION
+    flags = _flags(config.DB_FILE)
+    assert flags["p1"] == (0, 0, 0, 0, version)
+    # 同日内容指纹相同（空白差异归一化后）的后一条标重复；跨日不算
+    assert flags["p2"] == (0, 0, 0, 1, version)
+    assert flags["p6"] == (0, 0, 0, 0, version)
+    assert flags["p3"][2] == 1
+    assert flags["p4"][1] == 1
+    assert flags["p5"][0] == 1
+
+    posts = retail_sentiment._load_sentiment_posts_df(SYMBOL, "2026-03-10", "2026-03-11")
+    assert sorted(posts["event_id"]) == ["p1", "p2", "p3", "p4", "p6"]
+    candidates = retail_sentiment._daily_posts_for_scoring(SYMBOL, "2026-03-10")
+    assert [row["event_id"] for row in candidates] == ["p1"]
+    daily = retail_sentiment._event_daily_aggregate(SYMBOL, "2026-03-10", "2026-03-11")
+    assert dict(zip(daily["bucket_date"], daily["post_count"])) == {"2026-03-10": 4, "2026-03-11": 1}
+
+
+def test_stale_rows_classified_on_read_and_version_bump_reclassifies(monkeypatch, tmp_path):
+    config, retail_sentiment, _ = _reload_modules(monkeypatch, tmp_path)
+    conn = sqlite3.connect(config.DB_FILE)
+    try:
+        conn.executemany(
+            """
+            INSERT INTO sentiment_events (event_id, source, symbol, event_type, content, pub_time, view_count, reply_count, source_event_id, raw_url)
+            VALUES (?, 'guba', ?, 'post', ?, ?, 0, 1, ?, ?)
+            """,
+            [
+                ("old-1", SYMBOL, "白酒龙头 稳稳拿住", "2026-03-10 10:00:00", "old-1", None),
+                ("old-2", SYMBOL, "白酒龙头 稳稳拿住", "2026-03-10 10:30:00", "old-2", None),
+                ("old-3", SYMBOL, "平安银行今天放量", "2026-03-11 10:00:00", "old-3", "https://guba.eastmoney.com/news,000001,9.html"),
+            ],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    rows = retail_sentiment.build_heat_trend_v2(SYMBOL, window="20d")
+    assert {row["time_bucket"]: row["post_count"] for row in rows} == {"2026-03-10": 2, "2026-03-11": 0}
+    flags = _flags(config.DB_FILE)
+    assert flags["old-2"][3] == 1 and flags["old-3"][0] == 1
+    assert retail_sentiment.reclassify_sentiment_event_quality()["events"] == 0
+
+    # 规则升级：分类器版本递增后只重算旧版本行，错配标记变化的发帖日同步刷新热度桶
+    monkeypatch.setattr(retail_sentiment, "EVENT_QUALITY_CLASSIFIER_VERSION", "event_quality_test_v2")
+    monkeypatch.setattr(retail_sentiment, "_is_symbol_mismatch", lambda symbol, raw_url, extra_json: False)
+    report = retail_sentiment.reclassify_sentiment_event_quality(SYMBOL)
+    assert (report["events"], report["heat_days"]) == (3, 1)
+    assert {value[4] for value in _flags(config.DB_FILE).values()} == {"event_quality_test_v2"}
+    rows = retail_sentiment.build_heat_trend_v2(SYMBOL, window="20d")
+    assert {row["time_bucket"]: row["post_count"] for row in rows} == {"2026-03-10": 2, "2026-03-11": 1}
+    assert retail_sentiment.reclassify_sentiment_event_quality(SYMBOL)["events"] == 0
+
+
+def test_duplicates_ignore_earlier_replies_and_mismatched_rows(monkeypatch, tmp_path):
+    config, retail_sentiment, sentiment_crawler = _reload_modules(monkeypatch, tmp_path)
+    reply = {**_comment("r1", "白酒龙头 稳稳拿住", "2026-03-10 09:31:00"), "event_type": "reply", "thread_id": "t0"}
+    sentiment_crawler.SentimentCrawler().save_comments(
+        [
+            reply,
+            _comment("p1", "白酒龙头 稳稳拿住", "2026-03-10 09:40:00"),
+            _comment("m1", "放量突破 今天走强", "2026-03-10 10:00:00", raw_url="https://guba.eastmoney.com/news,000001,7.html"),
+            _comment("p2", "放量突破 今天走强", "2026-03-10 10:10:00"),
+            _comment("p3", "放量突破  今天走强", "2026-03-10 10:20:00"),
+        ]
+    )
+
+    flags = _flags(config.DB_FILE)
+    # 同文的更早回复、更早的错配行都不会把有效主帖标成重复；有效主帖之间仍正常去重
+    assert flags["p1"][3] == 0
+    assert flags["m1"][0] == 1 and flags["p2"][3] == 0
+    assert flags["p3"][3] == 1
+    candidates = retail_sentiment._daily_posts_for_scoring(SYMBOL, "2026-03-10")
+    assert sorted(row["event_id"] for row in candidates) == ["p1", "p2"]
+
+
+def test_spam_rule_matches_whole_phrases_only(monkeypatch, tmp_path):
+    config, retail_sentiment, _ = _reload_modules(monkeypatch, tmp_path)
+    legit = ["散户群体都在割肉，主力在吸筹", "一群人追高被套", "人群都在看白酒", "VX指数大跌"]
+    spam = ["进群领牛股", "加vx看直播", "老师荐股 私信我", "微信群每天推票"]
+    assert [retail_sentiment.classify_event_quality(SYMBOL, text)["is_spam"] for text in legit] == [0, 0, 0, 0]
+    assert [retail_sentiment.classify_event_quality(SYMBOL, text)["is_spam"] for text in spam] == [1, 1, 1, 1]
+
+    # 遗留导入等非爬虫写入的行在读取前补标记，正常讨论仍进入打分候选
+    conn = sqlite3.connect(config.DB_FILE)
+    try:
+        conn.executemany(
+            """
+            INSERT INTO sentiment_events (event_id, source, symbol, event_type, content, pub_time, view_count, reply_count, source_event_id)
+            VALUES (?, 'guba', ?, 'post', ?, ?, 0, 1, ?)
+            """,
+            [
+                (f"g{index}", SYMBOL, text, f"2026-03-10 10:0{index}:00", f"g{index}")
+                for index, text in enumerate(legit + spam[:1])
+            ],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    retail_sentiment._ensure_sentiment_events_backfill(SYMBOL)
+    candidates = retail_sentiment._daily_posts_for_scoring(SYMBOL, "2026-03-10")
+    assert sorted(row["event_id"] for row in candidates) == ["g0", "g1", "g2", "g3"]
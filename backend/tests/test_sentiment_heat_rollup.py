@@ -0,0 +1,204 @@
+import importlib
+import json
+import sqlite3
+
+SYMBOL = "sh600519"
+
+
+def _reload_modules(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "market_data.db"))
+    monkeypatch.setenv("USER_DB_PATH", str(tmp_path / "user_data.db"))
+    import backend.app.core.config as config
+    import backend.app.db.database as database
+    import backend.app.services.retail_sentiment as retail_sentiment
+    import backend.app.services.sentiment_crawler as sentiment_crawler
+
+    importlib.reload(config)
+    importlib.reload(database)
+    importlib.reload(retail_sentiment)
+    importlib.reload(sentiment_crawler)
+    database.init_db()
+    return config, retail_sentiment, sentiment_crawler
+
+
+def _insert_posts(db_file, rows):
+    conn = sqlite3.connect(db_file)
+    try:
+        conn.executemany(
+            """
+            INSERT INTO sentiment_events (
+                event_id, source, symbol, event_type, content, pub_time, view_count, reply_count, source_event_id, extra_json
+            ) VALUES (?, 'guba', ?, 'post', ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (event_id, SYMBOL, content, pub_time, views, replies, event_id, json.dumps(extra, ensure_ascii=False))
+                for event_id, content, pub_time, views, replies, extra in rows
+            ],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+POSTS = [
+    ("p1", "明天涨停 起飞", "2026-03-10 10:03:00", 4000, 2, {}),
+    ("p2", "割肉出货了", "2026-03-10 10:07:00", 1000, 0, {}),
+    ("p3", "随便聊聊", "2026-03-10 13:21:00", 0, 1, {}),
+    # 同一天有新抓取帖子时，遗留导入帖不计入热度
+    ("legacy-1", "老数据 涨停", "2026-03-11 09:41:00", 500, 5, {"legacy_import": True}),
+    ("p4", "格局 满仓", "2026-03-11 09:45:00", 2000, 3, {}),
+    ("legacy-2", "只有遗留导入的一天 跌停", "2026-03-12 14:02:00", 0, 0, {"legacy_import": True}),
+]
+
+
+def _rollup_rows(db_file, granularity):
+    conn = sqlite3.connect(db_file)
+    try:
+        return {
+            row[0]: row[1:]
+            for row in conn.execute(
+                """
+                SELECT bucket_start, post_count, reply_count_sum, read_count_sum, bull_count, bear_count, raw_heat
+                FROM sentiment_heat_rollup
+                WHERE symbol=? AND granularity=?
+                """,
+                (SYMBOL, granularity),
+            )
+        }
+    finally:
+        conn.close()
+
+
+def test_heat_rollup_matches_raw_aggregation_and_feeds_trend(monkeypatch, tmp_path):
+    config, retail_sentiment, _ = _reload_modules(monkeypatch, tmp_path)
+    _insert_posts(config.DB_FILE, POSTS)
+
+    daily_rows = retail_sentiment.build_heat_trend_v2(SYMBOL, window="20d")
+
+    assert [row["time_bucket"] for row in daily_rows] == ["2026-03-10", "2026-03-11", "2026-03-12"]
+    posts = retail_sentiment._load_sentiment_posts_df(SYMBOL, "2026-03-10", "2026-03-12")
+    expected = retail_sentiment._aggregate_heat_buckets(posts, "1d")
+    for row in daily_rows:
+        bucket = expected[row["time_bucket"]]
+        for field in ("post_count", "reply_count_sum", "read_count_sum", "bull_count", "bear_count", "raw_heat"):
+            assert row[field] == bucket[field]
+    assert (daily_rows[0]["post_count"], daily_rows[0]["bull_count"], daily_rows[0]["bear_count"]) == (3, 1, 1)
+    assert (daily_rows[1]["post_count"], daily_rows[1]["bull_count"]) == (1, 1)
+    assert (daily_rows[2]["post_count"], daily_rows[2]["bear_count"]) == (1, 1)
+    assert daily_rows[0]["raw_heat"] == round(3 + 3 * 2.0 + 5000 / 2000.0 * 0.5, 2)
+
+    minute_buckets = _rollup_rows(config.DB_FILE, "10m")
+    assert minute_buckets["2026-03-10 10:00:00"][:1] == (2,)
+    assert minute_buckets["2026-03-10 13:20:00"][:1] == (1,)
+    assert "2026-03-11 09:40:00" in minute_buckets
+
+    intraday_rows = retail_sentiment.build_heat_trend_v2(SYMBOL, window="5d")
+    by_bucket = {row["time_bucket"]: row for row in intraday_rows}
+    assert by_bucket["2026-03-10 10:00:00"]["post_count"] == 2
+    assert by_bucket["2026-03-10 10:10:00"]["is_gap"] is True
+
+    overview = retail_sentiment.build_overview_v2(SYMBOL, window="20d")
+    assert overview["post_count"] == 5
+    assert (overview["bull_count"], overview["bear_count"]) == (2, 2)
+
+
+def test_save_comments_refreshes_only_touched_days(monkeypatch, tmp_path):
+    config, retail_sentiment, sentiment_crawler = _reload_modules(monkeypatch, tmp_path)
+    _insert_posts(config.DB_FILE, POSTS)
+    retail_sentiment.rebuild_sentiment_heat_rollup(SYMBOL)
+    before = _rollup_rows(config.DB_FILE, "1d")
+
+    spans = []
+    write_heat_rollup = retail_sentiment._write_heat_rollup
+
+    def _recording_write(symbol, start_date, end_date):
+        spans.append((symbol, start_date, end_date))
+        return write_heat_rollup(symbol, start_date, end_date)
+
+    monkeypatch.setattr(retail_sentiment, "_write_heat_rollup", _recording_write)
+    crawler = sentiment_crawler.SentimentCrawler()
+    crawler.save_comments(
+        [
+            {
+                "id": "p5",
+                "event_id": "p5",
+                "stock_code": SYMBOL,
+                "content": "接力 龙头",
+                "pub_time": "2026-03-12 14:05:00",
+                "crawl_time": "2026-03-12 14:06:00",
+                "read_count": 0,
+                "reply_count": 4,
+                "source": "guba",
+                "event_type": "post",
+                "extra_json": {"list_crawl": True},
+            }
+        ]
+    )
+
+    assert spans == [(SYMBOL, "2026-03-12", "2026-03-12")]
+    after = _rollup_rows(config.DB_FILE, "1d")
+    assert after["2026-03-10"] == before["2026-03-10"]
+    assert after["2026-03-11"] == before["2026-03-11"]
+    # 新抓取帖子落到只有遗留导入的那天后，遗留导入帖按规则被替换掉
+    assert after["2026-03-12"][:5] == (1, 4, 0, 1, 0)
+
+    monkeypatch.setattr(retail_sentiment, "_write_heat_rollup", write_heat_rollup)
+    retail_sentiment.rebuild_sentiment_heat_rollup(SYMBOL)
+    assert _rollup_rows(config.DB_FILE, "1d") == after
+
+
+def _moved_post(event_id, pub_time):
+    return {
+        "id": event_id,
+        "event_id": event_id,
+        "stock_code": SYMBOL,
+        "content": "明天涨停 起飞",
+        "pub_time": pub_time,
+        "crawl_time": pub_time,
+        "read_count": 4000,
+        "reply_count": 2,
+        "source": "guba",
+        "event_type": "post",
+        "extra_json": {"list_crawl": True},
+    }
+
+
+def test_save_comments_refreshes_previous_day_when_pub_time_moves(monkeypatch, tmp_path):
+    config, retail_sentiment, sentiment_crawler = _reload_modules(monkeypatch, tmp_path)
+    _insert_posts(config.DB_FILE, POSTS)
+    retail_sentiment.rebuild_sentiment_heat_rollup(SYMBOL)
+    assert _rollup_rows(config.DB_FILE, "1d")["2026-03-10"][0] == 3
+
+    sentiment_crawler.SentimentCrawler().save_comments([_moved_post("p1", "2026-03-12 09:50:00")])
+
+    after = _rollup_rows(config.DB_FILE, "1d")
+    # 旧发帖日不再计入被改写的主帖
+    assert after["2026-03-10"][0] == 2
+    assert after["2026-03-12"][0] == 1
+    retail_sentiment.rebuild_sentiment_heat_rollup(SYMBOL)
+    assert _rollup_rows(config.DB_FILE, "1d") == after
+
+
+def test_failed_refresh_invalidates_rollup_for_rebuild_on_read(monkeypatch, tmp_path):
+    config, retail_sentiment, sentiment_crawler = _reload_modules(monkeypatch, tmp_path)
+    _insert_posts(config.DB_FILE, POSTS)
+    retail_sentiment.rebuild_sentiment_heat_rollup(SYMBOL)
+    write_heat_rollup = retail_sentiment._write_heat_rollup
+
+    def _failing_write(symbol, start_date, end_date):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(retail_sentiment, "_write_heat_rollup", _failing_write)
+    sentiment_crawler.SentimentCrawler().save_comments([_moved_post("p5", "2026-03-11 10:00:00")])
+
+    conn = sqlite3.connect(config.DB_FILE)
+    try:
+        state = conn.execute("SELECT 1 FROM sentiment_heat_rollup_state WHERE symbol=?", (SYMBOL,)).fetchone()
+    finally:
+        conn.close()
+    assert state is None
+
+    # 下次读取整股重建，新帖计入
+    monkeypatch.setattr(retail_sentiment, "_write_heat_rollup", write_heat_rollup)
+    rows = retail_sentiment.build_heat_trend_v2(SYMBOL, window="20d")
+    assert {row["time_bucket"]: row["post_count"] for row in rows}["2026-03-11"] == 2
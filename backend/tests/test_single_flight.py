@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+
+import backend.app.routers.market as market_router
+from backend.app.core.single_flight import SingleFlight
+
+TRADING_CONTEXT = {
+    "natural_today": "2026-03-16",
+    "is_trade_day": True,
+    "market_status": "trading",
+    "market_status_label": "盘中",
+    "default_display_date": "2026-03-16",
+    "default_display_scope": "today",
+    "default_display_scope_label": "默认展示今日数据",
+    "should_use_realtime_path": True,
+}
+
+
+def test_concurrent_calls_share_one_computation_and_survive_waiter_cancel():
+    flight = SingleFlight(2, "test")
+    calls = []
+
+    def compute(value):
+        calls.append(threading.current_thread().name)
+        time.sleep(0.1)
+        return {"value": value}
+
+    async def scenario():
+        waiters = [asyncio.ensure_future(flight.run(("k", 1), compute, 1)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        waiters[0].cancel()
+        results = await asyncio.gather(*waiters[1:])
+        assert flight.inflight_count() == 0
+        again = await flight.run(("k", 1), compute, 2)
+        return results, again
+
+    results, again = asyncio.run(scenario())
+
+    assert len(calls) == 2 and all(name.startswith("test") for name in calls)
+    assert all(result is results[0] for result in results) and results[0] == {"value": 1}
+    assert again == {"value": 2}
+    assert flight.get_stats() == {"started": 2, "joined": 4, "failed": 0, "inflight": 0}
+
+
+def test_clone_gives_each_concurrent_waiter_its_own_result():
+    flight = SingleFlight(2, "test")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"bars": [1, 2]}
+
+    async def scenario():
+        return await asyncio.gather(*[flight.run("k", compute, clone=dict) for _ in range(4)])
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert len({id(result) for result in results}) == 4
+    results[0]["bars"] = []
+    assert all(result == {"bars": [1, 2]} for result in results[1:])
+
+
+def test_fresh_after_skips_computation_started_before_the_write():
+    flight = SingleFlight(2, "test")
+    calls = []
+
+    async def compute(tag):
+        calls.append(tag)
+        await asyncio.sleep(0.05)
+        return tag
+
+    async def scenario():
+        stale = asyncio.ensure_future(flight.run_async("k", lambda: compute("before")))
+        await asyncio.sleep(0.01)
+        written_at = time.monotonic()
+        fresh = await flight.run_async("k", lambda: compute("after"), fresh_after=written_at)
+        joined = await flight.run_async("k", lambda: compute("late"))
+        return await stale, fresh, joined
+
+    assert asyncio.run(scenario()) == ("before", "after", "late")
+    assert calls == ["before", "after", "late"]
+
+
+def test_realtime_dashboard_coalesces_callers_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(market_router, "MOCK_DATA_DATE", None)
+    monkeypatch.setattr(market_router.MarketClock, "get_market_context", lambda: dict(TRADING_CONTEXT))
+    monkeypatch.setattr(market_router, "_is_today_payload_stale", lambda *args: False)
+    calls = []
+
+    def slow_realtime(symbol, date_str):
+        calls.append((symbol, date_str))
+        time.sleep(0.2)
+        return {"chart_data": [{"time": "09:30"}], "cumulative_data": [], "latest_ticks": []}
+
+    monkeypatch.setattr("backend.app.services.analysis.calculate_realtime_aggregation", slow_realtime)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.ensure_future(ticker())
+        responses = await asyncio.gather(
+            *[market_router.get_realtime_dashboard(symbol="sh600519", date=None) for _ in range(8)]
+        )
+        ticker_task.cancel()
+        return responses, ticks
+
+    responses, ticks = asyncio.run(scenario())
+
+    assert calls == [("sh600519", "2026-03-16")]
+    assert all(resp.code == 200 and resp.data["view_mode"] for resp in responses)
+    # 合并后每个等待方拿到自己的响应拷贝，改写字段不会串到其它等待方
+    assert len({id(resp.data) for resp in responses}) == len(responses)
+    responses[0].data["chart_data"] = []
+    responses[0].data["view_mode"] = "mutated"
+    assert all(resp.data["chart_data"] == [{"time": "09:30"}] for resp in responses[1:])
+    assert all(resp.data["view_mode"] != "mutated" for resp in responses[1:])
+    # 计算在线程池里跑，事件循环上的其它协程照常推进
+    assert ticks >= 10
+
+
+def test_concurrent_hydrate_fetches_once(monkeypatch):
+    fetches, saved = [], []
+
+    async def fake_fetch(symbol):
+        fetches.append(symbol)
+        await asyncio.sleep(0.05)
+        return [{"time": "09:30:01", "price": 10.0, "volume": 100, "amount": 1000.0, "type": "buy"}]
+
+    monkeypatch.setattr(market_router, "fetch_live_ticks", fake_fetch)
+    monkeypatch.setattr(market_router, "save_ticks_daily_overwrite", lambda symbol, date_str, rows: saved.append(len(rows)))
+    monkeypatch.setattr("backend.app.services.analysis.aggregate_intraday_1m", lambda symbol, date_str: None)
+
+    async def scenario():
+        return await asyncio.gather(
+            *[market_router._hydrate_ticks_on_demand("sh600519", "2026-03-16") for _ in range(4)]
+        )
+
+    assert asyncio.run(scenario()) == [True] * 4
+    assert fetches == ["sh600519"] and saved == [1]
@@ -0,0 +1,81 @@
+import importlib
+import shutil
+import sqlite3
+
+from backend.tests.test_atomic_review_fallback import _init_atomic_db
+
+
+def _reload_modules(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "market_data.db"))
+    monkeypatch.setenv("USER_DB_PATH", str(tmp_path / "user_data.db"))
+    monkeypatch.setenv("ATOMIC_DB_PATH", str(tmp_path / "atomic_mainboard.db"))
+    import backend.app.core.config as config
+    import backend.app.db.l2_history_db as l2_history_db
+
+    importlib.reload(config)
+    importlib.reload(l2_history_db)
+    l2_history_db.ensure_l2_history_schema()
+    return l2_history_db
+
+
+def _daily_row(symbol, trade_date):
+    return (
+        symbol, trade_date, 10.0, 10.5, 9.8, 10.2, 500000.0,
+        11.0, 12.0, -1.0, 5.0, 6.0, -1.0,
+        21.0, 22.0, -1.0, 7.0, 8.0, -1.0,
+        0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, None,
+    )
+
+
+def _pool_bounds(l2_history_db):
+    return {
+        item["symbol"]: (item["min_date"], item["max_date"])
+        for item in l2_history_db.query_review_pool()["items"]
+    }
+
+
+def test_replace_daily_row_maintains_bounds_incrementally(monkeypatch, tmp_path):
+    l2_history_db = _reload_modules(monkeypatch, tmp_path)
+    for trade_date in ("2026-03-10", "2026-03-11", "2026-03-12"):
+        l2_history_db.replace_history_daily_l2_row("sz000833", trade_date, _daily_row("sz000833", trade_date))
+    l2_history_db.replace_history_daily_l2_row("sh600519", "2026-03-11", _daily_row("sh600519", "2026-03-11"))
+
+    assert _pool_bounds(l2_history_db) == {
+        "sz000833": ("2026-03-10", "2026-03-12"),
+        "sh600519": ("2026-03-11", "2026-03-11"),
+    }
+
+    l2_history_db.replace_history_daily_l2_row("sz000833", "2026-03-12", None)
+    l2_history_db.replace_history_daily_l2_row("sh600519", "2026-03-11", None)
+    assert _pool_bounds(l2_history_db) == {"sz000833": ("2026-03-10", "2026-03-11")}
+
+    # 池子只读汇总表：绕过维护入口的直接改写要靠重建命令同步
+    conn = sqlite3.connect(tmp_path / "market_data.db")
+    with conn:
+        conn.execute("DELETE FROM history_daily_l2 WHERE date='2026-03-10'")
+    conn.close()
+    assert _pool_bounds(l2_history_db)["sz000833"] == ("2026-03-10", "2026-03-11")
+    assert l2_history_db.rebuild_symbol_coverage_bounds() == {"history_daily_l2": 1, "atomic_trade_daily": 0}
+    assert _pool_bounds(l2_history_db)["sz000833"] == ("2026-03-11", "2026-03-11")
+
+
+def test_atomic_bounds_bootstrap_and_merge_script_update(monkeypatch, tmp_path):
+    atomic_db = _init_atomic_db(tmp_path)
+    delta_db = tmp_path / "delta.db"
+    shutil.copy(atomic_db, delta_db)
+    conn = sqlite3.connect(delta_db)
+    with conn:
+        conn.execute("UPDATE atomic_trade_daily SET trade_date='2026-04-13' WHERE trade_date='2026-04-10'")
+    conn.close()
+
+    l2_history_db = _reload_modules(monkeypatch, tmp_path)
+    assert _pool_bounds(l2_history_db) == {"sh603629": ("2026-04-09", "2026-04-10")}
+
+    import backend.scripts.merge_atomic_day_delta as merge_atomic_day_delta
+
+    merge_atomic_day_delta.merge_atomic_day_delta("2026-04-13", str(delta_db), target_db=str(atomic_db))
+
+    assert _pool_bounds(l2_history_db) == {"sh603629": ("2026-04-09", "2026-04-13")}
+    pool = l2_history_db.query_review_pool(keyword="603629")
+    assert pool["latest_date"] == "2026-04-13"
+    assert pool["items"][0]["source"] == "atomic_trade_daily"
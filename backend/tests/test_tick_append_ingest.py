@@ -0,0 +1,115 @@
+import asyncio
+import importlib
+import sqlite3
+
+
+def _reload_runtime_modules(monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "market_data.db"))
+    monkeypatch.setenv("USER_DB_PATH", str(tmp_path / "user_data.db"))
+    monkeypatch.setenv("INGEST_TOKEN", "secret")
+
+    import backend.app.core.config as config
+    import backend.app.db.crud as crud
+    import backend.app.db.database as database
+    import backend.app.routers.ingest as ingest
+
+    importlib.reload(config)
+    importlib.reload(database)
+    importlib.reload(crud)
+    importlib.reload(ingest)
+    database.init_db()
+    monkeypatch.setattr(ingest, "normalize_ingest_date", lambda raw: raw)
+    return config, crud, ingest
+
+
+def _rows(*items, symbol="sz000833", date="2026-03-12"):
+    return [(symbol, t, 10.0, 100, amount, "buy", date) for t, amount in items]
+
+
+def _stored_ticks(db_file):
+    conn = sqlite3.connect(db_file)
+    rows = conn.execute("SELECT time, amount FROM trade_ticks ORDER BY rowid").fetchall()
+    conn.close()
+    return rows
+
+
+def test_overwrite_sets_watermark_with_intra_second_ordinal(monkeypatch, tmp_path):
+    config, crud, _ = _reload_runtime_modules(monkeypatch, tmp_path)
+
+    watermark = crud.save_ticks_daily_overwrite(
+        "sz000833",
+        "2026-03-12",
+        _rows(("09:30:00", 1.0), ("09:30:03", 2.0), ("09:30:03", 3.0)),
+    )
+
+    assert watermark == {"last_time": "09:30:03", "last_seq": 2, "row_count": 3}
+    assert crud.get_tick_watermark("sz000833", "2026-03-12") == watermark
+
+
+def test_append_requires_matching_watermark(monkeypatch, tmp_path):
+    config, crud, _ = _reload_runtime_modules(monkeypatch, tmp_path)
+    base = crud.save_ticks_daily_overwrite("sz000833", "2026-03-12", _rows(("09:30:00", 1.0), ("09:30:03", 2.0)))
+
+    appended, watermark = crud.append_ticks_after_watermark(
+        "sz000833", "2026-03-12", base, _rows(("09:30:03", 3.0), ("09:30:06", 4.0))
+    )
+    assert appended is True
+    assert watermark == {"last_time": "09:30:06", "last_seq": 1, "row_count": 4}
+
+    stale_appended, current = crud.append_ticks_after_watermark(
+        "sz000833", "2026-03-12", base, _rows(("09:30:09", 5.0))
+    )
+    assert stale_appended is False
+    assert current == watermark
+    assert [amount for _, amount in _stored_ticks(config.DB_FILE)] == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_save_ticks_with_watermark_appends_delta_or_falls_back(monkeypatch, tmp_path):
+    config, crud, _ = _reload_runtime_modules(monkeypatch, tmp_path)
+    first = _rows(("09:30:00", 1.0), ("09:30:03", 2.0))
+    assert crud.save_ticks_with_watermark("sz000833", "2026-03-12", first)[0] == "overwritten"
+
+    grown = first + _rows(("09:30:03", 3.0), ("09:30:06", 4.0))
+    status, watermark = crud.save_ticks_with_watermark("sz000833", "2026-03-12", grown)
+    assert status == "appended"
+    assert watermark["row_count"] == 4
+
+    # 上游重抓后多出一笔更早的 tick，水位线处的秒内序号对不上 -> 回退全量覆盖
+    revised = _rows(("09:30:00", 1.0), ("09:30:01", 9.0), ("09:30:03", 2.0), ("09:30:03", 3.0), ("09:30:06", 4.0))
+    status, watermark = crud.save_ticks_with_watermark("sz000833", "2026-03-12", revised)
+    assert status == "overwritten"
+    assert watermark == {"last_time": "09:30:06", "last_seq": 1, "row_count": 5}
+    assert [amount for _, amount in _stored_ticks(config.DB_FILE)] == [1.0, 9.0, 2.0, 3.0, 4.0]
+
+
+def test_ingest_append_mode_reports_resync_on_mismatch(monkeypatch, tmp_path):
+    config, crud, ingest = _reload_runtime_modules(monkeypatch, tmp_path)
+    from backend.app.models.ingest_models import IngestTicksRequest
+
+    def _tick(t, amount):
+        return {"symbol": "sz000833", "time": t, "price": 10.0, "volume": 100, "amount": amount, "type": "buy", "date": "2026-03-12"}
+
+    overwrite = asyncio.run(ingest.ingest_ticks(IngestTicksRequest(
+        token="secret",
+        ticks=[_tick("09:30:00", 1.0), _tick("09:30:03", 2.0)],
+    )))
+    base = overwrite["tick_watermarks"][0]["watermark"]
+    assert overwrite["tick_watermarks"][0]["status"] == "overwritten"
+
+    appended = asyncio.run(ingest.ingest_ticks(IngestTicksRequest(
+        token="secret",
+        mode="append",
+        watermarks=[{"symbol": "sz000833", "date": "2026-03-12", **base}],
+        ticks=[_tick("09:30:03", 3.0)],
+    )))
+    assert appended["tick_watermarks"][0]["status"] == "appended"
+    assert appended["tick_watermarks"][0]["watermark"] == {"last_time": "09:30:03", "last_seq": 2, "row_count": 3}
+
+    replayed = asyncio.run(ingest.ingest_ticks(IngestTicksRequest(
+        token="secret",
+        mode="append",
+        watermarks=[{"symbol": "sz000833", "date": "2026-03-12", **base}],
+        ticks=[_tick("09:30:03", 3.0)],
+    )))
+    assert replayed["tick_watermarks"][0]["status"] == "resync_required"
+    assert len(_stored_ticks(config.DB_FILE)) == 3
@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { TrendingUp } from 'lucide-react';
 import { Line, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, Legend, Area, ComposedChart } from 'recharts';
-import { TickData, SearchResult, CapitalRatioData, CumulativeCapitalData, DashboardSourceMeta, IntradayFusionData } from '../../types';
+import { TickData, SearchResult, CapitalRatioData, CumulativeCapitalData, DashboardSourceMeta, IntradayFusionData, RealtimeStreamDelta } from '../../types';
 import * as StockService from '../../services/stockService';
 import FundsBattleSection from './FundsBattleSection';
 
@@ -141,6 +141,65 @@ const RealtimeView: React.FC<RealtimeViewProps> = ({ activeStock, configVersion,
         }
 
         let intervalId: any = null;
+        let stream: EventSource | null = null;
+        let lastSeq = 0;
+
+        const toChartRows = (rows: any[]) => (rows || []).map((d: any) => ({
+            ...d,
+            mainSellAmountPlot: d.mainSellAmount ? -d.mainSellAmount : 0,
+            mainBuyAmount: d.mainBuyAmount || 0,
+            superSellAmountPlot: d.superSellAmount ? -d.superSellAmount : 0,
+            superBuyAmount: d.superBuyAmount || 0,
+            closePrice: d.closePrice || 0
+        }));
+
+        const toTicks = (rows: any[]) => (rows || []).map((t: any) => ({
+            ...t,
+            color: t.type === 'buy' ? 'text-red-500' : (t.type === 'sell' ? 'text-green-500' : 'text-slate-400')
+        }));
+
+        const upsertBy = <T, K extends keyof T>(prev: T[], rows: T[], key: K): T[] => {
+            if (!rows || rows.length === 0) return prev;
+            const merged = new Map(prev.map(row => [row[key], row] as [T[K], T]));
+            rows.forEach(row => merged.set(row[key], row));
+            return Array.from(merged.values()).sort((a, b) => String(a[key]).localeCompare(String(b[key])));
+        };
+
+        const markUpdated = () => {
+            const now = new Date();
+            setLastUpdated(now.toTimeString().split(' ')[0]); // 24-hour format HH:MM:SS
+        };
+
+        const applyDashboard = (data: any) => {
+            // Update Chart Data (Full Series)
+            setChartData(toChartRows(data.chart_data));
+            setCumulativeData(data.cumulative_data || []);
+            setSourceMeta({
+                natural_today: data.natural_today,
+                source: data.source,
+                is_finalized: data.is_finalized,
+                bucket_granularity: data.bucket_granularity,
+                display_date: data.display_date,
+                market_status: data.market_status,
+                market_status_label: data.market_status_label,
+                default_display_date: data.default_display_date,
+                default_display_scope: data.default_display_scope,
+                default_display_scope_label: data.default_display_scope_label,
+                view_mode: data.view_mode,
+                view_mode_label: data.view_mode_label,
+                is_realtime_session: data.is_realtime_session,
+            });
+
+            // Update Ticks Table (Only latest N)
+            if (data.latest_ticks && Array.isArray(data.latest_ticks)) {
+                setDisplayTicks(toTicks(data.latest_ticks));
+            }
+
+            markUpdated();
+            if (data.display_date) {
+                setDisplayDate(data.display_date);
+            }
+        };
 
         const fetchData = async () => {
             if (!isMounted || isFetchingRef.current) return;
@@ -157,47 +216,7 @@ const RealtimeView: React.FC<RealtimeViewProps> = ({ activeStock, configVersion,
                 }
 
                 if (data) {
-                    // Update Chart Data (Full Series)
-                    const processedChart = (data.chart_data || []).map((d: any) => ({
-                        ...d,
-                        mainSellAmountPlot: d.mainSellAmount ? -d.mainSellAmount : 0,
-                        mainBuyAmount: d.mainBuyAmount || 0,
-                        superSellAmountPlot: d.superSellAmount ? -d.superSellAmount : 0,
-                        superBuyAmount: d.superBuyAmount || 0,
-                        closePrice: d.closePrice || 0
-                    }));
-                    setChartData(processedChart);
-                    setCumulativeData(data.cumulative_data || []);
-                    setSourceMeta({
-                        natural_today: data.natural_today,
-                        source: data.source,
-                        is_finalized: data.is_finalized,
-                        bucket_granularity: data.bucket_granularity,
-                        display_date: data.display_date,
-                        market_status: data.market_status,
-                        market_status_label: data.market_status_label,
-                        default_display_date: data.default_display_date,
-                        default_display_scope: data.default_display_scope,
-                        default_display_scope_label: data.default_display_scope_label,
-                        view_mode: data.view_mode,
-                        view_mode_label: data.view_mode_label,
-                        is_realtime_session: data.is_realtime_session,
-                    });
-
-                    // Update Ticks Table (Only latest N)
-                    if (data.latest_ticks && Array.isArray(data.latest_ticks)) {
-                        const ticks = data.latest_ticks.map((t: any) => ({
-                            ...t,
-                            color: t.type === 'buy' ? 'text-red-500' : (t.type === 'sell' ? 'text-green-500' : 'text-slate-400')
-                        }));
-                        setDisplayTicks(ticks);
-                    }
-
-                    const now = new Date();
-                    setLastUpdated(now.toTimeString().split(' ')[0]); // 24-hour format HH:MM:SS
-                    if (data.display_date) {
-                        setDisplayDate(data.display_date);
-                    }
+                    applyDashboard(data);
                     if (intervalId && data.market_status !== 'trading') {
                         clearInterval(intervalId);
                         intervalId = null;
@@ -221,12 +240,49 @@ const RealtimeView: React.FC<RealtimeViewProps> = ({ activeStock, configVersion,
             }
         };
 
-        fetchData();
+        if (enableRealtimeTracking) {
+            // 盘中改为服务端推送：首帧 snapshot 同时带 dashboard 与 fusion，之后只收增量。
+            setIsLoadingDashboard(true);
+            stream = StockService.openRealtimeStream(activeStock.symbol, {
+                onSnapshot: (payload) => {
+                    if (!isMounted) return;
+                    lastSeq = payload.seq;
+                    setIsLoadingDashboard(false);
+                    if (payload.dashboard) applyDashboard(payload.dashboard);
+                    if (payload.fusion) setFusionData(payload.fusion);
+                },
+                onDelta: (delta: RealtimeStreamDelta) => {
+                    // 首帧或整帧已覆盖的增量不再叠加，否则 latest_ticks 会重复
+                    if (!isMounted || delta.seq <= lastSeq) return;
+                    lastSeq = delta.seq;
+                    setChartData(prev => upsertBy(prev, toChartRows(delta.chart_data), 'time'));
+                    setCumulativeData(prev => upsertBy(prev, delta.cumulative_data, 'time'));
+                    if (delta.latest_ticks.length > 0) {
+                        setDisplayTicks(prev => [...toTicks(delta.latest_ticks), ...prev].slice(0, 50));
+                    }
+                    setFusionData(prev => (prev ? { ...prev, bars: upsertBy(prev.bars, delta.bars, 'datetime') } : prev));
+                    markUpdated();
+                },
+                onReset: (state: RealtimeStreamDelta) => {
+                    if (!isMounted) return;
+                    lastSeq = state.seq;
+                    setChartData(toChartRows(state.chart_data));
+                    setCumulativeData(state.cumulative_data || []);
+                    setDisplayTicks(toTicks(state.latest_ticks));
+                    setFusionData(prev => (prev ? { ...prev, bars: state.bars } : prev));
+                    markUpdated();
+                },
+            });
+        }
 
-        if (enableRealtimeTracking && shouldPollRealtime()) {
-            // Quiet refresh: focus=5s, normal=30s.
-            const intervalMs = focusMode === 'focus' ? 5000 : 30000;
-            intervalId = setInterval(fetchData, intervalMs);
+        if (!stream) {
+            fetchData();
+
+            if (enableRealtimeTracking && shouldPollRealtime()) {
+                // EventSource 不可用时回退轮询：focus=5s, normal=30s.
+                const intervalMs = focusMode === 'focus' ? 5000 : 30000;
+                intervalId = setInterval(fetchData, intervalMs);
+            }
         }
 
         return () => {
@@ -234,14 +290,16 @@ const RealtimeView: React.FC<RealtimeViewProps> = ({ activeStock, configVersion,
             // 心跳随组件卸载自动停止
             if (heartbeatInterval) clearInterval(heartbeatInterval);
             if (intervalId) clearInterval(intervalId);
+            if (stream) stream.close();
         };
     }, [activeStock, forceRefresh, selectedDate, focusMode]);
 
     useEffect(() => {
         if (!activeStock) return;
+        // 盘中推送流已携带 fusion 首帧与 5m bar 增量
+        if (!selectedDate && shouldPollRealtime() && typeof EventSource !== 'undefined') return;
 
         let isMounted = true;
-        let intervalId: any = null;
 
         const fetchFusion = async () => {
             if (!isMounted) return;
@@ -259,6 +317,7 @@ const RealtimeView: React.FC<RealtimeViewProps> = ({ activeStock, configVersion,
 
         fetchFusion();
 
+        let intervalId: any = null;
         if (!selectedDate && shouldPollRealtime()) {
             const intervalMs = focusMode === 'focus' ? 5000 : 30000;
             intervalId = setInterval(fetchFusion, intervalMs);
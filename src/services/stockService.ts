@@ -9,6 +9,7 @@ import {
   HistoryMultiframeItem,
   IntradayFusionData,
   RealtimeDashboardData,
+  RealtimeStreamDelta,
   SandboxPoolItem,
   SandboxReviewBar,
   ReviewPoolItem,
@@ -302,6 +303,37 @@ export const fetchIntradayFusion = async (symbol: string, date?: string): Promis
   }
 };
 
+export interface RealtimeStreamHandlers {
+  onSnapshot: (payload: { seq: number; live: boolean; dashboard: RealtimeDashboardData | null; fusion: IntradayFusionData | null }) => void;
+  onDelta: (payload: RealtimeStreamDelta) => void;
+  onReset: (payload: RealtimeStreamDelta) => void;
+  onEnd?: () => void;
+}
+
+// 盘中分时推送：首帧 snapshot，之后只收 delta / reset。断线由 EventSource 自动重连（重连会重新收到 snapshot）。
+export const openRealtimeStream = (symbol: string, handlers: RealtimeStreamHandlers, date?: string): EventSource | null => {
+  if (typeof EventSource === 'undefined') return null;
+  const url = `${API_BASE_URL}/realtime/stream?symbol=${symbol}${date ? `&date=${date}` : ''}`;
+  const source = new EventSource(url);
+  const listen = (event: string, handler: (payload: any) => void) => {
+    source.addEventListener(event, (e: MessageEvent) => {
+      try {
+        handler(JSON.parse(e.data));
+      } catch (err) {
+        console.warn(`Realtime stream ${event} parse error:`, err);
+      }
+    });
+  };
+  listen('snapshot', handlers.onSnapshot);
+  listen('delta', handlers.onDelta);
+  listen('reset', handlers.onReset);
+  listen('end', () => {
+    source.close();
+    handlers.onEnd?.();
+  });
+  return source;
+};
+
 // ==========================================
 // Watchlist API
 // ==========================================
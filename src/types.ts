@@ -138,6 +138,18 @@ export interface IntradayFusionData {
   bars: IntradayFusionBar[];
 }
 
+// /realtime/stream 的 delta / reset 载荷：chart/cumulative 按 time、bars 按 datetime upsert；
+// delta 的 latest_ticks 只含新增成交（新在前），reset 则为整帧替换。
+export interface RealtimeStreamDelta {
+  symbol: string;
+  trade_date: string;
+  seq: number;
+  chart_data: CapitalRatioData[];
+  cumulative_data: CumulativeCapitalData[];
+  latest_ticks: TickData[];
+  bars: IntradayFusionBar[];
+}
+
 export interface FundsBattleSignalTuning {
   diffThreshold: number;
   cancelThreshold: number;